@@ -7,8 +7,10 @@ from flask_migrate import Migrate
 from marshmallow import ValidationError
 import os
 
+from app.services.replica import RoutingSession
+
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
 
@@ -20,12 +22,38 @@ def create_app(config_name=None):
     config_name = config_name or os.getenv('FLASK_ENV', 'development')
     app.config.from_object(f'app.config.{config_name.title()}Config')
 
+    # Encode every JSON response through the fast serialization path
+    from app.utils.serialization import JSONProvider, output_json
+    app.json = JSONProvider(app)
+
+    # Compress large responses; registered first so it runs after every other after_request hook
+    from app.utils import compression
+    compression.init_app(app)
+
     # Initialize extensions
+    from app.services import pool_telemetry, replica
+    pool_telemetry.init_app(app)
+    replica.configure(app)
     db.init_app(app)
+    replica.init_app(app, db)
     jwt.init_app(app)
     migrate.init_app(app, db)
     CORS(app)
 
+    # Import models so string-based relationships resolve
+    from app.models import user, gym, exercise, metric, cohort, sync, job, notification, token  # noqa: F401
+
+    # Initialize services
+    from app.services import access, catalog, conditional, dashboard, instrumentation, principals, revocation, storage
+    access.init_app(app)
+    catalog.init_app(app)
+    conditional.init_app(app)
+    dashboard.init_app(app)
+    instrumentation.init_app(app)
+    principals.init_app(app)
+    revocation.init_app(app)
+    storage.init_app(app)
+
     # Initialize API
     api = Api(
         app,
@@ -35,6 +63,7 @@ def create_app(config_name=None):
         doc='/api/docs/',
         prefix='/api'
     )
+    api.representations['application/json'] = output_json
 
     # Register blueprints
     from app.routes.auth import auth_bp, auth_ns
@@ -44,6 +73,9 @@ def create_app(config_name=None):
     from app.routes.metrics import metrics_bp, metrics_ns
     from app.routes.cohorts import cohorts_bp, cohorts_ns
     from app.routes.health import health_bp
+    from app.routes.sync import sync_bp, sync_ns
+    from app.routes.system import system_bp
+    from app.routes.uploads import uploads_bp, uploads_ns
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
@@ -52,6 +84,9 @@ def create_app(config_name=None):
     app.register_blueprint(metrics_bp)
     app.register_blueprint(cohorts_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(system_bp)
+    app.register_blueprint(uploads_bp)
 
     # Add namespaces to API
     api.add_namespace(auth_ns)
@@ -60,6 +95,8 @@ def create_app(config_name=None):
     api.add_namespace(exercises_ns)
     api.add_namespace(metrics_ns)
     api.add_namespace(cohorts_ns)
+    api.add_namespace(sync_ns)
+    api.add_namespace(uploads_ns)
 
     # Error handlers
     @app.errorhandler(ValidationError)
@@ -0,0 +1,51 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from app.schemas.cohort import cohort_serializer
+from datetime import datetime, date
+
+class Cohort(db.Model):
+    __tablename__ = 'cohorts'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    name = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    color = db.Column(db.String(7), nullable=True)  # hex color code #RRGGBB
+    image_url = db.Column(db.String(500), nullable=True)
+    coach_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    gym_id = db.Column(BinaryUUID, db.ForeignKey('gyms.id', ondelete='CASCADE'), nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_cohorts_updated_at_id', 'updated_at', 'id'),
+    )
+
+    # Relationships
+    coach = db.relationship('User')
+    gym = db.relationship('Gym')
+    memberships = db.relationship('CohortMembership', back_populates='cohort', cascade='all, delete-orphan')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return cohort_serializer.dump(self)
+
+class CohortMembership(db.Model):
+    __tablename__ = 'cohort_memberships'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    cohort_id = db.Column(BinaryUUID, db.ForeignKey('cohorts.id', ondelete='CASCADE'), nullable=False)
+    athlete_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    joined_at = db.Column(db.Date, default=date.today, nullable=False)
+    is_active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('cohort_id', 'athlete_id', name='unique_cohort_athlete'),
+        db.Index('idx_cohort_membership_updated_at_id', 'updated_at', 'id'),
+    )
+
+    # Relationships
+    cohort = db.relationship('Cohort', back_populates='memberships')
+    athlete = db.relationship('User')
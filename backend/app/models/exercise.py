@@ -0,0 +1,91 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from app.schemas.exercise import exercise_metric_serializer, exercise_serializer
+from datetime import datetime
+
+class Exercise(db.Model):
+    __tablename__ = 'exercises'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    is_enabled = db.Column(db.Boolean, default=True, nullable=False)
+    creator_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    name = db.Column(db.String(255), nullable=False)
+    creator_name = db.Column(db.String(255), nullable=True)
+    category = db.Column(db.Enum('custom', 'system', name='exercise_category_enum'), nullable=False)
+    instructions = db.Column(db.Text, nullable=True)
+    instruction_video_id = db.Column(db.String(255), nullable=True)
+    image_url = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_exercises_updated_at_id', 'updated_at', 'id'),
+    )
+
+    # Relationships
+    metrics = db.relationship('ExerciseMetric', back_populates='exercise', cascade='all, delete-orphan')
+    body_segments = db.relationship('ExerciseBodySegment', back_populates='exercise', cascade='all, delete-orphan')
+    equipment = db.relationship('ExerciseEquipment', back_populates='exercise', cascade='all, delete-orphan')
+    search_terms = db.relationship('ExerciseSearchTerm', back_populates='exercise', cascade='all, delete-orphan')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return exercise_serializer.dump(self)
+
+class ExerciseMetric(db.Model):
+    __tablename__ = 'exercise_metrics'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    name = db.Column(db.String(255), nullable=False)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
+    is_enabled = db.Column(db.Boolean, default=True, nullable=False)
+    display_units = db.Column(db.Enum('metric', 'imperial', name='display_units_enum'), default='metric', nullable=False)
+    unit_of_measure = db.Column(
+        db.Enum('Meter', 'Kilogram', 'Second', 'Newton', 'Watt', 'Number', name='unit_of_measure_enum'),
+        nullable=False
+    )
+    decimals = db.Column(db.Integer, default=2, nullable=False)
+    min_value = db.Column(db.Numeric(15, 6), nullable=True)
+    max_value = db.Column(db.Numeric(15, 6), nullable=True)
+    default_value = db.Column(db.Numeric(15, 6), nullable=True)
+    higher_is_better = db.Column(db.Boolean, default=True, nullable=False)
+
+    # Relationships
+    exercise = db.relationship('Exercise', back_populates='metrics')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return exercise_metric_serializer.dump(self)
+
+class ExerciseBodySegment(db.Model):
+    __tablename__ = 'exercise_body_segments'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    name = db.Column(db.String(255), nullable=False)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+
+    # Relationships
+    exercise = db.relationship('Exercise', back_populates='body_segments')
+
+class ExerciseEquipment(db.Model):
+    __tablename__ = 'exercise_equipment'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    name = db.Column(db.String(255), nullable=False)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+
+    # Relationships
+    exercise = db.relationship('Exercise', back_populates='equipment')
+
+class ExerciseSearchTerm(db.Model):
+    __tablename__ = 'exercise_search_terms'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    name = db.Column(db.String(255), nullable=False)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+
+    # Relationships
+    exercise = db.relationship('Exercise', back_populates='search_terms')
@@ -0,0 +1,28 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from app.schemas.gym import gym_serializer
+from datetime import datetime
+
+class Gym(db.Model):
+    __tablename__ = 'gyms'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    name = db.Column(db.String(255), nullable=False)
+    address = db.Column(db.Text, nullable=True)
+    phone = db.Column(db.String(20), nullable=True)
+    email = db.Column(db.String(255), nullable=True)
+    website = db.Column(db.String(255), nullable=True)
+    archived = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_gyms_updated_at_id', 'updated_at', 'id'),
+    )
+
+    # Relationships
+    user_relationships = db.relationship('UserGymRelationship', back_populates='gym', cascade='all, delete-orphan')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return gym_serializer.dump(self)
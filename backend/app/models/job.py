@@ -0,0 +1,27 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from datetime import datetime
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by `flask run-jobs`"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(
+        db.Enum('queued', 'running', 'failed', name='job_status_enum'),
+        default='queued', nullable=False
+    )
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    # Earliest time the job may run; pushed back on each retry
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_jobs_kind_status_run_at', 'kind', 'status', 'run_at'),
+    )
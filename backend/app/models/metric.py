@@ -0,0 +1,156 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from app.schemas.metric import import_serializer, metric_serializer, rollup_serializer
+from datetime import datetime
+
+class PerformanceMetric(db.Model):
+    __tablename__ = 'performance_metrics'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    athlete_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False, index=True)
+    coach_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    gym_id = db.Column(BinaryUUID, db.ForeignKey('gyms.id', ondelete='CASCADE'), nullable=False, index=True)
+    exercise_metric_id = db.Column(BinaryUUID, db.ForeignKey('exercise_metrics.id', ondelete='CASCADE'), nullable=False, index=True)
+    value = db.Column(db.Numeric(15, 6), nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
+    notes = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_performance_metrics_athlete_date', 'athlete_id', 'date'),
+        db.Index('idx_performance_metrics_athlete_exercise', 'athlete_id', 'exercise_id'),
+        db.Index('idx_performance_metrics_updated_at_id', 'updated_at', 'id'),
+    )
+
+    # Relationships
+    athlete = db.relationship('User', foreign_keys=[athlete_id])
+    coach = db.relationship('User', foreign_keys=[coach_id])
+    exercise = db.relationship('Exercise')
+    exercise_metric = db.relationship('ExerciseMetric')
+    gym = db.relationship('Gym')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return metric_serializer.dump(self)
+
+class AthleteMetricRollup(db.Model):
+    """Personal best, latest value and test count per athlete and exercise metric"""
+    __tablename__ = 'athlete_metric_rollups'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    athlete_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    exercise_metric_id = db.Column(BinaryUUID, db.ForeignKey('exercise_metrics.id', ondelete='CASCADE'), nullable=False)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
+    test_count = db.Column(db.Integer, default=0, nullable=False)
+    best_value = db.Column(db.Numeric(15, 6), nullable=False)
+    best_date = db.Column(db.Date, nullable=False)
+    latest_value = db.Column(db.Numeric(15, 6), nullable=False)
+    latest_date = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('athlete_id', 'exercise_metric_id', name='unique_athlete_metric'),
+        db.Index('idx_rollups_metric_best', 'exercise_metric_id', 'best_value'),
+        db.Index('idx_rollups_latest_date', 'latest_date'),
+    )
+
+    # Relationships
+    exercise_metric = db.relationship('ExerciseMetric')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return rollup_serializer.dump(self)
+
+class MetricImport(db.Model):
+    """A CSV import of historical results; progress is committed with each batch"""
+    __tablename__ = 'metric_imports'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    gym_id = db.Column(BinaryUUID, db.ForeignKey('gyms.id', ondelete='CASCADE'), nullable=False)
+    coach_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_by = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(
+        db.Enum('running', 'completed', 'failed', name='metric_import_status_enum'),
+        default='running', nullable=False
+    )
+    # Data rows (after the header) consumed by committed batches; resuming skips these
+    rows_read = db.Column(db.Integer, default=0, nullable=False)
+    inserted = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    errors = db.relationship('MetricImportError', back_populates='metric_import', cascade='all, delete-orphan', lazy='dynamic')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return import_serializer.dump(self)
+
+class MetricImportError(db.Model):
+    """A rejected row of a metric import"""
+    __tablename__ = 'metric_import_errors'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    import_id = db.Column(BinaryUUID, db.ForeignKey('metric_imports.id', ondelete='CASCADE'), nullable=False)
+    row_number = db.Column(db.Integer, nullable=False)
+    error = db.Column(db.String(255), nullable=False)
+    line = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_metric_import_errors_row', 'import_id', 'row_number'),
+    )
+
+    # Relationships
+    metric_import = db.relationship('MetricImport', back_populates='errors')
+
+class AthleteMetricAnalytics(db.Model):
+    """Progress analytics per athlete and exercise metric, written by `flask compute-analytics`"""
+    __tablename__ = 'athlete_metric_analytics'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    athlete_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    exercise_metric_id = db.Column(BinaryUUID, db.ForeignKey('exercise_metrics.id', ondelete='CASCADE'), nullable=False)
+    exercise_id = db.Column(BinaryUUID, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False)
+    first_date = db.Column(db.Date, nullable=False)
+    last_date = db.Column(db.Date, nullable=False)
+    # Mean of the most recent ANALYTICS_WINDOW values (SI units)
+    rolling_mean = db.Column(db.Numeric(15, 6), nullable=False)
+    # Least-squares slope over the last ANALYTICS_TREND_DAYS days, SI units per week
+    slope_per_week = db.Column(db.Numeric(15, 6), nullable=True)
+    # Improvement per 30 days as a percentage of rolling_mean; negative means getting worse
+    progress_pct = db.Column(db.Float, nullable=True)
+    # No new personal best in the last ANALYTICS_PLATEAU_TESTS tests; plateau_since is the last best
+    plateau = db.Column(db.Boolean, default=False, nullable=False)
+    plateau_since = db.Column(db.Date, nullable=True)
+    outlier_count = db.Column(db.Integer, default=0, nullable=False)
+    latest_is_outlier = db.Column(db.Boolean, default=False, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('athlete_id', 'exercise_metric_id', name='unique_athlete_metric_analytics'),
+        db.Index('idx_analytics_metric_last_date', 'exercise_metric_id', 'last_date'),
+    )
+
+class AnalyticsRun(db.Model):
+    """One run of `flask compute-analytics`; the next incremental run starts from the last finished watermark"""
+    __tablename__ = 'analytics_runs'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    full = db.Column(db.Boolean, default=False, nullable=False)
+    # Rows changed at or after this time are picked up by the next run
+    watermark = db.Column(db.DateTime, nullable=False)
+    athletes = db.Column(db.Integer, default=0, nullable=False)
+    rows_read = db.Column(db.Integer, default=0, nullable=False)
+    rows_written = db.Column(db.Integer, default=0, nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_analytics_runs_finished_at', 'finished_at'),
+    )
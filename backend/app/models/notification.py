@@ -0,0 +1,33 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from datetime import datetime
+
+class ResponsibleParty(db.Model):
+    """Someone (parent, guardian, ...) who receives an athlete's notifications"""
+    __tablename__ = 'responsible_parties'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    athlete_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    archived = db.Column(db.Boolean, default=False, nullable=False, index=True)
+    email = db.Column(db.String(255), nullable=False, index=True)
+    first_name = db.Column(db.String(100), nullable=False)
+    last_name = db.Column(db.String(100), nullable=False)
+    relationship = db.Column(db.String(50), nullable=True)  # parent, guardian, spouse, etc.
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    athlete = db.relationship('User')
+
+class NotificationPreference(db.Model):
+    """A user's notification opt-outs; users without a row get everything"""
+    __tablename__ = 'user_notification_preferences'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    user_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, unique=True)
+    email_notifications = db.Column(db.Boolean, default=True, nullable=False)
+    performance_updates = db.Column(db.Boolean, default=True, nullable=False)
+    cohort_updates = db.Column(db.Boolean, default=True, nullable=False)
+    system_alerts = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
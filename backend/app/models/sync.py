@@ -0,0 +1,20 @@
+from app import db
+from app.utils.ids import BinaryUUID, new_id
+from datetime import datetime
+
+class SyncTombstone(db.Model):
+    """A deleted row, kept so delta sync can tell clients to drop it"""
+    __tablename__ = 'sync_tombstones'
+
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    entity = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(BinaryUUID, nullable=False)
+    # Scope keys of the deleted row; which callers see the tombstone
+    athlete_id = db.Column(BinaryUUID, nullable=True)
+    gym_id = db.Column(BinaryUUID, nullable=True)
+    cohort_id = db.Column(BinaryUUID, nullable=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_sync_tombstones_deleted_at_id', 'deleted_at', 'id'),
+    )
@@ -0,0 +1,37 @@
+from sqlalchemy.dialects import mysql
+
+from app import db
+from app.utils.ids import BinaryUUID
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    """A revoked access token, kept until the token would have expired anyway"""
+    __tablename__ = 'revoked_tokens'
+
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_revoked_tokens_expires_at', 'expires_at'),
+        db.Index('idx_revoked_tokens_created_at', 'created_at'),
+    )
+
+class TokenCutoff(db.Model):
+    """Revokes every token of a user issued before ``revoked_before``"""
+    __tablename__ = 'token_cutoffs'
+
+    user_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    # Microseconds, compared with the issue time tokens carry in their iat_us claim
+    revoked_before = db.Column(
+        db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql', 'mariadb'), nullable=False
+    )
+    # When the last token issued before the cutoff expires
+    expires_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_token_cutoffs_expires_at', 'expires_at'),
+        db.Index('idx_token_cutoffs_updated_at', 'updated_at'),
+    )
@@ -1,12 +1,13 @@
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.ids import BinaryUUID, new_id
+from app.services import passwords
+from app.schemas.user import user_serializer
 from datetime import datetime
-import uuid
 
 class User(db.Model):
     __tablename__ = 'users'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
     external_id = db.Column(db.String(255), nullable=True)
     archived = db.Column(db.Boolean, default=False, nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False)
@@ -26,18 +27,31 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        db.Index('idx_users_created_at_id', 'created_at', 'id'),
+        db.Index('idx_users_last_name_id', 'last_name', 'id'),
+        db.Index('idx_users_updated_at_id', 'updated_at', 'id'),
+    )
+
     # Relationships
     gym_relationships = db.relationship('UserGymRelationship', back_populates='user', cascade='all, delete-orphan')
-    coached_athletes = db.relationship('UserCoachRelationship', foreign_keys='UserCoachRelationship.coach_id', back_populates='coach')
-    athlete_coaches = db.relationship('UserCoachRelationship', foreign_keys='UserCoachRelationship.athlete_id', back_populates='athlete')
+    # Deleted with the user by ON DELETE CASCADE, not loaded and nulled out by the ORM
+    coached_athletes = db.relationship('UserCoachRelationship', foreign_keys='UserCoachRelationship.coach_id',
+                                       back_populates='coach', passive_deletes=True)
+    athlete_coaches = db.relationship('UserCoachRelationship', foreign_keys='UserCoachRelationship.athlete_id',
+                                      back_populates='athlete', passive_deletes=True)
 
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
         """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Check if the stored hash uses outdated parameters"""
+        return passwords.needs_rehash(self.password_hash)
 
     def has_role(self, role):
         """Check if user has specific role"""
@@ -51,29 +65,23 @@ class User(db.Model):
 
     def to_dict(self):
         """Convert to dictionary"""
-        return {
-            'id': self.id,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'nick_name': self.nick_name,
-            'is_athlete': self.is_athlete,
-            'is_coach': self.is_coach,
-            'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        return user_serializer.dump(self)
 
 class UserGymRelationship(db.Model):
     __tablename__ = 'user_gym_relationships'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    gym_id = db.Column(db.String(36), db.ForeignKey('gyms.id'), nullable=False)
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    user_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    gym_id = db.Column(BinaryUUID, db.ForeignKey('gyms.id', ondelete='CASCADE'), nullable=False)
     role = db.Column(db.Enum('athlete', 'coach', name='gym_role_enum'), nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_approved = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_user_gym_updated_at_id', 'updated_at', 'id'),
+    )
 
     # Relationships
     user = db.relationship('User', back_populates='gym_relationships')
@@ -82,12 +90,17 @@ class UserGymRelationship(db.Model):
 class UserCoachRelationship(db.Model):
     __tablename__ = 'user_coach_relationships'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    athlete_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    coach_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    gym_id = db.Column(db.String(36), db.ForeignKey('gyms.id'), nullable=False)
+    id = db.Column(BinaryUUID, primary_key=True, default=new_id)
+    athlete_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    coach_id = db.Column(BinaryUUID, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    gym_id = db.Column(BinaryUUID, db.ForeignKey('gyms.id', ondelete='CASCADE'), nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_user_coach_updated_at_id', 'updated_at', 'id'),
+    )
 
     # Relationships
     athlete = db.relationship('User', foreign_keys=[athlete_id], back_populates='athlete_coaches')
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, current_user, get_jwt
 from app import db
 from app.models.user import User
 from app.schemas.user import UserSchema
+from app.services import revocation
+from app.services.passwords import HashingBusy
 from marshmallow import ValidationError
 
 auth_bp = Blueprint('auth', __name__)
@@ -45,6 +47,11 @@ class Login(Resource):
             if not user or not user.check_password(password):
                 return {'error': 'Invalid credentials'}, 401
 
+            # Upgrade hashes created with older cost parameters
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+
             access_token = create_access_token(identity=user.id)
 
             return {
@@ -52,7 +59,11 @@ class Login(Resource):
                 'user': user.to_dict()
             }, 200
 
+        except HashingBusy as e:
+            db.session.rollback()
+            return {'error': 'Authentication is busy, retry shortly', 'details': str(e)}, 503, {'Retry-After': '1'}
         except Exception as e:
+            db.session.rollback()
             return {'error': 'Login failed', 'details': str(e)}, 500
 
 @auth_ns.route('/register')
@@ -91,6 +102,9 @@ class Register(Resource):
                 'user': user.to_dict()
             }, 201
 
+        except HashingBusy as e:
+            db.session.rollback()
+            return {'error': 'Authentication is busy, retry shortly', 'details': str(e)}, 503, {'Retry-After': '1'}
         except Exception as e:
             db.session.rollback()
             return {'error': 'Registration failed', 'details': str(e)}, 500
@@ -101,12 +115,9 @@ class CurrentUser(Resource):
     def get(self):
         """Get current user info"""
         try:
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-
-            if not user or user.archived:
+            user = db.session.get(User, current_user.id)
+            if user is None:
                 return {'error': 'User not found'}, 404
-
             return {'user': user.to_dict()}, 200
 
         except Exception as e:
@@ -118,13 +129,7 @@ class RefreshToken(Resource):
     def post(self):
         """Refresh access token"""
         try:
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-
-            if not user or user.archived:
-                return {'error': 'User not found'}, 404
-
-            access_token = create_access_token(identity=user_id)
+            access_token = create_access_token(identity=current_user.id)
 
             return {'access_token': access_token}, 200
 
@@ -133,8 +138,19 @@ class RefreshToken(Resource):
 
 @auth_ns.route('/logout')
 class Logout(Resource):
+    @auth_ns.doc(params={'everywhere': 'Also revoke every other token issued to the user so far'})
     @jwt_required()
     def post(self):
-        """User logout"""
-        # In a production app, you'd add the token to a blacklist
-        return {'message': 'Successfully logged out'}, 200
+        """User logout; revokes the access token"""
+        try:
+            if request.args.get('everywhere', '').lower() in ('1', 'true', 'yes'):
+                revocation.revoke_user_tokens(current_user.id)
+            else:
+                revocation.revoke_token(get_jwt())
+            db.session.commit()
+
+            return {'message': 'Successfully logged out'}, 200
+
+        except Exception as e:
+            db.session.rollback()
+            return {'error': 'Logout failed', 'details': str(e)}, 500
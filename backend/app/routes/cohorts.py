@@ -7,17 +7,17 @@ cohorts_ns = Namespace('cohorts', description='Training cohort operations')
 
 # Basic cohort model for API documentation
 cohort_model = cohorts_ns.model('Cohort', {
-    'id': fields.Integer(required=True, description='Cohort ID'),
+    'id': fields.String(required=True, description='Cohort ID'),
     'name': fields.String(required=True, description='Cohort name'),
     'description': fields.String(description='Cohort description'),
-    'gym_id': fields.Integer(description='Associated gym ID'),
+    'gym_id': fields.String(description='Associated gym ID'),
     'created_at': fields.DateTime(description='Creation timestamp')
 })
 
 @cohorts_ns.route('/')
 class CohortList(Resource):
     @cohorts_ns.doc('list_cohorts')
-    @cohorts_ns.marshal_list_with(cohort_model)
+    @cohorts_ns.response(200, 'Success', [cohort_model])
     @jwt_required()
     def get(self):
         """Fetch all cohorts"""
@@ -25,18 +25,18 @@ class CohortList(Resource):
         return []
 
     @cohorts_ns.doc('create_cohort')
-    @cohorts_ns.marshal_with(cohort_model, code=201)
+    @cohorts_ns.response(201, 'Created', cohort_model)
     @jwt_required()
     def post(self):
         """Create a new cohort"""
         # Placeholder implementation
         return {'message': 'Cohort creation not implemented yet'}, 501
 
-@cohorts_ns.route('/<int:cohort_id>')
+@cohorts_ns.route('/<string:cohort_id>')
 @cohorts_ns.param('cohort_id', 'The cohort identifier')
 class CohortDetail(Resource):
     @cohorts_ns.doc('get_cohort')
-    @cohorts_ns.marshal_with(cohort_model)
+    @cohorts_ns.response(200, 'Success', cohort_model)
     @jwt_required()
     def get(self, cohort_id):
         """Fetch a cohort by ID"""
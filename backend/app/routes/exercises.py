@@ -1,42 +1,124 @@
 from flask import Blueprint, request, jsonify
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services import catalog
+from app.services.conditional import conditional
+from app.utils.serialization import InvalidFields, parse_fields
 
 exercises_bp = Blueprint('exercises', __name__)
 exercises_ns = Namespace('exercises', description='Exercise operations')
 
 # Basic exercise model for API documentation
 exercise_model = exercises_ns.model('Exercise', {
-    'id': fields.Integer(required=True, description='Exercise ID'),
+    'id': fields.String(required=True, description='Exercise ID'),
     'name': fields.String(required=True, description='Exercise name'),
     'category': fields.String(description='Exercise category'),
-    'description': fields.String(description='Exercise description'),
-    'created_at': fields.DateTime(description='Creation timestamp')
+    'is_enabled': fields.Boolean(description='Whether the exercise is enabled'),
+    'creator_id': fields.String(description='Creator user ID for custom exercises'),
+    'creator_name': fields.String(description='Creator name for custom exercises'),
+    'instructions': fields.String(description='Exercise instructions'),
+    'instruction_video_id': fields.String(description='Instruction video ID'),
+    'image_url': fields.String(description='Image URL'),
+    'search_terms': fields.List(fields.String, description='Alternative names'),
+    'equipment': fields.List(fields.String, description='Equipment used'),
+    'body_segments': fields.List(fields.String, description='Body segments trained'),
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'updated_at': fields.DateTime(description='Last update timestamp')
 })
 
+pagination_model = exercises_ns.model('ExercisePagination', {
+    'page': fields.Integer(description='Current page'),
+    'per_page': fields.Integer(description='Items per page'),
+    'total': fields.Integer(description='Total matching exercises'),
+    'pages': fields.Integer(description='Total pages')
+})
+
+exercise_page_model = exercises_ns.model('ExercisePage', {
+    'data': fields.List(fields.Nested(exercise_model)),
+    'pagination': fields.Nested(pagination_model)
+})
+
+facets_model = exercises_ns.model('ExerciseFacets', {
+    'equipment': fields.List(fields.String, description='Equipment filter values'),
+    'body_segments': fields.List(fields.String, description='Body segment filter values')
+})
+
+def _catalog_version():
+    """Validator for catalog responses: the index digest"""
+    return catalog.get_index().version(), None
+
 @exercises_ns.route('/')
 class ExerciseList(Resource):
-    @exercises_ns.doc('list_exercises')
-    @exercises_ns.marshal_list_with(exercise_model)
+    @exercises_ns.doc('list_exercises', params={
+        'search': 'Typeahead query; every word must prefix-match (or nearly match) a name, search term, equipment or body segment',
+        'category': 'system or custom',
+        'equipment': 'Only exercises using this equipment',
+        'body_segment': 'Only exercises training this body segment',
+        'page': 'Page number (default 1)',
+        'per_page': 'Items per page (default 20, max 100)',
+        'fields': 'Comma-separated fields to return, e.g. id,name (default all)'
+    })
+    @exercises_ns.response(200, 'Success', exercise_page_model)
     @jwt_required()
+    @conditional(_catalog_version)
     def get(self):
-        """Fetch all exercises"""
-        # Placeholder implementation
-        return []
+        """Search the exercise catalog, best matches first"""
+        category = request.args.get('category')
+        if category and category not in ('system', 'custom'):
+            return {'error': 'Invalid category', 'details': {'category': ['system', 'custom']}}, 400
+        try:
+            keys = parse_fields(request.args.get('fields'), catalog.PAYLOAD_FIELDS)
+        except InvalidFields as e:
+            return {'error': str(e), 'details': {'fields': e.allowed}}, 400
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+
+        entries, total = catalog.search(
+            request.args.get('search', ''),
+            category=category,
+            equipment=request.args.get('equipment'),
+            body_segment=request.args.get('body_segment'),
+            user_id=get_jwt_identity(),
+            limit=per_page,
+            offset=(page - 1) * per_page
+        )
+        if keys is None:
+            data = [entry.payload for entry in entries]
+        else:
+            data = [{key: entry.payload[key] for key in keys} for entry in entries]
+        return {
+            'data': data,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': (total + per_page - 1) // per_page
+            }
+        }
 
     @exercises_ns.doc('create_exercise')
-    @exercises_ns.marshal_with(exercise_model, code=201)
+    @exercises_ns.response(201, 'Created', exercise_model)
     @jwt_required()
     def post(self):
         """Create a new exercise"""
         # Placeholder implementation
         return {'message': 'Exercise creation not implemented yet'}, 501
 
-@exercises_ns.route('/<int:exercise_id>')
+@exercises_ns.route('/facets')
+class ExerciseFacets(Resource):
+    @exercises_ns.doc('exercise_facets')
+    @exercises_ns.response(200, 'Success', facets_model)
+    @jwt_required()
+    @conditional(_catalog_version)
+    def get(self):
+        """Equipment and body segment values for the catalog filters"""
+        return catalog.get_index().facets()
+
+@exercises_ns.route('/<string:exercise_id>')
 @exercises_ns.param('exercise_id', 'The exercise identifier')
 class ExerciseDetail(Resource):
     @exercises_ns.doc('get_exercise')
-    @exercises_ns.marshal_with(exercise_model)
+    @exercises_ns.response(200, 'Success', exercise_model)
     @jwt_required()
     def get(self, exercise_id):
         """Fetch an exercise by ID"""
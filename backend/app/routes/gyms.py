@@ -7,7 +7,7 @@ gyms_ns = Namespace('gyms', description='Gym operations')
 
 # Basic gym model for API documentation
 gym_model = gyms_ns.model('Gym', {
-    'id': fields.Integer(required=True, description='Gym ID'),
+    'id': fields.String(required=True, description='Gym ID'),
     'name': fields.String(required=True, description='Gym name'),
     'address': fields.String(description='Gym address'),
     'created_at': fields.DateTime(description='Creation timestamp')
@@ -16,7 +16,7 @@ gym_model = gyms_ns.model('Gym', {
 @gyms_ns.route('/')
 class GymList(Resource):
     @gyms_ns.doc('list_gyms')
-    @gyms_ns.marshal_list_with(gym_model)
+    @gyms_ns.response(200, 'Success', [gym_model])
     @jwt_required()
     def get(self):
         """Fetch all gyms"""
@@ -24,18 +24,18 @@ class GymList(Resource):
         return []
 
     @gyms_ns.doc('create_gym')
-    @gyms_ns.marshal_with(gym_model, code=201)
+    @gyms_ns.response(201, 'Created', gym_model)
     @jwt_required()
     def post(self):
         """Create a new gym"""
         # Placeholder implementation
         return {'message': 'Gym creation not implemented yet'}, 501
 
-@gyms_ns.route('/<int:gym_id>')
+@gyms_ns.route('/<string:gym_id>')
 @gyms_ns.param('gym_id', 'The gym identifier')
 class GymDetail(Resource):
     @gyms_ns.doc('get_gym')
-    @gyms_ns.marshal_with(gym_model)
+    @gyms_ns.response(200, 'Success', gym_model)
     @jwt_required()
     def get(self, gym_id):
         """Fetch a gym by ID"""
@@ -1,4 +1,4 @@
-from flask import Blueprint
+from flask import Blueprint, current_app
 from sqlalchemy import text
 from app import db
 
@@ -15,9 +15,9 @@ def health_check():
             'status': 'healthy',
             'database': 'connected'
         }, 200
-    except Exception as e:
+    except Exception:
+        current_app.logger.exception('Health check failed')
         return {
             'status': 'unhealthy',
-            'database': 'disconnected',
-            'error': str(e)
+            'database': 'disconnected'
         }, 500
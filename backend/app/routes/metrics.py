@@ -1,24 +1,197 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from marshmallow import ValidationError
+from contextlib import closing
+from datetime import date, timedelta
+import io
+from sqlalchemy import select
+from app import db
+from app.models.user import User
+from app.models.exercise import Exercise, ExerciseMetric
+from app.models.metric import (
+    AthleteMetricAnalytics, AthleteMetricRollup, MetricImport, MetricImportError, PerformanceMetric
+)
+from app.schemas.metric import (
+    MetricSessionSchema, MetricUpdateSchema, analytics_serializer, import_error_serializer, import_serializer,
+    metric_serializer, rollup_serializer
+)
+from app.services.access import current_scope
+from app.services.exports import FORMATS, export_chunks, export_query
+from app.services.imports import ImportRunning, open_rows, resume_import, run_import, start_import
+from app.services.loading import column_options
+from app.services.metrics import RecordingDenied, coaches_gym, delete_metric, ingest_session, update_metric
+from app.services.replica import read_replica
+from app.services.trends import BUCKETS, DEFAULT_MAX_POINTS, MAX_POINTS_LIMIT, trend_series
+from app.utils.serialization import InvalidFields, dumps
 
 metrics_bp = Blueprint('metrics', __name__)
 metrics_ns = Namespace('metrics', description='Performance metrics operations')
 
-# Basic metric model for API documentation
 metric_model = metrics_ns.model('Metric', {
-    'id': fields.Integer(required=True, description='Metric ID'),
-    'user_id': fields.Integer(required=True, description='User ID'),
-    'exercise_id': fields.Integer(required=True, description='Exercise ID'),
-    'value': fields.Float(required=True, description='Metric value'),
-    'unit': fields.String(description='Metric unit'),
-    'recorded_at': fields.DateTime(description='Recording timestamp')
+    'id': fields.String(required=True, description='Metric ID'),
+    'athlete_id': fields.String(required=True, description='Athlete ID'),
+    'exercise_id': fields.String(required=True, description='Exercise ID'),
+    'coach_id': fields.String(description='Coach ID'),
+    'gym_id': fields.String(description='Gym ID'),
+    'exercise_metric_id': fields.String(required=True, description='Exercise metric ID'),
+    'value': fields.Float(required=True, description='Metric value in SI units'),
+    'date': fields.Date(description='Test date'),
+    'notes': fields.String(description='Notes'),
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'updated_at': fields.DateTime(description='Last update timestamp')
 })
 
+metric_update_model = metrics_ns.model('MetricUpdate', {
+    'value': fields.Float(description='Metric value in SI units'),
+    'date': fields.Date(description='Test date'),
+    'notes': fields.String(description='Notes')
+})
+
+rollup_model = metrics_ns.model('MetricRollup', {
+    'athlete_id': fields.String(description='Athlete ID'),
+    'exercise_metric_id': fields.String(description='Exercise metric ID'),
+    'exercise_id': fields.String(description='Exercise ID'),
+    'exercise_name': fields.String(description='Exercise name'),
+    'metric_name': fields.String(description='Exercise metric name'),
+    'unit_of_measure': fields.String(description='SI unit'),
+    'decimals': fields.Integer(description='Display precision'),
+    'test_count': fields.Integer(description='Number of recorded values'),
+    'best_value': fields.Float(description='Personal best'),
+    'best_date': fields.Date(description='Date of the personal best'),
+    'latest_value': fields.Float(description='Most recent value'),
+    'latest_date': fields.Date(description='Date of the most recent value')
+})
+
+analytics_model = metrics_ns.model('MetricAnalytics', {
+    'athlete_id': fields.String(description='Athlete ID'),
+    'first_name': fields.String(description='First name (GET /metrics/analytics only)'),
+    'last_name': fields.String(description='Last name (GET /metrics/analytics only)'),
+    'exercise_metric_id': fields.String(description='Exercise metric ID'),
+    'exercise_id': fields.String(description='Exercise ID'),
+    'exercise_name': fields.String(description='Exercise name'),
+    'metric_name': fields.String(description='Exercise metric name'),
+    'unit_of_measure': fields.String(description='SI unit'),
+    'decimals': fields.Integer(description='Display precision'),
+    'sample_count': fields.Integer(description='Number of recorded values'),
+    'first_date': fields.Date(description='Date of the first value'),
+    'last_date': fields.Date(description='Date of the most recent value'),
+    'rolling_mean': fields.Float(description='Mean of the most recent values'),
+    'slope_per_week': fields.Float(description='Trend in SI units per week; null with fewer than three recent tests'),
+    'progress_pct': fields.Float(description='Improvement per 30 days as a percentage of rolling_mean; '
+                                             'negative when getting worse'),
+    'plateau': fields.Boolean(description='No new personal best in the most recent tests'),
+    'plateau_since': fields.Date(description='Date of the last personal best when on a plateau'),
+    'outlier_count': fields.Integer(description='Values far from the athlete\'s usual range'),
+    'latest_is_outlier': fields.Boolean(description='Whether the most recent value is an outlier'),
+    'computed_at': fields.DateTime(description='When the nightly job computed the row')
+})
+
+# Flag filter -> criterion on athlete_metric_analytics
+ANALYTICS_FLAGS = {
+    'plateau': AthleteMetricAnalytics.plateau.is_(True),
+    'outlier': AthleteMetricAnalytics.latest_is_outlier.is_(True),
+    'declining': AthleteMetricAnalytics.progress_pct < 0
+}
+
+trend_point_model = metrics_ns.model('TrendPoint', {
+    'date': fields.String(description='First day of the bucket'),
+    'min': fields.Float(description='Lowest value in the bucket'),
+    'max': fields.Float(description='Highest value in the bucket'),
+    'mean': fields.Float(description='Mean value in the bucket'),
+    'last': fields.Float(description='Most recent value in the bucket'),
+    'count': fields.Integer(description='Number of values in the bucket')
+})
+
+trend_model = metrics_ns.model('Trend', {
+    'athlete_id': fields.String(description='Athlete ID'),
+    'exercise_metric_id': fields.String(description='Exercise metric ID'),
+    'bucket': fields.String(description='Bucket size used'),
+    'unit': fields.String(description='Unit the values are expressed in'),
+    'display_units': fields.String(description='metric or imperial'),
+    'decimals': fields.Integer(description='Display precision'),
+    'points': fields.List(fields.Nested(trend_point_model))
+})
+
+leaderboard_entry_model = metrics_ns.model('LeaderboardEntry', {
+    'athlete_id': fields.String(description='Athlete ID'),
+    'first_name': fields.String(description='First name'),
+    'last_name': fields.String(description='Last name'),
+    'best_value': fields.Float(description='Personal best'),
+    'best_date': fields.Date(description='Date of the personal best'),
+    'test_count': fields.Integer(description='Number of recorded values')
+})
+
+session_entry_model = metrics_ns.model('SessionEntry', {
+    'athlete_id': fields.String(description='Athlete ID (defaults to the session athlete)'),
+    'exercise_metric_id': fields.String(required=True, description='Exercise metric ID'),
+    'value': fields.Float(required=True, description='Metric value in SI units'),
+    'date': fields.Date(description='Test date (defaults to the session date)'),
+    'notes': fields.String(description='Notes')
+})
+
+session_model = metrics_ns.model('MetricSession', {
+    'athlete_id': fields.String(description='Athlete ID for entries that do not set one'),
+    'coach_id': fields.String(description='Coach ID (defaults to the current user)'),
+    'gym_id': fields.String(required=True, description='Gym ID'),
+    'date': fields.Date(required=True, description='Session date'),
+    'notes': fields.String(description='Notes applied to entries without their own'),
+    'allow_partial': fields.Boolean(description='Insert valid entries even if some entries fail'),
+    'entries': fields.List(fields.Nested(session_entry_model), required=True, description='Recorded values')
+})
+
+import_model = metrics_ns.model('MetricImport', {
+    'id': fields.String(description='Import ID'),
+    'gym_id': fields.String(description='Gym ID'),
+    'coach_id': fields.String(description='Coach recorded on the imported rows'),
+    'filename': fields.String(description='Uploaded file name'),
+    'status': fields.String(description='running, completed or failed'),
+    'rows_read': fields.Integer(description='Data rows applied so far; a resumed import skips these'),
+    'inserted': fields.Integer(description='Rows inserted'),
+    'failed': fields.Integer(description='Rows rejected'),
+    'message': fields.String(description='Why the import failed'),
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'updated_at': fields.DateTime(description='Last update timestamp')
+})
+
+import_error_model = metrics_ns.model('MetricImportError', {
+    'row_number': fields.Integer(description='Data row number (1 is the first row after the header)'),
+    'error': fields.String(description='Why the row was rejected'),
+    'line': fields.String(description='The row as read')
+})
+
+import_error_page_model = metrics_ns.model('MetricImportErrorPage', {
+    'data': fields.List(fields.Nested(import_error_model)),
+    'next_after': fields.Integer(description='Pass as after for the next page, null on the last page')
+})
+
+# Schemas
+session_schema = MetricSessionSchema()
+
+def _visible_metric_or_404(metric_id):
+    """Load a performance metric the caller is allowed to see"""
+    metric = PerformanceMetric.query.get_or_404(metric_id)
+    if not current_scope().can_see_athlete(metric.athlete_id):
+        metrics_ns.abort(404)
+    return metric
+
+def _editable_metric_or_404(metric_id):
+    """Load a performance metric the caller may change: admins, coaches of its gym or its recording coach"""
+    metric = _visible_metric_or_404(metric_id)
+    scope = current_scope()
+    if not (scope.is_admin or metric.coach_id == scope.user_id or coaches_gym(scope.user_id, metric.gym_id)):
+        metrics_ns.abort(403, 'Access denied')
+    return metric
+
+def _require_athlete(athlete_id):
+    """Abort unless the caller may see the athlete's data"""
+    if not current_scope().can_see_athlete(athlete_id):
+        metrics_ns.abort(403, 'Access denied')
+
 @metrics_ns.route('/')
 class MetricList(Resource):
     @metrics_ns.doc('list_metrics')
-    @metrics_ns.marshal_list_with(metric_model)
+    @metrics_ns.response(200, 'Success', [metric_model])
     @jwt_required()
     def get(self):
         """Fetch all metrics"""
@@ -26,20 +199,400 @@ class MetricList(Resource):
         return []
 
     @metrics_ns.doc('create_metric')
-    @metrics_ns.marshal_with(metric_model, code=201)
+    @metrics_ns.response(201, 'Created', metric_model)
     @jwt_required()
     def post(self):
         """Create a new metric"""
         # Placeholder implementation
         return {'message': 'Metric creation not implemented yet'}, 501
 
-@metrics_ns.route('/<int:metric_id>')
+@metrics_ns.route('/<string:metric_id>')
 @metrics_ns.param('metric_id', 'The metric identifier')
 class MetricDetail(Resource):
     @metrics_ns.doc('get_metric')
-    @metrics_ns.marshal_with(metric_model)
+    @metrics_ns.response(200, 'Success', metric_model)
     @jwt_required()
     def get(self, metric_id):
         """Fetch a metric by ID"""
-        # Placeholder implementation
-        return {'message': 'Metric detail not implemented yet'}, 501
+        return metric_serializer.dump(_visible_metric_or_404(metric_id))
+
+    @metrics_ns.doc('update_metric')
+    @metrics_ns.expect(metric_update_model)
+    @metrics_ns.response(200, 'Success', metric_model)
+    @jwt_required()
+    def put(self, metric_id):
+        """Update a metric's value, date or notes"""
+        metric = _editable_metric_or_404(metric_id)
+        try:
+            data = MetricUpdateSchema().load(request.get_json() or {})
+        except ValidationError as e:
+            return {'error': 'Validation failed', 'details': e.messages}, 400
+
+        try:
+            update_metric(metric, data)
+        except ValueError as e:
+            db.session.rollback()
+            return {'error': str(e)}, 400
+
+        db.session.commit()
+        return metric_serializer.dump(metric)
+
+    @metrics_ns.doc('delete_metric')
+    @jwt_required()
+    def delete(self, metric_id):
+        """Delete a metric"""
+        metric = _editable_metric_or_404(metric_id)
+        delete_metric(metric)
+        db.session.commit()
+        return '', 204
+
+@metrics_ns.route('/export')
+class MetricExport(Resource):
+    @metrics_ns.doc('export_metrics', params={
+        'format': 'csv (default) or ndjson',
+        'athlete_id': 'Only this athlete',
+        'gym_id': 'Only results recorded in this gym',
+        'start': 'Start date (ISO 8601)',
+        'end': 'End date (ISO 8601)',
+        'gzip': 'Compress the download (true/false)'
+    })
+    @jwt_required()
+    @read_replica
+    def get(self):
+        """Stream the performance history the caller can see as CSV or NDJSON"""
+        fmt = request.args.get('format', 'csv')
+        if fmt not in FORMATS:
+            return {'error': 'Invalid format', 'details': {'format': list(FORMATS)}}, 400
+        try:
+            start = date.fromisoformat(request.args['start']) if 'start' in request.args else None
+            end = date.fromisoformat(request.args['end']) if 'end' in request.args else None
+        except ValueError:
+            return {'error': 'Invalid date', 'details': {'format': 'YYYY-MM-DD'}}, 400
+
+        scope = current_scope()
+        athlete_id = request.args.get('athlete_id')
+        gym_id = request.args.get('gym_id')
+        if athlete_id:
+            _require_athlete(athlete_id)
+        if gym_id and not scope.can_see_gym(gym_id):
+            metrics_ns.abort(403, 'Access denied')
+
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        query = export_query(scope, athlete_id, gym_id, start, end)
+        filename = f'performance-history-{date.today().isoformat()}.{fmt}' + ('.gz' if compress else '')
+        return Response(
+            stream_with_context(export_chunks(query, fmt, compress)),
+            mimetype='application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson'),
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
+@metrics_ns.route('/athlete/<string:athlete_id>/summary')
+@metrics_ns.param('athlete_id', 'The athlete identifier')
+class AthleteMetricSummary(Resource):
+    @metrics_ns.doc('athlete_metric_summary', params={'exercise_id': 'Filter by exercise ID'})
+    @metrics_ns.response(200, 'Success', [rollup_model])
+    @jwt_required()
+    @read_replica
+    def get(self, athlete_id):
+        """Personal best, latest value and test count for each of an athlete's metrics"""
+        _require_athlete(athlete_id)
+        query = (
+            select(
+                AthleteMetricRollup,
+                Exercise.name.label('exercise_name'),
+                ExerciseMetric.name.label('metric_name'),
+                ExerciseMetric.unit_of_measure,
+                ExerciseMetric.decimals
+            )
+            .join(ExerciseMetric, ExerciseMetric.id == AthleteMetricRollup.exercise_metric_id)
+            .join(Exercise, Exercise.id == AthleteMetricRollup.exercise_id)
+            .where(AthleteMetricRollup.athlete_id == athlete_id)
+            .order_by(Exercise.name, ExerciseMetric.name)
+        )
+        exercise_id = request.args.get('exercise_id')
+        if exercise_id:
+            query = query.where(AthleteMetricRollup.exercise_id == exercise_id)
+
+        return [
+            {
+                **rollup_serializer.dump(row.AthleteMetricRollup),
+                'exercise_name': row.exercise_name,
+                'metric_name': row.metric_name,
+                'unit_of_measure': row.unit_of_measure,
+                'decimals': row.decimals
+            }
+            for row in db.session.execute(query)
+        ]
+
+@metrics_ns.route('/athlete/<string:athlete_id>/trend/<string:exercise_metric_id>')
+@metrics_ns.param('athlete_id', 'The athlete identifier')
+@metrics_ns.param('exercise_metric_id', 'The exercise metric identifier')
+class AthleteMetricTrend(Resource):
+    @metrics_ns.doc('athlete_metric_trend', params={
+        'start': 'Start date (ISO 8601, default one year before end)',
+        'end': 'End date (ISO 8601, default today)',
+        'bucket': 'day, week, month or auto (default)',
+        'max_points': f'Maximum points returned (default {DEFAULT_MAX_POINTS}, max {MAX_POINTS_LIMIT})'
+    })
+    @metrics_ns.response(200, 'Success', trend_model)
+    @jwt_required()
+    @read_replica
+    def get(self, athlete_id, exercise_metric_id):
+        """Bucketed trend of one athlete's metric for charting"""
+        _require_athlete(athlete_id)
+        metric = ExerciseMetric.query.get_or_404(exercise_metric_id)
+        try:
+            end = date.fromisoformat(request.args['end']) if 'end' in request.args else date.today()
+            start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=365)
+        except ValueError:
+            return {'error': 'Invalid date', 'details': {'format': 'YYYY-MM-DD'}}, 400
+        if start > end:
+            return {'error': 'start must not be after end'}, 400
+
+        bucket = request.args.get('bucket', 'auto')
+        if bucket != 'auto' and bucket not in BUCKETS:
+            return {'error': 'Invalid bucket', 'details': {'bucket': ['auto', *BUCKETS]}}, 400
+        max_points = max(3, min(request.args.get('max_points', DEFAULT_MAX_POINTS, type=int), MAX_POINTS_LIMIT))
+
+        return trend_series(athlete_id, metric, start, end, bucket, max_points)
+
+@metrics_ns.route('/leaderboard/<string:exercise_metric_id>')
+@metrics_ns.param('exercise_metric_id', 'The exercise metric identifier')
+class MetricLeaderboard(Resource):
+    @metrics_ns.doc('metric_leaderboard', params={'limit': 'Number of athletes (default 10, max 100)'})
+    @metrics_ns.response(200, 'Success', [leaderboard_entry_model])
+    @jwt_required()
+    @read_replica
+    def get(self, exercise_metric_id):
+        """Athletes ranked by personal best for one exercise metric"""
+        metric = ExerciseMetric.query.get_or_404(exercise_metric_id)
+        limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+        best = AthleteMetricRollup.best_value
+        query = (
+            select(
+                AthleteMetricRollup.athlete_id,
+                User.first_name,
+                User.last_name,
+                AthleteMetricRollup.best_value,
+                AthleteMetricRollup.best_date,
+                AthleteMetricRollup.test_count
+            )
+            .join(User, User.id == AthleteMetricRollup.athlete_id)
+            .where(
+                AthleteMetricRollup.exercise_metric_id == metric.id,
+                User.archived.is_(False),
+                current_scope().athlete_filter(AthleteMetricRollup.athlete_id)
+            )
+            .order_by(best.desc() if metric.higher_is_better else best.asc(), AthleteMetricRollup.best_date)
+            .limit(limit)
+        )
+        return [row._asdict() for row in db.session.execute(query)]
+
+def _analytics_query(*columns):
+    """Analytics rows joined to their exercise and metric names"""
+    return (
+        select(
+            AthleteMetricAnalytics,
+            Exercise.name.label('exercise_name'),
+            ExerciseMetric.name.label('metric_name'),
+            ExerciseMetric.unit_of_measure,
+            ExerciseMetric.decimals,
+            *columns
+        )
+        .join(ExerciseMetric, ExerciseMetric.id == AthleteMetricAnalytics.exercise_metric_id)
+        .join(Exercise, Exercise.id == AthleteMetricAnalytics.exercise_id)
+    )
+
+def _analytics_row(row, *names):
+    return {
+        **analytics_serializer.dump(row.AthleteMetricAnalytics),
+        'exercise_name': row.exercise_name,
+        'metric_name': row.metric_name,
+        'unit_of_measure': row.unit_of_measure,
+        'decimals': row.decimals,
+        **{name: getattr(row, name) for name in names}
+    }
+
+@metrics_ns.route('/athlete/<string:athlete_id>/analytics')
+@metrics_ns.param('athlete_id', 'The athlete identifier')
+class AthleteMetricAnalyticsList(Resource):
+    @metrics_ns.doc('athlete_metric_analytics', params={'exercise_id': 'Filter by exercise ID'})
+    @metrics_ns.response(200, 'Success', [analytics_model])
+    @jwt_required()
+    @read_replica
+    def get(self, athlete_id):
+        """Progress rate, plateau and outlier flags for each of an athlete's metrics (computed nightly)"""
+        _require_athlete(athlete_id)
+        query = (
+            _analytics_query()
+            .where(AthleteMetricAnalytics.athlete_id == athlete_id)
+            .order_by(Exercise.name, ExerciseMetric.name)
+        )
+        exercise_id = request.args.get('exercise_id')
+        if exercise_id:
+            query = query.where(AthleteMetricAnalytics.exercise_id == exercise_id)
+        return [_analytics_row(row) for row in db.session.execute(query)]
+
+@metrics_ns.route('/analytics')
+class MetricAnalyticsList(Resource):
+    @metrics_ns.doc('list_metric_analytics', params={
+        'flag': 'plateau, outlier (latest value) or declining',
+        'exercise_metric_id': 'Filter by exercise metric ID',
+        'limit': 'Number of rows (default 50, max 500)'
+    })
+    @metrics_ns.response(200, 'Success', [analytics_model])
+    @jwt_required()
+    @read_replica
+    def get(self):
+        """Visible athletes' analytics, most recently tested first (declining: worst first)"""
+        flag = request.args.get('flag')
+        if flag is not None and flag not in ANALYTICS_FLAGS:
+            return {'error': 'Invalid flag', 'details': {'flag': list(ANALYTICS_FLAGS)}}, 400
+        limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+        query = (
+            _analytics_query(User.first_name, User.last_name)
+            .join(User, User.id == AthleteMetricAnalytics.athlete_id)
+            .where(User.archived.is_(False), current_scope().athlete_filter(AthleteMetricAnalytics.athlete_id))
+            .limit(limit)
+        )
+        if flag:
+            query = query.where(ANALYTICS_FLAGS[flag])
+        exercise_metric_id = request.args.get('exercise_metric_id')
+        if exercise_metric_id:
+            query = query.where(AthleteMetricAnalytics.exercise_metric_id == exercise_metric_id)
+        if flag == 'declining':
+            query = query.order_by(AthleteMetricAnalytics.progress_pct, AthleteMetricAnalytics.id)
+        else:
+            query = query.order_by(AthleteMetricAnalytics.last_date.desc(), AthleteMetricAnalytics.id)
+        return [_analytics_row(row, 'first_name', 'last_name') for row in db.session.execute(query)]
+
+@metrics_ns.route('/sessions')
+class MetricSession(Resource):
+    @metrics_ns.doc('record_session')
+    @metrics_ns.expect(session_model)
+    @jwt_required()
+    def post(self):
+        """Record every metric from a testing session in one transaction"""
+        try:
+            data = session_schema.load(request.get_json() or {})
+        except ValidationError as e:
+            return {'error': 'Validation failed', 'details': e.messages}, 400
+
+        try:
+            result = ingest_session(data, get_jwt_identity(), current_scope())
+        except RecordingDenied as e:
+            db.session.rollback()
+            return {'error': str(e)}, 403
+        except ValueError as e:
+            db.session.rollback()
+            return {'error': str(e)}, 400
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Session recording failed')
+            return {'error': 'Session recording failed'}, 500
+
+        if not result['inserted'] and result['errors']:
+            db.session.rollback()
+            return {'error': 'Session rejected', 'details': {'errors': result['errors']}}, 422
+
+        db.session.commit()
+        return result, 201
+
+def _visible_import_or_404(import_id):
+    """Load a metric import in one of the caller's gyms"""
+    job = db.session.get(MetricImport, import_id)
+    if job is None or not current_scope().can_see_gym(job.gym_id):
+        metrics_ns.abort(404)
+    return job
+
+@metrics_ns.route('/imports')
+class MetricImportUpload(Resource):
+    @metrics_ns.doc('import_metrics', params={
+        'file': {'in': 'formData', 'type': 'file', 'description': 'CSV with email, exercise, metric, value, date (unit, notes optional)'},
+        'gym_id': {'in': 'formData', 'type': 'string', 'description': 'Gym ID (new imports)'},
+        'coach_id': {'in': 'formData', 'type': 'string', 'description': 'Coach ID (defaults to the current user; admins only)'},
+        'import_id': {'in': 'formData', 'type': 'string', 'description': 'Resume this unfinished import with the same file'}
+    })
+    @jwt_required()
+    def post(self):
+        """Import historical results from a CSV file, streaming progress as NDJSON"""
+        upload = request.files.get('file')
+        if upload is None:
+            return {'error': 'Validation failed', 'details': {'file': ['Missing data for required field.']}}, 400
+
+        scope = current_scope()
+        user_id = get_jwt_identity()
+        try:
+            columns, reader = open_rows(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+            if request.form.get('import_id'):
+                job = resume_import(request.form['import_id'], scope)
+            elif request.form.get('gym_id'):
+                job = start_import(
+                    request.form['gym_id'], request.form.get('coach_id') or user_id,
+                    created_by=user_id, filename=upload.filename, scope=scope
+                )
+            else:
+                return {'error': 'Validation failed', 'details': {'gym_id': ['Missing data for required field.']}}, 400
+        except UnicodeDecodeError:
+            return {'error': 'File must be UTF-8 encoded CSV'}, 400
+        except RecordingDenied as e:
+            db.session.rollback()
+            return {'error': str(e)}, 403
+        except ImportRunning as e:
+            return {'error': str(e)}, 409
+        except ValueError as e:
+            db.session.rollback()
+            return {'error': str(e)}, 400
+
+        def events():
+            yield dumps({'type': 'started', 'import_id': job.id, 'rows_read': job.rows_read}) + b'\n'
+            # Closed with the response, so a disconnect releases the import
+            with closing(run_import(job, columns, reader, scope)) as progress:
+                for event in progress:
+                    yield dumps(event) + b'\n'
+
+        return Response(
+            stream_with_context(events()), mimetype='application/x-ndjson', headers={'X-Import-Id': job.id}
+        )
+
+@metrics_ns.route('/imports/<string:import_id>')
+@metrics_ns.param('import_id', 'The import identifier')
+class MetricImportStatus(Resource):
+    @metrics_ns.doc('get_metric_import')
+    @metrics_ns.response(200, 'Success', import_model)
+    @jwt_required()
+    def get(self, import_id):
+        """Fetch an import's status and counters"""
+        return import_serializer.dump(_visible_import_or_404(import_id))
+
+@metrics_ns.route('/imports/<string:import_id>/errors')
+@metrics_ns.param('import_id', 'The import identifier')
+class MetricImportErrors(Resource):
+    @metrics_ns.doc('list_metric_import_errors', params={
+        'after': 'Only rows after this row number',
+        'limit': 'Page size (default 100, max 1000)',
+        'fields': 'Comma-separated fields to return, e.g. row_number,error (default all)'
+    })
+    @metrics_ns.response(200, 'Success', import_error_page_model)
+    @jwt_required()
+    def get(self, import_id):
+        """Rejected rows of an import, in file order"""
+        job = _visible_import_or_404(import_id)
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        try:
+            serializer = import_error_serializer.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return {'error': str(e), 'details': {'fields': e.allowed}}, 400
+        rows = db.session.scalars(
+            select(MetricImportError)
+            .options(*column_options(MetricImportError, serializer.attributes, MetricImportError.row_number))
+            .where(MetricImportError.import_id == job.id,
+                   MetricImportError.row_number > request.args.get('after', 0, type=int))
+            .order_by(MetricImportError.row_number)
+            .limit(limit + 1)
+        ).all()
+        page = rows[:limit]
+        return {
+            'data': serializer.dump_many(page),
+            'next_after': page[-1].row_number if len(rows) > limit else None
+        }
@@ -0,0 +1,37 @@
+from flask import Blueprint, request
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required
+from app.services.access import current_scope
+from app.services.sync import DEFAULT_LIMIT, MAX_LIMIT, CursorExpired, sync_page
+from app.utils.pagination import InvalidCursor
+
+sync_bp = Blueprint('sync', __name__)
+sync_ns = Namespace('sync', description='Incremental sync for offline clients')
+
+sync_page_model = sync_ns.model('SyncPage', {
+    'changes': fields.Raw(description='Changed rows by entity: users, gyms, gym_relationships, '
+                                      'coach_relationships, cohorts, cohort_memberships, exercises, metrics'),
+    'deleted': fields.Raw(description='Deleted or archived IDs by entity'),
+    'cursor': fields.String(description='Pass back to get the next page, or the next round of changes'),
+    'has_more': fields.Boolean(description='More pages are waiting in this round')
+})
+
+@sync_ns.route('/')
+class Sync(Resource):
+    @sync_ns.doc('sync', params={
+        'cursor': 'Cursor from the previous response; omit for an initial load',
+        'limit': f'Rows per page (default {DEFAULT_LIMIT}, max {MAX_LIMIT})'
+    })
+    @sync_ns.response(200, 'Success', sync_page_model)
+    @sync_ns.response(410, 'Cursor expired; sync again without a cursor')
+    @jwt_required()
+    def get(self):
+        """Fetch what changed since a cursor, one page at a time"""
+        limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+        try:
+            page = sync_page(current_scope(), request.args.get('cursor'), limit)
+        except InvalidCursor as e:
+            return {'error': str(e)}, 400
+        except CursorExpired as e:
+            return {'error': str(e)}, 410
+        return page
@@ -0,0 +1,53 @@
+from flask import Blueprint, Response, abort, current_app, request
+from flask_jwt_extended import verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+import hmac
+from app import db
+from app.services import access, catalog, dashboard, instrumentation, pool_telemetry, principals, replica, revocation
+from app.services.access import current_scope
+
+system_bp = Blueprint('system', __name__)
+
+def _authorized(token):
+    """METRICS_TOKEN as a bearer token, or an admin's access token"""
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    try:
+        verify_jwt_in_request()
+    except (JWTExtendedException, PyJWTError):
+        return False
+    return current_scope().is_admin
+
+@system_bp.route('/api/metrics/system')
+def system_metrics():
+    """Request, SQL and connection pool metrics for every worker of this replica"""
+    config = current_app.config
+    if not config.get('METRICS_ENABLED', True):
+        abort(404)
+
+    if not _authorized(config.get('METRICS_TOKEN')):
+        return {'error': 'Metrics require METRICS_TOKEN or an admin token'}, 401
+
+    view = instrumentation.aggregate(instrumentation.collect(config.get('METRICS_DIR')))
+    if request.args.get('format') == 'json':
+        return instrumentation.render_json(view)
+    return Response(instrumentation.render_prometheus(view), mimetype='text/plain; version=0.0.4')
+
+@system_bp.route('/api/metrics/health')
+def health_stats():
+    """This worker's cache, connection pool and read replica statistics"""
+    if not _authorized(current_app.config.get('METRICS_TOKEN')):
+        return {'error': 'Metrics require METRICS_TOKEN or an admin token'}, 401
+
+    return {
+        'caches': {
+            'principals': principals.cache_stats(),
+            'access_scopes': access.cache_stats(),
+            'dashboard_widgets': dashboard.cache_stats(),
+            'exercise_catalog': catalog.stats(),
+            'token_revocations': revocation.stats()
+        },
+        'database_pool': pool_telemetry.stats(db.engine),
+        'database_replica': replica.stats(db)
+    }
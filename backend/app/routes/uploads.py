@@ -0,0 +1,48 @@
+from flask import Blueprint, request, send_from_directory
+from flask_restx import Namespace, Resource, fields
+from flask_jwt_extended import jwt_required, current_user
+from app import db
+from app.services import images
+from app.services.storage import LocalStorage, get_storage
+
+uploads_bp = Blueprint('uploads', __name__)
+uploads_ns = Namespace('uploads', description='File uploads')
+
+image_model = uploads_ns.model('StoredImage', {
+    'key': fields.String(description='Storage key; the same bytes always get the same key'),
+    'url': fields.String(description='URL of the original image'),
+    'variants': fields.Raw(description='URLs of resized WebP variants by name (thumb, medium); '
+                                       'available shortly after upload'),
+    'created': fields.Boolean(description='False when identical bytes were already stored')
+})
+
+# A year; stored files never change because keys are content hashes
+IMMUTABLE_MAX_AGE = 31536000
+
+@uploads_ns.route('/images')
+class ImageUpload(Resource):
+    @uploads_ns.doc('upload_image', description='Send the image bytes as the request body '
+                                                '(Content-Type image/jpeg, image/png, image/gif or image/webp)')
+    @uploads_ns.response(201, 'Stored', image_model)
+    @uploads_ns.response(200, 'Already stored', image_model)
+    @jwt_required()
+    def post(self):
+        """Upload an image for an exercise, cohort or other resource"""
+        if not (current_user.is_coach or current_user.is_admin):
+            return {'error': 'Access denied'}, 403
+        try:
+            key, created = images.store_image(request.stream)
+        except images.UploadRejected as e:
+            return {'error': str(e)}, 400
+        db.session.commit()
+        return {'key': key, **images.urls(key), 'created': created}, 201 if created else 200
+
+@uploads_bp.route('/uploads/<path:key>')
+def serve_upload(key):
+    """Serve stored files when nginx is not in front (development)"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage) or not key.startswith('images/'):
+        return {'error': 'Resource not found'}, 404
+    response = send_from_directory(storage.root, key, max_age=IMMUTABLE_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
@@ -1,21 +1,42 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
 from app import db
-from app.models.user import User
-from app.schemas.user import UserSchema
+from app.models.gym import Gym
+from app.models.user import User, UserCoachRelationship, UserGymRelationship
+from app.schemas.user import roster_entry_serializer, user_relationships_serializer, user_serializer
+from app.services import dashboard, images
+from app.services.access import current_scope, get_scope
+from app.services.conditional import conditional
+from app.services.loading import column_options, load_options
+from app.services.replica import read_replica
+from app.services.storage import get_storage
+from app.utils.pagination import InvalidCursor, iter_keyset, paginate_keyset, parse_per_page
+from app.utils.query_budget import query_budget
+from app.utils.serialization import InvalidFields, dumps
 
 users_bp = Blueprint('users', __name__)
 users_ns = Namespace('users', description='User operations')
 
 # Schemas for API documentation
 user_model = users_ns.model('User', {
-    'id': fields.Integer(required=True, description='User ID'),
+    'id': fields.String(required=True, description='User ID'),
     'email': fields.String(required=True, description='User email'),
     'first_name': fields.String(required=True, description='First name'),
     'last_name': fields.String(required=True, description='Last name'),
+    'nick_name': fields.String(description='Nickname'),
+    'date_of_birth': fields.Date(description='Date of birth'),
+    'sex': fields.String(description='M, F or Other'),
+    'height': fields.Float(description='Height in meters'),
+    'weight': fields.Float(description='Weight in kilograms'),
+    'profile_image_url': fields.String(description='Profile image URL'),
+    'last_tested': fields.Date(description='Date of the most recent test'),
+    'is_athlete': fields.Boolean(description='Athlete status'),
+    'is_coach': fields.Boolean(description='Coach status'),
     'is_admin': fields.Boolean(description='Admin status'),
-    'created_at': fields.DateTime(description='Creation timestamp')
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'updated_at': fields.DateTime(description='Last update timestamp')
 })
 
 user_create_model = users_ns.model('UserCreate', {
@@ -25,25 +46,205 @@ user_create_model = users_ns.model('UserCreate', {
     'last_name': fields.String(required=True, description='Last name')
 })
 
+keyset_pagination_model = users_ns.model('KeysetPagination', {
+    'per_page': fields.Integer(description='Page size'),
+    'sort': fields.String(description='Sort key'),
+    'next_cursor': fields.String(description='Cursor for the next page, null on the last page'),
+    'has_more': fields.Boolean(description='Whether another page exists'),
+    'total': fields.Integer(description='Total rows, only when include_total is set')
+})
+
+user_page_model = users_ns.model('UserPage', {
+    'data': fields.List(fields.Nested(user_model)),
+    'pagination': fields.Nested(keyset_pagination_model)
+})
+
+profile_image_model = users_ns.model('ProfileImage', {
+    'key': fields.String(description='Storage key of the image'),
+    'url': fields.String(description='New profile_image_url'),
+    'variants': fields.Raw(description='URLs of resized WebP variants (thumb, medium), available shortly after upload'),
+    'created': fields.Boolean(description='False when identical bytes were already stored')
+})
+
+user_summary_model = users_ns.model('UserSummary', {
+    'id': fields.String(description='User ID'),
+    'email': fields.String(description='User email'),
+    'first_name': fields.String(description='First name'),
+    'last_name': fields.String(description='Last name'),
+    'last_tested': fields.Date(description='Date of the most recent test')
+})
+
+gym_membership_model = users_ns.model('GymMembership', {
+    'gym_id': fields.String(description='Gym ID'),
+    'gym_name': fields.String(description='Gym name'),
+    'role': fields.String(description='athlete, coach or admin'),
+    'is_active': fields.Boolean(description='Membership is active'),
+    'is_approved': fields.Boolean(description='Membership is approved'),
+    'created_at': fields.DateTime(description='Joined timestamp')
+})
+
+coach_link_model = users_ns.model('CoachLink', {
+    'gym_id': fields.String(description='Gym the coaching happens in'),
+    'is_active': fields.Boolean(description='Relationship is active'),
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'coach': fields.Nested(user_summary_model)
+})
+
+athlete_link_model = users_ns.model('AthleteLink', {
+    'gym_id': fields.String(description='Gym the coaching happens in'),
+    'is_active': fields.Boolean(description='Relationship is active'),
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'athlete': fields.Nested(user_summary_model)
+})
+
+user_relationships_model = users_ns.model('UserRelationships', {
+    'id': fields.String(description='User ID'),
+    'gyms': fields.List(fields.Nested(gym_membership_model)),
+    'coaches': fields.List(fields.Nested(coach_link_model)),
+    'athletes': fields.List(fields.Nested(athlete_link_model))
+})
+
+roster_athlete_model = users_ns.inherit('RosterAthlete', user_summary_model, {
+    'gyms': fields.List(fields.Nested(gym_membership_model))
+})
+
+roster_entry_model = users_ns.model('RosterEntry', {
+    'gym_id': fields.String(description='Gym the coaching happens in'),
+    'created_at': fields.DateTime(description='Creation timestamp'),
+    'athlete': fields.Nested(roster_athlete_model)
+})
+
+dashboard_model = users_ns.model('Dashboard', {
+    'widgets': fields.Raw(description='Widget data by name, in the requested order; '
+                                      'a widget that failed or timed out holds {"error": ...}')
+})
+
+# Keyset sort orders; each ends with the primary key so the order is total
+SORT_KEYS = {
+    'created_at': (User.created_at, User.id),
+    'last_name': (User.last_name, User.id)
+}
+
+def _flag(name):
+    """Read a boolean query string flag"""
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+def _visible_users():
+    """Users the caller may list: themselves plus the athletes in their scope"""
+    scope = current_scope()
+    if scope.is_admin:
+        return User.query
+    return User.query.filter(db.or_(User.id == scope.user_id, scope.athlete_filter(User.id)))
+
+def _load_user(user_id, profile):
+    """Load one user with the eager-loading profile an endpoint serializes"""
+    return db.session.scalars(
+        db.select(User).options(*load_options(profile)).where(User.id == user_id)
+    ).first()
+
+def _is_self_or_admin(user_id):
+    scope = current_scope()
+    return scope.is_admin or scope.user_id == user_id
+
+def _can_see_user(user_id):
+    return _is_self_or_admin(user_id) or current_scope().can_see_athlete(user_id)
+
+def _user_version(user_id):
+    """Validator for a user profile: its updated_at; None for users outside the caller's scope"""
+    if not _can_see_user(user_id):
+        return None
+    updated_at = db.session.execute(db.select(User.updated_at).where(User.id == user_id)).scalar()
+    return None if updated_at is None else (updated_at, updated_at)
+
+def _roster_version(user_id):
+    """Validator for a coach roster: counts and latest updates of every row it shows, in one query.
+
+    None unless the caller may see the roster, so the handler answers 403
+    instead of revealing through a 304 when the roster last changed.
+    """
+    if not _is_self_or_admin(user_id):
+        return None
+    links = db.select(UserCoachRelationship).where(UserCoachRelationship.coach_id == user_id).subquery()
+    athletes = db.select(links.c.athlete_id)
+    memberships = db.select(UserGymRelationship).where(UserGymRelationship.user_id.in_(athletes)).subquery()
+    row = db.session.execute(db.select(
+        db.select(db.func.count()).select_from(links).scalar_subquery(),
+        db.select(db.func.max(links.c.updated_at)).scalar_subquery(),
+        db.select(db.func.max(User.updated_at)).where(User.id.in_(athletes)).scalar_subquery(),
+        db.select(db.func.count()).select_from(memberships).scalar_subquery(),
+        db.select(db.func.max(memberships.c.updated_at)).scalar_subquery(),
+        db.select(db.func.max(Gym.updated_at)).where(Gym.id.in_(db.select(memberships.c.gym_id))).scalar_subquery()
+    )).one()
+    stamps = [value for value in row if isinstance(value, datetime)]
+    return tuple(row), max(stamps, default=None)
+
+def _stream_users(query, columns, serializer, buffer_rows=200):
+    """Write the whole user list as one JSON document, chunk by chunk"""
+    yield b'{"data":['
+    buffer = []
+    separator = b''
+    for user in iter_keyset(query, columns, session=db.session):
+        buffer.append(dumps(serializer.dump(user)))
+        if len(buffer) >= buffer_rows:
+            yield separator + b','.join(buffer)
+            separator = b','
+            buffer = []
+    if buffer:
+        yield separator + b','.join(buffer)
+    yield b']}'
+
 @users_ns.route('/')
 class UserList(Resource):
-    @users_ns.doc('list_users')
-    @users_ns.marshal_list_with(user_model)
+    @users_ns.doc('list_users', params={
+        'per_page': 'Page size (default 20, max 100)',
+        'cursor': 'Opaque cursor from the previous page',
+        'sort': 'created_at (default) or last_name',
+        'include_total': 'Include the total row count (costs an extra query)',
+        'stream': 'Stream every user as a single JSON document instead of paging',
+        'fields': 'Comma-separated fields to return, e.g. id,first_name,last_name (default all)'
+    })
+    @users_ns.response(200, 'Success', user_page_model)
     @jwt_required()
+    @read_replica
     def get(self):
-        """Fetch all users"""
-        users = User.query.all()
-        schema = UserSchema(many=True)
-        return schema.dump(users)
+        """Fetch users one keyset page at a time, or stream them all"""
+        sort = request.args.get('sort', 'created_at')
+        if sort not in SORT_KEYS:
+            return {'error': 'Invalid sort', 'details': {'sort': list(SORT_KEYS)}}, 400
+        columns = SORT_KEYS[sort]
+        try:
+            serializer = user_serializer.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return {'error': str(e), 'details': {'fields': e.allowed}}, 400
+        query = _visible_users().options(*column_options(User, serializer.attributes, *columns))
+
+        if _flag('stream'):
+            return Response(stream_with_context(_stream_users(query, columns, serializer)), mimetype='application/json')
+
+        per_page = parse_per_page(request.args.get('per_page', type=int))
+        try:
+            users, next_cursor = paginate_keyset(query, columns, per_page, request.args.get('cursor'))
+        except InvalidCursor as e:
+            return {'error': str(e)}, 400
+
+        pagination = {
+            'per_page': per_page,
+            'sort': sort,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if _flag('include_total'):
+            pagination['total'] = query.count()
+
+        return {'data': serializer.dump_many(users), 'pagination': pagination}
 
     @users_ns.doc('create_user')
     @users_ns.expect(user_create_model)
-    @users_ns.marshal_with(user_model, code=201)
+    @users_ns.response(201, 'Created', user_model)
     def post(self):
         """Create a new user"""
         data = request.get_json()
-        schema = UserSchema()
-        
+
         try:
             user = User(
                 email=data['email'],
@@ -55,25 +256,27 @@ class UserList(Resource):
             db.session.add(user)
             db.session.commit()
             
-            return schema.dump(user), 201
+            return user_serializer.dump(user), 201
         except Exception as e:
             db.session.rollback()
             return {'error': str(e)}, 400
 
-@users_ns.route('/<int:user_id>')
+@users_ns.route('/<string:user_id>')
 @users_ns.param('user_id', 'The user identifier')
 class UserDetail(Resource):
     @users_ns.doc('get_user')
-    @users_ns.marshal_with(user_model)
+    @users_ns.response(200, 'Success', user_model)
     @jwt_required()
+    @conditional(_user_version)
     def get(self, user_id):
         """Fetch a user by ID"""
+        if not _can_see_user(user_id):
+            return {'error': 'Access denied'}, 403
         user = User.query.get_or_404(user_id)
-        schema = UserSchema()
-        return schema.dump(user)
+        return user_serializer.dump(user)
 
     @users_ns.doc('update_user')
-    @users_ns.marshal_with(user_model)
+    @users_ns.response(200, 'Success', user_model)
     @jwt_required()
     def put(self, user_id):
         """Update a user"""
@@ -88,9 +291,8 @@ class UserDetail(Resource):
             user.email = data['email']
         
         db.session.commit()
-        
-        schema = UserSchema()
-        return schema.dump(user)
+
+        return user_serializer.dump(user)
 
     @users_ns.doc('delete_user')
     @jwt_required()
@@ -100,3 +302,94 @@ class UserDetail(Resource):
         db.session.delete(user)
         db.session.commit()
         return '', 204
+
+@users_ns.route('/<string:user_id>/image')
+@users_ns.param('user_id', 'The user identifier')
+class UserImage(Resource):
+    @users_ns.doc('upload_user_image', description='Send the image bytes as the request body '
+                                                   '(Content-Type image/jpeg, image/png, image/gif or image/webp)')
+    @users_ns.response(200, 'Success', profile_image_model)
+    @jwt_required()
+    def put(self, user_id):
+        """Replace a user's profile image"""
+        scope = current_scope()
+        if not (scope.is_admin or scope.user_id == user_id):
+            return {'error': 'Access denied'}, 403
+        user = User.query.get_or_404(user_id)
+        try:
+            key, created = images.store_image(request.stream)
+        except images.UploadRejected as e:
+            return {'error': str(e)}, 400
+        user.profile_image_url = get_storage().url(key)
+        db.session.commit()
+        return {'key': key, **images.urls(key), 'created': created}
+
+@users_ns.route('/<string:user_id>/relationships')
+@users_ns.param('user_id', 'The user identifier')
+class UserRelationships(Resource):
+    @users_ns.doc('get_user_relationships')
+    @users_ns.response(200, 'Success', user_relationships_model)
+    @jwt_required()
+    @query_budget(12)
+    @read_replica
+    def get(self, user_id):
+        """Fetch a user's gym memberships, coaches and coached athletes"""
+        scope = current_scope()
+        if not (scope.is_admin or scope.user_id == user_id or scope.can_see_athlete(user_id)):
+            return {'error': 'Access denied'}, 403
+
+        user = _load_user(user_id, 'user_relationships')
+        if user is None:
+            return {'error': 'User not found'}, 404
+        return user_relationships_serializer.dump(user)
+
+@users_ns.route('/<string:user_id>/roster')
+@users_ns.param('user_id', 'The coach identifier')
+class CoachRoster(Resource):
+    @users_ns.doc('get_coach_roster')
+    @users_ns.response(200, 'Success', [roster_entry_model])
+    @jwt_required()
+    @conditional(_roster_version)
+    @query_budget(12)
+    @read_replica
+    def get(self, user_id):
+        """Fetch a coach's active athletes with their gym memberships"""
+        if not _is_self_or_admin(user_id):
+            return {'error': 'Access denied'}, 403
+
+        coach = _load_user(user_id, 'coach_roster')
+        if coach is None:
+            return {'error': 'User not found'}, 404
+        return roster_entry_serializer.dump_many(coach.coached_athletes)
+
+@users_ns.route('/<string:user_id>/dashboard')
+@users_ns.param('user_id', 'The coach identifier')
+class CoachDashboard(Resource):
+    @users_ns.doc('get_coach_dashboard', params={
+        'widgets': 'Comma-separated widgets: ' + ', '.join(dashboard.WIDGETS) + ' (default all)',
+        'limit': 'Rows per list widget (default 10, max 50)',
+        'retest_days': 'Days after which an athlete is due for retesting (default DASHBOARD_RETEST_DAYS)',
+        'pb_days': 'Days of personal bests to show (default 14)'
+    })
+    @users_ns.response(200, 'Success', dashboard_model)
+    @jwt_required()
+    @query_budget(16)
+    @read_replica
+    def get(self, user_id):
+        """Fetch a coach's dashboard widgets in one request; timings are in the Server-Timing header"""
+        scope = current_scope()
+        if not (scope.is_admin or scope.user_id == user_id):
+            return {'error': 'Access denied'}, 403
+        try:
+            names = dashboard.parse_widgets(request.args.get('widgets'))
+        except dashboard.InvalidWidgets as e:
+            return {'error': str(e), 'details': {'widgets': e.allowed}}, 400
+
+        coach = db.session.scalar(
+            db.select(User.id).where(User.id == user_id, User.archived.is_(False), User.is_coach | User.is_admin)
+        )
+        if coach is None:
+            return {'error': 'User not found'}, 404
+        coach_scope = scope if scope.user_id == user_id else get_scope(user_id)
+        widgets, timings = dashboard.build(coach_scope, names, dashboard.parse_options(request.args))
+        return {'widgets': widgets}, 200, {'Server-Timing': dashboard.server_timing(timings)}
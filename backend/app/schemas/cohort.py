@@ -0,0 +1,26 @@
+from marshmallow import Schema, fields
+from app.utils.serialization import Serializer
+
+class CohortSchema(Schema):
+    id = fields.Str(dump_only=True)
+    name = fields.Str()
+    description = fields.Str()
+    color = fields.Str()
+    image_url = fields.Str()
+    coach_id = fields.Str()
+    gym_id = fields.Str()
+    is_active = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+class CohortMembershipSchema(Schema):
+    id = fields.Str(dump_only=True)
+    cohort_id = fields.Str()
+    athlete_id = fields.Str()
+    joined_at = fields.Date()
+    is_active = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+cohort_serializer = Serializer(CohortSchema)
+cohort_membership_serializer = Serializer(CohortMembershipSchema)
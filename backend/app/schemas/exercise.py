@@ -0,0 +1,35 @@
+from marshmallow import Schema, fields
+from app.utils.serialization import Serializer
+
+class ExerciseSchema(Schema):
+    id = fields.Str(dump_only=True)
+    name = fields.Str()
+    category = fields.Str()
+    is_enabled = fields.Bool()
+    creator_id = fields.Str()
+    creator_name = fields.Str()
+    instructions = fields.Str()
+    instruction_video_id = fields.Str()
+    image_url = fields.Str()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+class ExerciseMetricSchema(Schema):
+    id = fields.Str(dump_only=True)
+    name = fields.Str()
+    exercise_id = fields.Str()
+    is_enabled = fields.Bool()
+    display_units = fields.Str()
+    unit_of_measure = fields.Str()
+    decimals = fields.Int()
+    min_value = fields.Decimal()
+    max_value = fields.Decimal()
+    default_value = fields.Decimal()
+    higher_is_better = fields.Bool()
+
+class ExerciseWithMetricsSchema(ExerciseSchema):
+    metrics = fields.Nested(ExerciseMetricSchema, many=True)
+
+exercise_serializer = Serializer(ExerciseSchema)
+exercise_with_metrics_serializer = Serializer(ExerciseWithMetricsSchema)
+exercise_metric_serializer = Serializer(ExerciseMetricSchema)
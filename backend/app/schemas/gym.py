@@ -0,0 +1,14 @@
+from marshmallow import Schema, fields
+from app.utils.serialization import Serializer
+
+class GymSchema(Schema):
+    id = fields.Str(dump_only=True)
+    name = fields.Str()
+    address = fields.Str()
+    phone = fields.Str()
+    email = fields.Str()
+    website = fields.Str()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+gym_serializer = Serializer(GymSchema)
@@ -0,0 +1,103 @@
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+from app.utils.serialization import Serializer
+
+class SessionEntrySchema(Schema):
+    athlete_id = fields.Str(validate=validate.Length(equal=36))
+    exercise_metric_id = fields.Str(required=True, validate=validate.Length(equal=36))
+    value = fields.Decimal(required=True, allow_nan=False)
+    date = fields.Date()
+    notes = fields.Str()
+
+class MetricSessionSchema(Schema):
+    athlete_id = fields.Str(validate=validate.Length(equal=36))
+    coach_id = fields.Str(validate=validate.Length(equal=36))
+    gym_id = fields.Str(required=True, validate=validate.Length(equal=36))
+    date = fields.Date(required=True)
+    notes = fields.Str()
+    allow_partial = fields.Bool(load_default=False)
+    entries = fields.List(
+        fields.Nested(SessionEntrySchema),
+        required=True,
+        validate=validate.Length(min=1, max=5000)
+    )
+
+    @validates_schema
+    def validate_athletes(self, data, **kwargs):
+        if data.get('athlete_id'):
+            return
+        missing = [i for i, entry in enumerate(data.get('entries', [])) if not entry.get('athlete_id')]
+        if missing:
+            raise ValidationError(
+                {str(i): ['athlete_id is required when the session has no athlete_id'] for i in missing},
+                'entries'
+            )
+
+class MetricUpdateSchema(Schema):
+    value = fields.Decimal(allow_nan=False)
+    date = fields.Date()
+    notes = fields.Str(allow_none=True)
+
+class PerformanceMetricSchema(Schema):
+    id = fields.Str(dump_only=True)
+    athlete_id = fields.Str()
+    exercise_id = fields.Str()
+    coach_id = fields.Str()
+    gym_id = fields.Str()
+    exercise_metric_id = fields.Str()
+    value = fields.Decimal()
+    date = fields.Date()
+    notes = fields.Str()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+class AthleteMetricRollupSchema(Schema):
+    athlete_id = fields.Str()
+    exercise_metric_id = fields.Str()
+    exercise_id = fields.Str()
+    test_count = fields.Int()
+    best_value = fields.Decimal()
+    best_date = fields.Date()
+    latest_value = fields.Decimal()
+    latest_date = fields.Date()
+    updated_at = fields.DateTime(dump_only=True)
+
+class AthleteMetricAnalyticsSchema(Schema):
+    athlete_id = fields.Str()
+    exercise_metric_id = fields.Str()
+    exercise_id = fields.Str()
+    sample_count = fields.Int()
+    first_date = fields.Date()
+    last_date = fields.Date()
+    rolling_mean = fields.Decimal()
+    slope_per_week = fields.Decimal(allow_none=True)
+    progress_pct = fields.Float(allow_none=True)
+    plateau = fields.Bool()
+    plateau_since = fields.Date(allow_none=True)
+    outlier_count = fields.Int()
+    latest_is_outlier = fields.Bool()
+    computed_at = fields.DateTime(dump_only=True)
+
+metric_serializer = Serializer(PerformanceMetricSchema)
+rollup_serializer = Serializer(AthleteMetricRollupSchema)
+analytics_serializer = Serializer(AthleteMetricAnalyticsSchema)
+
+class MetricImportSchema(Schema):
+    id = fields.Str(dump_only=True)
+    gym_id = fields.Str()
+    coach_id = fields.Str()
+    filename = fields.Str()
+    status = fields.Str()
+    rows_read = fields.Int()
+    inserted = fields.Int()
+    failed = fields.Int()
+    message = fields.Str()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+class MetricImportErrorSchema(Schema):
+    row_number = fields.Int()
+    error = fields.Str()
+    line = fields.Str()
+
+import_serializer = Serializer(MetricImportSchema)
+import_error_serializer = Serializer(MetricImportErrorSchema)
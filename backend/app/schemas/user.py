@@ -1,5 +1,6 @@
 from marshmallow import Schema, fields, validate, post_load
 from datetime import date
+from app.utils.serialization import Serializer
 
 class UserSchema(Schema):
     id = fields.Str(dump_only=True)
@@ -19,6 +20,74 @@ class UserSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
     updated_at = fields.DateTime(dump_only=True)
 
+user_serializer = Serializer(UserSchema)
+
+class UserSummarySchema(Schema):
+    id = fields.Str(dump_only=True)
+    email = fields.Email()
+    first_name = fields.Str()
+    last_name = fields.Str()
+    last_tested = fields.Date()
+
+class GymMembershipSchema(Schema):
+    gym_id = fields.Str()
+    gym_name = fields.Str(attribute='gym.name')
+    role = fields.Str()
+    is_active = fields.Bool()
+    is_approved = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+
+class CoachLinkSchema(Schema):
+    gym_id = fields.Str()
+    is_active = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+    coach = fields.Nested(UserSummarySchema)
+
+class AthleteLinkSchema(Schema):
+    gym_id = fields.Str()
+    is_active = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+    athlete = fields.Nested(UserSummarySchema)
+
+class UserRelationshipsSchema(Schema):
+    id = fields.Str(dump_only=True)
+    gyms = fields.Nested(GymMembershipSchema, many=True, attribute='gym_relationships')
+    coaches = fields.Nested(CoachLinkSchema, many=True, attribute='athlete_coaches')
+    athletes = fields.Nested(AthleteLinkSchema, many=True, attribute='coached_athletes')
+
+class RosterAthleteSchema(UserSummarySchema):
+    gyms = fields.Nested(GymMembershipSchema, many=True, attribute='gym_relationships')
+
+class RosterEntrySchema(Schema):
+    gym_id = fields.Str()
+    created_at = fields.DateTime(dump_only=True)
+    athlete = fields.Nested(RosterAthleteSchema)
+
+user_relationships_serializer = Serializer(UserRelationshipsSchema)
+roster_entry_serializer = Serializer(RosterEntrySchema)
+
+class UserGymRelationshipSchema(Schema):
+    id = fields.Str(dump_only=True)
+    user_id = fields.Str()
+    gym_id = fields.Str()
+    role = fields.Str()
+    is_active = fields.Bool()
+    is_approved = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+class UserCoachRelationshipSchema(Schema):
+    id = fields.Str(dump_only=True)
+    athlete_id = fields.Str()
+    coach_id = fields.Str()
+    gym_id = fields.Str()
+    is_active = fields.Bool()
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+
+gym_relationship_serializer = Serializer(UserGymRelationshipSchema)
+coach_relationship_serializer = Serializer(UserCoachRelationshipSchema)
+
 class UserRegistrationSchema(Schema):
     email = fields.Email(required=True)
     password = fields.Str(required=True, validate=validate.Length(min=8))
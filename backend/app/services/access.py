@@ -0,0 +1,202 @@
+"""Role-based access scopes.
+
+Answers "which gyms, athletes and cohorts can this caller see?" once per
+identity and caches the answer as compact ID sets:
+
+- Administrators see everything.
+- Coaches see the gyms where their coach relationship is active and
+  approved, every active athlete in those gyms, athletes they coach
+  directly, and the cohorts of those gyms.
+- Athletes see themselves, their gyms, the cohorts they belong to and the
+  other members of those cohorts.
+
+Scopes are cached per user for ``ACCESS_SCOPE_TTL`` seconds. The whole
+cache is cleared after any commit that touches a relationship table, and a
+user's own entry is dropped when their row changes (roles, archival). Code
+that changes those tables with Core bulk statements must call
+``invalidate_all()`` itself. Other workers catch up within the TTL.
+"""
+from flask import g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, false, select, true, union
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.user import User, UserGymRelationship, UserCoachRelationship
+from app.models.cohort import Cohort, CohortMembership
+from app.utils.cache import TTLCache
+
+_cache = TTLCache()
+
+# Models whose changes alter somebody's scope
+SCOPE_MODELS = (UserGymRelationship, UserCoachRelationship, Cohort, CohortMembership)
+
+
+class AccessScope:
+    """The gyms, athletes and cohorts one user may see"""
+
+    __slots__ = ('user_id', 'is_admin', 'gym_ids', 'athlete_ids', 'cohort_ids')
+
+    def __init__(self, user_id, is_admin=False, gym_ids=(), athlete_ids=(), cohort_ids=()):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.gym_ids = frozenset(gym_ids)
+        self.athlete_ids = frozenset(athlete_ids)
+        self.cohort_ids = frozenset(cohort_ids)
+
+    def can_see_athlete(self, athlete_id):
+        return self.is_admin or athlete_id in self.athlete_ids
+
+    def can_see_gym(self, gym_id):
+        return self.is_admin or gym_id in self.gym_ids
+
+    def can_see_cohort(self, cohort_id):
+        return self.is_admin or cohort_id in self.cohort_ids
+
+    def athlete_filter(self, column):
+        """SQL criterion restricting ``column`` to visible athlete IDs"""
+        return self._filter(column, self.athlete_ids)
+
+    def gym_filter(self, column):
+        """SQL criterion restricting ``column`` to visible gym IDs"""
+        return self._filter(column, self.gym_ids)
+
+    def cohort_filter(self, column):
+        """SQL criterion restricting ``column`` to visible cohort IDs"""
+        return self._filter(column, self.cohort_ids)
+
+    def _filter(self, column, ids):
+        if self.is_admin:
+            return true()
+        if not ids:
+            return false()
+        return column.in_(ids)
+
+
+def init_app(app):
+    """Configure the scope cache from app config"""
+    _cache.configure(
+        maxsize=app.config.get('ACCESS_SCOPE_CACHE_SIZE', 1024),
+        ttl=app.config.get('ACCESS_SCOPE_TTL', 60)
+    )
+
+
+def get_scope(user_id):
+    """Return the (cached) AccessScope for a user ID"""
+    scope = _cache.get(user_id)
+    if scope is None:
+        scope = resolve_scope(user_id)
+        _cache.set(user_id, scope)
+    return scope
+
+
+def current_scope():
+    """AccessScope of the JWT identity, memoized for the request"""
+    if 'access_scope' not in g:
+        g.access_scope = get_scope(get_jwt_identity())
+    return g.access_scope
+
+
+def resolve_scope(user_id):
+    """Compute a user's scope from the relationship tables (uncached)"""
+    user = db.session.execute(
+        select(User.is_admin, User.is_coach, User.is_athlete)
+        .where(User.id == user_id, User.archived.is_(False))
+    ).first()
+    if user is None:
+        return AccessScope(user_id)
+    if user.is_admin:
+        return AccessScope(user_id, is_admin=True)
+
+    gym_ids = set()
+    athlete_ids = {user_id} if user.is_athlete else set()
+    cohort_ids = set()
+
+    if user.is_coach:
+        coach_gyms = set(db.session.scalars(
+            select(UserGymRelationship.gym_id).where(
+                UserGymRelationship.user_id == user_id,
+                UserGymRelationship.role == 'coach',
+                UserGymRelationship.is_active.is_(True),
+                UserGymRelationship.is_approved.is_(True)
+            )
+        ))
+        gym_ids |= coach_gyms
+        gym_athletes = select(UserGymRelationship.user_id).where(
+            UserGymRelationship.gym_id.in_(coach_gyms),
+            UserGymRelationship.role == 'athlete',
+            UserGymRelationship.is_active.is_(True)
+        )
+        coached = select(UserCoachRelationship.athlete_id).where(
+            UserCoachRelationship.coach_id == user_id,
+            UserCoachRelationship.is_active.is_(True)
+        )
+        athlete_ids.update(db.session.scalars(union(gym_athletes, coached)))
+        cohort_ids.update(db.session.scalars(
+            select(Cohort.id).where(Cohort.gym_id.in_(coach_gyms), Cohort.is_active.is_(True))
+        ))
+
+    if user.is_athlete:
+        gym_ids.update(db.session.scalars(
+            select(UserGymRelationship.gym_id).where(
+                UserGymRelationship.user_id == user_id,
+                UserGymRelationship.role == 'athlete',
+                UserGymRelationship.is_active.is_(True)
+            )
+        ))
+        own_cohorts = (
+            select(CohortMembership.cohort_id)
+            .join(Cohort, Cohort.id == CohortMembership.cohort_id)
+            .where(
+                CohortMembership.athlete_id == user_id,
+                CohortMembership.is_active.is_(True),
+                Cohort.is_active.is_(True)
+            )
+        )
+        for cohort_id, athlete_id in db.session.execute(
+            select(CohortMembership.cohort_id, CohortMembership.athlete_id).where(
+                CohortMembership.cohort_id.in_(own_cohorts),
+                CohortMembership.is_active.is_(True)
+            )
+        ):
+            cohort_ids.add(cohort_id)
+            athlete_ids.add(athlete_id)
+
+    return AccessScope(user_id, gym_ids=gym_ids, athlete_ids=athlete_ids, cohort_ids=cohort_ids)
+
+
+def invalidate(user_id):
+    """Drop one user's cached scope"""
+    _cache.pop(user_id)
+
+
+def invalidate_all():
+    """Drop every cached scope"""
+    _cache.clear()
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_scope_changes(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, SCOPE_MODELS):
+            session.info['access_scope_changed'] = True
+        elif isinstance(obj, User) and obj.id:
+            session.info.setdefault('access_scope_users', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_on_commit(session):
+    if session.info.pop('access_scope_changed', False):
+        invalidate_all()
+    for user_id in session.info.pop('access_scope_users', ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('access_scope_changed', None)
+    session.info.pop('access_scope_users', None)
@@ -0,0 +1,266 @@
+"""Batch progress analytics.
+
+``flask compute-analytics`` (run nightly) writes one
+``athlete_metric_analytics`` row per athlete and exercise metric, and the
+API reads those rows as they are. Nothing here runs in a request.
+
+Athletes are processed ``ANALYTICS_CHUNK_SIZE`` at a time. Each chunk's
+whole history is read with one query, as plain columns sorted by metric,
+athlete and date. ``analyze`` then computes every series in the chunk at
+once with NumPy (no Python loop per athlete):
+
+- ``rolling_mean``: mean of the last ``ANALYTICS_WINDOW`` values
+- ``slope_per_week``: least-squares slope over the last
+  ``ANALYTICS_TREND_DAYS`` days (at least three tests on two dates), and
+  ``progress_pct``, the same slope per 30 days as a percentage of the
+  rolling mean, signed so that positive is better for the metric
+- ``plateau``: no new personal best in the last ``ANALYTICS_PLATEAU_TESTS``
+  tests; ``plateau_since`` is the date of the last best
+- outliers: values whose robust z-score (median and MAD of the series) is
+  above ``ANALYTICS_OUTLIER_THRESHOLD``, for series of five or more tests
+
+Runs are incremental. Only athletes with rows changed, or deleted (from
+``sync_tombstones``), since the last finished run's watermark are
+recomputed. The first run is a full run, and so is any run whose watermark
+is older than the tombstone retention. ``--full`` forces one. With
+``--processes N`` the NumPy work runs in a pool of N processes while the
+parent reads the next chunk and writes the finished ones.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, insert, select, union
+
+from app import db
+from app.models.exercise import ExerciseMetric
+from app.models.metric import AnalyticsRun, AthleteMetricAnalytics, PerformanceMetric
+from app.models.sync import SyncTombstone
+from app.utils.ids import new_id
+
+# Rows per multi-row INSERT statement
+INSERT_CHUNK_SIZE = 500
+
+# Seconds subtracted from a run's start for its watermark, for rows committed after their timestamp
+WATERMARK_OVERLAP = 300
+
+# Fewest tests in a series before any of its values can be an outlier
+MIN_OUTLIER_SAMPLES = 5
+
+# Scales the median absolute deviation to a standard deviation under normality
+MAD_SCALE = 0.6745
+
+
+def run(full=False, processes=None, chunk_size=None):
+    """Recompute analytics for changed athletes (or all of them); returns the AnalyticsRun"""
+    config = current_app.config
+    processes = config['ANALYTICS_PROCESSES'] if processes is None else processes
+    chunk_size = chunk_size or config['ANALYTICS_CHUNK_SIZE']
+    started = datetime.utcnow()
+
+    since = None if full else _last_watermark()
+    retention = timedelta(days=config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+    if since is not None and since < started - retention:
+        since = None
+    athlete_ids = sorted(_athletes(since))
+
+    metrics = {
+        row.id: row for row in db.session.execute(
+            select(ExerciseMetric.id, ExerciseMetric.exercise_id, ExerciseMetric.higher_is_better)
+        )
+    }
+    settings = {
+        'window': config['ANALYTICS_WINDOW'],
+        'trend_days': config['ANALYTICS_TREND_DAYS'],
+        'plateau_tests': config['ANALYTICS_PLATEAU_TESTS'],
+        'threshold': config['ANALYTICS_OUTLIER_THRESHOLD']
+    }
+    record = AnalyticsRun(
+        full=since is None, watermark=started - timedelta(seconds=WATERMARK_OVERLAP),
+        athletes=len(athlete_ids), rows_read=0, rows_written=0, started_at=started
+    )
+    chunks = [athlete_ids[start:start + chunk_size] for start in range(0, len(athlete_ids), chunk_size)]
+
+    if processes > 0 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            pending = []
+            for chunk in chunks:
+                columns = _load(chunk, metrics)
+                record.rows_read += len(columns['values'])
+                pending.append((chunk, pool.submit(analyze, **columns, **settings)))
+                # Keep every process busy, but no more chunks in memory than that
+                if len(pending) > processes:
+                    done_chunk, future = pending.pop(0)
+                    record.rows_written += _write(done_chunk, future.result(), metrics, started)
+            for chunk, future in pending:
+                record.rows_written += _write(chunk, future.result(), metrics, started)
+    else:
+        for chunk in chunks:
+            columns = _load(chunk, metrics)
+            record.rows_read += len(columns['values'])
+            record.rows_written += _write(chunk, analyze(**columns, **settings), metrics, started)
+
+    if record.full:
+        # Athletes whose every result is gone
+        db.session.execute(
+            delete(AthleteMetricAnalytics).where(
+                AthleteMetricAnalytics.athlete_id.not_in(select(PerformanceMetric.athlete_id).distinct())
+            )
+        )
+    record.finished_at = datetime.utcnow()
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def _last_watermark():
+    return db.session.scalar(
+        select(AnalyticsRun.watermark)
+        .where(AnalyticsRun.finished_at.is_not(None))
+        .order_by(AnalyticsRun.finished_at.desc())
+        .limit(1)
+    )
+
+
+def _athletes(since):
+    """Athletes with results changed or deleted since ``since``; everyone with results when None"""
+    if since is None:
+        return set(db.session.scalars(select(PerformanceMetric.athlete_id).distinct()))
+    changed = select(PerformanceMetric.athlete_id).where(PerformanceMetric.updated_at >= since)
+    deleted = select(SyncTombstone.athlete_id).where(
+        SyncTombstone.entity == 'metrics', SyncTombstone.deleted_at >= since, SyncTombstone.athlete_id.is_not(None)
+    )
+    return set(db.session.scalars(union(changed, deleted)))
+
+
+def _load(athlete_ids, metrics):
+    """The chunk's results as NumPy columns, sorted by metric, athlete and date"""
+    pm = PerformanceMetric
+    rows = db.session.execute(
+        select(pm.exercise_metric_id, pm.athlete_id, pm.date, pm.value)
+        .where(pm.athlete_id.in_(athlete_ids))
+        .order_by(pm.exercise_metric_id, pm.athlete_id, pm.date, pm.created_at, pm.id)
+    ).all()
+    metric_ids = np.array([row[0] for row in rows], dtype=object)
+    return {
+        'metric_ids': metric_ids,
+        'athlete_ids': np.array([row[1] for row in rows], dtype=object),
+        'days': np.array([row[2].toordinal() for row in rows], dtype=np.int64),
+        'values': np.array([row[3] for row in rows], dtype=np.float64),
+        'signs': np.array([1.0 if metrics[m].higher_is_better else -1.0 for m in metric_ids], dtype=np.float64)
+    }
+
+
+def analyze(metric_ids, athlete_ids, days, values, signs, window, trend_days, plateau_tests, threshold):
+    """Analytics for every (metric, athlete) series in sorted columns.
+
+    Rows must be sorted by metric, athlete and date. ``signs`` is +1 for
+    rows of metrics where higher is better and -1 otherwise. Returns a
+    dict of per-series lists. Runs in pool processes, so it only uses
+    its arguments.
+    """
+    n = len(values)
+    if not n:
+        return {'metric_ids': [], 'athlete_ids': []}
+
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = (metric_ids[1:] != metric_ids[:-1]) | (athlete_ids[1:] != athlete_ids[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], n)
+    counts = ends - starts
+    last = ends - 1
+    series = np.repeat(np.arange(len(starts)), counts)
+
+    # Rolling mean of the last `window` values, from a running sum
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    window_starts = np.maximum(starts, ends - window)
+    rolling = (sums[ends] - sums[window_starts]) / (ends - window_starts)
+
+    # Least-squares slope per series over its trend window; x is days before the series' last test
+    x = (days - days[last][series]).astype(np.float64)
+    weight = (x >= -trend_days).astype(np.float64)
+    k = np.bincount(series, weight)
+    sx = np.bincount(series, weight * x)
+    sy = np.bincount(series, weight * values)
+    sxx = np.bincount(series, weight * x * x)
+    sxy = np.bincount(series, weight * x * values)
+    denominator = k * sxx - sx * sx
+    fit = (k >= 3) & (denominator > 0)
+    slope = np.full(len(starts), np.nan)
+    np.divide(k * sxy - sx * sy, denominator, out=slope, where=fit)
+    series_signs = signs[starts]
+    progress = np.full(len(starts), np.nan)
+    np.divide(slope * 30 * series_signs * 100, np.abs(rolling), out=progress, where=fit & (rolling != 0))
+
+    # Running personal best per series: offset each series above the previous one so a single
+    # maximum.accumulate restarts at every series boundary
+    adjusted = values * signs
+    span = adjusted.max() - adjusted.min() + 1.0
+    shifted = (adjusted - adjusted.min()) + series * span
+    running = np.maximum.accumulate(shifted)
+    new_best = boundary.copy()
+    new_best[1:] |= shifted[1:] > running[:-1]
+    last_best = np.maximum.reduceat(np.where(new_best, np.arange(n), -1), starts)
+    plateau = (last - last_best) >= plateau_tests
+
+    # Robust z-scores from each series' median and median absolute deviation
+    middle_low = starts + (counts - 1) // 2
+    middle_high = starts + counts // 2
+    ordered = values[np.lexsort((values, series))]
+    median = (ordered[middle_low] + ordered[middle_high]) / 2
+    deviation = np.abs(values - median[series])
+    ordered = deviation[np.lexsort((deviation, series))]
+    mad = (ordered[middle_low] + ordered[middle_high]) / 2
+    scored = (counts >= MIN_OUTLIER_SAMPLES) & (mad > 0)
+    z = np.zeros(n)
+    np.divide(MAD_SCALE * deviation, mad[series], out=z, where=scored[series])
+    outlier = z > threshold
+
+    return {
+        'metric_ids': metric_ids[starts].tolist(),
+        'athlete_ids': athlete_ids[starts].tolist(),
+        'sample_count': counts.tolist(),
+        'first_day': days[starts].tolist(),
+        'last_day': days[last].tolist(),
+        'rolling_mean': rolling.tolist(),
+        'slope_per_week': (slope * 7).tolist(),
+        'progress_pct': progress.tolist(),
+        'plateau': plateau.tolist(),
+        'plateau_since': days[last_best].tolist(),
+        'outlier_count': np.bincount(series, outlier, minlength=len(starts)).astype(np.int64).tolist(),
+        'latest_is_outlier': outlier[last].tolist()
+    }
+
+
+def _write(athlete_ids, result, metrics, computed_at):
+    """Replace the chunk's analytics rows and commit; returns the rows written"""
+    rows = [
+        {
+            'id': new_id(),
+            'athlete_id': athlete_id,
+            'exercise_metric_id': metric_id,
+            'exercise_id': metrics[metric_id].exercise_id,
+            'sample_count': result['sample_count'][i],
+            'first_date': date.fromordinal(result['first_day'][i]),
+            'last_date': date.fromordinal(result['last_day'][i]),
+            'rolling_mean': round(result['rolling_mean'][i], 6),
+            'slope_per_week': _finite(result['slope_per_week'][i], 6),
+            'progress_pct': _finite(result['progress_pct'][i], 2),
+            'plateau': result['plateau'][i],
+            'plateau_since': date.fromordinal(result['plateau_since'][i]) if result['plateau'][i] else None,
+            'outlier_count': result['outlier_count'][i],
+            'latest_is_outlier': result['latest_is_outlier'][i],
+            'computed_at': computed_at
+        }
+        for i, (metric_id, athlete_id) in enumerate(zip(result['metric_ids'], result['athlete_ids']))
+    ]
+    db.session.execute(delete(AthleteMetricAnalytics).where(AthleteMetricAnalytics.athlete_id.in_(athlete_ids)))
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(insert(AthleteMetricAnalytics), rows[start:start + INSERT_CHUNK_SIZE])
+    db.session.commit()
+    return len(rows)
+
+
+def _finite(value, digits):
+    return None if np.isnan(value) else round(value, digits)
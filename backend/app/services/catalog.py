@@ -0,0 +1,452 @@
+"""Exercise catalog search.
+
+Typeahead queries are answered from an in-memory inverted index instead of
+``LIKE '%term%'`` joins across the four exercise tables. Each worker builds
+the index on first use from ``exercises``, ``exercise_search_terms``,
+``exercise_equipment`` and ``exercise_body_segments`` (four queries) and
+keeps three postings maps:
+
+- token prefix -> {exercise ID: field weight}, for prefix matching as the
+  user types (exact tokens are a second map of the same shape)
+- trigram -> tokens, so a misspelled word still finds close tokens
+- equipment / body segment name -> exercise IDs, for filtering
+
+Matches on the exercise name outrank search terms, which outrank equipment
+and body segments. Ties are broken by category: the caller's own custom
+exercises first, then system exercises, then other custom exercises.
+
+Changes made through the ORM are picked up incrementally: the changed
+exercises are reloaded on the next search after the commit. Writing a
+search term, equipment or body segment row bumps its exercise's
+``updated_at`` so that other workers, which poll ``COUNT(*)`` and
+``MAX(updated_at)`` every ``CATALOG_REFRESH_INTERVAL`` seconds, can reload
+just what changed. Code that writes these tables with Core bulk statements
+must call ``invalidate()``.
+"""
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import heapq
+import re
+import threading
+import time
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.exercise import Exercise, ExerciseBodySegment, ExerciseEquipment, ExerciseSearchTerm
+from app.schemas.exercise import exercise_serializer
+from app.utils.serialization import dumps
+
+# Longest prefix stored in the index; longer query tokens are verified against the token text
+MAX_PREFIX = 12
+# Minimum trigram similarity (Jaccard) for a fuzzy token match, as pg_trgm's default
+MIN_SIMILARITY = 0.3
+
+FIELD_WEIGHTS = {'name': 4.0, 'term': 2.0, 'equipment': 1.0, 'segment': 1.0}
+EXACT_BONUS = 1.5
+FUZZY_PENALTY = 0.5
+
+CHILD_MODELS = (ExerciseSearchTerm, ExerciseEquipment, ExerciseBodySegment)
+
+# Keys of CatalogEntry.payload, in response order
+PAYLOAD_FIELDS = (*exercise_serializer.field_names, 'search_terms', 'equipment', 'body_segments')
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercase alphanumeric words of ``text``"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+def normalize(name):
+    """Key used for equipment and body segment filters"""
+    return ' '.join(tokenize(name))
+
+
+@lru_cache(maxsize=65536)
+def trigrams(token):
+    padded = f'  {token} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class CatalogEntry:
+    """An indexed exercise with its searchable tokens and response payload"""
+
+    __slots__ = ('id', 'name', 'category', 'creator_id', 'is_enabled', 'sort_name',
+                 'tokens', 'equipment', 'body_segments', 'payload')
+
+    def __init__(self, row, search_terms=(), equipment=(), body_segments=()):
+        self.id = row.id
+        self.name = row.name
+        self.category = row.category
+        self.creator_id = row.creator_id
+        self.is_enabled = row.is_enabled
+        self.sort_name = row.name.lower()
+        self.equipment = frozenset(normalize(name) for name in equipment)
+        self.body_segments = frozenset(normalize(name) for name in body_segments)
+
+        # token -> best field weight
+        self.tokens = {}
+        for field, texts in (
+            ('segment', body_segments),
+            ('equipment', equipment),
+            ('term', search_terms),
+            ('name', (row.name,))
+        ):
+            for text in texts:
+                for token in tokenize(text):
+                    self.tokens[token] = max(self.tokens.get(token, 0.0), FIELD_WEIGHTS[field])
+
+        self.payload = {
+            **exercise_serializer.dump(row),
+            'search_terms': sorted(search_terms),
+            'equipment': sorted(equipment),
+            'body_segments': sorted(body_segments)
+        }
+
+    def category_rank(self, user_id):
+        if self.category == 'custom' and user_id and self.creator_id == user_id:
+            return 0
+        return 1 if self.category == 'system' else 2
+
+
+class CatalogIndex:
+    """Prefix and trigram postings over the exercise catalog"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self._stale = set()
+        self._needs_build = True
+        self.refresh_interval = 30
+        self._checked_at = 0.0
+        self.built_at = None
+        self.searches = 0
+
+    def _reset(self):
+        self._entries = {}
+        self._prefixes = defaultdict(dict)
+        self._token_ids = defaultdict(dict)
+        self._trigrams = defaultdict(set)
+        self._equipment = defaultdict(set)
+        self._body_segments = defaultdict(set)
+        self._row_count = 0
+        self._max_updated = None
+        self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Maintenance
+
+    def add(self, entry):
+        """Index an entry, replacing any previous version"""
+        with self._lock:
+            self.remove(entry.id)
+            self._entries[entry.id] = entry
+            self._version = None
+            for token, weight in entry.tokens.items():
+                if token not in self._token_ids:
+                    for gram in trigrams(token):
+                        self._trigrams[gram].add(token)
+                self._token_ids[token][entry.id] = weight
+                for i in range(1, min(len(token), MAX_PREFIX) + 1):
+                    postings = self._prefixes[token[:i]]
+                    if postings.get(entry.id, 0.0) < weight:
+                        postings[entry.id] = weight
+            for name in entry.equipment:
+                self._equipment[name].add(entry.id)
+            for name in entry.body_segments:
+                self._body_segments[name].add(entry.id)
+
+    def remove(self, exercise_id):
+        """Drop an exercise from every posting"""
+        with self._lock:
+            entry = self._entries.pop(exercise_id, None)
+            if entry is None:
+                return
+            self._version = None
+            for token in entry.tokens:
+                _discard(self._token_ids, token, entry.id)
+                if token not in self._token_ids:
+                    for gram in trigrams(token):
+                        _discard(self._trigrams, gram, token)
+                for i in range(1, min(len(token), MAX_PREFIX) + 1):
+                    _discard(self._prefixes, token[:i], entry.id)
+            for name in entry.equipment:
+                _discard(self._equipment, name, entry.id)
+            for name in entry.body_segments:
+                _discard(self._body_segments, name, entry.id)
+
+    def build(self):
+        """(Re)build the whole index from the database"""
+        entries = load_entries()
+        with self._lock:
+            self._reset()
+            for entry in entries:
+                self.add(entry)
+            self._row_count, self._max_updated = _table_version()
+            self._stale.clear()
+            self._needs_build = False
+            self._checked_at = time.monotonic()
+            self.built_at = datetime.utcnow()
+
+    def reload(self, exercise_ids):
+        """Re-read specific exercises; IDs that no longer exist are removed"""
+        exercise_ids = set(exercise_ids)
+        entries = load_entries(exercise_ids)
+        with self._lock:
+            for entry in entries:
+                self.add(entry)
+            for exercise_id in exercise_ids - {entry.id for entry in entries}:
+                self.remove(exercise_id)
+
+    def mark_stale(self, exercise_ids):
+        with self._lock:
+            self._stale.update(exercise_ids)
+
+    def invalidate(self):
+        """Force a full rebuild on the next search"""
+        with self._lock:
+            self._needs_build = True
+
+    def ensure_fresh(self):
+        """Apply pending local changes and, every refresh interval, changes from other workers"""
+        if self._needs_build:
+            self.build()
+            return
+        if self._stale:
+            with self._lock:
+                stale, self._stale = self._stale, set()
+            self.reload(stale)
+            # Absorb our own inserts and deletes; updates are re-read by the next poll
+            with self._lock:
+                self._row_count = _table_version()[0]
+        if self.refresh_interval and time.monotonic() - self._checked_at >= self.refresh_interval:
+            self._checked_at = time.monotonic()
+            row_count, max_updated = _table_version()
+            if row_count != self._row_count:
+                self.build()
+            elif max_updated and (self._max_updated is None or max_updated > self._max_updated):
+                changed = db.session.scalars(
+                    select(Exercise.id).where(Exercise.updated_at >= (self._max_updated or max_updated))
+                ).all()
+                self.reload(changed)
+                with self._lock:
+                    self._max_updated = max_updated
+
+    # Queries
+
+    def search(self, query='', category=None, equipment=None, body_segment=None,
+               user_id=None, limit=20, offset=0, include_disabled=False):
+        """Rank exercises matching every word of ``query``.
+
+        Returns ``(entries, total)`` where ``entries`` is the requested page.
+        """
+        with self._lock:
+            self.searches += 1
+            scores = None
+            for token in dict.fromkeys(tokenize(query)):
+                token_scores = self._match_token(token)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {i: scores[i] + s for i, s in token_scores.items() if i in scores}
+                if not scores:
+                    return [], 0
+
+            candidates = self._entries.keys() if scores is None else scores.keys()
+            if equipment:
+                candidates = self._equipment.get(normalize(equipment), set()).intersection(candidates)
+            if body_segment:
+                candidates = self._body_segments.get(normalize(body_segment), set()).intersection(candidates)
+
+            entries = [
+                self._entries[i] for i in candidates
+                if (include_disabled or self._entries[i].is_enabled)
+                and (category is None or self._entries[i].category == category)
+            ]
+
+        if scores is None:
+            key = lambda e: (e.category_rank(user_id), e.sort_name)  # noqa: E731
+        else:
+            key = lambda e: (-scores[e.id], e.category_rank(user_id), e.sort_name)  # noqa: E731
+        # Typeahead only needs the first page, so avoid sorting every match
+        return heapq.nsmallest(offset + limit, entries, key=key)[offset:], len(entries)
+
+    def _match_token(self, token):
+        """Score every exercise with a token starting with ``token``, or fuzzily close to it"""
+        if len(token) <= MAX_PREFIX:
+            scores = dict(self._prefixes.get(token, ()))
+        else:
+            # Only the first MAX_PREFIX characters are indexed; check the rest against the tokens
+            scores = {}
+            for exercise_id in self._prefixes.get(token[:MAX_PREFIX], ()):
+                weights = [w for t, w in self._entries[exercise_id].tokens.items() if t.startswith(token)]
+                if weights:
+                    scores[exercise_id] = max(weights)
+        for exercise_id, weight in self._token_ids.get(token, {}).items():
+            scores[exercise_id] = max(scores[exercise_id], weight * EXACT_BONUS)
+        if scores or len(token) < 3:
+            return scores
+
+        grams = trigrams(token)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                overlap[candidate] += 1
+        for candidate, shared in overlap.items():
+            similarity = shared / len(grams | trigrams(candidate))
+            if similarity < MIN_SIMILARITY:
+                continue
+            for exercise_id, weight in self._token_ids[candidate].items():
+                scores[exercise_id] = max(scores.get(exercise_id, 0.0), weight * similarity * FUZZY_PENALTY)
+        return scores
+
+    def facets(self):
+        """Known equipment and body segment filter values"""
+        with self._lock:
+            return {'equipment': sorted(self._equipment), 'body_segments': sorted(self._body_segments)}
+
+    def version(self):
+        """Digest of every indexed payload; the same in every worker holding the same data"""
+        with self._lock:
+            if self._version is None:
+                digest = hashlib.sha1()
+                for exercise_id in sorted(self._entries):
+                    digest.update(dumps(self._entries[exercise_id].payload))
+                self._version = digest.hexdigest()
+            return self._version
+
+    def stats(self):
+        return {
+            'exercises': len(self._entries),
+            'tokens': len(self._token_ids),
+            'prefixes': len(self._prefixes),
+            'searches': self.searches,
+            'built_at': self.built_at.isoformat() if self.built_at else None
+        }
+
+
+def _discard(postings, key, value):
+    values = postings.get(key)
+    if values is not None:
+        if isinstance(values, dict):
+            values.pop(value, None)
+        else:
+            values.discard(value)
+        if not values:
+            del postings[key]
+
+
+def _table_version():
+    row = db.session.execute(select(func.count(Exercise.id), func.max(Exercise.updated_at))).one()
+    return row[0], row[1]
+
+
+def load_entries(exercise_ids=None):
+    """Read exercises and their search terms, equipment and body segments"""
+    query = select(Exercise.__table__)
+    if exercise_ids is not None:
+        if not exercise_ids:
+            return []
+        query = query.where(Exercise.id.in_(exercise_ids))
+    rows = db.session.execute(query).all()
+    if not rows:
+        return []
+
+    children = {}
+    for model in CHILD_MODELS:
+        names = defaultdict(list)
+        child_query = select(model.exercise_id, model.name)
+        if exercise_ids is not None:
+            child_query = child_query.where(model.exercise_id.in_([row.id for row in rows]))
+        for exercise_id, name in db.session.execute(child_query):
+            names[exercise_id].append(name)
+        children[model] = names
+
+    return [
+        CatalogEntry(
+            row,
+            search_terms=children[ExerciseSearchTerm].get(row.id, ()),
+            equipment=children[ExerciseEquipment].get(row.id, ()),
+            body_segments=children[ExerciseBodySegment].get(row.id, ())
+        )
+        for row in rows
+    ]
+
+
+_index = CatalogIndex()
+
+
+def init_app(app):
+    """Configure how often each worker checks for changes made elsewhere"""
+    _index.refresh_interval = app.config.get('CATALOG_REFRESH_INTERVAL', 30)
+    _index.invalidate()
+
+
+def get_index():
+    """The worker's catalog index, brought up to date"""
+    _index.ensure_fresh()
+    return _index
+
+
+def search(query='', **kwargs):
+    """Search the catalog; see ``CatalogIndex.search``"""
+    return get_index().search(query, **kwargs)
+
+
+def invalidate():
+    """Rebuild the index on the next search"""
+    _index.invalidate()
+
+
+def stats():
+    return _index.stats()
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_catalog_changes(session, flush_context, instances):
+    changed = session.info.setdefault('catalog_exercises', set())
+    touched = session.info.setdefault('catalog_touched', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Exercise):
+            if obj.id:
+                changed.add(obj.id)
+        elif isinstance(obj, CHILD_MODELS):
+            exercise_id = obj.exercise_id or (obj.exercise.id if obj.exercise is not None else None)
+            if exercise_id:
+                changed.add(exercise_id)
+                touched.add(exercise_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _touch_exercises(session, flush_context):
+    # New exercises only get their ID during flush
+    changed = session.info.setdefault('catalog_exercises', set())
+    changed.update(obj.id for obj in session.new if isinstance(obj, Exercise))
+    touched = session.info.pop('catalog_touched', None)
+    if touched:
+        session.execute(
+            update(Exercise)
+            .where(Exercise.id.in_(touched))
+            .values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_stale_on_commit(session):
+    changed = session.info.pop('catalog_exercises', None)
+    if changed:
+        _index.mark_stale(changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('catalog_exercises', None)
+    session.info.pop('catalog_touched', None)
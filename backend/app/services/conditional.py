@@ -0,0 +1,90 @@
+"""Conditional GET (ETag / Last-Modified) for API responses.
+
+Two layers, both installed by ``init_app``:
+
+- ``@conditional(validator)`` on a route handler runs ``validator`` first.
+  It returns a cheap version of what the handler would produce, usually
+  ``max(updated_at)`` and a row count from one aggregate query, or a
+  version counter, optionally with a last-modified time. The ETag is a hash
+  of that version, the request path and query string, and the caller's
+  identity (responses are per user). A matching ``If-None-Match`` (or, without
+  one, an ``If-Modified-Since`` no older than the last-modified time) gets
+  a 304 before the handler queries or serializes anything.
+- Every other successful GET gets an ETag hashed from its body, so
+  unchanged responses still answer ``If-None-Match`` with an empty 304,
+  though only after being built.
+
+Responses carry ``Cache-Control: private, no-cache`` unless the handler set
+one: browsers keep them and revalidate on each use, and shared caches
+(nginx) pass them through untouched because they depend on the caller.
+"""
+from functools import wraps
+import hashlib
+
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity
+
+DEFAULT_CACHE_CONTROL = 'private, no-cache'
+
+
+def conditional(validator, cache_control=None):
+    """Answer conditional GETs from ``validator(**view_args)`` before running the handler.
+
+    ``validator`` returns ``(version, last_modified)``, where ``version`` is
+    any value with a stable ``repr`` and ``last_modified`` a naive UTC
+    datetime or None, or returns None to skip validation (e.g. when the
+    resource does not exist and the handler will answer 404).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = validator(**kwargs)
+            if result is None:
+                return fn(*args, **kwargs)
+            version, last_modified = result
+            etag = make_etag(version)
+            g.conditional = (etag, last_modified, cache_control)
+            if _not_modified(etag, last_modified):
+                return {}, 304
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def make_etag(version):
+    """Strong ETag for ``version`` of the current URL as seen by the current caller"""
+    key = f'{request.full_path}|{get_jwt_identity()}|{version!r}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified is not None and last_modified.replace(microsecond=0) <= since.replace(tzinfo=None)
+
+
+def init_app(app):
+    """Attach validators and cache headers to GET responses"""
+
+    @app.after_request
+    def _apply_validators(response):
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        etag, last_modified, cache_control = g.pop('conditional', (None, None, None))
+        if response.status_code == 304 and etag:
+            # Built by @conditional: drop the placeholder body
+            response.set_data(b'')
+            response.headers.pop('Content-Type', None)
+        elif response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+            return response
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = cache_control or DEFAULT_CACHE_CONTROL
+        if etag:
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+        elif 'ETag' not in response.headers:
+            response.add_etag()
+            response.make_conditional(request)
+        return response
@@ -0,0 +1,452 @@
+"""Coach dashboard widgets.
+
+A coach's landing page is assembled by one request
+(``GET /users/{id}/dashboard``). It names the widgets it wants and their
+options. Each widget is an independent read over the coach's access scope:
+
+- ``roster``: athlete counts, per gym, and how many were tested recently
+- ``recent_tests``: the athletes tested most recently (``users.last_tested``)
+- ``overdue_retests``: athletes last tested more than ``retest_days`` ago
+- ``cohorts``: member counts and recent testing per visible cohort
+- ``personal_bests``: personal bests set in the last ``pb_days`` days
+
+Widgets that are not cached are computed at the same time on a small
+per-worker thread pool (``DASHBOARD_CONCURRENCY`` threads). Each widget runs
+in its own app context, so it has its own session and connection. It also
+runs in a copy of the request's context variables, so query budgets and
+request metrics still count its statements. A widget that fails or takes
+longer than ``DASHBOARD_WIDGET_TIMEOUT`` seconds is answered with an error
+in its slot; the others are still returned. A timed-out widget keeps
+running (a running query cannot be cancelled) and its result is cached when
+it finishes, and a request for a widget that is already being computed
+waits for that computation instead of starting another, so a slow widget
+occupies at most one thread per key. A concurrency of 0 computes widgets
+one after another in the request.
+
+Results are cached per widget, coach and options for ``DASHBOARD_CACHE_TTL``
+seconds. Commits drop the cached widgets of every coach who can see an
+athlete whose row, results or rollups changed, and clear the whole cache
+when a relationship table changes (as ``app.services.access`` does).
+Results of computations that were running when the cache was invalidated
+are not cached. Other workers catch up within the TTL.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import contextvars
+from datetime import date, timedelta
+import functools
+import threading
+import time
+
+from flask import current_app, g
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.cohort import Cohort, CohortMembership
+from app.models.exercise import Exercise, ExerciseMetric
+from app.models.gym import Gym
+from app.models.metric import AthleteMetricRollup, PerformanceMetric
+from app.models.user import User, UserCoachRelationship, UserGymRelationship
+from app.services.access import SCOPE_MODELS
+from app.utils.cache import TTLCache
+from app.utils.units import display_unit, to_display
+
+# name -> function(scope, options), in default display order
+WIDGETS = {}
+
+# Option -> (default, minimum, maximum); None defaults come from config
+OPTIONS = {
+    'limit': (10, 1, 50),
+    'retest_days': (None, 1, 365),
+    'pb_days': (14, 1, 365)
+}
+
+# Columns of the athlete lists
+ATHLETE_COLUMNS = (User.id, User.first_name, User.last_name, User.profile_image_url, User.last_tested)
+
+# Models whose rows carry the athlete they belong to
+ATHLETE_MODELS = (PerformanceMetric, AthleteMetricRollup)
+
+_cache = TTLCache()
+_lock = threading.Lock()
+_executor = None
+_settings = None
+# cache key -> future of the computation in progress; the generation counts invalidations
+_inflight = {}
+_inflight_lock = threading.RLock()
+_generation = 0
+
+
+class InvalidWidgets(ValueError):
+    """Raised for unknown widget names; ``allowed`` lists the valid ones"""
+
+    def __init__(self, names):
+        super().__init__(f'Unknown widgets: {", ".join(names)}')
+        self.allowed = list(WIDGETS)
+
+
+def widget(name):
+    """Register ``fn(scope, options) -> JSON data`` as a dashboard widget"""
+    def register(fn):
+        WIDGETS[name] = fn
+        return fn
+    return register
+
+
+def init_app(app):
+    """Configure the widget cache from app config"""
+    _cache.configure(
+        maxsize=app.config.get('DASHBOARD_CACHE_SIZE', 2048),
+        ttl=app.config.get('DASHBOARD_CACHE_TTL', 30)
+    )
+
+
+def parse_widgets(value):
+    """Widget names from a comma-separated list, in order; all of them when empty"""
+    if not value:
+        return list(WIDGETS)
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in WIDGETS]
+    if unknown:
+        raise InvalidWidgets(unknown)
+    return names or list(WIDGETS)
+
+
+def parse_options(args):
+    """Widget options from query arguments, clamped to their allowed range"""
+    options = {}
+    for name, (default, low, high) in OPTIONS.items():
+        value = args.get(name, type=int)
+        if value is None:
+            value = default if default is not None else current_app.config['DASHBOARD_RETEST_DAYS']
+        options[name] = max(low, min(value, high))
+    return options
+
+
+def build(scope, names, options):
+    """Compute (or fetch from cache) the named widgets for a coach's scope.
+
+    Returns ``(widgets, timings)``: widget data by name, and per widget a
+    ``(milliseconds, source)`` pair where source is ``cache``, ``db``,
+    ``error`` or ``timeout``.
+    """
+    config = current_app.config
+    widgets = {}
+    timings = {}
+    missing = []
+    for name in names:
+        key = (name, scope.user_id, tuple(sorted(options.items())))
+        cached = _cache.get(key)
+        if cached is not None:
+            widgets[name] = cached[1]
+            timings[name] = (0.0, 'cache')
+        else:
+            missing.append((name, key))
+
+    visible = None if scope.is_admin else scope.athlete_ids
+    if config['DASHBOARD_CONCURRENCY'] <= 0:
+        results = []
+        for name, key in missing:
+            generation = _generation
+            result = _compute(name, scope, options)
+            _store(key, visible, generation, result)
+            results.append((name, result))
+    else:
+        executor = _get_executor(config)
+        app = current_app._get_current_object()
+        replica = g.get('read_replica', False)
+        futures = [
+            (name, _submit(executor, key, visible, _compute_in_context, app, replica, name, scope, options))
+            for name, key in missing
+        ]
+        deadline = time.monotonic() + config['DASHBOARD_WIDGET_TIMEOUT']
+        results = []
+        for name, future in futures:
+            try:
+                results.append((name, future.result(timeout=max(deadline - time.monotonic(), 0))))
+            except FutureTimeout:
+                # Left running; _finished caches its result
+                results.append((name, ({'error': 'Widget timed out'}, None, 'timeout')))
+
+    for name, (data, elapsed, source) in results:
+        widgets[name] = data
+        timings[name] = (elapsed or 0.0, source)
+    return {name: widgets[name] for name in names}, timings
+
+
+def server_timing(timings):
+    """``Server-Timing`` header value for widget timings"""
+    return ', '.join(
+        f'{name};dur={elapsed:.1f};desc="{source}"' for name, (elapsed, source) in timings.items()
+    )
+
+
+def _submit(executor, key, visible, fn, *args):
+    """The future computing a cache key, submitting ``fn(*args)`` unless one is in flight"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = executor.submit(contextvars.copy_context().run, fn, *args)
+            _inflight[key] = future
+            future.add_done_callback(functools.partial(_finished, key, visible, _generation))
+        return future
+
+
+def _finished(key, visible, generation, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    if not future.cancelled() and future.exception() is None:
+        _store(key, visible, generation, future.result())
+
+
+def _store(key, visible, generation, result):
+    """Cache a computed widget unless the cache was invalidated since it started"""
+    data, _, source = result
+    with _inflight_lock:
+        if source == 'db' and generation == _generation:
+            _cache.set(key, (visible, data))
+
+
+def _compute(name, scope, options):
+    started = time.perf_counter()
+    try:
+        data = WIDGETS[name](scope, options)
+    except Exception:
+        current_app.logger.exception('Dashboard widget %s failed', name)
+        db.session.rollback()
+        return {'error': 'Widget failed'}, (time.perf_counter() - started) * 1000, 'error'
+    return data, (time.perf_counter() - started) * 1000, 'db'
+
+
+def _compute_in_context(app, replica, name, scope, options):
+    """Run one widget on a pool thread with its own app context and session"""
+    with app.app_context():
+        g.read_replica = replica
+        return _compute(name, scope, options)
+
+
+def _get_executor(config):
+    """Create the pool lazily so it is built after gunicorn forks"""
+    global _executor, _settings
+    settings = config['DASHBOARD_CONCURRENCY']
+    if _settings != settings:
+        with _lock:
+            if _settings != settings:
+                if _executor is not None:
+                    _executor.shutdown(wait=False)
+                _executor = ThreadPoolExecutor(max_workers=settings, thread_name_prefix='dashboard')
+                _settings = settings
+    return _executor
+
+
+def _athletes(scope):
+    """Criteria for the active athletes in a scope"""
+    return (
+        User.is_athlete.is_(True),
+        User.archived.is_(False),
+        User.id != scope.user_id,
+        scope.athlete_filter(User.id)
+    )
+
+
+def _athlete_summary(row):
+    return {
+        'id': row.id,
+        'first_name': row.first_name,
+        'last_name': row.last_name,
+        'profile_image_url': row.profile_image_url,
+        'last_tested': row.last_tested.isoformat() if row.last_tested else None
+    }
+
+
+
+@widget('roster')
+def roster(scope, options):
+    cutoff = date.today() - timedelta(days=options['retest_days'])
+    totals = db.session.execute(
+        select(
+            func.count(User.id).label('athletes'),
+            func.count(User.last_tested).label('tested'),
+            func.coalesce(func.sum(case((User.last_tested >= cutoff, 1), else_=0)), 0).label('tested_recently')
+        ).where(*_athletes(scope))
+    ).one()
+    coached = db.session.scalar(
+        select(func.count(func.distinct(UserCoachRelationship.athlete_id)))
+        .join(User, User.id == UserCoachRelationship.athlete_id)
+        .where(UserCoachRelationship.coach_id == scope.user_id, UserCoachRelationship.is_active.is_(True),
+               User.archived.is_(False))
+    )
+    gyms = db.session.execute(
+        select(Gym.id, Gym.name, func.count(func.distinct(UserGymRelationship.user_id)).label('athletes'))
+        .join(UserGymRelationship, UserGymRelationship.gym_id == Gym.id)
+        .join(User, User.id == UserGymRelationship.user_id)
+        .where(
+            UserGymRelationship.role == 'athlete',
+            UserGymRelationship.is_active.is_(True),
+            Gym.archived.is_(False),
+            scope.gym_filter(Gym.id),
+            *_athletes(scope)
+        )
+        .group_by(Gym.id, Gym.name)
+        .order_by(Gym.name)
+    ).all()
+    return {
+        'athletes': totals.athletes,
+        'coached': coached,
+        'tested_recently': totals.tested_recently,
+        'overdue': totals.tested - totals.tested_recently,
+        'never_tested': totals.athletes - totals.tested,
+        'retest_days': options['retest_days'],
+        'gyms': [{'id': gym.id, 'name': gym.name, 'athletes': gym.athletes} for gym in gyms]
+    }
+
+
+@widget('recent_tests')
+def recent_tests(scope, options):
+    rows = db.session.execute(
+        select(*ATHLETE_COLUMNS)
+        .where(User.last_tested.is_not(None), *_athletes(scope))
+        .order_by(User.last_tested.desc(), User.last_name, User.first_name)
+        .limit(options['limit'])
+    ).all()
+    return [_athlete_summary(row) for row in rows]
+
+
+@widget('overdue_retests')
+def overdue_retests(scope, options):
+    cutoff = date.today() - timedelta(days=options['retest_days'])
+    criteria = (User.last_tested < cutoff, *_athletes(scope))
+    total = db.session.scalar(select(func.count(User.id)).where(*criteria))
+    rows = db.session.execute(
+        select(*ATHLETE_COLUMNS)
+        .where(*criteria)
+        .order_by(User.last_tested, User.last_name, User.first_name)
+        .limit(options['limit'])
+    ).all() if total else []
+    return {
+        'retest_days': options['retest_days'],
+        'total': total,
+        'athletes': [_athlete_summary(row) for row in rows]
+    }
+
+
+@widget('cohorts')
+def cohorts(scope, options):
+    cutoff = date.today() - timedelta(days=options['retest_days'])
+    members = (
+        select(CohortMembership.cohort_id, User.last_tested)
+        .join(User, User.id == CohortMembership.athlete_id)
+        .where(CohortMembership.is_active.is_(True), User.archived.is_(False))
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(
+            Cohort.id, Cohort.name, Cohort.color, Cohort.gym_id,
+            func.count(members.c.cohort_id).label('members'),
+            func.coalesce(func.sum(case((members.c.last_tested >= cutoff, 1), else_=0)), 0).label('tested_recently')
+        )
+        .outerjoin(members, members.c.cohort_id == Cohort.id)
+        .where(Cohort.is_active.is_(True), scope.cohort_filter(Cohort.id))
+        .group_by(Cohort.id, Cohort.name, Cohort.color, Cohort.gym_id)
+        .order_by(Cohort.name)
+        .limit(options['limit'])
+    ).all()
+    return [
+        {
+            'id': row.id,
+            'name': row.name,
+            'color': row.color,
+            'gym_id': row.gym_id,
+            'members': row.members,
+            'tested_recently': row.tested_recently
+        }
+        for row in rows
+    ]
+
+
+@widget('personal_bests')
+def personal_bests(scope, options):
+    since = date.today() - timedelta(days=options['pb_days'])
+    rows = db.session.execute(
+        select(
+            AthleteMetricRollup.athlete_id, User.first_name, User.last_name,
+            AthleteMetricRollup.exercise_metric_id, Exercise.name.label('exercise'),
+            ExerciseMetric.name.label('metric'), ExerciseMetric.unit_of_measure,
+            ExerciseMetric.display_units, ExerciseMetric.decimals,
+            AthleteMetricRollup.best_value, AthleteMetricRollup.best_date
+        )
+        .join(User, User.id == AthleteMetricRollup.athlete_id)
+        .join(ExerciseMetric, ExerciseMetric.id == AthleteMetricRollup.exercise_metric_id)
+        .join(Exercise, Exercise.id == AthleteMetricRollup.exercise_id)
+        # A first test is trivially a best; only improvements are news
+        .where(AthleteMetricRollup.best_date >= since, AthleteMetricRollup.test_count > 1, *_athletes(scope))
+        .order_by(AthleteMetricRollup.best_date.desc(), User.last_name, User.first_name)
+        .limit(options['limit'])
+    ).all()
+    return [
+        {
+            'athlete_id': row.athlete_id,
+            'first_name': row.first_name,
+            'last_name': row.last_name,
+            'exercise_metric_id': row.exercise_metric_id,
+            'exercise': row.exercise,
+            'metric': row.metric,
+            'value': to_display(row.best_value, row.unit_of_measure, row.display_units, row.decimals),
+            'unit': display_unit(row.unit_of_measure, row.display_units),
+            'date': row.best_date.isoformat()
+        }
+        for row in rows
+    ]
+
+
+def invalidate_athletes(athlete_ids):
+    """Drop cached widgets of every coach who can see one of the athletes"""
+    athlete_ids = set(athlete_ids)
+    if athlete_ids:
+        _forget_inflight()
+        _cache.pop_where(lambda key, value: value[0] is None or not value[0].isdisjoint(athlete_ids))
+
+
+def invalidate_all():
+    """Drop every cached widget"""
+    _forget_inflight()
+    _cache.clear()
+
+
+def _forget_inflight():
+    """Keep computations started before a change from being cached or joined"""
+    global _generation
+    with _inflight_lock:
+        _generation += 1
+        _inflight.clear()
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_dashboard_changes(session, flush_context, instances):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, SCOPE_MODELS):
+            session.info['dashboard_changed'] = True
+        elif isinstance(obj, ATHLETE_MODELS) and obj.athlete_id:
+            session.info.setdefault('dashboard_athletes', set()).add(obj.athlete_id)
+        elif isinstance(obj, User) and obj.id:
+            session.info.setdefault('dashboard_athletes', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('dashboard_changed', False):
+        invalidate_all()
+    athlete_ids = session.info.pop('dashboard_athletes', None)
+    if athlete_ids:
+        invalidate_athletes(athlete_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('dashboard_changed', None)
+    session.info.pop('dashboard_athletes', None)
@@ -0,0 +1,100 @@
+"""Constant-memory export of performance history.
+
+``export_rows`` runs one query (performance metrics joined with athlete,
+exercise and metric names) on a server-side cursor, so the database driver
+hands rows over ``EXPORT_BATCH_ROWS`` at a time instead of buffering the
+whole result. ``csv_chunks`` and ``ndjson_chunks`` turn each batch into one
+bytes chunk, and ``gzip_chunks`` compresses a chunk stream on the fly, so
+an export of any size is streamed with only one batch in memory.
+"""
+import csv
+import io
+import zlib
+
+from sqlalchemy import select
+
+from app import db
+from app.models.exercise import Exercise, ExerciseMetric
+from app.models.metric import PerformanceMetric
+from app.models.user import User
+from app.utils.serialization import dumps
+
+EXPORT_BATCH_ROWS = 1000
+FORMATS = ('csv', 'ndjson')
+
+COLUMNS = (
+    'id', 'date', 'athlete_id', 'email', 'first_name', 'last_name', 'exercise', 'metric',
+    'value', 'unit_of_measure', 'gym_id', 'coach_id', 'notes', 'created_at'
+)
+
+
+def export_query(scope=None, athlete_id=None, gym_id=None, start=None, end=None):
+    """Select the export columns, restricted to what ``scope`` may see"""
+    pm = PerformanceMetric
+    query = (
+        select(
+            pm.id, pm.date, pm.athlete_id, User.email, User.first_name, User.last_name,
+            Exercise.name.label('exercise'), ExerciseMetric.name.label('metric'),
+            pm.value, ExerciseMetric.unit_of_measure, pm.gym_id, pm.coach_id, pm.notes, pm.created_at
+        )
+        .join(User, User.id == pm.athlete_id)
+        .join(Exercise, Exercise.id == pm.exercise_id)
+        .join(ExerciseMetric, ExerciseMetric.id == pm.exercise_metric_id)
+        .order_by(pm.athlete_id, pm.date, pm.id)
+    )
+    if scope is not None:
+        query = query.where(scope.athlete_filter(pm.athlete_id))
+    if athlete_id:
+        query = query.where(pm.athlete_id == athlete_id)
+    if gym_id:
+        query = query.where(pm.gym_id == gym_id)
+    if start:
+        query = query.where(pm.date >= start)
+    if end:
+        query = query.where(pm.date <= end)
+    return query
+
+
+def export_rows(query, batch_size=EXPORT_BATCH_ROWS):
+    """Yield lists of rows from a server-side cursor"""
+    result = db.session.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def csv_chunks(batches):
+    """Header, then one CSV chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue().encode()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(batches):
+    """One JSON object per line, one chunk per batch of rows"""
+    for rows in batches:
+        yield b''.join(dumps(row._asdict()) + b'\n' for row in rows)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a chunk stream as a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(query, fmt='csv', compress=False):
+    """Encoded (and optionally gzipped) chunks for an export query"""
+    encode = csv_chunks if fmt == 'csv' else ndjson_chunks
+    chunks = encode(export_rows(query))
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,135 @@
+"""Convert VARCHAR(36) ID columns of an existing MySQL/MariaDB database to BINARY(16).
+
+Databases created before ``BinaryUUID`` store IDs as 36-character strings.
+The conversion keeps every existing ID (old UUIDv4 values stay valid; new
+rows simply get UUIDv7 IDs). The foreign keys touching an ID column still
+to convert are dropped, then each table's ID columns are converted in three
+steps:
+
+1. widen the columns to ``VARBINARY(36)`` so the text bytes are kept as is
+2. replace each 36-byte value with ``UNHEX(REPLACE(id, '-', ''))``
+3. shrink the columns to ``BINARY(16)``
+
+and finally every foreign key of the models missing from the database is
+created.
+
+The conversion is not transactional: MySQL/MariaDB commit each ``ALTER
+TABLE`` on its own, so a failure leaves the tables converted so far as they
+are. Running it again resumes it. Columns are pending until they are
+``BINARY(16)``, so a ``VARBINARY(36)`` column holding a mix of 16-byte and
+36-byte values is picked up again and only its remaining text values are
+converted. The foreign keys to recreate come from the models rather than
+the database, so the ones a failed run dropped are not lost. SQLite
+databases need no conversion: ``BinaryUUID`` stores text there.
+"""
+from sqlalchemy import inspect, text
+
+from app import db
+from app.utils.ids import BinaryUUID
+
+
+def id_columns():
+    """(table, column) for every BinaryUUID column in the models"""
+    return [
+        (table, column)
+        for table in db.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, BinaryUUID)
+    ]
+
+
+def _key(table, columns, referred_table, referred_columns):
+    return table, tuple(columns), referred_table, tuple(referred_columns)
+
+
+def _model_foreign_keys():
+    """Key and constraint of every foreign key in the models"""
+    return [
+        (_key(table.name, [c.name for c in fk.columns], fk.referred_table.name, [e.column.name for e in fk.elements]), fk)
+        for table in db.metadata.sorted_tables
+        for fk in table.foreign_key_constraints
+    ]
+
+
+def _pending(reflected_type):
+    """Whether a reflected ID column still needs (part of) the conversion"""
+    # CHAR/VARCHAR have not started; VARBINARY(36) was widened by a run that did not finish
+    return str(reflected_type).upper() != 'BINARY(16)'
+
+
+def conversion_statements(engine=None):
+    """SQL statements converting the ID columns still stored as text"""
+    engine = engine or db.engine
+    if engine.dialect.name not in ('mysql', 'mariadb'):
+        return []
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    pending = {}
+    for table, column in id_columns():
+        if table.name not in existing:
+            continue
+        reflected = {c['name']: c for c in inspector.get_columns(table.name)}.get(column.name)
+        if reflected is not None and _pending(reflected['type']):
+            pending.setdefault(table.name, []).append(column)
+    converted = {(name, column.name) for name, columns in pending.items() for column in columns}
+
+    live, dropped = {}, []
+    for name in sorted(existing):
+        for fk in inspector.get_foreign_keys(name):
+            key = _key(name, fk['constrained_columns'], fk['referred_table'], fk['referred_columns'])
+            live[key] = fk['name']
+            if any((name, c) in converted for c in fk['constrained_columns']) or any(
+                (fk['referred_table'], c) in converted for c in fk['referred_columns']
+            ):
+                dropped.append(key)
+    missing = [
+        (key, fk) for key, fk in _model_foreign_keys()
+        if key[0] in existing and key[2] in existing and (key not in live or key in dropped)
+    ]
+    if not pending and not missing:
+        return []
+
+    statements = ['SET FOREIGN_KEY_CHECKS = 0']
+    for key in dropped:
+        statements.append(f'ALTER TABLE {preparer.quote(key[0])} DROP FOREIGN KEY {preparer.quote(live[key])}')
+    for name, columns in pending.items():
+        t = preparer.quote(name)
+        quoted = [(preparer.quote(column.name), 'NULL' if column.nullable else 'NOT NULL') for column in columns]
+        statements += [
+            f'ALTER TABLE {t} ' + ', '.join(f'MODIFY {c} VARBINARY(36) {null}' for c, null in quoted),
+            f'UPDATE {t} SET '
+            + ', '.join(f"{c} = IF(LENGTH({c}) = 36, UNHEX(REPLACE({c}, '-', '')), {c})" for c, _ in quoted)
+            + ' WHERE ' + ' OR '.join(f'LENGTH({c}) = 36' for c, _ in quoted),
+            f'ALTER TABLE {t} ' + ', '.join(f'MODIFY {c} BINARY(16) {null}' for c, null in quoted),
+        ]
+    for (name, columns, referred_table, referred_columns), fk in missing:
+        statement = f'ALTER TABLE {preparer.quote(name)} ADD '
+        if fk.name:
+            statement += f'CONSTRAINT {preparer.quote(fk.name)} '
+        statement += (
+            f'FOREIGN KEY ({", ".join(preparer.quote(c) for c in columns)}) '
+            f'REFERENCES {preparer.quote(referred_table)} ({", ".join(preparer.quote(c) for c in referred_columns)})'
+        )
+        if fk.ondelete:
+            statement += f' ON DELETE {fk.ondelete}'
+        statements.append(statement)
+    statements.append('SET FOREIGN_KEY_CHECKS = 1')
+    return statements
+
+
+def convert(statements):
+    """Run the conversion statements on one connection, committing each.
+
+    Not transactional (see the module docstring): after a failure, run the
+    conversion again to finish it.
+    """
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        try:
+            for statement in statements:
+                connection.execute(text(statement))
+        except Exception:
+            # Keep the connection, with FOREIGN_KEY_CHECKS off, out of the pool
+            connection.invalidate()
+            raise
@@ -0,0 +1,188 @@
+"""Image uploads: streamed, content addressed, resized in the background.
+
+``store_image`` copies the request body to a staged file in
+``UPLOAD_CHUNK_SIZE`` chunks. It hashes and size-checks as it goes, so at
+most one chunk is held in the web worker at a time. The type comes from the
+file's leading bytes; the Content-Type header is not trusted. The file is
+saved as ``images/<aa>/<sha256>.<ext>``. Uploading the same bytes again
+(the same photo for several users, or a retried upload) reuses the stored
+file.
+
+Resized variants (``VARIANTS``, WebP) are not made in the request. The
+request queues an ``images.variants`` job on its own transaction, and the
+job worker (``flask run-jobs``) renders variants in a process pool of
+``IMAGE_PROCESSES`` processes, so decoding and resizing neither hold the
+GIL nor block a web worker. Variant keys follow from the original's key,
+so their URLs are known immediately; clients fall back to the original
+until a variant exists. Pillow is only imported in the pool processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import os
+
+from flask import current_app
+
+from app.services import jobs
+from app.services.storage import get_storage
+
+VARIANTS_JOB = 'images.variants'
+
+# Variant name -> longest side in pixels
+VARIANTS = {'thumb': 128, 'medium': 512}
+
+# Leading bytes -> (extension, MIME type)
+SIGNATURES = (
+    (b'\xff\xd8\xff', ('jpg', 'image/jpeg')),
+    (b'\x89PNG\r\n\x1a\n', ('png', 'image/png')),
+    (b'GIF87a', ('gif', 'image/gif')),
+    (b'GIF89a', ('gif', 'image/gif')),
+)
+HEADER_SIZE = 12
+
+_pool = None
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is not an accepted image"""
+
+
+def sniff(header):
+    """(extension, MIME type) of an image from its first bytes, or None"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp', 'image/webp'
+    for signature, kind in SIGNATURES:
+        if header.startswith(signature):
+            return kind
+    return None
+
+
+def image_key(digest, extension):
+    return f'images/{digest[:2]}/{digest}.{extension}'
+
+
+def variant_key(key, name):
+    return f'{key.rsplit(".", 1)[0]}-{name}.webp'
+
+
+def store_image(stream, max_bytes=None):
+    """Stream an uploaded image to storage.
+
+    Returns ``(key, created)``; ``created`` is False when the same bytes
+    were already stored. Raises UploadRejected for empty, oversized or
+    non-image bodies. Queues variant rendering on the current session.
+    """
+    config = current_app.config
+    max_bytes = max_bytes or config['IMAGE_MAX_BYTES']
+    chunk_size = config['UPLOAD_CHUNK_SIZE']
+    storage = get_storage()
+    staged = storage.staging_path('.part')
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        header = b''
+        with open(staged, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f'Image larger than {max_bytes} bytes')
+                if len(header) < HEADER_SIZE:
+                    header += chunk[:HEADER_SIZE - len(header)]
+                digest.update(chunk)
+                out.write(chunk)
+        if not size:
+            raise UploadRejected('Empty upload')
+        kind = sniff(header)
+        if kind is None:
+            raise UploadRejected('Unsupported image type (use JPEG, PNG, GIF or WebP)')
+
+        key = image_key(digest.hexdigest(), kind[0])
+        created = storage.save(key, staged)
+    finally:
+        if os.path.exists(staged):
+            os.unlink(staged)
+
+    if created or not all(storage.exists(variant_key(key, name)) for name in VARIANTS):
+        jobs.enqueue(VARIANTS_JOB, [{'key': key}])
+    return key, created
+
+
+def urls(key):
+    """Public URLs of an image and its variants"""
+    storage = get_storage()
+    return {
+        'url': storage.url(key),
+        'variants': {name: storage.url(variant_key(key, name)) for name in VARIANTS}
+    }
+
+
+@jobs.handler(VARIANTS_JOB, batch_size=20)
+def render_variants(batch):
+    """Render missing variants for a batch of stored images in the process pool"""
+    config = current_app.config
+    storage = get_storage()
+    pool = _get_pool(config['IMAGE_PROCESSES'])
+    pending = []
+    for job in batch:
+        key = job.payload['key']
+        for name, size in VARIANTS.items():
+            target = variant_key(key, name)
+            if storage.exists(target):
+                continue
+            staged = storage.staging_path('.webp')
+            future = pool.submit(render, storage.path(key), staged, size, config['IMAGE_QUALITY'])
+            pending.append((job, target, staged, future))
+
+    failures = {}
+    for job, target, staged, future in pending:
+        try:
+            future.result()
+            storage.save(target, staged)
+        except ValueError as e:
+            failures[job.id] = jobs.PermanentError(str(e))
+        except BrokenProcessPool as e:
+            # A pool process died (e.g. killed for memory); start a new pool next batch
+            close()
+            failures.setdefault(job.id, e)
+        except Exception as e:
+            failures.setdefault(job.id, e)
+        finally:
+            if os.path.exists(staged):
+                os.unlink(staged)
+    return failures
+
+
+def render(source, target, size, quality):
+    """Write ``source`` scaled to fit ``size`` x ``size`` as WebP (runs in a pool process)"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source) as image:
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if alpha else 'RGB')
+            image.thumbnail((size, size), Image.LANCZOS)
+            image.save(target, 'WEBP', quality=quality, method=4)
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError) as e:
+        # Pool exceptions must pickle; ValueError marks the image as unusable
+        raise ValueError(f'Cannot read image: {e}') from None
+
+
+def _get_pool(processes):
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=processes)
+    return _pool
+
+
+def close():
+    """Shut down the worker's image process pool"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
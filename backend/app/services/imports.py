@@ -0,0 +1,309 @@
+"""Streaming CSV import of historical performance results.
+
+A file is read row by row (never held in memory) and processed in batches
+of ``IMPORT_BATCH_SIZE`` rows. For each batch, athlete emails and
+exercise/metric names not seen earlier in the import are resolved with one
+query each and cached for the rest of the file, values are validated and
+converted to SI units, and the valid rows are inserted together with their
+rollups. The rejected rows and the import's progress counters are written
+in the same transaction, so after a crash ``rows_read`` is exactly the
+number of rows already applied and resuming skips them.
+
+An import is run by one stream at a time: resuming claims it with a
+conditional update, which fails while another run holds it (its
+``updated_at`` moves with every batch, so a run that died without releasing
+it can be claimed again after ``IMPORT_STALE_AFTER`` seconds). A run that
+stops early, e.g. because the client disconnected, marks the import failed
+so it can be resumed straight away.
+
+Expected columns (header names are case-insensitive):
+
+- ``email``: the athlete's email
+- ``exercise`` and ``metric``: exercise and exercise metric names
+- ``value``: the result, in ``unit`` if given, otherwise in SI units
+- ``date``: ``YYYY-MM-DD`` or ``MM/DD/YYYY``
+- ``unit`` and ``notes``: optional
+
+``run_import`` is a generator of progress events so the CLI can print them
+and the upload endpoint can stream them as NDJSON.
+"""
+import csv
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import func, insert, or_, select, update
+
+from app import db
+from app.models.exercise import Exercise, ExerciseMetric
+from app.models.metric import MetricImport, MetricImportError, PerformanceMetric
+from app.models.user import User
+from app.services import rollups
+from app.services.metrics import INSERT_CHUNK_SIZE, _entry_error, check_gym_and_coach
+from app.utils.ids import new_id
+from app.utils.units import to_si
+
+REQUIRED_COLUMNS = ('email', 'exercise', 'metric', 'value', 'date')
+OPTIONAL_COLUMNS = ('unit', 'notes')
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y')
+SI_PRECISION = Decimal('0.000001')
+MAX_LINE_LENGTH = 1000
+INTERRUPTED = 'Interrupted before completion'
+
+
+class ImportRejected(ValueError):
+    """Raised before any row is processed when the file cannot be imported"""
+
+
+class ImportRunning(ImportRejected):
+    """Raised when resuming an import that another run is still processing"""
+
+
+def start_import(gym_id, coach_id, created_by=None, filename=None, scope=None):
+    """Create an import record after checking the gym and coach"""
+    check_gym_and_coach(gym_id, coach_id, scope)
+    job = MetricImport(gym_id=gym_id, coach_id=coach_id, created_by=created_by, filename=filename)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def resume_import(import_id, scope=None):
+    """Load an unfinished import the caller may continue"""
+    job = db.session.get(MetricImport, import_id)
+    if job is None or (scope is not None and not scope.can_see_gym(job.gym_id)):
+        raise ImportRejected('Import not found')
+    if job.status == 'completed':
+        raise ImportRejected('Import already completed')
+    check_gym_and_coach(job.gym_id, job.coach_id, scope)
+
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config.get('IMPORT_STALE_AFTER', 300))
+    claimed = db.session.execute(
+        update(MetricImport)
+        .where(
+            MetricImport.id == job.id,
+            MetricImport.status != 'completed',
+            or_(MetricImport.status != 'running', MetricImport.updated_at < stale)
+        )
+        .values(status='running', message=None, updated_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        raise ImportRunning('Import is already running')
+    db.session.commit()
+    db.session.refresh(job)
+    return job
+
+
+def open_rows(lines):
+    """Read the header of a CSV text stream; returns (column index, row iterator)"""
+    reader = csv.reader(lines)
+    try:
+        header = next(reader)
+    except StopIteration:
+        raise ImportRejected('File is empty')
+    columns = {name.strip().lower(): index for index, name in enumerate(header)}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportRejected(f'Missing columns: {", ".join(missing)}')
+    return columns, reader
+
+
+def run_import(job, columns, reader, scope=None, batch_size=None):
+    """Process the remaining rows of an import, yielding progress events.
+
+    Events are dicts with a ``type`` of ``error`` (one per rejected row),
+    ``progress`` (after each committed batch) and finally ``done`` or
+    ``failed``. Closing the generator early marks the import failed with the
+    batches committed so far kept.
+    """
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    importer = _Importer(job, columns, scope)
+    batch = []
+    try:
+        for row_number, values in enumerate(reader, 1):
+            if row_number <= job.rows_read:
+                continue
+            batch.append((row_number, values))
+            if len(batch) >= batch_size:
+                yield from importer.apply(batch)
+                batch = []
+        if batch:
+            yield from importer.apply(batch)
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.message = str(e)[:1000]
+        db.session.commit()
+        yield {'type': 'failed', 'error': job.message, **_counters(job)}
+        return
+    except BaseException:
+        # GeneratorExit from a closed stream, or KeyboardInterrupt in the CLI
+        _release(job)
+        raise
+
+    job.status = 'completed'
+    db.session.commit()
+    yield {'type': 'done', **_counters(job)}
+
+
+def _release(job):
+    """Mark an import stopped mid-run as failed so it can be resumed"""
+    try:
+        db.session.rollback()
+        job.status = 'failed'
+        job.message = INTERRUPTED
+        db.session.commit()
+    except Exception:
+        # Left 'running'; it can be claimed again once stale
+        db.session.rollback()
+        current_app.logger.exception('Could not release import %s', job.id)
+
+
+def _counters(job):
+    return {'import_id': job.id, 'rows_read': job.rows_read, 'inserted': job.inserted, 'failed': job.failed}
+
+
+def _parse_date(text):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Invalid date {text}')
+
+
+class _Importer:
+    """Per-import lookup caches and batch application"""
+
+    def __init__(self, job, columns, scope):
+        self.job = job
+        self.columns = columns
+        self.scope = scope
+        self.athletes = {}
+        self.metrics = {}
+
+    def _field(self, values, name):
+        index = self.columns.get(name)
+        if index is None or index >= len(values):
+            return ''
+        return values[index].strip()
+
+    def apply(self, batch):
+        parsed, errors = [], []
+        for row_number, values in batch:
+            if not any(value.strip() for value in values):
+                continue
+            row = {name: self._field(values, name) for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+            row['email'] = row['email'].lower()
+            row['key'] = (row['exercise'].lower(), row['metric'].lower())
+            parsed.append((row_number, values, row))
+
+        self._resolve_athletes({row['email'] for _, _, row in parsed})
+        self._resolve_metrics({row['key'] for _, _, row in parsed})
+
+        now = datetime.utcnow()
+        inserts = []
+        for row_number, values, row in parsed:
+            try:
+                inserts.append(self._build(row, now))
+            except ValueError as e:
+                errors.append((row_number, values, str(e)))
+
+        for start in range(0, len(inserts), INSERT_CHUNK_SIZE):
+            db.session.execute(insert(PerformanceMetric).values(inserts[start:start + INSERT_CHUNK_SIZE]))
+        rollups.apply_inserted(inserts)
+        if errors:
+            db.session.execute(insert(MetricImportError), [
+                {
+                    'id': new_id(),
+                    'import_id': self.job.id,
+                    'row_number': row_number,
+                    'error': message[:255],
+                    'line': ','.join(values)[:MAX_LINE_LENGTH]
+                }
+                for row_number, values, message in errors
+            ])
+        self.job.rows_read = batch[-1][0]
+        self.job.inserted += len(inserts)
+        self.job.failed += len(errors)
+        db.session.commit()
+
+        for row_number, _, message in errors:
+            yield {'type': 'error', 'row': row_number, 'error': message}
+        yield {'type': 'progress', **_counters(self.job)}
+
+    def _build(self, row, now):
+        """Validate one parsed row and return its performance_metrics values"""
+        athlete_id = self.athletes.get(row['email'])
+        if athlete_id is None or (self.scope is not None and not self.scope.can_see_athlete(athlete_id)):
+            raise ValueError('Athlete not found')
+        metric = self.metrics.get(row['key'])
+        if metric is None:
+            raise ValueError('Exercise metric not found')
+        try:
+            value = Decimal(row['value'])
+        except InvalidOperation:
+            raise ValueError(f'Invalid value {row["value"]}')
+        if not value.is_finite():
+            raise ValueError(f'Invalid value {row["value"]}')
+        value = to_si(value, row['unit'], metric.unit_of_measure).quantize(SI_PRECISION)
+        error = _entry_error(value, metric, True)
+        if error:
+            raise ValueError(error)
+        return {
+            'id': new_id(),
+            'athlete_id': athlete_id,
+            'exercise_id': metric.exercise_id,
+            'coach_id': self.job.coach_id,
+            'gym_id': self.job.gym_id,
+            'exercise_metric_id': metric.id,
+            'value': value,
+            'date': _parse_date(row['date']),
+            'notes': row['notes'] or None,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def _resolve_athletes(self, emails):
+        missing = [email for email in emails if email not in self.athletes]
+        if not missing:
+            return
+        found = dict(db.session.execute(
+            select(func.lower(User.email), User.id)
+            .where(func.lower(User.email).in_(missing), User.is_athlete.is_(True), User.archived.is_(False))
+        ).all())
+        for email in missing:
+            self.athletes[email] = found.get(email)
+
+    def _resolve_metrics(self, keys):
+        missing = {key for key in keys if key not in self.metrics}
+        if not missing:
+            return
+        # Match system exercises and the importing coach's own custom exercises
+        rows = db.session.execute(
+            select(
+                func.lower(Exercise.name).label('exercise_name'),
+                func.lower(ExerciseMetric.name).label('metric_name'),
+                ExerciseMetric.id,
+                ExerciseMetric.exercise_id,
+                ExerciseMetric.is_enabled,
+                ExerciseMetric.min_value,
+                ExerciseMetric.max_value,
+                ExerciseMetric.unit_of_measure
+            )
+            .join(Exercise, Exercise.id == ExerciseMetric.exercise_id)
+            .where(
+                func.lower(Exercise.name).in_({exercise for exercise, _ in missing}),
+                or_(Exercise.category == 'system', Exercise.creator_id == self.job.coach_id)
+            )
+            .order_by(Exercise.category)
+        )
+        for row in rows:
+            key = (row.exercise_name, row.metric_name)
+            if key in missing and key not in self.metrics:
+                self.metrics[key] = row
+        for key in missing:
+            self.metrics.setdefault(key, None)
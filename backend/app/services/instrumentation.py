@@ -0,0 +1,353 @@
+"""Request and SQL instrumentation.
+
+When ``METRICS_ENABLED`` is set, every request records, per route (the URL
+rule, so IDs do not explode the label set) and method:
+
+- a latency histogram and a count per status code
+- the number of SQL statements and the SQL time spent by the request
+- request and response body sizes
+
+Each gunicorn worker keeps its own registry and writes a snapshot to
+``METRICS_DIR/worker-<pid>.json`` every ``METRICS_FLUSH_INTERVAL`` seconds
+(atomically, from a background thread). The scrape endpoint merges the
+snapshots of every live worker with its own live registry, so whichever
+worker answers reports the whole replica. Snapshots of workers that have
+exited are deleted; their counters restart, which Prometheus ``rate()``
+treats as a counter reset. Without ``METRICS_DIR`` only the answering
+worker's numbers are reported.
+
+With ``METRICS_ENABLED`` off no hooks or SQL listeners are installed, so
+requests pay nothing.
+"""
+from contextvars import ContextVar
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services import pool_telemetry
+from app.utils.histogram import Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """SQL work attributed to one in-flight request"""
+
+    __slots__ = ('started', 'sql_statements', 'sql_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+
+
+class RouteMetrics:
+    """Aggregates for one (method, route) pair in this worker"""
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.sql_statements = Histogram(SQL_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+
+    def state(self):
+        return {
+            'statuses': dict(self.statuses),
+            'latency': self.latency.state(),
+            'sql_statements': self.sql_statements.state(),
+            'sql_seconds': self.sql_seconds,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes.state()
+        }
+
+
+class Registry:
+    """Per-worker route metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, method, route, status, metrics, duration, request_bytes, response_bytes):
+        key = (method, route)
+        with self._lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteMetrics()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.sql_seconds += metrics.sql_seconds
+            stats.request_bytes += request_bytes
+        stats.latency.observe(duration)
+        stats.sql_statements.observe(metrics.sql_statements)
+        if response_bytes is not None:
+            stats.response_bytes.observe(response_bytes)
+
+    def state(self):
+        with self._lock:
+            routes = list(self.routes.items())
+        return {
+            'pid': os.getpid(),
+            'written_at': time.time(),
+            'routes': [
+                {'method': method, 'route': route, **stats.state()}
+                for (method, route), stats in routes
+            ],
+            'pool': pool_telemetry.state()
+        }
+
+
+_registry = Registry()
+_flusher = {'pid': None, 'thread': None}
+
+
+def init_app(app):
+    """Install request hooks and SQL listeners unless metrics are disabled"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    directory = app.config.get('METRICS_DIR')
+    interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _start_request_metrics():
+        if directory:
+            _ensure_flusher(directory, interval)
+        _current.set(RequestMetrics())
+
+    @app.after_request
+    def _record_request_metrics(response):
+        metrics = _current.get()
+        if metrics is not None:
+            _current.set(None)
+            rule = request.url_rule
+            _registry.record(
+                request.method,
+                rule.rule if rule is not None else '<unmatched>',
+                str(response.status_code),
+                metrics,
+                time.perf_counter() - metrics.started,
+                request.content_length or 0,
+                None if response.is_streamed else response.content_length
+            )
+        return response
+
+
+# The start time lives on the statement's execution context, which is discarded with the
+# statement, so one that fails (no after_cursor_execute) leaves nothing behind on the connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    started = getattr(context, '_metrics_start', None)
+    if metrics is not None and started is not None:
+        metrics.sql_statements += 1
+        metrics.sql_seconds += time.perf_counter() - started
+
+
+def _ensure_flusher(directory, interval):
+    """Start the snapshot thread once per worker process (after gunicorn forks)"""
+    pid = os.getpid()
+    if _flusher['pid'] == pid:
+        return
+    _flusher['pid'] = pid
+    thread = threading.Thread(target=_flush_loop, args=(directory, interval), name='metrics-flush', daemon=True)
+    _flusher['thread'] = thread
+    thread.start()
+
+
+def _flush_loop(directory, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_snapshot(directory)
+        except OSError:
+            pass
+
+
+def write_snapshot(directory):
+    """Atomically write this worker's registry to the shared directory"""
+    path = os.path.join(directory, f'worker-{os.getpid()}.json')
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(_registry.state(), f)
+    os.replace(tmp, path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory=None):
+    """States of every live worker; this worker's comes from memory"""
+    own = _registry.state()
+    states = [own]
+    if directory:
+        for path in glob.glob(os.path.join(directory, 'worker-*.json')):
+            try:
+                pid = int(os.path.basename(path)[len('worker-'):-len('.json')])
+            except ValueError:
+                continue
+            if pid == own['pid']:
+                continue
+            if not _alive(pid):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return states
+
+
+def aggregate(states):
+    """Merge worker states into one view keyed by (method, route)"""
+    routes = {}
+    for state in states:
+        for route in state['routes']:
+            key = (route['method'], route['route'])
+            routes.setdefault(key, []).append(route)
+
+    merged = {}
+    for key, parts in routes.items():
+        statuses = {}
+        for part in parts:
+            for status, count in part['statuses'].items():
+                statuses[status] = statuses.get(status, 0) + count
+        merged[key] = {
+            'statuses': statuses,
+            'latency': Histogram.merged(p['latency'] for p in parts),
+            'sql_statements': Histogram.merged(p['sql_statements'] for p in parts),
+            'sql_seconds': sum(p['sql_seconds'] for p in parts),
+            'request_bytes': sum(p['request_bytes'] for p in parts),
+            'response_bytes': Histogram.merged(p['response_bytes'] for p in parts)
+        }
+    return {
+        'workers': len(states),
+        'routes': merged,
+        'pool': pool_telemetry.merge_states([state['pool'] for state in states if state.get('pool')])
+    }
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+def _histogram_lines(name, histogram, labels):
+    for bound, count in histogram.cumulative():
+        yield f'{name}_bucket{_labels(**labels, le=_bound(bound))} {count}'
+    yield f'{name}_sum{_labels(**labels)} {histogram.sum}'
+    yield f'{name}_count{_labels(**labels)} {histogram.count}'
+
+
+def render_prometheus(view):
+    """Prometheus text exposition (version 0.0.4) of an ``aggregate()`` view"""
+    routes = sorted(view['routes'].items())
+    lines = [
+        '# HELP aiptrack_workers Worker processes included in this scrape',
+        '# TYPE aiptrack_workers gauge',
+        f'aiptrack_workers {view["workers"]}',
+        '# HELP aiptrack_http_requests_total Requests by route, method and status',
+        '# TYPE aiptrack_http_requests_total counter'
+    ]
+    for (method, route), stats in routes:
+        for status, count in sorted(stats['statuses'].items()):
+            lines.append(f'aiptrack_http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+    for name, key, help_text in (
+        ('aiptrack_http_request_duration_seconds', 'latency', 'Request latency'),
+        ('aiptrack_sql_statements_per_request', 'sql_statements', 'SQL statements executed per request'),
+        ('aiptrack_http_response_size_bytes', 'response_bytes', 'Response body size')
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (method, route), stats in routes:
+            lines.extend(_histogram_lines(name, stats[key], {'method': method, 'route': route}))
+
+    for name, key, help_text in (
+        ('aiptrack_sql_duration_seconds_total', 'sql_seconds', 'Time spent executing SQL'),
+        ('aiptrack_http_request_size_bytes_total', 'request_bytes', 'Request body bytes received')
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (method, route), stats in routes:
+            lines.append(f'{name}{_labels(method=method, route=route)} {stats[key]}')
+
+    pool = view['pool']
+    if pool:
+        for name, value in sorted(pool['counters'].items()):
+            kind = 'gauge' if name == 'peak_checked_out' else 'counter'
+            suffix = '' if kind == 'gauge' else '_total'
+            lines += [f'# TYPE aiptrack_db_pool_{name}{suffix} {kind}', f'aiptrack_db_pool_{name}{suffix} {value}']
+        for name, histogram in (('checkout_wait', pool['checkout_wait']), ('hold_time', pool['hold_time'])):
+            metric = f'aiptrack_db_pool_{name}_seconds'
+            lines += [f'# TYPE {metric} histogram']
+            lines.extend(_histogram_lines(metric, histogram, {}))
+    return '\n'.join(lines) + '\n'
+
+
+def render_json(view):
+    """JSON-friendly summary of an ``aggregate()`` view"""
+    return {
+        'workers': view['workers'],
+        'routes': [
+            {
+                'method': method,
+                'route': route,
+                'requests': sum(stats['statuses'].values()),
+                'statuses': stats['statuses'],
+                'latency': stats['latency'].snapshot(),
+                'sql_statements': stats['sql_statements'].snapshot(),
+                'sql_seconds': round(stats['sql_seconds'], 6),
+                'request_bytes': stats['request_bytes'],
+                'response_bytes': stats['response_bytes'].snapshot()
+            }
+            for (method, route), stats in sorted(view['routes'].items())
+        ],
+        'database_pool': {
+            **view['pool']['counters'],
+            'checkout_wait': view['pool']['checkout_wait'].snapshot(),
+            'hold_time': view['pool']['hold_time'].snapshot()
+        } if view['pool'] else None
+    }
+
+
+def reset():
+    """Clear this worker's registry"""
+    with _registry._lock:
+        _registry.routes.clear()
@@ -0,0 +1,182 @@
+"""Database-backed background jobs.
+
+Request handlers ``enqueue`` jobs on their own session, so a job exists
+exactly when the write that caused it commits. Jobs run outside the web
+workers, in ``flask run-jobs``:
+
+- each pass claims up to ``batch_size`` due jobs per registered kind with
+  ``SELECT ... FOR UPDATE SKIP LOCKED`` (MySQL 8 / MariaDB 10.6), so several
+  workers can run side by side, and marks them running
+- the kind's handler gets the whole batch and returns the jobs that failed;
+  the others are deleted in the same transaction as the handler's own
+  writes
+- failed jobs are retried with exponential backoff
+  (``JOB_RETRY_DELAY`` doubling up to ``JOB_RETRY_MAX_DELAY``) until
+  ``JOB_MAX_ATTEMPTS``, then kept with status ``failed`` and the last error
+- jobs left running by a crashed worker are claimed again after
+  ``JOB_LOCK_TIMEOUT`` seconds
+
+Delivery is at least once: a handler's side effects (an email) can repeat
+if the worker dies before committing.
+
+A handler registered with ``coalesce=True`` gets every queued job of its
+kind as soon as the oldest one is due, so work queued in quick succession
+is handled together.
+"""
+from datetime import datetime, timedelta
+import os
+import random
+import socket
+import threading
+import traceback
+
+from flask import current_app
+from sqlalchemy import delete, insert, or_, select, update
+
+from app import db
+from app.models.job import Job
+from app.utils.ids import new_id
+
+# kind -> (handler, batch_size, coalesce), in registration (and run) order
+HANDLERS = {}
+
+
+class PermanentError(Exception):
+    """Returned or raised for a job that must not be retried"""
+
+
+def handler(kind, batch_size=50, coalesce=False):
+    """Register ``fn(jobs) -> {job_id: exception}`` as the handler for ``kind``.
+
+    ``batch_size`` may name a config key instead of giving a number.
+    """
+    def register(fn):
+        HANDLERS[kind] = (fn, batch_size, coalesce)
+        return fn
+    return register
+
+
+def enqueue(kind, payloads, delay=0):
+    """Queue one job per JSON payload on the current session; the caller commits"""
+    now = datetime.utcnow()
+    run_at = now + timedelta(seconds=delay)
+    rows = [
+        {'id': new_id(), 'kind': kind, 'payload': payload, 'status': 'queued', 'attempts': 0,
+         'run_at': run_at, 'created_at': now, 'updated_at': now}
+        for payload in payloads
+    ]
+    if rows:
+        db.session.execute(insert(Job), rows)
+    return len(rows)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(kind, limit, worker, coalesce=False):
+    """Mark up to ``limit`` due jobs of ``kind`` as running by ``worker`` and return them"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config['JOB_LOCK_TIMEOUT'])
+    due = or_(
+        (Job.status == 'queued') & (Job.run_at <= now),
+        (Job.status == 'running') & (Job.locked_at < stale)
+    )
+    query = select(Job.id).where(Job.kind == kind)
+    if coalesce:
+        if db.session.scalar(select(Job.id).where(Job.kind == kind, due).limit(1)) is None:
+            db.session.rollback()
+            return []
+        query = query.where(or_(Job.status == 'queued', due))
+    else:
+        query = query.where(due)
+    ids = db.session.scalars(
+        query.order_by(Job.run_at).limit(limit).with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.session.rollback()
+        return []
+    db.session.execute(
+        update(Job).where(Job.id.in_(ids))
+        .values(status='running', locked_by=worker, locked_at=now, attempts=Job.attempts + 1)
+    )
+    db.session.commit()
+    return db.session.scalars(select(Job).where(Job.id.in_(ids)).order_by(Job.run_at)).all()
+
+
+def retry_delay(attempts):
+    """Seconds before retrying a job that has failed ``attempts`` times, with jitter"""
+    config = current_app.config
+    delay = min(config['JOB_RETRY_DELAY'] * 2 ** (attempts - 1), config['JOB_RETRY_MAX_DELAY'])
+    return delay * random.uniform(0.5, 1.0)
+
+
+def run_batch(kind, worker):
+    """Claim and handle one batch of ``kind``; returns the number of jobs claimed"""
+    fn, batch_size, coalesce = HANDLERS[kind]
+    if isinstance(batch_size, str):
+        batch_size = current_app.config[batch_size]
+    jobs = claim(kind, batch_size, worker, coalesce)
+    if not jobs:
+        return 0
+    try:
+        failures = fn(jobs) or {}
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Job batch %s failed', kind)
+        failures = {job.id: e for job in jobs}
+    _finish(jobs, failures)
+    return len(jobs)
+
+
+def _finish(jobs, failures):
+    now = datetime.utcnow()
+    max_attempts = current_app.config['JOB_MAX_ATTEMPTS']
+    done = [job.id for job in jobs if job.id not in failures]
+    if done:
+        db.session.execute(delete(Job).where(Job.id.in_(done)))
+    for job in jobs:
+        error = failures.get(job.id)
+        if error is None:
+            continue
+        message = ''.join(traceback.format_exception_only(error)).strip()[:2000]
+        if isinstance(error, PermanentError) or job.attempts >= max_attempts:
+            values = {'status': 'failed'}
+        else:
+            values = {'status': 'queued', 'run_at': now + timedelta(seconds=retry_delay(job.attempts))}
+        db.session.execute(
+            update(Job).where(Job.id == job.id)
+            .values(locked_by=None, locked_at=None, last_error=message, **values)
+        )
+    db.session.commit()
+
+
+def run_worker(once=False, stop=None):
+    """Handle jobs until ``stop`` is set, or (``once``) until none are due"""
+    stop = stop or threading.Event()
+    worker = worker_name()
+    poll_interval = current_app.config['JOB_POLL_INTERVAL']
+    handled = 0
+    while not stop.is_set():
+        claimed = 0
+        for kind in HANDLERS:
+            claimed += run_batch(kind, worker)
+        handled += claimed
+        if not claimed:
+            if once:
+                break
+            stop.wait(poll_interval)
+    return handled
+
+
+def retry_failed(kind=None):
+    """Queue failed jobs (of ``kind``) again with a fresh attempt count"""
+    query = update(Job).where(Job.status == 'failed')
+    if kind:
+        query = query.where(Job.kind == kind)
+    result = db.session.execute(
+        query.values(status='queued', attempts=0, run_at=datetime.utcnow(), last_error=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
@@ -0,0 +1,51 @@
+"""Eager-loading profiles for relationship-heavy endpoints.
+
+The user relationships default to lazy loading, which is fine for a single
+row but issues one query per row once a list of relationships (and their
+``user``/``gym``/``athlete``/``coach`` targets) is serialized. Each profile
+lists the loader options one endpoint needs so its whole object graph
+loads in a fixed number of statements regardless of roster size:
+``selectinload`` for collections (one extra ``IN`` query each) and
+``joinedload`` for the many-to-one target of each relationship row.
+
+Endpoints using a profile declare a matching ``query_budget``.
+
+``column_options`` goes the other way for flat lists with a sparse fieldset:
+it loads only the columns the selected fields read.
+"""
+from sqlalchemy.orm import load_only, selectinload
+
+from app.models.user import User, UserCoachRelationship, UserGymRelationship
+
+PROFILES = {
+    # A user's gyms, coaches and coached athletes
+    'user_relationships': (
+        selectinload(User.gym_relationships).joinedload(UserGymRelationship.gym),
+        selectinload(User.athlete_coaches).joinedload(UserCoachRelationship.coach),
+        selectinload(User.coached_athletes).joinedload(UserCoachRelationship.athlete),
+    ),
+    # A coach's active athletes, each with their gym memberships
+    'coach_roster': (
+        selectinload(User.coached_athletes.and_(UserCoachRelationship.is_active.is_(True)))
+        .joinedload(UserCoachRelationship.athlete)
+        .selectinload(User.gym_relationships)
+        .joinedload(UserGymRelationship.gym),
+    ),
+}
+
+
+def load_options(profile):
+    """Loader options for a named profile"""
+    return PROFILES[profile]
+
+
+def column_options(model, attributes, *required):
+    """``load_only`` for the columns behind ``attributes`` plus ``required`` (e.g. sort keys).
+
+    ``attributes`` comes from ``Serializer.attributes``; None loads every
+    column. The primary key is always loaded.
+    """
+    if attributes is None:
+        return ()
+    mapped = model.__mapper__.column_attrs
+    return (load_only(*(getattr(model, name) for name in attributes if name in mapped), *required),)
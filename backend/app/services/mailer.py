@@ -0,0 +1,139 @@
+"""Outgoing email over a reused SMTP connection.
+
+``Mailer`` holds one SMTP connection and sends every message of a batch
+over it, and keeps it open between batches. A batch of notification
+digests then costs one connect/STARTTLS/login handshake instead of one per
+message. The connection is replaced after ``SMTP_IDLE_TIMEOUT`` seconds
+without use (before the server drops it) or after ``SMTP_MAX_MESSAGES``
+messages, and reopened once if the server hangs up mid-batch.
+
+A mailer is not thread safe; the job worker owns one (see
+``app.services.notifications``). For development point ``SMTP_HOST`` and
+``SMTP_PORT`` at a local stand-in such as the ``mailhog`` service in
+docker-compose.dev.yml or ``python -m aiosmtpd -n -l localhost:1025``.
+"""
+from email.message import EmailMessage
+import smtplib
+import time
+
+# Errors after which the connection is unusable and must be reopened
+DISCONNECTS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+# Rejections of one message; the connection stays usable for the rest of the batch
+REJECTIONS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)
+
+
+def is_permanent(error):
+    """Whether the server rejected a message for good (5xx), so retrying cannot help"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPDataError):
+        return error.smtp_code >= 500
+    return False
+
+
+class Mailer:
+    """Sends messages over one SMTP connection that is kept open between batches"""
+
+    def __init__(self, host='localhost', port=25, username=None, password=None, starttls=False, ssl=False,
+                 timeout=10, sender='notifications@aiptrack.com', idle_timeout=60, max_messages=100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.ssl = ssl
+        self.timeout = timeout
+        self.sender = sender
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self._smtp = None
+        self._sent = 0
+        self._used_at = 0.0
+        self.connections = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            host=config['SMTP_HOST'],
+            port=config['SMTP_PORT'],
+            username=config['SMTP_USERNAME'],
+            password=config['SMTP_PASSWORD'],
+            starttls=config['SMTP_STARTTLS'],
+            ssl=config['SMTP_SSL'],
+            timeout=config['SMTP_TIMEOUT'],
+            sender=config['MAIL_FROM'],
+            idle_timeout=config['SMTP_IDLE_TIMEOUT'],
+            max_messages=config['SMTP_MAX_MESSAGES']
+        )
+
+    def message(self, to, subject, text):
+        """Build a plain-text message from the configured sender"""
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = to
+        message['Subject'] = subject
+        message.set_content(text)
+        return message
+
+    def send_many(self, messages):
+        """Send messages in order over the pooled connection.
+
+        Returns ``{index: exception}`` for the messages that failed. When
+        the connection cannot be (re)opened, that message and every one after
+        it fail with the connection error.
+        """
+        failures = {}
+        for index, message in enumerate(messages):
+            try:
+                try:
+                    self._send(message)
+                except DISCONNECTS:
+                    # Usually a connection the server closed while idle: one fresh attempt
+                    self.close()
+                    self._send(message)
+            except REJECTIONS as e:
+                failures[index] = e
+            except (smtplib.SMTPException, OSError) as e:
+                self.close()
+                failures.update((i, e) for i in range(index, len(messages)))
+                break
+        return failures
+
+    def close(self):
+        """Close the connection, if one is open"""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _send(self, message):
+        smtp = self._connection()
+        smtp.send_message(message)
+        self._sent += 1
+        self._used_at = time.monotonic()
+
+    def _connection(self):
+        now = time.monotonic()
+        if self._smtp is not None and (
+            now - self._used_at > self.idle_timeout or self._sent >= self.max_messages
+        ):
+            self.close()
+        if self._smtp is None:
+            smtp_class = smtplib.SMTP_SSL if self.ssl else smtplib.SMTP
+            smtp = smtp_class(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls and not self.ssl:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._sent = 0
+            self._used_at = now
+            self.connections += 1
+        return self._smtp
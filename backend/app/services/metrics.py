@@ -0,0 +1,173 @@
+"""Performance metric ingestion"""
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app import db
+from app.models.user import User, UserGymRelationship
+from app.models.gym import Gym
+from app.models.exercise import ExerciseMetric
+from app.models.metric import PerformanceMetric
+from app.services import notifications, rollups
+from app.utils.ids import new_id
+
+# Rows per multi-row INSERT statement; keeps statements well under max_allowed_packet
+INSERT_CHUNK_SIZE = 500
+
+
+class RecordingDenied(PermissionError):
+    """Raised when the caller may not record results for a gym or coach"""
+
+
+def ingest_session(session, coach_id, scope=None):
+    """Validate and insert every entry of a testing session.
+
+    Exercise metrics and athletes are resolved with one query each, and the
+    valid rows are written with chunked multi-row INSERTs on the current
+    transaction, together with the athlete rollups; the caller commits.
+    Returns ``{'inserted': n, 'errors': [...]}``. When any entry fails and
+    ``allow_partial`` is not set, nothing is written.
+    When an AccessScope is given, the gym and every athlete must be visible
+    to it and the caller must coach in the gym (see ``check_gym_and_coach``).
+    Raises ValueError if the gym or coach for the whole session is invalid,
+    and RecordingDenied if the caller may not record for them.
+    """
+    coach_id = session.get('coach_id') or coach_id
+    gym_id = session['gym_id']
+    check_gym_and_coach(gym_id, coach_id, scope)
+
+    entries = session['entries']
+    default_athlete = session.get('athlete_id')
+    athlete_ids = {entry.get('athlete_id') or default_athlete for entry in entries}
+    metric_ids = {entry['exercise_metric_id'] for entry in entries}
+
+    metrics = {
+        row.id: row for row in db.session.execute(
+            select(
+                ExerciseMetric.id,
+                ExerciseMetric.exercise_id,
+                ExerciseMetric.is_enabled,
+                ExerciseMetric.min_value,
+                ExerciseMetric.max_value
+            ).where(ExerciseMetric.id.in_(metric_ids))
+        )
+    }
+    athletes = set(db.session.scalars(
+        select(User.id).where(User.id.in_(athlete_ids), User.is_athlete.is_(True), User.archived.is_(False))
+    ))
+    if scope is not None:
+        athletes = {athlete_id for athlete_id in athletes if scope.can_see_athlete(athlete_id)}
+
+    now = datetime.utcnow()
+    rows = []
+    errors = []
+    for index, entry in enumerate(entries):
+        athlete_id = entry.get('athlete_id') or default_athlete
+        metric = metrics.get(entry['exercise_metric_id'])
+        error = _entry_error(entry['value'], metric, athlete_id in athletes)
+        if error:
+            errors.append({
+                'index': index,
+                'athlete_id': athlete_id,
+                'exercise_metric_id': entry['exercise_metric_id'],
+                'error': error
+            })
+            continue
+
+        rows.append({
+            'id': new_id(),
+            'athlete_id': athlete_id,
+            'exercise_id': metric.exercise_id,
+            'coach_id': coach_id,
+            'gym_id': gym_id,
+            'exercise_metric_id': metric.id,
+            'value': entry['value'],
+            'date': entry.get('date') or session['date'],
+            'notes': entry.get('notes') or session.get('notes'),
+            'created_at': now,
+            'updated_at': now
+        })
+
+    if errors and not session.get('allow_partial'):
+        return {'inserted': 0, 'errors': errors}
+
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(insert(PerformanceMetric).values(rows[start:start + INSERT_CHUNK_SIZE]))
+    rollups.apply_inserted(rows)
+    notifications.results_posted(rows)
+
+    return {'inserted': len(rows), 'errors': errors}
+
+
+def check_gym_and_coach(gym_id, coach_id, scope=None):
+    """Raise unless results may be recorded for the gym by the coach.
+
+    The coach must be an admin or an approved coach of the gym. When an
+    AccessScope is given, its user must be an admin or a coach of the gym,
+    and only admins may record results under another coach. Raises
+    ValueError for an unknown gym or coach, RecordingDenied otherwise.
+    """
+    if scope is not None and not scope.can_see_gym(gym_id):
+        raise ValueError('Gym not found')
+    if not db.session.scalar(select(Gym.id).where(Gym.id == gym_id, Gym.archived.is_(False))):
+        raise ValueError('Gym not found')
+    if scope is not None and not (scope.is_admin or coaches_gym(scope.user_id, gym_id)):
+        raise RecordingDenied('Only coaches of the gym and admins can record results')
+    if scope is not None and not scope.is_admin and coach_id != scope.user_id:
+        raise RecordingDenied('Only admins can record results for another coach')
+    coach = db.session.execute(
+        select(User.is_coach, User.is_admin).where(User.id == coach_id, User.archived.is_(False))
+    ).first()
+    if not coach or not (coach.is_coach or coach.is_admin):
+        raise ValueError('Coach not found')
+    if not coach.is_admin and not coaches_gym(coach_id, gym_id):
+        raise ValueError('Coach is not a coach of this gym')
+
+
+def coaches_gym(user_id, gym_id):
+    """Whether the user is an active, approved coach of the gym"""
+    return db.session.scalar(
+        select(UserGymRelationship.id).where(
+            UserGymRelationship.user_id == user_id,
+            UserGymRelationship.gym_id == gym_id,
+            UserGymRelationship.role == 'coach',
+            UserGymRelationship.is_active.is_(True),
+            UserGymRelationship.is_approved.is_(True)
+        ).limit(1)
+    ) is not None
+
+
+def update_metric(metric, data):
+    """Apply a validated update to one performance metric and refresh its rollup.
+
+    Raises ValueError if the new value is outside the exercise metric's range.
+    """
+    if 'value' in data:
+        error = _entry_error(data['value'], metric.exercise_metric, True)
+        if error:
+            raise ValueError(error)
+
+    for name in ('value', 'date', 'notes'):
+        if name in data:
+            setattr(metric, name, data[name])
+    rollups.recompute({(metric.athlete_id, metric.exercise_metric_id)})
+
+
+def delete_metric(metric):
+    """Delete one performance metric and refresh its rollup"""
+    key = (metric.athlete_id, metric.exercise_metric_id)
+    db.session.delete(metric)
+    rollups.recompute({key})
+
+
+def _entry_error(value, metric, athlete_ok):
+    """Return a message describing why an entry is invalid, or None"""
+    if not athlete_ok:
+        return 'Athlete not found'
+    if metric is None or not metric.is_enabled:
+        return 'Exercise metric not found'
+    if metric.min_value is not None and value < metric.min_value:
+        return f'Value is below the minimum of {metric.min_value.normalize():f}'
+    if metric.max_value is not None and value > metric.max_value:
+        return f'Value is above the maximum of {metric.max_value.normalize():f}'
+    return None
@@ -0,0 +1,165 @@
+"""Email notifications for posted results.
+
+Recording a testing session queues one ``notify.results`` job per athlete
+(``results_posted``), on the same transaction as the results. Nothing is
+sent from the request. The job worker then:
+
+1. ``build_digests`` waits until the oldest results job has been queued for
+   ``NOTIFY_DIGEST_DELAY`` seconds, takes every queued results job and
+   groups the results by recipient: the athlete (unless their preferences
+   opt out of email or performance updates) and each of the athlete's
+   responsible parties. One ``notify.digest`` job is queued per distinct
+   email address, so a parent of two athletes, or an athlete tested in
+   three sessions, gets one message.
+2. ``send_digests`` renders the digests and sends them in batches of
+   ``MAIL_BATCH_SIZE`` over one SMTP connection (``app.services.mailer``).
+   Messages the server rejects for good fail without retry; everything
+   else is retried with the job queue's backoff.
+
+Historical CSV imports do not notify.
+"""
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models.exercise import Exercise, ExerciseMetric
+from app.models.metric import PerformanceMetric
+from app.models.notification import NotificationPreference, ResponsibleParty
+from app.models.user import User
+from app.services import jobs
+from app.services.mailer import Mailer, is_permanent
+from app.utils.units import UNIT_SYMBOLS, display_unit, to_display
+
+RESULTS = 'notify.results'
+DIGEST = 'notify.digest'
+
+# Metric IDs per query when loading the results of a digest batch
+LOAD_CHUNK_SIZE = 1000
+
+_mailer = None
+
+
+def results_posted(rows):
+    """Queue notifications for newly inserted performance metric rows (dicts with id and athlete_id)"""
+    config = current_app.config
+    if not config['NOTIFICATIONS_ENABLED'] or not rows:
+        return 0
+    by_athlete = defaultdict(list)
+    for row in rows:
+        by_athlete[row['athlete_id']].append(row['id'])
+    return jobs.enqueue(
+        RESULTS,
+        [{'athlete_id': athlete_id, 'metric_ids': ids} for athlete_id, ids in by_athlete.items()],
+        delay=config['NOTIFY_DIGEST_DELAY']
+    )
+
+
+@jobs.handler(RESULTS, batch_size=500, coalesce=True)
+def build_digests(batch):
+    """Turn queued results jobs into one digest job per recipient"""
+    metric_ids = sorted({metric_id for job in batch for metric_id in job.payload['metric_ids']})
+    results = defaultdict(list)
+    for start in range(0, len(metric_ids), LOAD_CHUNK_SIZE):
+        for row in db.session.execute(
+            select(
+                PerformanceMetric.athlete_id, PerformanceMetric.value, PerformanceMetric.date,
+                Exercise.name.label('exercise'), ExerciseMetric.name.label('metric'),
+                ExerciseMetric.unit_of_measure, ExerciseMetric.display_units, ExerciseMetric.decimals
+            )
+            .join(ExerciseMetric, ExerciseMetric.id == PerformanceMetric.exercise_metric_id)
+            .join(Exercise, Exercise.id == PerformanceMetric.exercise_id)
+            .where(PerformanceMetric.id.in_(metric_ids[start:start + LOAD_CHUNK_SIZE]))
+        ):
+            results[row.athlete_id].append(_result(row))
+    if not results:
+        # Every result was deleted before the digest went out
+        return {}
+
+    athletes = db.session.execute(
+        select(
+            User.id, User.email, User.first_name, User.last_name,
+            NotificationPreference.email_notifications, NotificationPreference.performance_updates
+        )
+        .outerjoin(NotificationPreference, NotificationPreference.user_id == User.id)
+        .where(User.id.in_(results), User.archived.is_(False))
+    ).all()
+    parties = defaultdict(list)
+    for party in db.session.execute(
+        select(ResponsibleParty.athlete_id, ResponsibleParty.email, ResponsibleParty.first_name)
+        .where(ResponsibleParty.athlete_id.in_(results), ResponsibleParty.archived.is_(False))
+    ):
+        parties[party.athlete_id].append(party)
+
+    # email (case-insensitive) -> digest payload
+    digests = {}
+    def add(email, name, athlete):
+        digest = digests.setdefault(email.strip().lower(), {'to': email.strip(), 'name': name, 'athletes': []})
+        if athlete not in digest['athletes']:
+            digest['athletes'].append(athlete)
+
+    for athlete in sorted(athletes, key=lambda a: (a.last_name, a.first_name)):
+        entry = {
+            'name': f'{athlete.first_name} {athlete.last_name}',
+            'results': sorted(results[athlete.id], key=lambda r: (r['date'], r['exercise'], r['metric']))
+        }
+        if athlete.email_notifications is not False and athlete.performance_updates is not False:
+            add(athlete.email, athlete.first_name, entry)
+        for party in parties[athlete.id]:
+            add(party.email, party.first_name, entry)
+
+    jobs.enqueue(DIGEST, list(digests.values()))
+    return {}
+
+
+@jobs.handler(DIGEST, batch_size='MAIL_BATCH_SIZE')
+def send_digests(batch):
+    """Send digest emails over the pooled SMTP connection"""
+    mailer = get_mailer()
+    failures = mailer.send_many([mailer.message(**render_digest(job.payload)) for job in batch])
+    return {
+        batch[index].id: jobs.PermanentError(str(error)) if is_permanent(error) else error
+        for index, error in failures.items()
+    }
+
+
+def render_digest(digest):
+    """Subject and plain-text body for a digest payload"""
+    athletes = digest['athletes']
+    if len(athletes) == 1:
+        subject = f'New results for {athletes[0]["name"]}'
+    else:
+        subject = f'New results for {len(athletes)} athletes'
+    lines = [f'Hi {digest["name"]},', '', 'New results have been recorded:']
+    for athlete in athletes:
+        lines += ['', athlete['name']]
+        for result in athlete['results']:
+            lines.append(f'  {result["date"]}  {result["exercise"]} - {result["metric"]}: {result["value"]}')
+    lines += ['', '-- ', 'AIP Track']
+    return {'to': digest['to'], 'subject': subject, 'text': '\n'.join(lines) + '\n'}
+
+
+def get_mailer():
+    """The worker's mailer, created from config on first use"""
+    global _mailer
+    if _mailer is None:
+        _mailer = Mailer.from_config(current_app.config)
+    return _mailer
+
+
+def close():
+    """Close the worker's SMTP connection"""
+    if _mailer is not None:
+        _mailer.close()
+
+
+def _result(row):
+    value = to_display(row.value, row.unit_of_measure, row.display_units, row.decimals)
+    unit = display_unit(row.unit_of_measure, row.display_units)
+    return {
+        'date': row.date.isoformat(),
+        'exercise': row.exercise,
+        'metric': row.metric,
+        'value': f'{value:.{row.decimals}f} {UNIT_SYMBOLS.get(unit, unit)}'.rstrip()
+    }
@@ -0,0 +1,100 @@
+"""Password hashing with a bounded per-worker executor.
+
+Hashes are computed on a small thread pool (``PASSWORD_HASH_CONCURRENCY``
+threads per worker). PBKDF2 releases the GIL, so with threaded gunicorn
+workers a burst of logins queues on the pool while the other request
+threads keep serving. At most ``PASSWORD_HASH_QUEUE_LIMIT`` hashes may be
+pending per worker; beyond that ``HashingBusy`` is raised so callers can
+answer 503 instead of piling up. A concurrency of 0 hashes inline.
+
+The cost is configured with ``PASSWORD_HASH_METHOD`` (werkzeug syntax, e.g.
+``pbkdf2:sha256:600000``); hashes created with other parameters are
+reported by ``needs_rehash`` so login can upgrade them transparently.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import functools
+import threading
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_settings = None
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a hash waited too long"""
+
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    config = current_app.config
+    return _run(
+        generate_password_hash,
+        password,
+        method=config['PASSWORD_HASH_METHOD'],
+        salt_length=config['PASSWORD_HASH_SALT_LENGTH']
+    )
+
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash"""
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Whether a stored hash was created with different parameters than configured"""
+    if not password_hash:
+        return False
+    method = password_hash.split('$', 1)[0]
+    return method != _resolved_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+@functools.lru_cache(maxsize=8)
+def _resolved_method(method):
+    """The prefix werkzeug stores for a configured method, defaults filled in
+
+    ``scrypt`` is written as ``scrypt:32768:8:1`` and ``pbkdf2:sha256`` with its
+    iteration count, so hash a throwaway value once and read the prefix back.
+    """
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+def _run(fn, *args, **kwargs):
+    config = current_app.config
+    if config['PASSWORD_HASH_CONCURRENCY'] <= 0:
+        return fn(*args, **kwargs)
+
+    executor, slots = _get_executor(config)
+    if not slots.acquire(blocking=False):
+        raise HashingBusy('Too many pending password hashes')
+    try:
+        future = executor.submit(fn, *args, **kwargs)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=config['PASSWORD_HASH_TIMEOUT'])
+    except FutureTimeout as e:
+        future.cancel()
+        raise HashingBusy('Password hashing timed out') from e
+
+
+def _get_executor(config):
+    """Create the pool lazily so it is built after gunicorn forks"""
+    global _executor, _slots, _settings
+    settings = (config['PASSWORD_HASH_CONCURRENCY'], config['PASSWORD_HASH_QUEUE_LIMIT'])
+    if _settings != settings:
+        with _lock:
+            if _settings != settings:
+                if _executor is not None:
+                    _executor.shutdown(wait=False)
+                _slots = threading.BoundedSemaphore(settings[1])
+                _executor = ThreadPoolExecutor(max_workers=settings[0], thread_name_prefix='password-hash')
+                _settings = settings
+    return _executor, _slots
@@ -0,0 +1,192 @@
+"""Database connection pool settings and telemetry.
+
+``SQLALCHEMY_ENGINE_OPTIONS`` is built from the ``DB_POOL_*`` settings (see
+``app.config``). Each gunicorn worker has its own pool, so one backend
+replica can hold up to ``workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)``
+connections against MariaDB's shared ``max_connections``.
+
+When the engine uses a queue pool, ``init_app`` swaps in ``TimedQueuePool``
+and listens to its events to record, per worker:
+
+- checkout wait: time spent getting a connection, including opening a new
+  one when the pool grows into its overflow
+- saturation: checkouts that found every connection (including overflow)
+  already in use, and checkouts that timed out waiting
+- hold time: how long requests keep a connection checked out
+- churn: connections opened, closed and invalidated
+
+``stats()`` reports these together with the live pool gauges.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+from app.utils.histogram import Histogram
+
+
+class PoolStats:
+    """Counters and histograms shared by every instrumented pool in this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.saturated = 0
+            self.timeouts = 0
+            self.opened = 0
+            self.closed = 0
+            self.invalidated = 0
+            self.peak_checked_out = 0
+        self.checkout_wait = Histogram()
+        self.hold_time = Histogram()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self):
+        with self._lock:
+            counters = {
+                'checkouts': self.checkouts,
+                'saturated': self.saturated,
+                'timeouts': self.timeouts,
+                'peak_checked_out': self.peak_checked_out,
+                'connections_opened': self.opened,
+                'connections_closed': self.closed,
+                'connections_invalidated': self.invalidated
+            }
+        return {
+            **counters,
+            'checkout_wait': self.checkout_wait.snapshot(),
+            'hold_time': self.hold_time.snapshot()
+        }
+
+
+_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        capacity = self.size() + max(self._max_overflow, 0)
+        if self._max_overflow > -1 and self.checkedout() >= capacity:
+            _stats.incr('saturated')
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            _stats.incr('timeouts')
+            raise
+        finally:
+            _stats.checkout_wait.observe(time.perf_counter() - start)
+        checked_out = self.checkedout()
+        with _stats._lock:
+            _stats.peak_checked_out = max(_stats.peak_checked_out, checked_out)
+        return record
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for a pooled (server) database"""
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_timeout': config['DB_POOL_TIMEOUT']
+    }
+
+
+def init_app(app):
+    """Apply the pool settings; must run before ``db.init_app``"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if uri.startswith('sqlite'):
+        # SQLite uses single-connection pools that take no sizing options
+        return
+    options = {**engine_options(app.config), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    if app.config.get('DB_POOL_TELEMETRY', True):
+        options.setdefault('poolclass', TimedQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def stats(engine=None):
+    """Pool telemetry for this worker, with live gauges for ``engine`` if given"""
+    result = _stats.snapshot()
+    if engine is not None:
+        pool = engine.pool
+        result['pool'] = {'class': type(pool).__name__, 'status': pool.status()}
+        if isinstance(pool, QueuePool):
+            result['pool'].update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow()
+            )
+    return result
+
+
+def state():
+    """Raw, mergeable telemetry for aggregating across workers"""
+    snapshot = _stats.snapshot()
+    return {
+        'counters': {k: v for k, v in snapshot.items() if k not in ('checkout_wait', 'hold_time')},
+        'checkout_wait': _stats.checkout_wait.state(),
+        'hold_time': _stats.hold_time.state()
+    }
+
+
+def merge_states(states):
+    """Combine ``state()`` results from several workers, or None if there are none"""
+    if not states:
+        return None
+    counters = {}
+    for item in states:
+        for name, value in item['counters'].items():
+            counters[name] = max(counters.get(name, 0), value) if name == 'peak_checked_out' else counters.get(name, 0) + value
+    return {
+        'counters': counters,
+        'checkout_wait': Histogram.merged(item['checkout_wait'] for item in states),
+        'hold_time': Histogram.merged(item['hold_time'] for item in states)
+    }
+
+
+def reset():
+    _stats.reset()
+
+
+@event.listens_for(TimedQueuePool, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    _stats.incr('opened')
+
+
+@event.listens_for(TimedQueuePool, 'close')
+def _on_close(dbapi_connection, connection_record):
+    _stats.incr('closed')
+
+
+@event.listens_for(TimedQueuePool, 'close_detached')
+def _on_close_detached(dbapi_connection):
+    _stats.incr('closed')
+
+
+@event.listens_for(TimedQueuePool, 'invalidate')
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    _stats.incr('invalidated')
+
+
+@event.listens_for(TimedQueuePool, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info['checked_out_at'] = time.perf_counter()
+    _stats.incr('checkouts')
+
+
+@event.listens_for(TimedQueuePool, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop('checked_out_at', None)
+    if started is not None:
+        _stats.hold_time.observe(time.perf_counter() - started)
@@ -0,0 +1,106 @@
+"""JWT principal loading.
+
+Registers Flask-JWT-Extended's ``user_lookup_loader`` so every protected
+request resolves its identity exactly once; the extension memoizes the
+result for the rest of the request as ``current_user``. Across requests,
+each worker keeps a bounded TTL/LRU cache of lightweight principals (roles
+and archived flag) so repeat callers skip the users primary-key lookup
+entirely. Entries are dropped after any ORM commit that changes the user's
+row; other workers catch up within the TTL. Profile fields are not cached:
+some, like ``last_tested``, are written with Core UPDATEs that bypass the
+invalidation, so ``/auth/me`` reads the row itself.
+"""
+from flask import current_app, jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db, jwt
+from app.models.user import User
+from app.utils.cache import TTLCache
+
+_cache = TTLCache()
+
+
+class Principal:
+    """The cached, session-independent view of an authenticated user"""
+
+    __slots__ = ('id', 'email', 'is_athlete', 'is_coach', 'is_admin', 'archived')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.is_athlete = user.is_athlete
+        self.is_coach = user.is_coach
+        self.is_admin = user.is_admin
+        self.archived = user.archived
+
+    def has_role(self, role):
+        """Check if user has specific role"""
+        if role == 'athlete':
+            return self.is_athlete
+        elif role == 'coach':
+            return self.is_coach
+        elif role == 'admin':
+            return self.is_admin
+        return False
+
+
+def init_app(app):
+    """Configure the principal cache from app config"""
+    _cache.configure(
+        maxsize=app.config.get('PRINCIPAL_CACHE_SIZE', 2048),
+        ttl=app.config.get('PRINCIPAL_CACHE_TTL', 30)
+    )
+
+
+@jwt.user_lookup_loader
+def load_principal(jwt_header, jwt_data):
+    """Resolve the token subject; archived or deleted users fail the lookup"""
+    principal = get_principal(jwt_data[current_app.config['JWT_IDENTITY_CLAIM']])
+    if principal is None or principal.archived:
+        return None
+    return principal
+
+
+@jwt.user_lookup_error_loader
+def principal_not_found(jwt_header, jwt_data):
+    return jsonify({'error': 'User not found'}), 401
+
+
+def get_principal(user_id):
+    """Return the (cached) Principal for a user ID, or None if it does not exist"""
+    principal = _cache.get(user_id)
+    if principal is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        principal = Principal(user)
+        _cache.set(user_id, principal)
+    return principal
+
+
+def invalidate(user_id):
+    """Drop one cached principal"""
+    _cache.pop(user_id)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_user_changes(session, flush_context, instances):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.id:
+            session.info.setdefault('principal_users', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    for user_id in session.info.pop('principal_users', ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('principal_users', None)
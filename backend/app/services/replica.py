@@ -0,0 +1,183 @@
+"""Optional read replica routing.
+
+When ``DATABASE_REPLICA_URL`` is set it is added to ``SQLALCHEMY_BINDS`` as
+the ``replica`` bind, and ``RoutingSession`` (the session class of ``db``)
+sends plain SELECT statements issued by handlers decorated with
+``@read_replica`` to it. Everything else uses the primary:
+
+- flushes, INSERT/UPDATE/DELETE and ``SELECT ... FOR UPDATE``
+- text statements, whose intent is unknown
+- every statement in undecorated handlers, CLI commands and jobs
+- reads later in a request that already wrote (read-your-writes: the
+  replica may not have the write yet)
+- reads while the replica is unhealthy
+
+The replica's health is probed at most every ``DB_REPLICA_HEALTH_INTERVAL``
+seconds with ``SELECT 1`` and, on MariaDB, the replication lag from
+``SHOW SLAVE STATUS``, which must stay under ``DB_REPLICA_MAX_LAG``. A
+connection error on the replica marks it down until the next probe.
+"""
+from functools import wraps
+import threading
+import time
+import weakref
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+BIND_KEY = 'replica'
+
+_health = weakref.WeakKeyDictionary()
+
+
+class ReplicaHealth:
+    """Cached health of one replica engine, with routing counters"""
+
+    def __init__(self, engine, interval, max_lag):
+        self._engine = weakref.ref(engine)
+        self._lock = threading.RLock()
+        self.interval = interval
+        self.max_lag = max_lag
+        self.healthy = True
+        self.checked_at = None
+        self.reason = None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.sticky_reads = 0
+
+    def available(self):
+        now = time.monotonic()
+        if self.checked_at is None or now - self.checked_at >= self.interval:
+            with self._lock:
+                if self.checked_at is None or now - self.checked_at >= self.interval:
+                    self.healthy, self.reason = self._probe()
+                    self.checked_at = time.monotonic()
+        return self.healthy
+
+    def mark_down(self, reason):
+        with self._lock:
+            self.healthy = False
+            self.reason = reason
+            self.checked_at = time.monotonic()
+
+    def _probe(self):
+        engine = self._engine()
+        if engine is None:
+            return False, 'engine disposed'
+        try:
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+                if engine.dialect.name in ('mysql', 'mariadb'):
+                    return self._check_lag(connection)
+        except exc.SQLAlchemyError as e:
+            return False, _reason(e)
+        return True, None
+
+    def _check_lag(self, connection):
+        try:
+            status = connection.execute(text('SHOW SLAVE STATUS')).mappings().first()
+        except exc.SQLAlchemyError:
+            # Lag is not visible without the REPLICATION CLIENT privilege
+            return True, None
+        if status is None:
+            return True, None
+        lag = status.get('Seconds_Behind_Master')
+        if lag is None:
+            return False, 'replication stopped'
+        if lag > self.max_lag:
+            return False, f'replication lag {lag}s'
+        return True, None
+
+    def stats(self):
+        return {
+            'healthy': self.healthy,
+            'reason': self.reason,
+            'replica_reads': self.replica_reads,
+            'primary_fallbacks': self.primary_fallbacks,
+            'sticky_reads': self.sticky_reads
+        }
+
+
+class RoutingSession(Session):
+    """Session that sends read-only statements of ``@read_replica`` handlers to the replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.replica_sticky = True
+            elif g.get('read_replica') and _is_plain_select(clause):
+                engine = self._replica()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self):
+        engine = self._db.engines.get(BIND_KEY)
+        health = _health.get(engine) if engine is not None else None
+        if health is None:
+            return None
+        if g.get('replica_sticky'):
+            health.sticky_reads += 1
+            return None
+        if not health.available():
+            health.primary_fallbacks += 1
+            return None
+        health.replica_reads += 1
+        return engine
+
+
+def _is_plain_select(clause):
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def read_replica(fn):
+    """Let a read-only route handler's SELECTs go to the replica when one is configured"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def configure(app):
+    """Add the replica bind; must run before ``db.init_app``"""
+    url = app.config.get('DATABASE_REPLICA_URL')
+    if url:
+        app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), BIND_KEY: url}
+
+
+def init_app(app, db):
+    """Start tracking the replica engine's health; must run after ``db.init_app``"""
+    if not app.config.get('DATABASE_REPLICA_URL'):
+        return
+    with app.app_context():
+        engine = db.engines[BIND_KEY]
+    _health[engine] = ReplicaHealth(
+        engine,
+        app.config.get('DB_REPLICA_HEALTH_INTERVAL', 5),
+        app.config.get('DB_REPLICA_MAX_LAG', 30)
+    )
+    if not event.contains(Engine, 'handle_error', _on_error):
+        event.listen(Engine, 'handle_error', _on_error)
+
+
+def stats(db):
+    """Replica health and routing counters for this worker, or None without a replica"""
+    engine = db.engines.get(BIND_KEY)
+    health = _health.get(engine) if engine is not None else None
+    return health.stats() if health is not None else None
+
+
+def _on_error(context):
+    health = _health.get(context.engine)
+    if health is not None and (context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError)):
+        health.mark_down(_reason(context.sqlalchemy_exception))
+
+
+def _reason(error):
+    # The error class only: driver messages can include host, database and user names
+    return f'unreachable ({type(error.__cause__ or error).__name__})'
@@ -0,0 +1,238 @@
+"""Access token revocation.
+
+Flask-JWT-Extended's ``token_in_blocklist_loader`` runs on every protected
+request, so it never queries the database. Each worker instead mirrors the
+unexpired revocations in memory and checks a token with two dictionary
+lookups:
+
+- ``revoked_tokens``: single tokens by ``jti`` (logout), kept until the
+  token's own expiry
+- ``token_cutoffs``: per user, every token issued at or before
+  ``revoked_before`` (archival, "log out everywhere"), kept until the last
+  such token expires. Tokens carry their issue time in microseconds
+  (``iat_us``; the standard ``iat`` is whole seconds), so a token issued
+  right after a cutoff, in the same second, stays valid.
+
+The mirror is loaded on first use. After that, at most every
+``REVOCATION_REFRESH_INTERVAL`` seconds one request reads the rows written
+since the last refresh, minus ``REFRESH_OVERLAP`` seconds so that rows from
+slow transactions are not missed. Other requests go on using the mirror
+meanwhile. Revocations committed by this worker apply at once; other
+workers see them within the interval. Expired entries are dropped from the
+mirror on refresh. Expired rows are deleted from the tables whenever a new
+revocation is written, so the tables stay about as large as the mirror.
+
+Archiving a user (``archived`` set to true through the ORM) revokes all of
+their tokens on the same commit.
+"""
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+from flask import current_app, jsonify
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session, attributes
+
+from app import db, jwt
+from app.models.token import RevokedToken, TokenCutoff
+from app.models.user import User
+
+# Seconds re-read on each refresh, for rows committed after their timestamp
+REFRESH_OVERLAP = 30
+
+# Issue time claim in epoch microseconds, compared with cutoffs
+ISSUED_AT_CLAIM = 'iat_us'
+
+
+class RevocationList:
+    """This worker's mirror of the unexpired revocations"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self.refresh_interval = 5
+        # jti -> expiry, user ID -> (cutoff, expiry); epoch seconds
+        self._tokens = {}
+        self._cutoffs = {}
+        self._loaded = False
+        self._checked_at = 0.0
+        self._since = None
+        self.refreshes = 0
+
+    def is_revoked(self, jti, user_id, issued_at):
+        if jti in self._tokens:
+            return True
+        cutoff = self._cutoffs.get(user_id)
+        return cutoff is not None and issued_at <= cutoff[0]
+
+    def add_token(self, jti, expires):
+        with self._lock:
+            self._tokens[jti] = expires
+
+    def add_cutoff(self, user_id, cutoff, expires):
+        with self._lock:
+            current = self._cutoffs.get(user_id)
+            if current is None or cutoff > current[0]:
+                self._cutoffs[user_id] = (cutoff, expires)
+
+    def ensure_fresh(self):
+        """Load the mirror on first use, then apply new rows every refresh interval"""
+        if not self._loaded:
+            with self._refreshing:
+                if not self._loaded:
+                    self._refresh()
+                    self._loaded = True
+            return
+        if not self.refresh_interval or time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        # One request refreshes; the others keep using the current mirror
+        if self._refreshing.acquire(blocking=False):
+            try:
+                if time.monotonic() - self._checked_at >= self.refresh_interval:
+                    self._refresh()
+            finally:
+                self._refreshing.release()
+
+    def _refresh(self):
+        now = datetime.utcnow()
+        tokens = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > now)
+        cutoffs = (
+            select(TokenCutoff.user_id, TokenCutoff.revoked_before, TokenCutoff.expires_at)
+            .where(TokenCutoff.expires_at > now)
+        )
+        if self._since is not None:
+            since = self._since - timedelta(seconds=REFRESH_OVERLAP)
+            tokens = tokens.where(RevokedToken.created_at >= since)
+            cutoffs = cutoffs.where(TokenCutoff.updated_at >= since)
+        new_tokens = db.session.execute(tokens).all()
+        new_cutoffs = db.session.execute(cutoffs).all()
+
+        expired = _epoch(now)
+        with self._lock:
+            self._tokens = {jti: expires for jti, expires in self._tokens.items() if expires > expired}
+            self._cutoffs = {
+                user_id: cutoff for user_id, cutoff in self._cutoffs.items() if cutoff[1] > expired
+            }
+        for row in new_tokens:
+            self.add_token(row.jti, _epoch(row.expires_at))
+        for row in new_cutoffs:
+            self.add_cutoff(row.user_id, _epoch(row.revoked_before), _epoch(row.expires_at))
+        self._since = now
+        self._checked_at = time.monotonic()
+        self.refreshes += 1
+
+    def stats(self):
+        return {
+            'tokens': len(self._tokens),
+            'cutoffs': len(self._cutoffs),
+            'refresh_interval': self.refresh_interval,
+            'refreshes': self.refreshes,
+            'refreshed_at': self._since.isoformat() if self._since else None
+        }
+
+
+_list = RevocationList()
+
+
+def init_app(app):
+    """Configure the revocation mirror from app config"""
+    _list.refresh_interval = app.config.get('REVOCATION_REFRESH_INTERVAL', 5)
+
+
+@jwt.additional_claims_loader
+def issued_at_claim(identity):
+    return {ISSUED_AT_CLAIM: time.time_ns() // 1000}
+
+
+@jwt.token_in_blocklist_loader
+def is_token_revoked(jwt_header, jwt_data):
+    _list.ensure_fresh()
+    user_id = jwt_data[current_app.config['JWT_IDENTITY_CLAIM']]
+    if ISSUED_AT_CLAIM in jwt_data:
+        issued_at = jwt_data[ISSUED_AT_CLAIM] / 1_000_000
+    else:
+        # Tokens from before the claim existed; whole seconds, so the cutoff's own second counts as before
+        issued_at = jwt_data.get('iat', 0)
+    return _list.is_revoked(jwt_data['jti'], user_id, issued_at)
+
+
+@jwt.revoked_token_loader
+def token_revoked(jwt_header, jwt_data):
+    return jsonify({'error': 'Token has been revoked'}), 401
+
+
+def revoke_token(jwt_data):
+    """Revoke one token, given its decoded claims, on the current session; the caller commits"""
+    session = db.session()
+    jti = jwt_data['jti']
+    if 'exp' in jwt_data:
+        expires = datetime.utcfromtimestamp(jwt_data['exp'])
+    else:
+        expires = datetime.utcnow() + _token_lifetime()
+    _prune(session, RevokedToken)
+    if session.get(RevokedToken, jti) is None:
+        session.add(RevokedToken(
+            jti=jti, user_id=jwt_data.get(current_app.config['JWT_IDENTITY_CLAIM']), expires_at=expires
+        ))
+    session.info.setdefault('revoked_tokens', []).append((jti, _epoch(expires)))
+
+
+def revoke_user_tokens(user_id, before=None):
+    """Revoke every token of a user issued up to ``before`` (default now); the caller commits"""
+    _set_cutoff(db.session(), user_id, before)
+
+
+def stats():
+    return _list.stats()
+
+
+def _set_cutoff(session, user_id, before=None):
+    before = before or datetime.utcnow()
+    expires = before + _token_lifetime()
+    _prune(session, TokenCutoff)
+    cutoff = session.get(TokenCutoff, user_id)
+    if cutoff is None:
+        session.add(TokenCutoff(user_id=user_id, revoked_before=before, expires_at=expires))
+    elif before > cutoff.revoked_before:
+        cutoff.revoked_before = before
+        cutoff.expires_at = expires
+    session.info.setdefault('token_cutoffs', []).append((user_id, _epoch(before), _epoch(expires)))
+
+
+def _prune(session, model):
+    """Delete rows whose tokens have all expired"""
+    session.execute(
+        delete(model).where(model.expires_at <= datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _token_lifetime():
+    lifetime = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    return lifetime if isinstance(lifetime, timedelta) else timedelta(seconds=lifetime or 0)
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+@event.listens_for(Session, 'before_flush')
+def _revoke_on_archive(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, User) and obj.id and obj.archived:
+            if attributes.get_history(obj, 'archived').added:
+                _set_cutoff(session, obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_on_commit(session):
+    for jti, expires in session.info.pop('revoked_tokens', ()):
+        _list.add_token(jti, expires)
+    for user_id, cutoff, expires in session.info.pop('token_cutoffs', ()):
+        _list.add_cutoff(user_id, cutoff, expires)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_on_rollback(session):
+    session.info.pop('revoked_tokens', None)
+    session.info.pop('token_cutoffs', None)
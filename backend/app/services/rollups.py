@@ -0,0 +1,254 @@
+"""Athlete personal-best / latest-value rollups.
+
+``athlete_metric_rollups`` holds one row per athlete and exercise metric so
+that dashboards never aggregate over ``performance_metrics``. Every write
+path calls into this module on the same session before committing:
+
+- inserts are folded in incrementally with ``apply_inserted``
+- updates and deletes recompute the affected keys with ``recompute``
+- ``rebuild`` recomputes everything (or a set of athletes) to repair drift
+"""
+from sqlalchemy import case, delete, func, select, tuple_, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app import db
+from app.models.user import User
+from app.models.exercise import ExerciseMetric
+from app.models.metric import AthleteMetricRollup, PerformanceMetric
+from app.utils.ids import new_id
+
+# Athletes per batch when rebuilding
+REBUILD_CHUNK_SIZE = 500
+
+
+def apply_inserted(rows):
+    """Fold newly inserted performance metric rows into the rollups.
+
+    ``rows`` are dicts (or objects) with athlete_id, exercise_metric_id,
+    exercise_id, value and date. Missing rollups are first created empty
+    with an upsert, then every key's rollup is locked for update, so
+    concurrent sessions for the same athlete serialize on the rollup row
+    even when both post its first result.
+    """
+    rows = [_as_dict(row) for row in rows]
+    if not rows:
+        return
+
+    keys = {(row['athlete_id'], row['exercise_metric_id']) for row in rows}
+    higher_is_better = dict(db.session.execute(
+        select(ExerciseMetric.id, ExerciseMetric.higher_is_better)
+        .where(ExerciseMetric.id.in_({metric_id for _, metric_id in keys}))
+    ).all())
+    _insert_missing(rows)
+    rollups = {
+        (r.athlete_id, r.exercise_metric_id): r for r in db.session.scalars(
+            select(AthleteMetricRollup)
+            .where(tuple_(AthleteMetricRollup.athlete_id, AthleteMetricRollup.exercise_metric_id).in_(keys))
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+    }
+
+    for row in rows:
+        rollup = rollups[(row['athlete_id'], row['exercise_metric_id'])]
+        if rollup.test_count == 0:
+            rollup.test_count = 1
+            rollup.best_value = rollup.latest_value = row['value']
+            rollup.best_date = rollup.latest_date = row['date']
+            continue
+
+        rollup.test_count += 1
+        if _is_better(row['value'], row['date'], rollup, higher_is_better.get(row['exercise_metric_id'], True)):
+            rollup.best_value = row['value']
+            rollup.best_date = row['date']
+        # Ties on date go to the newer row, matching the rebuild ordering
+        if row['date'] >= rollup.latest_date:
+            rollup.latest_value = row['value']
+            rollup.latest_date = row['date']
+
+    latest_by_athlete = {}
+    for row in rows:
+        current = latest_by_athlete.get(row['athlete_id'])
+        if current is None or row['date'] > current:
+            latest_by_athlete[row['athlete_id']] = row['date']
+    for athlete_id, tested in latest_by_athlete.items():
+        db.session.execute(
+            update(User)
+            .where(User.id == athlete_id, (User.last_tested.is_(None)) | (User.last_tested < tested))
+            .values(last_tested=tested)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _insert_missing(rows):
+    """Create an empty rollup (test_count 0) for each key of ``rows`` that has none.
+
+    Keys are inserted in sorted order, and a key another session has just
+    created is left alone rather than failing on unique_athlete_metric.
+    """
+    placeholders = {}
+    for row in rows:
+        placeholders.setdefault((row['athlete_id'], row['exercise_metric_id']), {
+            'id': new_id(),
+            'athlete_id': row['athlete_id'],
+            'exercise_metric_id': row['exercise_metric_id'],
+            'exercise_id': row['exercise_id'],
+            'test_count': 0,
+            'best_value': row['value'],
+            'best_date': row['date'],
+            'latest_value': row['value'],
+            'latest_date': row['date']
+        })
+    values = [placeholders[key] for key in sorted(placeholders)]
+
+    table = AthleteMetricRollup.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        # A no-op assignment: ON DUPLICATE KEY keeps the existing row
+        statement = mysql.insert(table).on_duplicate_key_update(test_count=table.c.test_count)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(table).on_conflict_do_nothing(index_elements=['athlete_id', 'exercise_metric_id'])
+    else:
+        statement = postgresql.insert(table).on_conflict_do_nothing(index_elements=['athlete_id', 'exercise_metric_id'])
+    db.session.execute(statement, values)
+
+
+def recompute(keys):
+    """Recompute rollups and last_tested for (athlete_id, exercise_metric_id) keys.
+
+    Used after updates and deletes, where an incremental fold cannot know
+    the previous best or latest value. Keys with no remaining rows lose
+    their rollup.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    db.session.flush()
+    key_columns = (PerformanceMetric.athlete_id, PerformanceMetric.exercise_metric_id)
+    computed = _compute(tuple_(*key_columns).in_(keys))
+
+    rollup_keys = (AthleteMetricRollup.athlete_id, AthleteMetricRollup.exercise_metric_id)
+    existing = {
+        (r.athlete_id, r.exercise_metric_id): r for r in db.session.scalars(
+            select(AthleteMetricRollup).where(tuple_(*rollup_keys).in_(keys)).with_for_update()
+        )
+    }
+    for key in keys:
+        values = computed.get(key)
+        rollup = existing.get(key)
+        if values is None:
+            if rollup is not None:
+                db.session.delete(rollup)
+        elif rollup is None:
+            db.session.add(AthleteMetricRollup(**values))
+        else:
+            for name, value in values.items():
+                setattr(rollup, name, value)
+
+    _refresh_last_tested({athlete_id for athlete_id, _ in keys})
+
+
+def rebuild(athlete_ids=None, chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute rollups and last_tested from raw rows, a chunk of athletes at a time.
+
+    When ``athlete_ids`` is None every athlete with performance data (or an
+    existing rollup) is rebuilt. Each chunk is committed on its own so a
+    full rebuild does not hold one enormous transaction. Returns the number
+    of rollup rows written.
+    """
+    if athlete_ids is None:
+        athlete_ids = set(db.session.scalars(select(PerformanceMetric.athlete_id).distinct()))
+        athlete_ids |= set(db.session.scalars(select(AthleteMetricRollup.athlete_id).distinct()))
+    athlete_ids = sorted(athlete_ids)
+
+    written = 0
+    for start in range(0, len(athlete_ids), chunk_size):
+        chunk = athlete_ids[start:start + chunk_size]
+        computed = _compute(PerformanceMetric.athlete_id.in_(chunk))
+        db.session.execute(delete(AthleteMetricRollup).where(AthleteMetricRollup.athlete_id.in_(chunk)))
+        if computed:
+            db.session.add_all(AthleteMetricRollup(**values) for values in computed.values())
+        _refresh_last_tested(chunk)
+        db.session.commit()
+        written += len(computed)
+    return written
+
+
+def _compute(criterion):
+    """Aggregate raw rows matching ``criterion`` into rollup column values per key"""
+    pm = PerformanceMetric
+    partition = (pm.athlete_id, pm.exercise_metric_id)
+    signed_value = case((ExerciseMetric.higher_is_better.is_(False), -pm.value), else_=pm.value)
+    ranked = (
+        select(
+            pm.athlete_id,
+            pm.exercise_metric_id,
+            pm.exercise_id,
+            pm.value,
+            pm.date,
+            func.count().over(partition_by=partition).label('test_count'),
+            func.row_number().over(
+                partition_by=partition, order_by=(pm.date.desc(), pm.created_at.desc(), pm.id.desc())
+            ).label('latest_rank'),
+            func.row_number().over(
+                partition_by=partition, order_by=(signed_value.desc(), pm.date.asc(), pm.id.asc())
+            ).label('best_rank')
+        )
+        .join(ExerciseMetric, ExerciseMetric.id == pm.exercise_metric_id)
+        .where(criterion)
+        .subquery()
+    )
+    result = db.session.execute(
+        select(ranked).where((ranked.c.latest_rank == 1) | (ranked.c.best_rank == 1))
+    )
+
+    computed = {}
+    for row in result:
+        values = computed.setdefault((row.athlete_id, row.exercise_metric_id), {
+            'athlete_id': row.athlete_id,
+            'exercise_metric_id': row.exercise_metric_id,
+            'exercise_id': row.exercise_id,
+            'test_count': row.test_count
+        })
+        if row.latest_rank == 1:
+            values['latest_value'] = row.value
+            values['latest_date'] = row.date
+        if row.best_rank == 1:
+            values['best_value'] = row.value
+            values['best_date'] = row.date
+    return computed
+
+
+def _refresh_last_tested(athlete_ids):
+    """Set users.last_tested to each athlete's most recent performance date"""
+    latest = (
+        select(func.max(PerformanceMetric.date))
+        .where(PerformanceMetric.athlete_id == User.id)
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(list(athlete_ids)))
+        .values(last_tested=latest)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _is_better(value, tested, rollup, higher_is_better):
+    """Whether a new value beats the current best; ties keep the earlier date"""
+    if value == rollup.best_value:
+        return tested < rollup.best_date
+    return value > rollup.best_value if higher_is_better else value < rollup.best_value
+
+
+def _as_dict(row):
+    if isinstance(row, dict):
+        return row
+    return {
+        'athlete_id': row.athlete_id,
+        'exercise_metric_id': row.exercise_metric_id,
+        'exercise_id': row.exercise_id,
+        'value': row.value,
+        'date': row.date
+    }
@@ -0,0 +1,95 @@
+"""Storage for uploaded files.
+
+Files are addressed by key, a relative path such as
+``images/3f/3fa9...c1.jpg``. Writers stage a complete file on local disk
+first (``staging_path``) and then ``save`` it under its key, so readers
+never see a partial file. ``LocalStorage`` keeps files under
+``UPLOAD_FOLDER`` and ``save`` is an atomic rename. A remote backend
+(S3-compatible storage) would implement the same methods and return its
+own URLs.
+
+Stored files are immutable. Keys are derived from content hashes, so a key
+always means the same bytes and URLs can be cached forever (see
+``frontend/nginx.conf``).
+"""
+from abc import ABC, abstractmethod
+import os
+import tempfile
+
+from flask import current_app
+
+STAGING_DIR = '.staging'
+
+
+class Storage(ABC):
+    """Interface every storage backend implements"""
+
+    @abstractmethod
+    def staging_path(self, suffix=''):
+        """A new empty local file to write an upload or variant into before ``save``"""
+
+    @abstractmethod
+    def save(self, key, staged_path):
+        """Move a staged file to ``key``; returns False (and drops it) if ``key`` already exists"""
+
+    @abstractmethod
+    def exists(self, key):
+        """Whether a file is stored at ``key``"""
+
+    @abstractmethod
+    def path(self, key):
+        """A local filesystem path to read the file at ``key`` from"""
+
+    @abstractmethod
+    def url(self, key):
+        """Public URL of the file at ``key``"""
+
+
+class LocalStorage(Storage):
+    """Files in a local directory, served from ``base_url`` by nginx"""
+
+    def __init__(self, root, base_url):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip('/')
+
+    def staging_path(self, suffix=''):
+        staging = os.path.join(self.root, STAGING_DIR)
+        os.makedirs(staging, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=staging, suffix=suffix)
+        os.close(fd)
+        return path
+
+    def save(self, key, staged_path):
+        target = self.path(key)
+        if os.path.exists(target):
+            os.unlink(staged_path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(staged_path, 0o644)
+        # Same filesystem as the staging directory, so the rename is atomic
+        os.replace(staged_path, target)
+        return True
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f'Invalid storage key {key}')
+        return path
+
+    def url(self, key):
+        return f'{self.base_url}/{key}'
+
+
+def init_app(app):
+    """Create the configured storage backend"""
+    backend = app.config['STORAGE_BACKEND']
+    if backend != 'local':
+        raise ValueError(f'Unknown STORAGE_BACKEND {backend}')
+    app.extensions['storage'] = LocalStorage(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_URL'])
+
+
+def get_storage():
+    return current_app.extensions['storage']
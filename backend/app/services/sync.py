@@ -0,0 +1,292 @@
+"""Incremental (delta) sync for offline-capable clients.
+
+A sync round walks the synced entities in a fixed order and returns the
+rows the caller can see whose ``updated_at`` falls in ``(since, upto]``,
+ordered by ``(updated_at, id)`` so a round can be split into pages at any
+row. Rows deleted since ``since`` come from ``sync_tombstones`` (written
+automatically when the ORM flushes a delete), and archived users and gyms
+are reported as deleted too. Deleting a user or gym also writes
+tombstones for the rows the database deletes with it (``CASCADES``),
+keyed by gym or cohort where they have one, so clients that only saw
+them through the deleted user still drop them. The first round has no ``since`` and returns
+everything visible, so it doubles as the initial load.
+
+The opaque cursor carries ``since``, ``upto`` and the position in the
+walk. When a round completes, the next one starts at ``upto`` minus
+``SYNC_SAFETY_WINDOW`` seconds: a row written by a transaction that
+committed after the round read past it is sent again rather than missed,
+so clients must apply changes idempotently (upsert by ID).
+
+Tombstones older than ``SYNC_TOMBSTONE_RETENTION_DAYS`` are pruned, so a
+cursor older than that raises ``CursorExpired`` and the client starts
+over. Rows that leave the caller's scope (e.g. an athlete moving to
+another gym) are not reported; a fresh initial load drops them.
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+import json
+
+from flask import current_app
+from sqlalchemy import and_, delete, event, insert, select, true
+from sqlalchemy.orm import Session, selectinload
+
+from app import db
+from app.models.cohort import Cohort, CohortMembership
+from app.models.exercise import Exercise
+from app.models.gym import Gym
+from app.models.metric import PerformanceMetric
+from app.models.sync import SyncTombstone
+from app.models.user import User, UserCoachRelationship, UserGymRelationship
+from app.schemas.cohort import cohort_membership_serializer, cohort_serializer
+from app.schemas.exercise import exercise_with_metrics_serializer
+from app.schemas.gym import gym_serializer
+from app.schemas.metric import metric_serializer
+from app.schemas.user import coach_relationship_serializer, gym_relationship_serializer, user_serializer
+from app.utils.pagination import InvalidCursor, encode_cursor, keyset_filter
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+
+class CursorExpired(ValueError):
+    """Raised when a cursor predates the tombstone retention window"""
+
+
+class SyncEntity:
+    """One synced table: how to select, scope and serialize its changed rows"""
+
+    def __init__(self, name, model, serializer, visible, options=()):
+        self.name = name
+        self.model = model
+        self.serializer = serializer
+        self.visible = visible
+        self.options = options
+        self.archivable = hasattr(model, 'archived')
+
+    def fetch(self, scope, since, upto, key, limit):
+        model = self.model
+        columns = (model.updated_at, model.id)
+        query = select(model).where(self.visible(scope), model.updated_at <= upto).options(*self.options)
+        if since is not None:
+            query = query.where(model.updated_at > since)
+        elif self.archivable:
+            # An initial load has nothing to delete
+            query = query.where(model.archived.is_(False))
+        if key is not None:
+            query = query.where(keyset_filter(columns, key))
+        rows = db.session.scalars(query.order_by(*columns).limit(limit)).all()
+        return rows, [(row.updated_at, row.id) for row in rows]
+
+    def emit(self, rows, changes, deleted):
+        for row in rows:
+            if self.archivable and row.archived:
+                deleted.setdefault(self.name, []).append(row.id)
+            else:
+                changes.setdefault(self.name, []).append(self.serializer.dump(row))
+
+
+class TombstoneStep:
+    """Deletions since the cursor, grouped by entity"""
+
+    name = 'tombstones'
+
+    def fetch(self, scope, since, upto, key, limit):
+        if since is None:
+            return [], []
+        t = SyncTombstone
+        columns = (t.deleted_at, t.id)
+        query = select(t.entity, t.entity_id, t.deleted_at, t.id).where(
+            t.deleted_at > since, t.deleted_at <= upto, _tombstone_visible(scope)
+        )
+        if key is not None:
+            query = query.where(keyset_filter(columns, key))
+        rows = db.session.execute(query.order_by(*columns).limit(limit)).all()
+        return rows, [(row.deleted_at, row.id) for row in rows]
+
+    def emit(self, rows, changes, deleted):
+        for row in rows:
+            deleted.setdefault(row.entity, []).append(row.entity_id)
+
+
+def _tombstone_visible(scope):
+    if scope.is_admin:
+        return true()
+    t = SyncTombstone
+    return (
+        scope.athlete_filter(t.athlete_id)
+        | scope.gym_filter(t.gym_id)
+        | scope.cohort_filter(t.cohort_id)
+        | and_(t.athlete_id.is_(None), t.gym_id.is_(None), t.cohort_id.is_(None))
+    )
+
+
+def _self_or(scope, column, other):
+    return true() if scope.is_admin else (column == scope.user_id) | other
+
+
+STEPS = (
+    SyncEntity('users', User, user_serializer,
+               lambda scope: _self_or(scope, User.id, scope.athlete_filter(User.id))),
+    SyncEntity('gyms', Gym, gym_serializer, lambda scope: scope.gym_filter(Gym.id)),
+    SyncEntity('gym_relationships', UserGymRelationship, gym_relationship_serializer,
+               lambda scope: _self_or(scope, UserGymRelationship.user_id,
+                                      scope.gym_filter(UserGymRelationship.gym_id))),
+    SyncEntity('coach_relationships', UserCoachRelationship, coach_relationship_serializer,
+               lambda scope: _self_or(scope, UserCoachRelationship.coach_id,
+                                      scope.athlete_filter(UserCoachRelationship.athlete_id))),
+    SyncEntity('cohorts', Cohort, cohort_serializer, lambda scope: scope.cohort_filter(Cohort.id)),
+    SyncEntity('cohort_memberships', CohortMembership, cohort_membership_serializer,
+               lambda scope: scope.cohort_filter(CohortMembership.cohort_id)),
+    # The exercise catalog is shared by every user
+    SyncEntity('exercises', Exercise, exercise_with_metrics_serializer, lambda scope: true(),
+               options=(selectinload(Exercise.metrics),)),
+    SyncEntity('metrics', PerformanceMetric, metric_serializer,
+               lambda scope: scope.athlete_filter(PerformanceMetric.athlete_id)),
+    TombstoneStep(),
+)
+
+
+def _decode(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        since, upto, step, key_at, key_id = json.loads(raw)
+        since = datetime.fromisoformat(since) if since else None
+        upto = datetime.fromisoformat(upto) if upto else None
+        key = (datetime.fromisoformat(key_at), key_id) if key_at else None
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if not isinstance(step, int) or not 0 <= step < len(STEPS):
+        raise InvalidCursor('Invalid cursor')
+    return since, upto, step, key
+
+
+def sync_page(scope, cursor=None, limit=DEFAULT_LIMIT):
+    """Return one page of changes: ``{'changes', 'deleted', 'cursor', 'has_more'}``"""
+    now = datetime.utcnow()
+    since, upto, step, key = _decode(cursor) if cursor else (None, None, 0, None)
+    retention = timedelta(days=current_app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+    if since is not None and since < now - retention:
+        raise CursorExpired('Sync cursor expired; sync again without a cursor')
+    upto = upto or now
+
+    changes, deleted = {}, {}
+    remaining = limit
+    while step < len(STEPS) and remaining > 0:
+        rows, keys = STEPS[step].fetch(scope, since, upto, key, remaining + 1)
+        if len(rows) > remaining:
+            rows, key = rows[:remaining], keys[remaining - 1]
+            STEPS[step].emit(rows, changes, deleted)
+            remaining = 0
+            break
+        STEPS[step].emit(rows, changes, deleted)
+        remaining -= len(rows)
+        step, key = step + 1, None
+
+    has_more = step < len(STEPS)
+    if has_more:
+        state = [since, upto, step, key[0] if key else None, key[1] if key else None]
+    else:
+        window = timedelta(seconds=current_app.config.get('SYNC_SAFETY_WINDOW', 5))
+        state = [upto - window, None, 0, None, None]
+    return {
+        'changes': changes,
+        'deleted': deleted,
+        'cursor': encode_cursor(state),
+        'has_more': has_more
+    }
+
+
+def prune_tombstones(days=None):
+    """Delete tombstones older than the retention window; returns the count"""
+    days = days if days is not None else current_app.config.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+    result = db.session.execute(
+        delete(SyncTombstone).where(SyncTombstone.deleted_at < datetime.utcnow() - timedelta(days=days))
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _user_keys(user):
+    gyms = user.__dict__.get('gym_relationships') or ()
+    return {'athlete_id': user.id, 'gym_id': gyms[0].gym_id if gyms else None}
+
+
+_NO_KEYS = {'athlete_id': None, 'gym_id': None, 'cohort_id': None}
+
+# Deleted model -> (entity name, scope keys of the row)
+TOMBSTONES = {
+    User: ('users', _user_keys),
+    Gym: ('gyms', lambda o: {'gym_id': o.id}),
+    UserGymRelationship: ('gym_relationships', lambda o: {'athlete_id': o.user_id, 'gym_id': o.gym_id}),
+    UserCoachRelationship: ('coach_relationships', lambda o: {'athlete_id': o.athlete_id, 'gym_id': o.gym_id}),
+    Cohort: ('cohorts', lambda o: {'cohort_id': o.id, 'gym_id': o.gym_id}),
+    CohortMembership: ('cohort_memberships', lambda o: {'cohort_id': o.cohort_id, 'athlete_id': o.athlete_id}),
+    Exercise: ('exercises', lambda o: {}),
+    PerformanceMetric: ('metrics', lambda o: {'athlete_id': o.athlete_id, 'gym_id': o.gym_id}),
+}
+
+
+def _cohorts_of(coach_ids):
+    return CohortMembership.cohort_id.in_(select(Cohort.id).where(Cohort.coach_id.in_(coach_ids)))
+
+
+def _gym_cohorts(gym_ids):
+    return CohortMembership.cohort_id.in_(select(Cohort.id).where(Cohort.gym_id.in_(gym_ids)))
+
+
+# Tracked rows the database deletes with their parent (ON DELETE CASCADE), which the ORM never
+# loads: deleted model -> (entity name, columns selected as entity_id and scope keys, criterion)
+CASCADES = {
+    User: (
+        ('metrics', (PerformanceMetric.id, PerformanceMetric.athlete_id, PerformanceMetric.gym_id),
+         lambda ids: PerformanceMetric.athlete_id.in_(ids) | PerformanceMetric.coach_id.in_(ids)),
+        ('coach_relationships',
+         (UserCoachRelationship.id, UserCoachRelationship.athlete_id, UserCoachRelationship.gym_id),
+         lambda ids: UserCoachRelationship.athlete_id.in_(ids) | UserCoachRelationship.coach_id.in_(ids)),
+        ('cohorts', (Cohort.id, Cohort.id.label('cohort_id'), Cohort.gym_id),
+         lambda ids: Cohort.coach_id.in_(ids)),
+        ('cohort_memberships', (CohortMembership.id, CohortMembership.cohort_id, CohortMembership.athlete_id),
+         lambda ids: CohortMembership.athlete_id.in_(ids) | _cohorts_of(ids)),
+    ),
+    Gym: (
+        ('metrics', (PerformanceMetric.id, PerformanceMetric.athlete_id, PerformanceMetric.gym_id),
+         lambda ids: PerformanceMetric.gym_id.in_(ids)),
+        ('coach_relationships',
+         (UserCoachRelationship.id, UserCoachRelationship.athlete_id, UserCoachRelationship.gym_id),
+         lambda ids: UserCoachRelationship.gym_id.in_(ids)),
+        ('cohorts', (Cohort.id, Cohort.id.label('cohort_id'), Cohort.gym_id),
+         lambda ids: Cohort.gym_id.in_(ids)),
+        ('cohort_memberships', (CohortMembership.id, CohortMembership.cohort_id, CohortMembership.athlete_id),
+         _gym_cohorts),
+    ),
+}
+
+
+@event.listens_for(Session, 'before_flush')
+def _record_cascaded_tombstones(session, flush_context, instances):
+    """Tombstones for rows that will go with a deleted user or gym, read before they are gone"""
+    parents = {}
+    for obj in session.deleted:
+        if type(obj) in CASCADES:
+            parents.setdefault(type(obj), []).append(obj.id)
+    rows = {}
+    for model, ids in parents.items():
+        for entity, columns, criterion in CASCADES[model]:
+            for row in session.execute(select(*columns).where(criterion(ids))).mappings():
+                keys = {name: value for name, value in row.items() if name != 'id'}
+                rows[(entity, row['id'])] = {'entity': entity, 'entity_id': row['id'], **_NO_KEYS, **keys}
+    if rows:
+        session.execute(insert(SyncTombstone), list(rows.values()))
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_tombstones(session, flush_context):
+    rows = []
+    for obj in session.deleted:
+        tracked = TOMBSTONES.get(type(obj))
+        if tracked is not None:
+            entity, keys = tracked
+            rows.append({'entity': entity, 'entity_id': obj.id, **_NO_KEYS, **keys(obj)})
+    if rows:
+        session.execute(insert(SyncTombstone), rows)
@@ -0,0 +1,296 @@
+"""Seeded synthetic data for performance testing.
+
+``generate`` fills the configured database with gyms, coaches, athletes,
+coach and gym relationships, cohorts, a system exercise catalog and
+``performance_metrics`` history at whatever scale is asked for. The same
+seed and ``anchor`` always produce the same rows (IDs included: UUIDv7s
+built from each row's timestamp and the seeded generator), so runs against
+SQLite and MariaDB are comparable. Only the salted password hash and the
+rebuilt rollups' IDs differ between runs. History ends on the anchor's
+date, not today's.
+
+Rows are written with Core ``executemany`` inserts in batches of
+``batch_size`` and committed per batch, so memory stays flat at any scale.
+Athletes get an ability level and a subset of the catalog's metrics; their
+results drift toward better values over the ``days`` of history with some
+noise, within each metric's min/max. Rollups and ``last_tested`` are
+rebuilt from the raw rows at the end.
+
+Every synthetic user shares one password (hashed once), and emails follow
+``coach<n>@<domain>`` / ``athlete<n>@<domain>`` so load tests can log in.
+"""
+from datetime import datetime, time, timedelta
+import random
+
+from sqlalchemy import insert
+
+from app import db
+from app.models.cohort import Cohort, CohortMembership
+from app.models.exercise import (
+    Exercise, ExerciseBodySegment, ExerciseEquipment, ExerciseMetric, ExerciseSearchTerm
+)
+from app.models.gym import Gym
+from app.models.metric import PerformanceMetric
+from app.models.user import User, UserCoachRelationship, UserGymRelationship
+from app.services import passwords, rollups
+from app.utils.ids import uuid7
+
+EMAIL_DOMAIN = 'synthetic.aiptrack.test'
+DEFAULT_PASSWORD = 'synthetic-password'
+DEFAULT_BATCH_SIZE = 5000
+
+# Creation time of every generated row and the last day of testing history
+DEFAULT_ANCHOR = datetime(2025, 1, 1)
+
+FIRST_NAMES = (
+    'Alex', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn', 'Parker',
+    'Maria', 'James', 'Wei', 'Aisha', 'Lucas', 'Sofia', 'Noah', 'Emma', 'Mateo', 'Olivia',
+    'Liam', 'Zara', 'Ethan', 'Mia', 'Kai', 'Nora', 'Omar', 'Leah', 'Ivan', 'Chloe'
+)
+LAST_NAMES = (
+    'Smith', 'Johnson', 'Garcia', 'Chen', 'Patel', 'Nguyen', 'Kim', 'Silva', 'Müller', 'Rossi',
+    'Brown', 'Davis', 'Lopez', 'Wilson', 'Khan', 'Martin', 'Lee', 'Walker', 'Young', 'Hall',
+    'Novak', 'Okafor', 'Sato', 'Ali', 'Cohen', 'Berg', 'Costa', 'Dubois', 'Fischer', 'Ivanova'
+)
+GYM_WORDS = ('Iron', 'Summit', 'Apex', 'Forge', 'Peak', 'Titan', 'Pulse', 'Core', 'Vertex', 'Atlas')
+COHORT_NAMES = ('Varsity', 'Junior Varsity', 'Off-Season', 'Sprinters', 'Throwers', 'Strength Block', 'Rookies')
+COHORT_COLORS = ('#E53935', '#1E88E5', '#43A047', '#FB8C00', '#8E24AA', '#00ACC1')
+
+# name, equipment, body segments, search terms,
+# metrics as (name, unit, higher_is_better, min, max, decimals)
+EXERCISES = (
+    ('Back Squat', ('Barbell', 'Squat Rack'), ('Lower Body',), ('squat', 'legs'),
+     (('1RM', 'Kilogram', True, 40, 250, 1), ('Reps at 70%', 'Number', True, 1, 25, 0))),
+    ('Front Squat', ('Barbell', 'Squat Rack'), ('Lower Body',), ('squat',),
+     (('1RM', 'Kilogram', True, 30, 200, 1),)),
+    ('Deadlift', ('Barbell',), ('Lower Body', 'Back'), ('hinge', 'pull'),
+     (('1RM', 'Kilogram', True, 50, 300, 1),)),
+    ('Bench Press', ('Barbell', 'Bench'), ('Upper Body', 'Chest'), ('press', 'chest'),
+     (('1RM', 'Kilogram', True, 30, 180, 1), ('Reps at 60kg', 'Number', True, 0, 40, 0))),
+    ('Overhead Press', ('Barbell',), ('Upper Body', 'Shoulders'), ('press', 'shoulders'),
+     (('1RM', 'Kilogram', True, 20, 120, 1),)),
+    ('Pull-Up', ('Pull-Up Bar',), ('Upper Body', 'Back'), ('chin', 'pull'),
+     (('Max Reps', 'Number', True, 0, 40, 0),)),
+    ('Push-Up', (), ('Upper Body', 'Chest'), ('press',),
+     (('Max Reps', 'Number', True, 0, 100, 0),)),
+    ('Vertical Jump', (), ('Lower Body',), ('jump', 'power'),
+     (('Height', 'Meter', True, 0.2, 1.1, 2), ('Peak Power', 'Watt', True, 1500, 7000, 0))),
+    ('Broad Jump', (), ('Lower Body',), ('jump', 'power'),
+     (('Distance', 'Meter', True, 1.2, 3.6, 2),)),
+    ('40 Yard Dash', (), ('Full Body',), ('sprint', 'speed'),
+     (('Time', 'Second', False, 4.2, 7.0, 2),)),
+    ('100m Sprint', (), ('Full Body',), ('sprint', 'speed'),
+     (('Time', 'Second', False, 10.0, 18.0, 2),)),
+    ('Pro Agility Shuttle', ('Cones',), ('Full Body',), ('5-10-5', 'agility'),
+     (('Time', 'Second', False, 3.8, 6.5, 2),)),
+    ('1 Mile Run', (), ('Full Body',), ('endurance', 'conditioning'),
+     (('Time', 'Second', False, 240, 720, 0),)),
+    ('Rowing 2k', ('Rowing Machine',), ('Full Body',), ('erg', 'conditioning'),
+     (('Time', 'Second', False, 360, 600, 1), ('Average Power', 'Watt', True, 100, 450, 0))),
+    ('Medicine Ball Throw', ('Medicine Ball',), ('Upper Body',), ('throw', 'power'),
+     (('Distance', 'Meter', True, 2, 15, 2),)),
+    ('Grip Strength', ('Dynamometer',), ('Forearms',), ('grip', 'hand'),
+     (('Force', 'Newton', True, 150, 700, 0),)),
+    ('Plank', (), ('Core',), ('abs', 'hold'),
+     (('Hold Time', 'Second', True, 20, 400, 0),)),
+    ('Kettlebell Swing', ('Kettlebell',), ('Lower Body', 'Back'), ('hinge', 'swing'),
+     (('Reps in 1 Minute', 'Number', True, 10, 60, 0),)),
+    ('Power Clean', ('Barbell',), ('Full Body',), ('clean', 'olympic'),
+     (('1RM', 'Kilogram', True, 30, 170, 1),)),
+    ('Hip Thrust', ('Barbell', 'Bench'), ('Lower Body', 'Glutes'), ('glute', 'bridge'),
+     (('1RM', 'Kilogram', True, 40, 300, 1),)),
+)
+
+
+def generate(gyms=50, coaches=500, athletes=20000, cohorts_per_coach=2, cohort_size=15,
+             exercises=40, metrics=10_000_000, days=730, seed=42, password=DEFAULT_PASSWORD,
+             batch_size=DEFAULT_BATCH_SIZE, anchor=DEFAULT_ANCHOR, progress=None):
+    """Insert a synthetic data set and return row counts per table.
+
+    The schema must exist and must not already hold synthetic users.
+    ``progress(table, rows)`` is called after each batch is committed.
+    """
+    if coaches < gyms:
+        raise ValueError('Need at least one coach per gym')
+    rng = random.Random(seed)
+    today = anchor.date()
+    writer = _BatchWriter(batch_size, progress)
+    password_hash = passwords.hash_password(password)
+    now = anchor
+
+    def new_id(at=now):
+        return uuid7(int(at.timestamp() * 1000), rng.getrandbits(74))
+
+    def person(email, **flags):
+        # Every row has the same keys: a multi-row INSERT takes its columns from the first row
+        return {
+            'id': new_id(), 'email': email, 'password_hash': password_hash,
+            'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+            'archived': False, 'is_athlete': False, 'is_coach': False, 'is_admin': False,
+            'sex': None, 'date_of_birth': None, 'height': None, 'weight': None,
+            'created_at': now, 'updated_at': now, **flags
+        }
+
+    gym_ids = []
+    for i in range(gyms):
+        gym_ids.append(new_id())
+        writer.add(Gym, {
+            'id': gym_ids[-1], 'name': f'{rng.choice(GYM_WORDS)} Performance {i + 1}', 'archived': False,
+            'email': f'gym{i}@{EMAIL_DOMAIN}', 'created_at': now, 'updated_at': now
+        })
+    writer.flush(Gym)
+
+    coach_gyms = {}
+    for i in range(coaches):
+        coach = person(f'coach{i}@{EMAIL_DOMAIN}', is_coach=True)
+        gym_id = gym_ids[i % gyms]
+        coach_gyms.setdefault(gym_id, []).append(coach['id'])
+        writer.add(User, coach)
+        writer.add(UserGymRelationship, _membership(new_id(), coach['id'], gym_id, 'coach', now))
+
+    # Each athlete: (id, gym, coach, ability in 0..1)
+    roster = []
+    for i in range(athletes):
+        gym_id = rng.choice(gym_ids)
+        coach_id = rng.choice(coach_gyms[gym_id])
+        athlete = person(
+            f'athlete{i}@{EMAIL_DOMAIN}', is_athlete=True,
+            sex=rng.choice(('M', 'F')),
+            date_of_birth=today - timedelta(days=rng.randint(14 * 365, 35 * 365)),
+            height=round(rng.gauss(1.75, 0.09), 3), weight=round(rng.gauss(75, 12), 2)
+        )
+        roster.append((athlete['id'], gym_id, coach_id, min(1.0, max(0.0, rng.gauss(0.5, 0.18)))))
+        writer.add(User, athlete)
+        writer.add(UserGymRelationship, _membership(new_id(), athlete['id'], gym_id, 'athlete', now))
+        writer.add(UserCoachRelationship, {
+            'id': new_id(), 'athlete_id': athlete['id'], 'coach_id': coach_id, 'gym_id': gym_id,
+            'is_active': True, 'created_at': now
+        })
+    writer.flush(User, UserGymRelationship, UserCoachRelationship)
+
+    athletes_by_gym = {}
+    for athlete_id, gym_id, _, _ in roster:
+        athletes_by_gym.setdefault(gym_id, []).append(athlete_id)
+    for gym_id, gym_coaches in coach_gyms.items():
+        members = athletes_by_gym.get(gym_id, [])
+        for coach_id in gym_coaches:
+            for _ in range(cohorts_per_coach):
+                cohort_id = new_id()
+                writer.add(Cohort, {
+                    'id': cohort_id, 'name': rng.choice(COHORT_NAMES), 'color': rng.choice(COHORT_COLORS),
+                    'coach_id': coach_id, 'gym_id': gym_id, 'is_active': True,
+                    'created_at': now, 'updated_at': now
+                })
+                for athlete_id in rng.sample(members, min(cohort_size, len(members))):
+                    writer.add(CohortMembership, {
+                        'id': new_id(), 'cohort_id': cohort_id, 'athlete_id': athlete_id,
+                        'joined_at': today, 'is_active': True, 'created_at': now
+                    })
+    writer.flush(Cohort, CohortMembership)
+
+    # Catalog: the templates first, then numbered variations of them
+    catalog = []
+    for i in range(exercises):
+        name, equipment, segments, terms, metric_specs = EXERCISES[i % len(EXERCISES)]
+        if i >= len(EXERCISES):
+            name = f'{name} (Variation {i // len(EXERCISES)})'
+        exercise_id = new_id()
+        writer.add(Exercise, {
+            'id': exercise_id, 'name': name, 'category': 'system', 'is_enabled': True,
+            'created_at': now, 'updated_at': now
+        })
+        for model, values in ((ExerciseEquipment, equipment), (ExerciseBodySegment, segments),
+                              (ExerciseSearchTerm, terms)):
+            for value in values:
+                writer.add(model, {'id': new_id(), 'name': value, 'exercise_id': exercise_id})
+        for metric_name, unit, higher_is_better, low, high, decimals in metric_specs:
+            metric_id = new_id()
+            writer.add(ExerciseMetric, {
+                'id': metric_id, 'name': metric_name, 'exercise_id': exercise_id, 'is_enabled': True,
+                'display_units': 'metric', 'unit_of_measure': unit, 'decimals': decimals,
+                'min_value': low, 'max_value': high, 'higher_is_better': higher_is_better
+            })
+            catalog.append((metric_id, exercise_id, higher_is_better, low, high, decimals))
+    writer.flush(Exercise, ExerciseEquipment, ExerciseBodySegment, ExerciseSearchTerm, ExerciseMetric)
+
+    if catalog and roster:
+        per_athlete, extra = divmod(metrics, len(roster))
+        for index, (athlete_id, gym_id, coach_id, ability) in enumerate(roster):
+            count = per_athlete + (1 if index < extra else 0)
+            tracked = rng.sample(catalog, min(len(catalog), rng.randint(4, 12)))
+            # Test dates in order, oldest first, so progression follows time
+            offsets = sorted(rng.randrange(days) for _ in range(count))
+            for n, offset in enumerate(offsets):
+                metric_id, exercise_id, higher_is_better, low, high, decimals = tracked[n % len(tracked)]
+                progress_share = 1 - offset / days
+                level = ability * 0.75 + 0.2 * progress_share * ability + rng.gauss(0, 0.04)
+                if not higher_is_better:
+                    level = 1 - level
+                value = round(min(high, max(low, low + (high - low) * level)), decimals)
+                tested = today - timedelta(days=offset)
+                stamp = datetime.combine(tested, time(8 + n % 10))
+                writer.add(PerformanceMetric, {
+                    'id': new_id(stamp), 'athlete_id': athlete_id, 'exercise_id': exercise_id,
+                    'coach_id': coach_id, 'gym_id': gym_id, 'exercise_metric_id': metric_id,
+                    'value': value, 'date': tested, 'created_at': stamp, 'updated_at': stamp
+                })
+        writer.flush(PerformanceMetric)
+
+    counts = dict(writer.counts)
+    counts['athlete_metric_rollups'] = rollups.rebuild({athlete_id for athlete_id, _, _, _ in roster})
+    if progress:
+        progress('athlete_metric_rollups', counts['athlete_metric_rollups'])
+    return counts
+
+
+def _membership(membership_id, user_id, gym_id, role, now):
+    return {
+        'id': membership_id, 'user_id': user_id, 'gym_id': gym_id, 'role': role,
+        'is_active': True, 'is_approved': True, 'created_at': now
+    }
+
+
+class _BatchWriter:
+    """Buffers rows per model and inserts them with executemany in batches"""
+
+    def __init__(self, batch_size, progress):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.rows = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        rows = self.rows.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self._write(model)
+
+    def flush(self, *models):
+        """Write what is buffered for ``models`` (in order, so parents land first)"""
+        for model in models:
+            self._write(model)
+
+    def _write(self, model):
+        rows = self.rows.pop(model, None)
+        if not rows:
+            return
+        # Parents buffered alongside (users before their memberships) must land first
+        for parent in _PARENTS.get(model, ()):
+            self._write(parent)
+        db.session.execute(insert(model.__table__), rows)
+        db.session.commit()
+        table = model.__tablename__
+        self.counts[table] = self.counts.get(table, 0) + len(rows)
+        if self.progress:
+            self.progress(table, self.counts[table])
+
+
+_PARENTS = {
+    UserGymRelationship: (User,),
+    UserCoachRelationship: (User,),
+    CohortMembership: (Cohort,),
+    ExerciseEquipment: (Exercise,),
+    ExerciseBodySegment: (Exercise,),
+    ExerciseSearchTerm: (Exercise,),
+    ExerciseMetric: (Exercise,),
+}
@@ -0,0 +1,221 @@
+"""Time-bucketed trend series for progress charts.
+
+Series are aggregated per day, week (Monday start) or month in SQL on
+MariaDB and SQLite. Other dialects fall back to fetching the two raw
+columns and aggregating them with NumPy. Either way the result is capped
+with Largest-Triangle-Three-Buckets downsampling so chart payloads stay
+bounded regardless of how much history exists.
+"""
+from datetime import date
+
+import numpy as np
+from sqlalchemy import func, select
+
+from app import db
+from app.models.metric import PerformanceMetric
+from app.utils.units import display_factor, display_unit
+
+BUCKETS = ('day', 'week', 'month')
+DEFAULT_MAX_POINTS = 200
+MAX_POINTS_LIMIT = 1000
+
+# Approximate bucket widths in days, used to pick a bucket for 'auto'
+_BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 30.44}
+
+
+def choose_bucket(start, end, max_points):
+    """Pick the finest bucket that keeps the series within ``max_points``"""
+    span = (end - start).days + 1
+    for bucket in BUCKETS:
+        if span / _BUCKET_DAYS[bucket] <= max_points:
+            return bucket
+    return 'month'
+
+
+def trend_series(athlete_id, metric, start, end, bucket='auto', max_points=DEFAULT_MAX_POINTS):
+    """Return bucketed min/max/mean/last values for one athlete and metric.
+
+    ``metric`` is the ExerciseMetric; values are converted to its
+    ``display_units`` and rounded to its ``decimals``.
+    """
+    if bucket == 'auto':
+        bucket = choose_bucket(start, end, max_points)
+
+    criteria = (
+        PerformanceMetric.athlete_id == athlete_id,
+        PerformanceMetric.exercise_metric_id == metric.id,
+        PerformanceMetric.date >= start,
+        PerformanceMetric.date <= end
+    )
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb', 'sqlite'):
+        rows = _sql_buckets(criteria, bucket, dialect)
+    else:
+        rows = _numpy_buckets(criteria, bucket)
+
+    if len(rows) > max_points:
+        keep = lttb_indices([r['date'].toordinal() for r in rows], [r['mean'] for r in rows], max_points)
+        rows = [rows[i] for i in keep]
+
+    factor = display_factor(metric.unit_of_measure, metric.display_units)
+    decimals = metric.decimals
+    points = [
+        {
+            'date': row['date'].isoformat(),
+            'min': round(row['min'] * factor, decimals),
+            'max': round(row['max'] * factor, decimals),
+            'mean': round(row['mean'] * factor, decimals),
+            'last': round(row['last'] * factor, decimals),
+            'count': row['count']
+        }
+        for row in rows
+    ]
+    return {
+        'athlete_id': athlete_id,
+        'exercise_metric_id': metric.id,
+        'bucket': bucket,
+        'unit': display_unit(metric.unit_of_measure, metric.display_units),
+        'display_units': metric.display_units,
+        'decimals': decimals,
+        'points': points
+    }
+
+
+def _bucket_expression(bucket, dialect):
+    """SQL expression for the first day of the bucket containing a row's date"""
+    column = PerformanceMetric.date
+    if bucket == 'day':
+        return column
+    if dialect == 'sqlite':
+        if bucket == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.strftime('%Y-%m-01', column)
+    if bucket == 'week':
+        return func.subdate(column, func.weekday(column))
+    return func.date_format(column, '%Y-%m-01')
+
+
+def _sql_buckets(criteria, bucket, dialect):
+    """Aggregate buckets in the database with window functions"""
+    pm = PerformanceMetric
+    key = _bucket_expression(bucket, dialect).label('bucket')
+    ranked = (
+        select(
+            key,
+            pm.value,
+            func.min(pm.value).over(partition_by=key).label('min'),
+            func.max(pm.value).over(partition_by=key).label('max'),
+            func.avg(pm.value).over(partition_by=key).label('mean'),
+            func.count().over(partition_by=key).label('count'),
+            func.row_number().over(
+                partition_by=key, order_by=(pm.date.desc(), pm.created_at.desc(), pm.id.desc())
+            ).label('rank')
+        )
+        .where(*criteria)
+        .subquery()
+    )
+    result = db.session.execute(
+        select(ranked).where(ranked.c.rank == 1).order_by(ranked.c.bucket)
+    )
+    return [
+        {
+            'date': _as_date(row.bucket),
+            'min': float(row.min),
+            'max': float(row.max),
+            'mean': float(row.mean),
+            'last': float(row.value),
+            'count': row.count
+        }
+        for row in result
+    ]
+
+
+def _numpy_buckets(criteria, bucket):
+    """Aggregate buckets in NumPy from the raw (date, value) columns"""
+    pm = PerformanceMetric
+    result = db.session.execute(
+        select(pm.date, pm.value).where(*criteria).order_by(pm.date, pm.created_at, pm.id)
+    ).all()
+    if not result:
+        return []
+
+    days = np.fromiter((row[0].toordinal() for row in result), dtype=np.int64, count=len(result))
+    values = np.fromiter((float(row[1]) for row in result), dtype=np.float64, count=len(result))
+    keys = _numpy_bucket_keys(days, bucket)
+
+    # Rows are sorted by date, so each bucket is one contiguous run
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    counts = ends - starts
+    return [
+        {
+            'date': date.fromordinal(int(first_day)),
+            'min': float(low),
+            'max': float(high),
+            'mean': float(total / count),
+            'last': float(last),
+            'count': int(count)
+        }
+        for first_day, low, high, total, last, count in zip(
+            keys[starts],
+            np.minimum.reduceat(values, starts),
+            np.maximum.reduceat(values, starts),
+            np.add.reduceat(values, starts),
+            values[ends - 1],
+            counts
+        )
+    ]
+
+
+def _numpy_bucket_keys(days, bucket):
+    """Map proleptic ordinals to the ordinal of their bucket's first day"""
+    if bucket == 'day':
+        return days
+    if bucket == 'week':
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is the weekday
+        return days - (days - 1) % 7
+    month_starts = {}
+    keys = np.empty_like(days)
+    for i, day in enumerate(days):
+        current = date.fromordinal(int(day))
+        month = (current.year, current.month)
+        if month not in month_starts:
+            month_starts[month] = current.replace(day=1).toordinal()
+        keys[i] = month_starts[month]
+    return keys
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` representative points"""
+    n = len(x)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    previous = 0
+    for i in range(threshold - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        next_hi = min(int((i + 2) * every) + 1, n)
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (avg_y - y[previous])
+        )
+        previous = lo + int(areas.argmax())
+        selected.append(previous)
+    selected.append(n - 1)
+    return selected
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
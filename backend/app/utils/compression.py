@@ -0,0 +1,76 @@
+"""Negotiated compression for buffered responses.
+
+``compress_response`` picks brotli (when the ``brotli`` package is
+installed) or gzip from ``Accept-Encoding`` and compresses the body in
+place. ``init_app`` runs it on every buffered text/JSON response of at least
+``COMPRESS_MIN_SIZE`` bytes, which in practice means list pages and sync
+pages; small bodies go out as they are. Streamed responses are left alone.
+
+The hook runs after the conditional GET hook, so ETags are computed on the
+identity body and only weakened here, as nginx does when it compresses.
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip only
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain'
+})
+
+
+def negotiate(accept_encodings):
+    """The encoding to use for a request's ``Accept-Encoding``, or None"""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best = accept_encodings.best_match(candidates)
+    return best if best and accept_encodings[best] else None
+
+
+def compress_response(response, min_size=None):
+    """Compress a response body in place with the best encoding the client accepts"""
+    config = current_app.config
+    min_size = config.get('COMPRESS_MIN_SIZE', MIN_COMPRESS_SIZE) if min_size is None else min_size
+
+    response.vary.add('Accept-Encoding')
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.content_length is not None and response.content_length < min_size
+    ):
+        return response
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', 4)))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=config.get('COMPRESS_GZIP_LEVEL', 6)))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Compress large text and JSON responses; register before any hook that sets ETags"""
+
+    @app.after_request
+    def _compress(response):
+        if (
+            app.config.get('COMPRESS_ENABLED', True)
+            and response.status_code == 200
+            and response.mimetype in COMPRESSIBLE_TYPES
+        ):
+            compress_response(response)
+        return response
@@ -0,0 +1,108 @@
+"""Fixed-bucket latency histograms"""
+import bisect
+import threading
+
+# Upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """A thread-safe histogram of observations (in seconds) over fixed buckets.
+
+    Quantiles are estimated as the upper bound of the bucket that contains
+    them, which is what a Prometheus-style scrape would report as well.
+    ``state()`` exports the raw counts so histograms recorded in different
+    processes can be combined with ``Histogram.merged``.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile, or None if empty"""
+        with self._lock:
+            counts, total, largest = list(self._counts), self.count, self.max
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, largest), 6)
+        return round(largest, 6)
+
+    def snapshot(self):
+        """Counts per bucket (cumulative, keyed by upper bound) plus summary values"""
+        with self._lock:
+            counts, total, total_sum, largest = list(self._counts), self.count, self.sum, self.max
+        cumulative = {}
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            cumulative[str(bound)] = seen
+        cumulative['+Inf'] = total
+        return {
+            'count': total,
+            'sum': round(total_sum, 6),
+            'max': round(largest, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative
+        }
+
+    def state(self):
+        """Raw, mergeable counts"""
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'counts': list(self._counts),
+                'count': self.count,
+                'sum': self.sum,
+                'max': self.max
+            }
+
+    @classmethod
+    def merged(cls, states):
+        """Build a histogram from the ``state()`` of histograms with identical buckets"""
+        states = list(states)
+        histogram = cls(states[0]['buckets'] if states else DEFAULT_BUCKETS)
+        for state in states:
+            if tuple(state['buckets']) != histogram.buckets:
+                raise ValueError('Cannot merge histograms with different buckets')
+            histogram._counts = [a + b for a, b in zip(histogram._counts, state['counts'])]
+            histogram.count += state['count']
+            histogram.sum += state['sum']
+            histogram.max = max(histogram.max, state['max'])
+        return histogram
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf"""
+        with self._lock:
+            counts = list(self._counts)
+        pairs = []
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            pairs.append((bound, seen))
+        pairs.append((float('inf'), seen + counts[-1]))
+        return pairs
@@ -0,0 +1,95 @@
+"""Primary and foreign key IDs.
+
+New rows get UUIDv7 IDs (RFC 9562): a 48-bit millisecond timestamp followed
+by random bits, so keys are generated in roughly increasing order and
+inserts append to the end of InnoDB's clustered index instead of splitting
+random pages. ``BinaryUUID`` stores them as ``BINARY(16)`` on MySQL/MariaDB
+(16 bytes in the primary key and in every secondary index, instead of a
+36-character string) and as text elsewhere. Python code always sees the
+canonical 36-character string, so IDs compare, serialize and validate
+exactly as before.
+"""
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy.dialects.mysql import BINARY
+from sqlalchemy.types import String, TypeDecorator
+
+# Binds in place of malformed IDs (e.g. from a URL); 16 bytes no UUIDv4/v7 ever uses
+_NO_MATCH = b'\x00' * 16
+
+_lock = threading.Lock()
+_last = {'ms': 0, 'seq': 0}
+
+
+def uuid7(timestamp_ms=None, random_bits=None):
+    """Return a UUIDv7 as a string.
+
+    Without arguments the current time is used and IDs generated in the same
+    millisecond by this process stay ordered (the 12 ``rand_a`` bits count
+    up). ``timestamp_ms`` and ``random_bits`` (74 bits) make the ID
+    reproducible, e.g. for seeded synthetic data.
+    """
+    if random_bits is None:
+        random_bits = int.from_bytes(os.urandom(10), 'big') >> 6
+    rand_a = random_bits >> 62
+    rand_b = random_bits & ((1 << 62) - 1)
+    if timestamp_ms is None:
+        with _lock:
+            ms = time.time_ns() // 1_000_000
+            if ms <= _last['ms']:
+                ms = _last['ms']
+                _last['seq'] += 1
+                if _last['seq'] > 0xFFF:
+                    ms += 1
+                    _last['seq'] = 0
+            else:
+                _last['seq'] = rand_a & 0x7FF
+            _last['ms'] = ms
+            timestamp_ms, rand_a = ms, _last['seq']
+    value = (
+        (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+        | 0x7 << 76
+        | (rand_a & 0xFFF) << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return str(uuid.UUID(int=value))
+
+
+def new_id():
+    """Column default for primary keys"""
+    return uuid7()
+
+
+class BinaryUUID(TypeDecorator):
+    """UUID stored as BINARY(16) on MySQL/MariaDB and CHAR(36)-style text elsewhere"""
+
+    impl = String(36)
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return str
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name in ('mysql', 'mariadb'):
+            return dialect.type_descriptor(BINARY(16))
+        return dialect.type_descriptor(String(36))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name not in ('mysql', 'mariadb'):
+            return value
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        try:
+            return uuid.UUID(value).bytes
+        except (TypeError, ValueError):
+            return _NO_MATCH
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
@@ -0,0 +1,98 @@
+"""Keyset (cursor) pagination helpers"""
+import base64
+import binascii
+from datetime import date, datetime
+import json
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+STREAM_CHUNK_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor that cannot be decoded"""
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row into an opaque cursor"""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into values typed for the given columns"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor('Invalid cursor')
+
+    decoded = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        try:
+            if value is not None and python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif value is not None and python_type is date:
+                value = date.fromisoformat(value)
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor('Invalid cursor') from e
+        decoded.append(value)
+    return decoded
+
+
+def keyset_filter(columns, values):
+    """Build ``(c1, c2, ...) > (v1, v2, ...)`` as an index-friendly OR chain"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column > values[i]))
+    return or_(*clauses)
+
+
+def parse_per_page(value):
+    """Clamp a requested page size to the allowed range"""
+    if value is None:
+        return DEFAULT_PER_PAGE
+    return max(1, min(value, MAX_PER_PAGE))
+
+
+def paginate_keyset(query, columns, per_page, cursor=None):
+    """Return ``(rows, next_cursor)`` for one page ordered by ``columns``.
+
+    ``columns`` must end with a unique column (normally the primary key) so
+    that the ordering is total.
+    """
+    if cursor:
+        query = query.filter(keyset_filter(columns, decode_cursor(cursor, columns)))
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in columns])
+    return rows, next_cursor
+
+
+def iter_keyset(query, columns, chunk_size=STREAM_CHUNK_SIZE, session=None):
+    """Yield every row of ``query`` in keyset-ordered chunks.
+
+    Each chunk is a separate bounded query, so memory stays flat regardless
+    of table size. When ``session`` is given, rows are expunged once the
+    caller has consumed them so the identity map does not grow.
+    """
+    cursor = None
+    while True:
+        rows, cursor = paginate_keyset(query, columns, chunk_size, cursor)
+        for row in rows:
+            yield row
+            if session is not None:
+                session.expunge(row)
+        if cursor is None:
+            return
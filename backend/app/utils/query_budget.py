@@ -0,0 +1,130 @@
+"""Query budgets.
+
+``query_budget`` wraps a route handler (as a decorator) or any block (as a
+context manager) and counts the SQL statements executed inside it. A block
+that runs more than ``max_statements`` statements, or runs the same
+statement shape more than ``max_repeats`` times (the signature of N+1 lazy
+loading), violates its budget. What happens then depends on
+``QUERY_BUDGET_MODE``:
+
+- ``off``: nothing is counted (production default)
+- ``log``: a warning listing the repeated shapes goes to the app logger
+  (development default)
+- ``raise``: ``QueryBudgetExceeded`` is raised (testing default)
+
+Statement shapes ignore literal values and collapse expanded ``IN`` lists,
+so ``WHERE users.id = ?`` run fifty times shows up as one shape with a
+count of fifty.
+"""
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+import re
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_MAX_REPEATS = 3
+
+_active = ContextVar('query_budget', default=None)
+
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in ``raise`` mode when a block runs more statements than budgeted"""
+
+
+def statement_shape(statement):
+    """Normalize a SQL statement so repeated executions compare equal"""
+    shape = _PLACEHOLDER.sub('?', statement)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _mode():
+    if not has_app_context():
+        return 'off'
+    return current_app.config.get('QUERY_BUDGET_MODE', 'off')
+
+
+class query_budget:
+    """Limit the statements executed by a route handler or block"""
+
+    def __init__(self, max_statements, max_repeats=DEFAULT_MAX_REPEATS, name=None):
+        self.max_statements = max_statements
+        self.max_repeats = max_repeats
+        self.name = name
+        self.shapes = Counter()
+        self.count = 0
+        self._parent = None
+        self._token = None
+
+    def __call__(self, fn):
+        name = self.name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with query_budget(self.max_statements, self.max_repeats, name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        if _mode() != 'off':
+            _install()
+            self._parent = _active.get()
+            self._token = _active.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is None:
+            return False
+        _active.reset(self._token)
+        self._token = None
+        if exc_type is None:
+            self.check()
+        return False
+
+    def record(self, statement):
+        self.count += 1
+        self.shapes[statement_shape(statement)] += 1
+        if self._parent is not None:
+            self._parent.record(statement)
+
+    def repeated(self):
+        """Shapes executed more than ``max_repeats`` times, most frequent first"""
+        if self.max_repeats is None:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > self.max_repeats]
+
+    def violations(self):
+        problems = []
+        if self.count > self.max_statements:
+            problems.append(f'{self.count} statements (budget {self.max_statements})')
+        for shape, n in self.repeated():
+            problems.append(f'{n}x {shape[:200]}')
+        return problems
+
+    def check(self):
+        """Log or raise according to QUERY_BUDGET_MODE if the budget was exceeded"""
+        problems = self.violations()
+        if not problems:
+            return
+        message = f'Query budget exceeded in {self.name or "block"}: ' + '; '.join(problems)
+        if _mode() == 'raise':
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning(message)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    budget = _active.get()
+    if budget is not None:
+        budget.record(statement)
+
+
+def _install():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
@@ -0,0 +1,209 @@
+"""Fast-path serialization.
+
+Marshmallow schemas stay the contract for what a resource looks like, but
+``Schema.dump`` re-inspects every field on every object. ``Serializer``
+compiles a schema once into a plain Python function that builds the output
+dict with direct attribute reads and inline conversions for the common
+field types (strings, numbers, booleans, dates and datetimes) and nested
+schemas; any other field falls back to its own ``serialize`` so behaviour
+matches marshmallow.
+
+``Serializer.select`` narrows a serializer to the fields a client asked for
+with ``?fields=`` (a sparse fieldset); each distinct selection is compiled
+once and cached. ``attributes`` names the instance attributes behind it, so
+the route can ``load_only`` those columns (see ``app.services.loading``).
+
+Responses are encoded with orjson when it is installed (stdlib ``json``
+otherwise). ``output_json`` is registered as the Flask-RESTX JSON
+representation and ``JSONProvider`` as the Flask JSON provider, so both
+namespace resources and plain blueprint routes encode through ``dumps``.
+Decimals are emitted as JSON numbers.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import keyword
+
+from flask import make_response
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import Schema, fields
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+# Compiled ``fields=`` selections kept per serializer
+MAX_CACHED_SELECTIONS = 64
+
+# Inline expressions for field types whose marshmallow output can be built
+# without calling the field; ``{}`` is the attribute read. Checked in order.
+_INLINE = (
+    (fields.Boolean, '{}'),
+    (fields.Integer, '{}'),
+    (fields.Float, '(None if (_v := {}) is None else float(_v))'),
+    (fields.Decimal, '(None if (_v := {}) is None else float(_v))'),
+    (fields.DateTime, '(None if (_v := {}) is None else _v.isoformat())'),
+    (fields.Date, '(None if (_v := {}) is None else _v.isoformat())'),
+    # Column values for string fields are already str
+    (fields.String, '{}'),
+    (fields.UUID, '(None if (_v := {}) is None else str(_v))'),
+)
+
+
+def _inline_template(field):
+    """Expression template for a field, or None if it must be serialized by marshmallow"""
+    if type(field) is fields.Raw:
+        return '{}'
+    if isinstance(field, (fields.DateTime, fields.Date)) and field.format not in (None, 'iso', 'iso8601'):
+        return None
+    if isinstance(field, fields.Decimal) and field.as_string:
+        return None
+    for field_type, template in _INLINE:
+        if isinstance(field, field_type):
+            return template
+    return None
+
+
+def compile_schema(schema):
+    """Compile a marshmallow schema instance into a ``obj -> dict`` function.
+
+    The generated function reads attributes straight from the instance
+    ``__dict__`` when every inlined attribute is present there (loaded ORM
+    columns), skipping SQLAlchemy's attribute instrumentation, and falls
+    back to normal attribute access otherwise (expired rows, Row objects,
+    properties).
+    """
+    namespace = {}
+    direct, fallback = [], []
+    attributes = set()
+    for name, field in schema.dump_fields.items():
+        key = field.data_key or name
+        attribute = field.attribute or name
+        template = _inline_template(field)
+        if isinstance(field, fields.Nested) and isinstance(field.nested, (type, Schema)):
+            # Nested schemas are compiled too; the child dump runs on the attribute value
+            child = f'_n{len(fallback)}'
+            namespace[child] = compile_schema(field.schema)
+            if field.many:
+                template = f'(None if (_v := {{}}) is None else [{child}(_i) for _i in _v])'
+            else:
+                template = f'(None if (_v := {{}}) is None else {child}(_v))'
+        if template is not None and attribute.isidentifier() and not keyword.iskeyword(attribute):
+            attributes.add(attribute)
+            direct.append(f'            {key!r}: {template.format(f"d[{attribute!r}]")},')
+            fallback.append(f'        {key!r}: {template.format(f"obj.{attribute}")},')
+        else:
+            namespace[f'_f{len(fallback)}'] = field
+            expr = f'_f{len(fallback)}.serialize({name!r}, obj)'
+            direct.append(f'            {key!r}: {expr},')
+            fallback.append(f'        {key!r}: {expr},')
+
+    namespace['_attributes'] = frozenset(attributes)
+    source = (
+        'def dump(obj):\n'
+        '    d = getattr(obj, "__dict__", None)\n'
+        '    if d is not None and _attributes <= d.keys():\n'
+        '        return {\n' + '\n'.join(direct) + '\n        }\n'
+        '    return {\n' + '\n'.join(fallback) + '\n    }\n'
+    )
+    exec(compile(source, f'<serializer {type(schema).__name__}>', 'exec'), namespace)
+    return namespace['dump']
+
+
+class InvalidFields(ValueError):
+    """Raised when ``fields=`` names a field the resource does not have"""
+
+    def __init__(self, unknown, allowed):
+        super().__init__(f'Unknown fields: {", ".join(unknown)}')
+        self.allowed = list(allowed)
+
+
+def parse_fields(value, allowed):
+    """Parse a comma-separated ``fields=`` value into names, in ``allowed`` order.
+
+    Returns None (every field) when ``value`` is empty.
+    """
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = sorted(requested.difference(allowed))
+    if unknown:
+        raise InvalidFields(unknown, allowed)
+    return tuple(name for name in allowed if name in requested)
+
+
+class Serializer:
+    """Compiled dump path for one marshmallow schema"""
+
+    def __init__(self, schema_class, **schema_kwargs):
+        self.schema_class = schema_class
+        self.schema_kwargs = schema_kwargs
+        self.schema = schema_class(**schema_kwargs)
+        self._dump = compile_schema(self.schema)
+        # output key -> schema field name
+        self._names = {field.data_key or name: name for name, field in self.schema.dump_fields.items()}
+        self.field_names = tuple(self._names)
+        self.attributes = tuple(field.attribute or name for name, field in self.schema.dump_fields.items())
+        self._subsets = {}
+
+    def select(self, value):
+        """This serializer narrowed to a ``fields=`` value (itself when empty)"""
+        keys = parse_fields(value, self.field_names)
+        if keys is None or len(keys) == len(self.field_names):
+            return self
+        subset = self._subsets.get(keys)
+        if subset is None:
+            subset = Serializer(self.schema_class, **self.schema_kwargs, only=tuple(self._names[key] for key in keys))
+            # Clients use a handful of selections; don't let arbitrary ones grow the cache
+            if len(self._subsets) < MAX_CACHED_SELECTIONS:
+                self._subsets[keys] = subset
+        return subset
+
+    def dump(self, obj):
+        """Serialize one object to a JSON-ready dict"""
+        return self._dump(obj)
+
+    def dump_many(self, objs):
+        """Serialize an iterable of objects to a list of dicts"""
+        dump = self._dump
+        return [dump(obj) for obj in objs]
+
+    __call__ = dump
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """Encode data as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTX representation for application/json"""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with ``dumps``"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
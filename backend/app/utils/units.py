@@ -0,0 +1,74 @@
+"""SI unit conversion for display and import.
+
+Values are always stored in SI units (see ``exercise_metrics.unit_of_measure``).
+Metrics whose ``display_units`` is ``imperial`` are converted on the way out.
+"""
+from decimal import Decimal
+
+# SI unit -> (imperial unit, multiplier from SI)
+IMPERIAL = {
+    'Meter': ('Foot', 3.280839895),
+    'Kilogram': ('Pound', 2.2046226218),
+    'Newton': ('Pound-force', 0.2248089431)
+}
+
+# Short labels for SI and imperial units
+UNIT_SYMBOLS = {
+    'Meter': 'm',
+    'Kilogram': 'kg',
+    'Second': 's',
+    'Newton': 'N',
+    'Watt': 'W',
+    'Number': 'c',
+    'Foot': 'ft',
+    'Pound': 'lb',
+    'Pound-force': 'lbf'
+}
+
+# Lower-cased unit names and symbols -> unit name
+UNIT_NAMES = {
+    **{name.lower(): name for name in UNIT_SYMBOLS},
+    **{symbol.lower(): name for name, symbol in UNIT_SYMBOLS.items()},
+    'lbs': 'Pound', 'feet': 'Foot', 'meters': 'Meter', 'seconds': 'Second', 'sec': 'Second', 'reps': 'Number'
+}
+
+
+def display_unit(unit_of_measure, display_units):
+    """Return the unit name values are shown in"""
+    if display_units == 'imperial' and unit_of_measure in IMPERIAL:
+        return IMPERIAL[unit_of_measure][0]
+    return unit_of_measure
+
+
+def display_factor(unit_of_measure, display_units):
+    """Return the multiplier from the stored SI value to the display value"""
+    if display_units == 'imperial' and unit_of_measure in IMPERIAL:
+        return IMPERIAL[unit_of_measure][1]
+    return 1.0
+
+
+def to_display(value, unit_of_measure, display_units, decimals):
+    """Convert a stored SI value for display, rounded to ``decimals``"""
+    if value is None:
+        return None
+    return round(float(value) * display_factor(unit_of_measure, display_units), decimals)
+
+
+def to_si(value, unit, unit_of_measure):
+    """Convert an imported value given in ``unit`` to the metric's SI unit.
+
+    ``unit`` may be a unit name or symbol (``lb``, ``Pound``, ``kg``...), and
+    blank means the value is already in SI. Raises ValueError if the unit
+    is unknown or measures something else.
+    """
+    if not unit:
+        return value
+    name = UNIT_NAMES.get(unit.strip().lower())
+    if name is None:
+        raise ValueError(f'Unknown unit {unit}')
+    if name == unit_of_measure:
+        return value
+    imperial = IMPERIAL.get(unit_of_measure)
+    if imperial is None or imperial[0] != name:
+        raise ValueError(f'Unit {unit} does not match {unit_of_measure}')
+    return value / Decimal(str(imperial[1]))
@@ -0,0 +1,96 @@
+"""Compare catalog typeahead from the in-memory index with LIKE joins.
+
+Seeds ``--exercises`` synthetic exercises with search terms, equipment and
+body segments, then replays every prefix of a set of queries (as a user
+typing would) against both paths and prints p50/p95/p99 latency.
+
+    python -m benchmarks.catalog_search --exercises 2000
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import or_, select
+
+from benchmarks.common import make_app, percentiles
+from app import db
+from app.models.exercise import Exercise, ExerciseBodySegment, ExerciseEquipment, ExerciseSearchTerm
+from app.services import catalog
+
+MOVEMENTS = ['squat', 'deadlift', 'press', 'row', 'lunge', 'jump', 'sprint', 'throw', 'carry', 'pull up',
+             'clean', 'snatch', 'bridge', 'plank', 'hinge', 'step up', 'push up', 'curl', 'raise', 'rotation']
+MODIFIERS = ['front', 'back', 'single leg', 'split', 'overhead', 'bench', 'incline', 'paused', 'tempo',
+             'box', 'broad', 'lateral', 'romanian', 'sumo', 'bulgarian', 'hang', 'power', 'seated', 'kneeling']
+EQUIPMENT = ['barbell', 'dumbbell', 'kettlebell', 'medicine ball', 'band', 'sled', 'cable', 'trap bar', 'bodyweight']
+SEGMENTS = ['quadriceps', 'hamstrings', 'glutes', 'chest', 'shoulders', 'back', 'core', 'calves', 'arms']
+QUERIES = ['squat', 'bulgarian split', 'romanian deadlift', 'kettlebell swing', 'medicine ball throw',
+           'sqat', 'hamstring', 'trap bar', 'single leg box jump', 'overhead press']
+
+
+def seed(count):
+    rng = random.Random(7)
+    rows = []
+    for i in range(count):
+        exercise = Exercise(
+            name=f'{rng.choice(MODIFIERS).title()} {rng.choice(EQUIPMENT).title()} {rng.choice(MOVEMENTS).title()} {i}',
+            category='system' if i % 4 else 'custom'
+        )
+        exercise.search_terms = [ExerciseSearchTerm(name=rng.choice(MOVEMENTS)) for _ in range(2)]
+        exercise.equipment = [ExerciseEquipment(name=rng.choice(EQUIPMENT))]
+        exercise.body_segments = [ExerciseBodySegment(name=s) for s in rng.sample(SEGMENTS, 2)]
+        rows.append(exercise)
+    db.session.add_all(rows)
+    db.session.commit()
+
+
+def like_search(query, limit=20):
+    """The naive path: one LIKE per word across the four tables"""
+    stmt = select(Exercise.id, Exercise.name).where(Exercise.is_enabled.is_(True))
+    for word in query.split():
+        pattern = f'%{word}%'
+        stmt = stmt.where(or_(
+            Exercise.name.ilike(pattern),
+            Exercise.id.in_(select(ExerciseSearchTerm.exercise_id).where(ExerciseSearchTerm.name.ilike(pattern))),
+            Exercise.id.in_(select(ExerciseEquipment.exercise_id).where(ExerciseEquipment.name.ilike(pattern))),
+            Exercise.id.in_(select(ExerciseBodySegment.exercise_id).where(ExerciseBodySegment.name.ilike(pattern)))
+        ))
+    return db.session.execute(stmt.order_by(Exercise.name).limit(limit)).all()
+
+
+def keystrokes():
+    return [query[:i] for query in QUERIES for i in range(1, len(query) + 1) if query[:i].strip()]
+
+
+def measure(fn, inputs):
+    samples = []
+    for text in inputs:
+        start = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def print_stats(label, stats):
+    print(f'{label:<24} ' + '  '.join(f'{k}={v:8.3f}ms' for k, v in stats.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--exercises', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed(args.exercises)
+        start = time.perf_counter()
+        catalog.get_index()
+        print(f'index build              {args.exercises} exercises  {(time.perf_counter() - start) * 1000:.1f}ms')
+
+        inputs = keystrokes()
+        print(f'{len(inputs)} keystrokes')
+        print_stats('LIKE joins', measure(like_search, inputs))
+        print_stats('inverted index', measure(lambda text: catalog.search(text, limit=20), inputs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run with the testing configuration against DATABASE_TEST_URL,
+which defaults to an in-memory SQLite database. Run them from the backend
+directory, e.g. ``python -m benchmarks.metric_ingest``.
+"""
+from datetime import date
+import os
+import time
+
+os.environ.setdefault('DATABASE_TEST_URL', 'sqlite://')
+
+from app import create_app, db  # noqa: E402
+from app.models.user import User, UserGymRelationship  # noqa: E402
+from app.models.gym import Gym  # noqa: E402
+from app.models.exercise import Exercise, ExerciseMetric  # noqa: E402
+
+
+def make_app():
+    """Create a testing app with a freshly created schema"""
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def seed_reference_data(athletes=20, exercises=5, metrics_per_exercise=2):
+    """Create a gym with an approved coach, athletes and exercise metrics; return their IDs"""
+    gym = Gym(name='Benchmark Gym')
+    coach = User(email='coach@bench.local', first_name='Bench', last_name='Coach', is_coach=True)
+    athlete_rows = [
+        User(email=f'athlete{i}@bench.local', first_name='Bench', last_name=f'Athlete{i}', is_athlete=True)
+        for i in range(athletes)
+    ]
+    metric_rows = []
+    for i in range(exercises):
+        exercise = Exercise(name=f'Exercise {i}', category='system')
+        for j in range(metrics_per_exercise):
+            metric_rows.append(ExerciseMetric(
+                name=f'Metric {j}', exercise=exercise, unit_of_measure='Kilogram',
+                min_value=0, max_value=1000
+            ))
+    memberships = [UserGymRelationship(user=coach, gym=gym, role='coach', is_approved=True)] + [
+        UserGymRelationship(user=athlete, gym=gym, role='athlete', is_approved=True) for athlete in athlete_rows
+    ]
+    db.session.add_all([gym, coach, *athlete_rows, *metric_rows, *memberships])
+    db.session.commit()
+    return {
+        'gym_id': gym.id,
+        'coach_id': coach.id,
+        'athlete_ids': [a.id for a in athlete_rows],
+        'metrics': [(m.id, m.exercise_id) for m in metric_rows],
+        'date': date.today()
+    }
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn and return (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Return {'p50': ..., ...} for a list of latencies (nearest-rank)"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f'p{p}': None for p in points}
+    return {f'p{p}': ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] for p in points}
+
+
+def report(label, rows, elapsed):
+    """Print a one-line throughput summary"""
+    print(f'{label:<28} {rows:>8} rows  {elapsed:8.3f}s  {rows / elapsed:12.0f} rows/s')
@@ -0,0 +1,207 @@
+"""End-to-end API load benchmark with a JSON baseline.
+
+Drives a fixed set of read endpoints at fixed concurrency and reports
+throughput and p50/p95/p99 latency per scenario. Without ``--url`` it
+generates a small synthetic data set (``app.services.synthetic``) into a
+temporary SQLite file and serves the app from a threaded WSGI server; with
+``--url`` it targets a running deployment seeded by ``flask generate-data``
+and logs in as ``--email``.
+
+``--save`` writes the results as a baseline; ``--baseline`` compares against
+one and exits non-zero when a scenario's p95 grew, or its throughput fell,
+by more than ``--tolerance``.
+
+    python -m benchmarks.load --requests 200 --concurrency 8 --save baseline.json
+    python -m benchmarks.load --requests 200 --concurrency 8 --baseline baseline.json
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import percentiles
+
+# Scenario name -> path template; {athlete}, {coach} and {metric} come from discovery, {start} and
+# {end} span the year of synthetic history before the anchor (endpoints default to ending today)
+SCENARIOS = {
+    'health': '/api/health',
+    'users_page': '/api/users/?per_page=50',
+    'user_relationships': '/api/users/{coach}/relationships',
+    'coach_roster': '/api/users/{coach}/roster',
+    'exercise_search': '/api/exercises/?search=squ',
+    'athlete_summary': '/api/metrics/athlete/{athlete}/summary',
+    'athlete_trend': '/api/metrics/athlete/{athlete}/trend/{metric}?start={start}&end={end}',
+    'leaderboard': '/api/metrics/leaderboard/{metric}?limit=25',
+}
+
+
+def request_json(url, token=None, body=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = json.dumps(body).encode() if body is not None else None
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers)) as response:
+        return json.loads(response.read())
+
+
+def start_local_server(args):
+    """Serve a freshly generated synthetic data set; returns (base_url, server)"""
+    directory = tempfile.mkdtemp(prefix='aiptrack-load-')
+    os.environ['DATABASE_TEST_URL'] = f'sqlite:///{os.path.join(directory, "load.db")}'
+    os.environ.setdefault('METRICS_DIR', directory)
+    from werkzeug.serving import make_server
+    from app import create_app, db
+    from app.services import synthetic
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        synthetic.generate(
+            gyms=2, coaches=4, athletes=args.athletes, cohorts_per_coach=2, exercises=20,
+            metrics=args.metrics, seed=args.seed, password=args.password
+        )
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def discover(base_url, email, password):
+    """Log in and pick the IDs the scenario paths need"""
+    login = request_json(f'{base_url}/api/auth/login', body={'email': email, 'password': password})
+    token = login['access_token']
+    users = request_json(f'{base_url}/api/users/?per_page=50', token)['data']
+    athletes = [user['id'] for user in users if user['is_athlete']]
+    if not athletes:
+        sys.exit(f'{email} cannot see any athletes; seed data with `flask generate-data` first')
+    summary = request_json(f'{base_url}/api/metrics/athlete/{athletes[0]}/summary', token)
+    if not summary:
+        sys.exit(f'Athlete {athletes[0]} has no metrics')
+    return token, {'coach': login['user']['id'], 'athlete': athletes[0], 'metric': summary[0]['exercise_metric_id']}
+
+
+def history_window(anchor=None):
+    """The year of history ``flask generate-data`` writes, ending on ``anchor``"""
+    if anchor is None:
+        # Imported late: the local server sets the database URL before the app is first imported
+        from app.services.synthetic import DEFAULT_ANCHOR
+        anchor = DEFAULT_ANCHOR.date()
+    return {'start': (anchor - timedelta(days=365)).isoformat(), 'end': anchor.isoformat()}
+
+
+def fetch(url, token):
+    request = urllib.request.Request(url, headers={'Authorization': f'Bearer {token}'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return time.perf_counter() - start, status
+
+
+def run_scenario(url, token, args):
+    for _ in range(args.warmup):
+        fetch(url, token)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(url, token), range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stats = percentiles([latency * 1000 for latency, _ in results])
+    return {
+        'requests': len(results),
+        'errors': sum(1 for _, status in results if status >= 400),
+        'throughput': round(len(results) / elapsed, 1),
+        **{key: round(value, 2) for key, value in stats.items()}
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return (scenario, reason) pairs for scenarios that regressed"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append((name, f'p95 {previous["p95"]}ms -> {current["p95"]}ms'))
+        if current['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append((name, f'throughput {previous["throughput"]}/s -> {current["throughput"]}/s'))
+        if current['errors'] > previous['errors']:
+            regressions.append((name, f'errors {previous["errors"]} -> {current["errors"]}'))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Base URL of a running server (default: local synthetic server)')
+    parser.add_argument('--email', default='coach0@synthetic.aiptrack.test')
+    parser.add_argument('--password', default='synthetic-password')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per scenario')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='run only these (repeatable)')
+    parser.add_argument('--athletes', type=int, default=200, help='local data set size')
+    parser.add_argument('--metrics', type=int, default=20000, help='local performance_metrics rows')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor', type=date.fromisoformat,
+                        help='last day of synthetic history (default: synthetic.DEFAULT_ANCHOR)')
+    parser.add_argument('--save', metavar='PATH', help='write results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative regression')
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url, server = start_local_server(args)
+    token, ids = discover(base_url.rstrip('/'), args.email, args.password)
+    ids.update(history_window(args.anchor))
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = run_scenario(base_url.rstrip('/') + SCENARIOS[name].format(**ids), token, args)
+        stats = results[name]
+        print(
+            f'{name:<20} {stats["throughput"]:8.1f} req/s  errors {stats["errors"]:<3} '
+            + '  '.join(f'{k}={stats[k]:7.1f}ms' for k in ('p50', 'p95', 'p99'))
+        )
+    if server is not None:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            'target': args.url or 'local-sqlite',
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'python': platform.python_version(),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'scenarios': results
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline written to {args.save}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, reason in regressions:
+            print(f'REGRESSION {name}: {reason}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions beyond {args.tolerance:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Measure non-auth latency while a burst of logins hashes passwords.
+
+Serves the app from a threaded WSGI server on a temporary SQLite file,
+fires ``--logins`` concurrent login requests and, at the same time, polls
+``/api/health`` from a probe thread. Runs once with inline hashing
+(PASSWORD_HASH_CONCURRENCY=0) and once with the bounded hashing pool, and
+prints the probe's p50/p95/p99 latency for each.
+
+    python -m benchmarks.login_storm --logins 32 --threads 8
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# The database URL is read once when the config module is imported
+_DB_DIR = tempfile.TemporaryDirectory()
+os.environ['DATABASE_TEST_URL'] = f'sqlite:///{os.path.join(_DB_DIR.name, "storm.db")}'
+
+from benchmarks.common import percentiles  # noqa: E402
+
+PASSWORD = 'benchmark-password'
+
+
+def make_server_app(concurrency, method):
+    from app import create_app, db
+    from app.models.user import User
+
+    app = create_app('testing')
+    app.config.update(PASSWORD_HASH_CONCURRENCY=concurrency, PASSWORD_HASH_METHOD=method)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='storm@bench.local', first_name='Storm', last_name='User', is_athlete=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def post_login(base_url):
+    body = json.dumps({'email': 'storm@bench.local', 'password': PASSWORD}).encode()
+    request = urllib.request.Request(
+        f'{base_url}/api/auth/login', data=body, headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def probe(base_url, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        with urllib.request.urlopen(f'{base_url}/api/health') as response:
+            response.read()
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def run(label, concurrency, args):
+    from werkzeug.serving import make_server
+
+    app = make_server_app(concurrency, args.method)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(base_url, stop, samples))
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        statuses = list(pool.map(lambda _: post_login(base_url), range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    server.shutdown()
+
+    stats = percentiles([s * 1000 for s in samples])
+    codes = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(
+        f'{label:<22} logins {elapsed:6.2f}s {codes}  health n={len(samples):<4} '
+        + '  '.join(f'{k}={v:7.1f}ms' for k, v in stats.items() if v is not None)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=8, help='concurrent login clients')
+    parser.add_argument('--pool', type=int, default=1, help='PASSWORD_HASH_CONCURRENCY for the bounded run')
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    run('inline hashing', 0, args)
+    run(f'bounded pool ({args.pool})', args.pool, args)
+
+
+if __name__ == '__main__':
+    main()
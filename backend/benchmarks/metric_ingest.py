@@ -0,0 +1,72 @@
+"""Compare batch session ingestion with row-at-a-time metric inserts.
+
+    python -m benchmarks.metric_ingest --athletes 50 --repeats 4
+"""
+import argparse
+from decimal import Decimal
+import random
+
+from benchmarks.common import make_app, seed_reference_data, timed, report
+from app import db
+from app.models.metric import PerformanceMetric
+from app.services.metrics import ingest_session
+
+
+def build_entries(ref, repeats):
+    rng = random.Random(42)
+    return [
+        {
+            'athlete_id': athlete_id,
+            'exercise_metric_id': metric_id,
+            'value': Decimal(str(round(rng.uniform(1, 500), 2)))
+        }
+        for _ in range(repeats)
+        for athlete_id in ref['athlete_ids']
+        for metric_id, _exercise_id in ref['metrics']
+    ]
+
+
+def row_at_a_time(ref, entries):
+    """One ORM insert and one commit per value, as the single-row POST would do"""
+    exercises = dict(ref['metrics'])
+    for entry in entries:
+        db.session.add(PerformanceMetric(
+            athlete_id=entry['athlete_id'],
+            exercise_id=exercises[entry['exercise_metric_id']],
+            coach_id=ref['coach_id'],
+            gym_id=ref['gym_id'],
+            exercise_metric_id=entry['exercise_metric_id'],
+            value=entry['value'],
+            date=ref['date']
+        ))
+        db.session.commit()
+    return len(entries)
+
+
+def batched(ref, entries):
+    result = ingest_session({'gym_id': ref['gym_id'], 'date': ref['date'], 'entries': entries}, ref['coach_id'])
+    db.session.commit()
+    return result['inserted']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--athletes', type=int, default=50)
+    parser.add_argument('--exercises', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=4, help='values per athlete and metric')
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        ref = seed_reference_data(athletes=args.athletes, exercises=args.exercises)
+        entries = build_entries(ref, args.repeats)
+
+        rows, elapsed = timed(row_at_a_time, ref, entries)
+        report('row-at-a-time', rows, elapsed)
+
+        rows, elapsed = timed(batched, ref, entries)
+        report('batch session', rows, elapsed)
+
+
+if __name__ == '__main__':
+    main()
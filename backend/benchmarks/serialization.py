@@ -0,0 +1,102 @@
+"""Measure user serialization throughput, old paths against the compiled one.
+
+Inserts ``--users`` users, loads them back as ORM objects and times each
+way a user list has been turned into a JSON body:
+
+- schema + marshal: ``UserSchema().dump`` followed by Flask-RESTX
+  ``marshal`` and ``json.dumps`` (the old detail routes)
+- hand-written to_dict: the old ``User.to_dict`` with ``json.dumps``
+- compiled serializer: ``user_serializer.dump_many`` with ``dumps``
+
+    python -m benchmarks.serialization --users 10000
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import json
+
+from flask_restx import Model, fields, marshal
+
+from benchmarks.common import make_app, report, timed
+from app import db
+from app.models.user import User
+from app.schemas.user import UserSchema, user_serializer
+from app.utils.serialization import dumps
+
+old_user_model = Model('User', {
+    'id': fields.String(required=True),
+    'email': fields.String(required=True),
+    'first_name': fields.String(required=True),
+    'last_name': fields.String(required=True),
+    'is_admin': fields.Boolean(),
+    'created_at': fields.DateTime()
+})
+
+
+def legacy_to_dict(user):
+    """User.to_dict as it was before the compiled serializers"""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'nick_name': user.nick_name,
+        'is_athlete': user.is_athlete,
+        'is_coach': user.is_coach,
+        'is_admin': user.is_admin,
+        'created_at': user.created_at.isoformat(),
+        'updated_at': user.updated_at.isoformat()
+    }
+
+
+def load_users(count):
+    created = datetime(2024, 1, 1)
+    db.session.add_all([
+        User(
+            id=f'00000000-0000-4000-8000-{i:012d}', email=f'user{i}@bench.local',
+            first_name='Bench', last_name=f'User{i}', nick_name=None,
+            date_of_birth=date(2000, 1, 1) + timedelta(days=i % 3650), sex='Other',
+            height=Decimal('1.800'), weight=Decimal('80.00'), is_athlete=True,
+            is_coach=False, is_admin=False, created_at=created + timedelta(minutes=i),
+            updated_at=created + timedelta(minutes=i)
+        )
+        for i in range(count)
+    ])
+    db.session.commit()
+    db.session.expunge_all()
+    return User.query.order_by(User.created_at).all()
+
+
+def schema_and_marshal(users):
+    schema = UserSchema()
+    return json.dumps([marshal(schema.dump(user), old_user_model) for user in users])
+
+
+def hand_written(users):
+    return json.dumps([legacy_to_dict(user) for user in users])
+
+
+def compiled(users):
+    return dumps(user_serializer.dump_many(users))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        users = load_users(args.users)
+        for label, fn in (
+            ('schema + marshal', schema_and_marshal),
+            ('hand-written to_dict', hand_written),
+            ('compiled serializer', compiled)
+        ):
+            elapsed = min(timed(fn, users)[1] for _ in range(args.repeats))
+            report(label, len(users), elapsed)
+
+
+if __name__ == '__main__':
+    main()
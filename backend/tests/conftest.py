@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+import pytest
+
+# Config reads the environment on import, so point it at a throwaway SQLite file first
+_db_dir = tempfile.mkdtemp(prefix='aiptrack-test-')
+os.environ['DATABASE_TEST_URL'] = f'sqlite:///{_db_dir}/test.db'
+os.environ.setdefault('METRICS_ENABLED', 'false')
+
+from app import create_app, db  # noqa: E402
+from app.services import synthetic  # noqa: E402
+
+PASSWORD = 'synthetic-password'
+
+
+@pytest.fixture(scope='session')
+def app():
+    """App on a SQLite database with a small synthetic data set"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        synthetic.generate(gyms=2, coaches=2, athletes=30, exercises=2, metrics=300, days=90, password=PASSWORD)
+    return app
+
+
+@pytest.fixture
+def login(client):
+    """Authorization headers for a user, given their email"""
+    def login(email):
+        response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+        assert response.status_code == 200, response.get_json()
+        return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+    return login
@@ -0,0 +1,101 @@
+import math
+from statistics import median
+
+import numpy as np
+import pytest
+
+from app.services import analytics
+
+SETTINGS = {'window': 3, 'trend_days': 30, 'plateau_tests': 3, 'threshold': 3.5}
+
+# (metric, athlete, sign, [(day, value), ...]), sorted by metric, athlete and day
+SERIES = [
+    # Ties the best twice without beating it: the plateau dates from the first 110
+    ('m1', 'a1', 1.0, [(1, 100), (5, 105), (9, 110), (14, 110), (20, 108), (27, 110), (33, 107)]),
+    # A single test
+    ('m1', 'a2', 1.0, [(12, 50)]),
+    # Lower is better, with one slow outlier
+    ('m2', 'a1', -1.0, [(2, 12.0), (6, 11.5), (10, 11.8), (15, 11.2), (19, 11.9), (26, 20.0)]),
+    # Median absolute deviation of zero: nothing is scored
+    ('m2', 'a3', -1.0, [(3, 10), (4, 10), (8, 10), (9, 10), (11, 10), (60, 15)]),
+    # Every test on one day: no trend
+    ('m3', 'a1', 1.0, [(40, 5), (40, 6), (40, 7)]),
+]
+
+
+def _expected(sign, tests):
+    days = [day for day, _ in tests]
+    values = [float(value) for _, value in tests]
+    n = len(values)
+    rolling = sum(values[-SETTINGS['window']:]) / len(values[-SETTINGS['window']:])
+
+    points = [(day - days[-1], value) for day, value in tests if day - days[-1] >= -SETTINGS['trend_days']]
+    k = len(points)
+    sx = sum(x for x, _ in points)
+    sy = sum(y for _, y in points)
+    denominator = k * sum(x * x for x, _ in points) - sx * sx
+    slope = progress = math.nan
+    if k >= 3 and denominator > 0:
+        slope = (k * sum(x * y for x, y in points) - sx * sy) / denominator
+        progress = slope * 30 * sign * 100 / abs(rolling)
+
+    best = last_best = None
+    for i, value in enumerate(values):
+        if best is None or value * sign > best:
+            best, last_best = value * sign, i
+
+    outliers = [False] * n
+    if n >= analytics.MIN_OUTLIER_SAMPLES:
+        middle = median(values)
+        mad = median(abs(value - middle) for value in values)
+        if mad > 0:
+            outliers = [analytics.MAD_SCALE * abs(value - middle) / mad > SETTINGS['threshold'] for value in values]
+
+    return {
+        'sample_count': n,
+        'first_day': days[0],
+        'last_day': days[-1],
+        'rolling_mean': rolling,
+        'slope_per_week': slope * 7,
+        'progress_pct': progress,
+        'plateau': n - 1 - last_best >= SETTINGS['plateau_tests'],
+        'plateau_since': days[last_best],
+        'outlier_count': sum(outliers),
+        'latest_is_outlier': outliers[-1]
+    }
+
+
+def test_analyze_matches_per_series_computation():
+    rows = [(metric, athlete, sign, day, value) for metric, athlete, sign, tests in SERIES for day, value in tests]
+    result = analytics.analyze(
+        metric_ids=np.array([row[0] for row in rows], dtype=object),
+        athlete_ids=np.array([row[1] for row in rows], dtype=object),
+        days=np.array([row[3] for row in rows], dtype=np.int64),
+        values=np.array([row[4] for row in rows], dtype=np.float64),
+        signs=np.array([row[2] for row in rows], dtype=np.float64),
+        **SETTINGS
+    )
+
+    assert list(zip(result['metric_ids'], result['athlete_ids'])) == [(m, a) for m, a, _, _ in SERIES]
+    for i, (metric, athlete, sign, tests) in enumerate(SERIES):
+        for name, expected in _expected(sign, tests).items():
+            actual = result[name][i]
+            if isinstance(expected, float) and math.isnan(expected):
+                assert math.isnan(actual), (metric, athlete, name)
+            else:
+                assert actual == pytest.approx(expected), (metric, athlete, name)
+
+
+def test_hand_built_series_cover_the_edge_cases():
+    expected = [_expected(sign, tests) for _, _, sign, tests in SERIES]
+    assert expected[0]['plateau'] and expected[0]['plateau_since'] == 9
+    assert expected[1]['sample_count'] == 1 and math.isnan(expected[1]['slope_per_week'])
+    assert expected[2]['latest_is_outlier'] and expected[2]['progress_pct'] < 0
+    assert expected[3]['outlier_count'] == 0
+    assert math.isnan(expected[4]['slope_per_week'])
+
+
+def test_analyze_without_rows():
+    empty = np.array([], dtype=object)
+    result = analytics.analyze(empty, empty, np.array([], dtype=np.int64), np.array([]), np.array([]), **SETTINGS)
+    assert result == {'metric_ids': [], 'athlete_ids': []}
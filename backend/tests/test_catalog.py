@@ -0,0 +1,103 @@
+import pytest
+
+from app import db
+from app.models.exercise import Exercise, ExerciseBodySegment, ExerciseEquipment, ExerciseSearchTerm
+from app.models.user import User
+from app.services import catalog
+
+
+@pytest.fixture
+def exercises(app):
+    """Two coaches' IDs and exercises named for the test, by label"""
+    with app.app_context():
+        mine, theirs = db.session.scalars(db.select(User.id).where(User.is_coach).order_by(User.email).limit(2))
+        created = {
+            'system': Exercise(name='Zorblax Press', category='system'),
+            'mine': Exercise(name='Zorblax Press', category='custom', creator_id=mine),
+            'theirs': Exercise(name='Zorblax Press', category='custom', creator_id=theirs),
+            'named': Exercise(
+                name='Quintar Row', category='system',
+                equipment=[ExerciseEquipment(name='Kettlebell')],
+                body_segments=[ExerciseBodySegment(name='Upper Body')]
+            ),
+            'termed': Exercise(
+                name='Bent Pull', category='system',
+                search_terms=[ExerciseSearchTerm(name='quintar')],
+                equipment=[ExerciseEquipment(name='Barbell')],
+                body_segments=[ExerciseBodySegment(name='Upper Body')]
+            ),
+        }
+        db.session.add_all(created.values())
+        db.session.commit()
+        ids = {label: exercise.id for label, exercise in created.items()}
+        yield mine, ids
+        db.session.rollback()
+        for exercise_id in ids.values():
+            exercise = db.session.get(Exercise, exercise_id)
+            if exercise is not None:
+                db.session.delete(exercise)
+        db.session.commit()
+
+
+def _ids(query, **kwargs):
+    entries, total = catalog.search(query, **kwargs)
+    assert total == len(entries)
+    return [entry.id for entry in entries]
+
+
+def test_prefix_and_multi_word_matching(exercises):
+    _, ids = exercises
+    zorblax = {ids['system'], ids['mine'], ids['theirs']}
+    assert set(_ids('zorb')) == zorblax
+    assert set(_ids('ZORBLAX pr')) == zorblax
+    assert _ids('zorblax row') == []
+
+
+def test_misspelled_words_match_fuzzily(exercises):
+    _, ids = exercises
+    assert set(_ids('zorblux')) == {ids['system'], ids['mine'], ids['theirs']}
+    assert _ids('qxzv') == []
+
+
+def test_own_custom_exercises_rank_before_system_and_others(exercises):
+    mine, ids = exercises
+    assert _ids('zorblax', user_id=mine) == [ids['mine'], ids['system'], ids['theirs']]
+    # Without a caller, custom exercises all rank after system ones
+    assert _ids('zorblax')[0] == ids['system']
+
+
+def test_name_matches_outrank_search_terms(exercises):
+    _, ids = exercises
+    assert _ids('quintar') == [ids['named'], ids['termed']]
+
+
+def test_equipment_and_body_segment_filters(exercises):
+    _, ids = exercises
+    assert _ids('quintar', equipment='kettlebell') == [ids['named']]
+    assert _ids('', equipment='  BARBELL ', body_segment='upper-body') == [ids['termed']]
+    assert set(_ids('', body_segment='Upper Body')) >= {ids['named'], ids['termed']}
+    assert _ids('quintar', equipment='Treadmill') == []
+    facets = catalog.get_index().facets()
+    assert {'kettlebell', 'barbell'} <= set(facets['equipment'])
+
+
+def test_changes_are_applied_incrementally(app, exercises):
+    _, ids = exercises
+    assert set(_ids('zorblax')) == {ids['system'], ids['mine'], ids['theirs']}
+    index = catalog.get_index()
+    built_at = index.built_at
+
+    exercise = db.session.get(Exercise, ids['theirs'])
+    exercise.name = 'Vantrix Carry'
+    exercise.equipment.append(ExerciseEquipment(name='Farmer Handles'))
+    db.session.commit()
+
+    assert _ids('vantrix') == [ids['theirs']]
+    assert ids['theirs'] not in _ids('zorblax')
+    assert _ids('', equipment='farmer handles') == [ids['theirs']]
+
+    db.session.delete(db.session.get(Exercise, ids['system']))
+    db.session.commit()
+    assert set(_ids('zorblax')) == {ids['mine']}
+    # Reloaded in place, not rebuilt
+    assert catalog.get_index().built_at == built_at
@@ -0,0 +1,100 @@
+import gzip
+import json
+
+import brotli
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.user import User
+
+USERS = '/api/users/?per_page=50'
+
+
+@pytest.fixture
+def headers(app, login):
+    with app.app_context():
+        return login(db.session.scalar(db.select(User.email).where(User.is_coach).order_by(User.email)))
+
+
+def _get(client, url, headers, **extra):
+    return client.get(url, headers={**headers, **extra})
+
+
+@pytest.mark.parametrize('accept, encoding, decompress', [
+    ('gzip, deflate, br', 'br', brotli.decompress),
+    ('br;q=0.5, gzip', 'gzip', gzip.decompress),
+    ('gzip', 'gzip', gzip.decompress),
+])
+def test_negotiated_encoding(client, headers, accept, encoding, decompress):
+    plain = _get(client, USERS, headers)
+    assert 'Content-Encoding' not in plain.headers and len(plain.get_data()) >= 1024
+
+    response = _get(client, USERS, headers, **{'Accept-Encoding': accept})
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(response.get_data()) < len(plain.get_data())
+    assert json.loads(decompress(response.get_data())) == plain.get_json()
+
+
+def test_small_refused_and_streamed_bodies_are_not_compressed(app, client, headers, monkeypatch):
+    small = _get(client, '/api/users/?per_page=1', headers, **{'Accept-Encoding': 'gzip'})
+    assert len(small.get_data()) < 1024 and 'Content-Encoding' not in small.headers
+    assert 'Content-Encoding' not in _get(client, USERS, headers, **{'Accept-Encoding': 'identity'}).headers
+    assert 'Content-Encoding' not in _get(client, USERS, headers, **{'Accept-Encoding': 'gzip;q=0'}).headers
+
+    streamed = _get(client, '/api/users/?stream=true', headers, **{'Accept-Encoding': 'gzip'})
+    assert streamed.is_streamed and 'Content-Encoding' not in streamed.headers
+    assert streamed.get_json()['data']
+
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', 10 ** 7)
+    assert 'Content-Encoding' not in _get(client, USERS, headers, **{'Accept-Encoding': 'gzip'}).headers
+
+
+@pytest.mark.parametrize('url', [USERS, '/api/exercises/?per_page=50'])
+def test_compressed_responses_have_weak_etags_that_revalidate(app, client, headers, monkeypatch, url):
+    # The synthetic catalog is small
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', 256)
+    plain = _get(client, url, headers)
+    assert not plain.headers['ETag'].startswith('W/')
+
+    response = _get(client, url, headers, **{'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert etag == f'W/{plain.headers["ETag"]}'
+
+    again = _get(client, url, headers, **{'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304 and again.get_data() == b''
+
+
+def test_fields_narrow_the_payload_and_the_columns_loaded(app, client, headers):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'FROM users' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = _get(client, '/api/users/?per_page=5&fields=last_name,id', headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    assert [set(user) for user in response.get_json()['data']] == [{'id', 'last_name'}] * 5
+
+    listing = statements[-1]
+    select_list = listing.split(' FROM users')[0]
+    assert 'users.last_name' in select_list and 'users.id' in select_list
+    for column in ('users.email', 'users.first_name', 'users.password_hash'):
+        assert column not in select_list
+
+
+def test_unknown_fields_are_rejected(client, headers):
+    response = _get(client, '/api/users/?fields=id,password_hash', headers)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['error'] == 'Unknown fields: password_hash'
+    assert 'id' in body['details']['fields'] and 'password_hash' not in body['details']['fields']
+    assert _get(client, '/api/exercises/?fields=nope', headers).status_code == 400
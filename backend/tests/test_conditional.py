@@ -0,0 +1,40 @@
+from app import db
+from app.models.user import User
+
+
+def _emails(app):
+    with app.app_context():
+        coach = db.session.execute(db.select(User.id, User.email).where(User.is_coach).order_by(User.email)).first()
+        athlete = db.session.scalar(db.select(User.email).where(User.is_athlete).order_by(User.email))
+    return coach, athlete
+
+
+def test_roster_revalidates_for_its_coach(app, client, login):
+    (coach_id, coach_email), _ = _emails(app)
+    headers = login(coach_email)
+    response = client.get(f'/api/users/{coach_id}/roster', headers=headers)
+    assert response.status_code == 200
+
+    again = client.get(f'/api/users/{coach_id}/roster', headers={**headers, 'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_roster_validators_do_not_bypass_access(app, client, login):
+    (coach_id, _), athlete_email = _emails(app)
+    headers = {**login(athlete_email), 'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}
+    assert client.get(f'/api/users/{coach_id}/roster', headers=headers).status_code == 403
+
+
+def test_user_profile_outside_scope_is_denied(app, client, login):
+    (coach_id, _), athlete_email = _emails(app)
+    headers = login(athlete_email)
+    assert client.get(f'/api/users/{coach_id}', headers=headers).status_code == 403
+    revalidate = {**headers, 'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'}
+    assert client.get(f'/api/users/{coach_id}', headers=revalidate).status_code == 403
+
+
+def test_user_profile_for_self(app, client, login):
+    (coach_id, coach_email), _ = _emails(app)
+    response = client.get(f'/api/users/{coach_id}', headers=login(coach_email))
+    assert response.status_code == 200
+    assert response.get_json()['id'] == coach_id
@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models.user import User, UserCoachRelationship
+from app.services import dashboard
+
+
+@pytest.fixture
+def coach(app):
+    """A coach's ID, email and one of their athletes' IDs, with an empty widget cache"""
+    dashboard.invalidate_all()
+    with app.app_context():
+        link = db.session.scalar(db.select(UserCoachRelationship).order_by(UserCoachRelationship.id).limit(1))
+        return link.coach_id, db.session.get(User, link.coach_id).email, link.athlete_id
+
+
+def _timings(response):
+    """Source per widget from the Server-Timing header"""
+    timings = {}
+    for entry in response.headers['Server-Timing'].split(', '):
+        name, duration, source = entry.split(';')
+        assert duration.startswith('dur=')
+        timings[name] = source.split('=', 1)[1].strip('"')
+    return timings
+
+
+def test_widgets_are_cached_until_an_athlete_changes(app, client, login, coach):
+    coach_id, email, athlete_id = coach
+    headers = login(email)
+    url = f'/api/users/{coach_id}/dashboard'
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert _timings(first) == {name: 'db' for name in dashboard.WIDGETS}
+
+    again = client.get(url, headers=headers)
+    assert _timings(again) == {name: 'cache' for name in dashboard.WIDGETS}
+    assert again.get_json() == first.get_json()
+
+    with app.app_context():
+        athlete = db.session.get(User, athlete_id)
+        last_tested = athlete.last_tested
+        athlete.last_tested = date.today()
+        db.session.commit()
+    try:
+        after = client.get(url, headers=headers)
+        assert _timings(after) == {name: 'db' for name in dashboard.WIDGETS}
+        recent = after.get_json()['widgets']['recent_tests']
+        assert recent[0]['id'] == athlete_id and recent[0]['last_tested'] == date.today().isoformat()
+    finally:
+        with app.app_context():
+            db.session.get(User, athlete_id).last_tested = last_tested
+            db.session.commit()
+
+
+def test_slow_widget_times_out_once_and_caches_its_late_result(app, client, login, coach, monkeypatch):
+    coach_id, email, _ = coach
+    release = threading.Event()
+    calls = []
+
+    def slow(scope, options):
+        calls.append(scope.user_id)
+        release.wait(10)
+        return {'slow': True}
+
+    monkeypatch.setitem(dashboard.WIDGETS, 'slow', slow)
+    monkeypatch.setitem(app.config, 'DASHBOARD_WIDGET_TIMEOUT', 0.2)
+    monkeypatch.setitem(app.config, 'DASHBOARD_CONCURRENCY', 3)
+    headers = login(email)
+    url = f'/api/users/{coach_id}/dashboard?widgets=slow,roster'
+    try:
+        first = client.get(url, headers=headers)
+        assert first.status_code == 200
+        assert first.get_json()['widgets']['slow'] == {'error': 'Widget timed out'}
+        assert _timings(first) == {'slow': 'timeout', 'roster': 'db'}
+
+        # Still running: joined, not started again
+        again = client.get(url, headers=headers)
+        assert _timings(again) == {'slow': 'timeout', 'roster': 'cache'}
+        assert len(calls) == 1
+    finally:
+        release.set()
+
+    deadline = time.monotonic() + 5
+    while dashboard._inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    late = client.get(url, headers=headers)
+    assert late.get_json()['widgets']['slow'] == {'slow': True}
+    assert _timings(late) == {'slow': 'cache', 'roster': 'cache'}
+    assert len(calls) == 1
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+
+from app import db
+from app.models.gym import Gym
+from app.models.metric import PerformanceMetric
+from app.models.user import User
+from app.services.access import get_scope
+from app.services.exports import COLUMNS
+
+
+def _users(app):
+    """(id, email, visible athlete IDs, a gym outside the scope) for a coach and an athlete"""
+    with app.app_context():
+        users = []
+        for role in (User.is_coach, User.is_athlete):
+            user = db.session.scalar(db.select(User).where(role).order_by(User.email).limit(1))
+            scope = get_scope(user.id)
+            hidden_gym = db.session.scalar(db.select(Gym.id).where(Gym.id.not_in(scope.gym_ids)).limit(1))
+            users.append((user.id, user.email, scope.athlete_ids, hidden_gym))
+        return users
+
+
+def _expected(app, athlete_ids):
+    """IDs and athlete emails of the results of the given athletes"""
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(PerformanceMetric.id, User.email)
+            .join(User, User.id == PerformanceMetric.athlete_id)
+            .where(PerformanceMetric.athlete_id.in_(athlete_ids))
+        ).all()
+        total = db.session.scalar(db.select(db.func.count()).select_from(PerformanceMetric))
+    return dict(rows), total
+
+
+def _csv(body):
+    reader = csv.DictReader(io.StringIO(body.decode()))
+    assert tuple(reader.fieldnames) == COLUMNS
+    return list(reader)
+
+
+def test_exports_only_contain_the_callers_scope(app, client, login):
+    for user_id, email, athlete_ids, _ in _users(app):
+        expected, total = _expected(app, athlete_ids)
+        assert 0 < len(expected) < total
+
+        response = client.get('/api/metrics/export', headers=login(email))
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = _csv(response.get_data())
+        assert {row['id']: row['email'] for row in rows} == expected
+        assert len(rows) == len(expected)
+        assert {row['athlete_id'] for row in rows} <= athlete_ids
+
+
+def test_filters_outside_the_scope_are_denied(app, client, login):
+    (coach_id, _, _, _), (athlete_id, athlete_email, visible, hidden_gym) = _users(app)
+    with app.app_context():
+        hidden_athlete = db.session.scalar(
+            db.select(User.id).where(User.is_athlete, User.id.not_in(visible)).limit(1)
+        )
+    headers = login(athlete_email)
+    for query in ({'athlete_id': hidden_athlete}, {'athlete_id': coach_id}, {'gym_id': hidden_gym}):
+        assert client.get('/api/metrics/export', query_string=query, headers=headers).status_code == 403, query
+    assert client.get(
+        '/api/metrics/export', query_string={'athlete_id': athlete_id}, headers=headers
+    ).status_code == 200
+
+
+def test_gzip_and_ndjson_exports(app, client, login):
+    _, email, athlete_ids, _ = _users(app)[0]
+    headers = login(email)
+    plain = client.get('/api/metrics/export', headers=headers).get_data()
+
+    compressed = client.get('/api/metrics/export', query_string={'gzip': 'true'}, headers=headers)
+    assert compressed.mimetype == 'application/gzip'
+    assert compressed.headers['Content-Disposition'].endswith('.csv.gz')
+    assert gzip.decompress(compressed.get_data()) == plain
+
+    ndjson = client.get('/api/metrics/export', query_string={'format': 'ndjson'}, headers=headers)
+    assert ndjson.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in ndjson.get_data().splitlines()]
+    assert all(tuple(line) == COLUMNS for line in lines)
+    by_id = {row['id']: row for row in _csv(plain)}
+    assert sorted(by_id) == sorted(line['id'] for line in lines)
+    for line in lines:
+        row = by_id[line['id']]
+        assert (line['athlete_id'], line['email'], line['date']) == (row['athlete_id'], row['email'], row['date'])
+        assert line['athlete_id'] in athlete_ids
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import mysql
+
+from app import db
+from app.services import id_migration
+
+
+class _Inspector:
+    """Reflection of a MariaDB schema: column types by (table, column), and the foreign keys left"""
+
+    def __init__(self, types, foreign_keys):
+        self.types, self.foreign_keys = types, foreign_keys
+
+    def get_table_names(self):
+        return [table.name for table in db.metadata.sorted_tables]
+
+    def get_columns(self, name):
+        return [
+            {'name': column.name, 'type': self.types.get((name, column.name), 'BINARY(16)')}
+            for column in db.metadata.tables[name].columns
+        ]
+
+    def get_foreign_keys(self, name):
+        return [fk for table, fk in self.foreign_keys if table == name]
+
+
+def _statements(monkeypatch, types, foreign_keys):
+    monkeypatch.setattr(id_migration, 'inspect', lambda engine: _Inspector(types, foreign_keys))
+    return id_migration.conversion_statements(SimpleNamespace(dialect=mysql.dialect()))
+
+
+def _live_foreign_keys():
+    return [
+        (name, {'name': f'{name}_ibfk_{i}', 'constrained_columns': list(columns),
+                'referred_table': referred, 'referred_columns': list(referred_columns)})
+        for i, ((name, columns, referred, referred_columns), _) in enumerate(id_migration._model_foreign_keys())
+    ]
+
+
+def test_converted_schema_has_nothing_pending(app, monkeypatch):
+    with app.app_context():
+        assert _statements(monkeypatch, {}, _live_foreign_keys()) == []
+
+
+def test_rerun_after_failure_resumes_columns_and_recreates_dropped_keys(app, monkeypatch):
+    with app.app_context():
+        # A failed run: every foreign key dropped, one column widened but not shrunk, one not started
+        types = {('performance_metrics', 'athlete_id'): 'VARBINARY(36)', ('cohorts', 'coach_id'): 'VARCHAR(36)'}
+        statements = _statements(monkeypatch, types, [])
+
+        assert statements[0] == 'SET FOREIGN_KEY_CHECKS = 0' and statements[-1] == 'SET FOREIGN_KEY_CHECKS = 1'
+        assert not any('DROP FOREIGN KEY' in s for s in statements)
+        converted = [s for s in statements if s.startswith(('ALTER TABLE', 'UPDATE')) and 'FOREIGN KEY' not in s]
+        assert len(converted) == 6
+        assert "UPDATE performance_metrics SET athlete_id = IF(LENGTH(athlete_id) = 36" in converted[4]
+        added = [s for s in statements if 'ADD FOREIGN KEY' in s]
+        assert len(added) == len(id_migration._model_foreign_keys())
+        assert (
+            'ALTER TABLE user_gym_relationships ADD FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE'
+            in added
+        )
+
+
+def test_keys_on_pending_columns_are_dropped_and_recreated(app, monkeypatch):
+    with app.app_context():
+        live = _live_foreign_keys()
+        statements = _statements(monkeypatch, {('users', 'id'): 'VARCHAR(36)'}, live)
+        referencing = [fk['name'] for _, fk in live if fk['referred_table'] == 'users']
+        dropped = [s.rsplit(' ', 1)[1] for s in statements if 'DROP FOREIGN KEY' in s]
+        assert sorted(dropped) == sorted(referencing)
+        assert len([s for s in statements if 'ADD FOREIGN KEY' in s]) == len(referencing)
@@ -0,0 +1,108 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app import db
+from app.models.job import Job
+from app.models.user import User
+from app.services import images, jobs
+from app.services.storage import LocalStorage
+
+
+@pytest.fixture
+def storage(app, monkeypatch, tmp_path):
+    """Local storage in a temporary directory; queued variant jobs are dropped afterwards"""
+    storage = LocalStorage(str(tmp_path), '/uploads')
+    monkeypatch.setitem(app.extensions, 'storage', storage)
+    monkeypatch.setitem(app.config, 'IMAGE_PROCESSES', 1)
+    yield storage
+    images.close()
+    with app.app_context():
+        db.session.execute(db.delete(Job).where(Job.kind == images.VARIANTS_JOB))
+        db.session.commit()
+
+
+def _png(size=(800, 600), color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _staged(storage):
+    staging = os.path.join(storage.root, '.staging')
+    return os.listdir(staging) if os.path.isdir(staging) else []
+
+
+def test_oversized_and_non_image_bodies_are_rejected(app, storage):
+    with app.app_context():
+        with pytest.raises(images.UploadRejected, match='larger than'):
+            images.store_image(io.BytesIO(_png()), max_bytes=100)
+        with pytest.raises(images.UploadRejected, match='Unsupported image type'):
+            # Sniffed from the bytes: a PDF named and typed as an image is still a PDF
+            images.store_image(io.BytesIO(b'%PDF-1.7\n' + b'0' * 1000))
+        with pytest.raises(images.UploadRejected, match='Empty'):
+            images.store_image(io.BytesIO(b''))
+        assert _staged(storage) == []
+        assert not os.path.exists(os.path.join(storage.root, 'images'))
+
+
+def test_same_bytes_are_stored_once(app, storage):
+    body = _png(color=(10, 20, 30))
+    with app.app_context():
+        key, created = images.store_image(io.BytesIO(body))
+        assert created and key.startswith('images/') and key.endswith('.png')
+        assert images.store_image(io.BytesIO(body)) == (key, False)
+        with open(storage.path(key), 'rb') as f:
+            assert f.read() == body
+        assert _staged(storage) == []
+
+
+def test_keys_cannot_leave_the_storage_root(storage):
+    for key in ('../outside.png', 'images/../../outside.png', '/etc/passwd'):
+        with pytest.raises(ValueError):
+            storage.path(key)
+
+
+def test_worker_renders_both_variants(app, storage):
+    with app.app_context():
+        key, _ = images.store_image(io.BytesIO(_png(size=(1000, 400))))
+        db.session.commit()
+        assert jobs.run_batch(images.VARIANTS_JOB, 'worker-1') == 1
+        assert not db.session.scalars(db.select(Job).where(Job.kind == images.VARIANTS_JOB)).all()
+        for name, size in images.VARIANTS.items():
+            path = storage.path(images.variant_key(key, name))
+            with open(path, 'rb') as f:
+                assert images.sniff(f.read(images.HEADER_SIZE)) == ('webp', 'image/webp')
+            with Image.open(path) as variant:
+                assert max(variant.size) == size and abs(variant.size[0] / variant.size[1] - 2.5) < 0.05
+
+        # Variants exist, so storing the same bytes again queues nothing
+        images.store_image(io.BytesIO(_png(size=(1000, 400))))
+        assert not db.session.new and not db.session.scalars(
+            db.select(Job).where(Job.kind == images.VARIANTS_JOB)
+        ).all()
+
+
+def test_profile_image_only_for_the_user_themselves(app, client, login, storage):
+    with app.app_context():
+        first, second = db.session.execute(
+            db.select(User.id, User.email).where(User.is_athlete).order_by(User.email).limit(2)
+        ).all()
+        before = db.session.get(User, second.id).profile_image_url
+    headers = {**login(first.email), 'Content-Type': 'image/png'}
+    body = _png(color=(1, 2, 3))
+
+    assert client.put(f'/api/users/{second.id}/image', data=body, headers=headers).status_code == 403
+    with app.app_context():
+        assert db.session.get(User, second.id).profile_image_url == before
+    assert not os.path.exists(os.path.join(storage.root, 'images'))
+
+    response = client.put(f'/api/users/{first.id}/image', data=body, headers=headers)
+    assert response.status_code == 200
+    with app.app_context():
+        user = db.session.get(User, first.id)
+        assert user.profile_image_url == response.get_json()['url'] == storage.url(response.get_json()['key'])
+        user.profile_image_url = None
+        db.session.commit()
@@ -0,0 +1,104 @@
+import io
+import json
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models.exercise import Exercise, ExerciseMetric
+from app.models.metric import MetricImport, PerformanceMetric
+from app.models.user import User, UserCoachRelationship
+from app.services import imports, rollups
+
+IMPORT_DATE = date(2023, 3, 1)
+
+
+def _file(app):
+    """A coach's ID and email, their gym, and a four-row CSV for their athletes"""
+    with app.app_context():
+        link = db.session.scalar(db.select(UserCoachRelationship).order_by(UserCoachRelationship.id).limit(1))
+        athletes = db.session.scalars(
+            db.select(User.email).join(UserCoachRelationship, UserCoachRelationship.athlete_id == User.id)
+            .where(UserCoachRelationship.coach_id == link.coach_id, UserCoachRelationship.gym_id == link.gym_id)
+            .order_by(User.email).limit(4)
+        ).all()
+        metric, exercise = db.session.execute(
+            db.select(ExerciseMetric, Exercise.name).join(Exercise)
+            .where(ExerciseMetric.is_enabled, Exercise.category == 'system').limit(1)
+        ).one()
+        lines = ['email,exercise,metric,value,date'] + [
+            f'{email},{exercise},{metric.name},{metric.max_value},{IMPORT_DATE.isoformat()}' for email in athletes
+        ]
+        coach = db.session.get(User, link.coach_id)
+        return coach.id, coach.email, link.gym_id, '\n'.join(lines) + '\n'
+
+
+def _upload(client, headers, csv, **form):
+    data = {'file': (io.BytesIO(csv.encode()), 'results.csv'), **form}
+    return client.post('/api/metrics/imports', data=data, headers=headers, content_type='multipart/form-data')
+
+
+def _events(response):
+    return [json.loads(line) for line in response.get_data().splitlines()]
+
+
+def _cleanup(app, import_id):
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(PerformanceMetric.athlete_id, PerformanceMetric.exercise_metric_id)
+            .where(PerformanceMetric.date == IMPORT_DATE)
+        ).all()
+        db.session.execute(db.delete(PerformanceMetric).where(PerformanceMetric.date == IMPORT_DATE))
+        rollups.recompute(set(rows))
+        db.session.delete(db.session.get(MetricImport, import_id))
+        db.session.commit()
+
+
+def test_interrupted_import_resumes_after_the_committed_rows(app, client, login):
+    coach_id, email, gym_id, csv = _file(app)
+    with app.app_context():
+        job = imports.start_import(gym_id, coach_id)
+        import_id = job.id
+        columns, reader = imports.open_rows(io.StringIO(csv))
+        progress = imports.run_import(job, columns, reader, batch_size=2)
+        assert next(event for event in progress if event['type'] == 'progress')['rows_read'] == 2
+        # As when the client disconnects mid-stream
+        progress.close()
+        job = db.session.get(MetricImport, import_id)
+        assert (job.status, job.message, job.rows_read) == ('failed', imports.INTERRUPTED, 2)
+
+    try:
+        response = _upload(client, login(email), csv, import_id=import_id)
+        assert response.status_code == 200, response.get_json()
+        events = _events(response)
+        assert events[0] == {'type': 'started', 'import_id': import_id, 'rows_read': 2}
+        assert events[-1]['type'] == 'done'
+        assert (events[-1]['rows_read'], events[-1]['inserted']) == (4, 4)
+        with app.app_context():
+            count = db.session.scalar(
+                db.select(db.func.count()).select_from(PerformanceMetric).where(PerformanceMetric.date == IMPORT_DATE)
+            )
+            assert count == 4
+    finally:
+        _cleanup(app, import_id)
+
+
+def test_running_import_cannot_be_resumed_until_stale(app, client, login):
+    coach_id, email, gym_id, csv = _file(app)
+    with app.app_context():
+        import_id = imports.start_import(gym_id, coach_id).id
+
+    try:
+        headers = login(email)
+        response = _upload(client, headers, csv, import_id=import_id)
+        assert response.status_code == 409
+        with app.app_context():
+            job = db.session.get(MetricImport, import_id)
+            assert (job.status, job.rows_read) == ('running', 0)
+            # Its run died without a batch for longer than IMPORT_STALE_AFTER
+            job.updated_at = datetime.utcnow() - timedelta(seconds=app.config['IMPORT_STALE_AFTER'] + 1)
+            db.session.commit()
+
+        response = _upload(client, headers, csv, import_id=import_id)
+        assert response.status_code == 200
+        assert _events(response)[-1]['inserted'] == 4
+    finally:
+        _cleanup(app, import_id)
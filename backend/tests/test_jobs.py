@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.job import Job
+from app.services import jobs
+
+KIND = 'test.job'
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    """A registered test kind whose handler fails every job with the given error"""
+    errors = {}
+    monkeypatch.setitem(jobs.HANDLERS, KIND, (lambda batch: {job.id: errors['error'] for job in batch}, 10, False))
+    monkeypatch.setitem(app.config, 'JOB_RETRY_DELAY', 30)
+    monkeypatch.setitem(app.config, 'JOB_RETRY_MAX_DELAY', 100)
+    monkeypatch.setitem(app.config, 'JOB_MAX_ATTEMPTS', 3)
+    with app.app_context():
+        yield errors
+        db.session.rollback()
+        db.session.execute(db.delete(Job).where(Job.kind == KIND))
+        db.session.commit()
+
+
+def _job():
+    return db.session.scalars(db.select(Job).where(Job.kind == KIND)).one()
+
+
+def test_failed_jobs_back_off_then_fail(queue):
+    queue['error'] = RuntimeError('SMTP unavailable')
+    jobs.enqueue(KIND, [{'n': 1}])
+    db.session.commit()
+
+    start = datetime.utcnow()
+    assert jobs.run_batch(KIND, 'worker-1') == 1
+    job = _job()
+    assert (job.status, job.attempts, job.locked_by) == ('queued', 1, None)
+    assert 'SMTP unavailable' in job.last_error
+    # JOB_RETRY_DELAY with jitter
+    assert start + timedelta(seconds=15) <= job.run_at <= datetime.utcnow() + timedelta(seconds=30)
+    assert jobs.run_batch(KIND, 'worker-1') == 0
+
+    for attempts in (2, 3):
+        job.run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert jobs.run_batch(KIND, 'worker-1') == 1
+        job = _job()
+        assert job.attempts == attempts
+    # JOB_MAX_ATTEMPTS reached: kept for inspection, no longer claimed
+    assert job.status == 'failed'
+    assert jobs.run_batch(KIND, 'worker-1') == 0
+
+
+def test_retry_delay_doubles_up_to_the_maximum(queue):
+    assert 15 <= jobs.retry_delay(1) <= 30
+    assert 30 <= jobs.retry_delay(2) <= 60
+    assert 50 <= jobs.retry_delay(3) <= 100
+    assert 50 <= jobs.retry_delay(10) <= 100
+
+
+def test_permanent_errors_are_not_retried(queue):
+    queue['error'] = jobs.PermanentError('550 mailbox unavailable')
+    jobs.enqueue(KIND, [{'n': 1}])
+    db.session.commit()
+    jobs.run_batch(KIND, 'worker-1')
+    job = _job()
+    assert (job.status, job.attempts) == ('failed', 1)
+
+
+def test_claim_takes_over_stale_locks_only(app, queue):
+    now = datetime.utcnow()
+    timeout = timedelta(seconds=app.config['JOB_LOCK_TIMEOUT'])
+    db.session.add_all([
+        Job(kind=KIND, payload={'n': 'stale'}, status='running', attempts=1, run_at=now - timeout,
+            locked_by='crashed', locked_at=now - timeout - timedelta(seconds=1)),
+        Job(kind=KIND, payload={'n': 'held'}, status='running', attempts=1, run_at=now,
+            locked_by='alive', locked_at=now),
+        Job(kind=KIND, payload={'n': 'later'}, status='queued', run_at=now + timedelta(minutes=5))
+    ])
+    db.session.commit()
+
+    claimed = jobs.claim(KIND, 10, 'worker-2')
+    assert [job.payload for job in claimed] == [{'n': 'stale'}]
+    assert (claimed[0].status, claimed[0].locked_by, claimed[0].attempts) == ('running', 'worker-2', 2)
+    assert jobs.claim(KIND, 10, 'worker-3') == []
@@ -0,0 +1,168 @@
+import smtplib
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models.exercise import ExerciseMetric
+from app.models.job import Job
+from app.models.metric import PerformanceMetric
+from app.models.notification import NotificationPreference, ResponsibleParty
+from app.models.user import User, UserCoachRelationship
+from app.services import jobs, mailer, notifications
+from app.services.notifications import DIGEST, RESULTS
+
+
+class _Server:
+    """In-process SMTP stand-in: accepted messages, and scripted refusals and hang-ups"""
+
+    def __init__(self):
+        self.outbox = []
+        self.connections = 0
+        # address -> SMTP reply code
+        self.refuse = {}
+        # one entry per send attempt; True drops the connection instead of sending
+        self.hangups = []
+
+    def connect(self, host, port, timeout=None):
+        self.connections += 1
+        return _Connection(self)
+
+
+class _Connection:
+    def __init__(self, server):
+        self.server = server
+
+    def send_message(self, message):
+        if self.server.hangups and self.server.hangups.pop(0):
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        code = self.server.refuse.get(message['To'])
+        if code:
+            raise smtplib.SMTPRecipientsRefused({message['To']: (code, b'Mailbox unavailable')})
+        self.server.outbox.append(message)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = _Server()
+    monkeypatch.setattr(mailer.smtplib, 'SMTP', server.connect)
+    monkeypatch.setattr(notifications, '_mailer', None)
+    return server
+
+
+def _messages(sender, *addresses):
+    return [sender.message(address, 'Results', 'New results') for address in addresses]
+
+
+def test_send_many_reconnects_once_after_a_disconnect(server):
+    sender = mailer.Mailer()
+    assert sender.send_many(_messages(sender, 'a@example.com')) == {}
+    # The server dropped the idle connection: the next send reconnects and goes through
+    server.hangups = [True]
+    assert sender.send_many(_messages(sender, 'b@example.com', 'c@example.com')) == {}
+    assert [message['To'] for message in server.outbox] == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert server.connections == sender.connections == 2
+
+
+def test_send_many_fails_the_rest_when_the_connection_drops(server):
+    sender = mailer.Mailer()
+    server.hangups = [False, True, True]
+    failures = sender.send_many(_messages(sender, 'a@example.com', 'b@example.com', 'c@example.com'))
+    assert sorted(failures) == [1, 2]
+    assert all(isinstance(error, smtplib.SMTPServerDisconnected) for error in failures.values())
+    assert [message['To'] for message in server.outbox] == ['a@example.com']
+
+
+def test_send_many_continues_after_a_rejection(server):
+    sender = mailer.Mailer()
+    server.refuse = {'b@example.com': 550}
+    failures = sender.send_many(_messages(sender, 'a@example.com', 'b@example.com', 'c@example.com'))
+    assert list(failures) == [1] and mailer.is_permanent(failures[1])
+    assert [message['To'] for message in server.outbox] == ['a@example.com', 'c@example.com']
+    assert server.connections == 1
+
+
+def test_rejected_digests_fail_without_retry(app, server):
+    server.refuse = {'gone@example.com': 550, 'full@example.com': 452}
+    digests = [
+        {'to': address, 'name': 'Sam', 'athletes': [{'name': 'Sam Lee', 'results': []}]}
+        for address in ('ok@example.com', 'gone@example.com', 'full@example.com')
+    ]
+    with app.app_context():
+        try:
+            jobs.enqueue(DIGEST, digests)
+            db.session.commit()
+            assert jobs.run_batch(DIGEST, 'worker-1') == 3
+
+            left = {job.payload['to']: job for job in db.session.scalars(db.select(Job).where(Job.kind == DIGEST))}
+            assert sorted(left) == ['full@example.com', 'gone@example.com']
+            assert left['gone@example.com'].status == 'failed'
+            assert 'PermanentError' in left['gone@example.com'].last_error
+            # A temporary (4xx) refusal is retried
+            assert left['full@example.com'].status == 'queued'
+            assert [message['To'] for message in server.outbox] == ['ok@example.com']
+        finally:
+            db.session.execute(db.delete(Job).where(Job.kind == DIGEST))
+            db.session.commit()
+
+
+def test_build_digests_coalesces_by_recipient(app, server):
+    with app.app_context():
+        link = db.session.scalar(db.select(UserCoachRelationship).order_by(UserCoachRelationship.id).limit(1))
+        metric = db.session.scalar(db.select(ExerciseMetric).limit(1))
+        athlete = User(email='Digest-Athlete@example.com', first_name='Ann', last_name='Digest', is_athlete=True)
+        opted_out = User(email='digest-quiet@example.com', first_name='Bo', last_name='Digest', is_athlete=True)
+        db.session.add_all([athlete, opted_out])
+        db.session.flush()
+        added = [
+            NotificationPreference(user_id=opted_out.id, performance_updates=False),
+            # One parent of both athletes, entered with two spellings of the address
+            ResponsibleParty(athlete_id=athlete.id, email='Parent@example.com', first_name='Pat', last_name='Digest'),
+            ResponsibleParty(athlete_id=opted_out.id, email='parent@EXAMPLE.com ', first_name='Pat',
+                             last_name='Digest'),
+        ]
+        results = [
+            PerformanceMetric(athlete_id=user.id, exercise_id=metric.exercise_id, exercise_metric_id=metric.id,
+                              coach_id=link.coach_id, gym_id=link.gym_id, value=10, date=date(2024, 5, day))
+            for user, day in ((athlete, 1), (athlete, 8), (opted_out, 1))
+        ]
+        db.session.add_all(added + results)
+        db.session.flush()
+        try:
+            # Two sessions for the first athlete, one for the second
+            jobs.enqueue(RESULTS, [
+                {'athlete_id': result.athlete_id, 'metric_ids': [result.id]} for result in results
+            ])
+            db.session.commit()
+            assert jobs.run_batch(RESULTS, 'worker-1') == 3
+
+            digests = {
+                job.payload['to'].lower(): job.payload
+                for job in db.session.scalars(db.select(Job).where(Job.kind == DIGEST))
+            }
+            assert sorted(digests) == ['digest-athlete@example.com', 'parent@example.com']
+            own = digests['digest-athlete@example.com']['athletes']
+            assert [a['name'] for a in own] == ['Ann Digest']
+            assert [r['date'] for r in own[0]['results']] == ['2024-05-01', '2024-05-08']
+            parent = digests['parent@example.com']
+            assert parent['name'] == 'Pat'
+            assert [a['name'] for a in parent['athletes']] == ['Ann Digest', 'Bo Digest']
+            assert not db.session.scalars(db.select(Job).where(Job.kind == RESULTS)).all()
+        finally:
+            db.session.rollback()
+            db.session.execute(db.delete(Job).where(Job.kind.in_([RESULTS, DIGEST])))
+            for row in results + added + [athlete, opted_out]:
+                db.session.delete(db.session.merge(row))
+            db.session.commit()
@@ -0,0 +1,36 @@
+from app import db
+from app.models.user import User
+
+
+def _coach_email(app):
+    with app.app_context():
+        return db.session.scalar(db.select(User.email).where(User.is_coach).order_by(User.email))
+
+
+def test_users_second_page(app, client, login):
+    headers = login(_coach_email(app))
+    first = client.get('/api/users/?per_page=5&include_total=true', headers=headers).get_json()
+    assert first['pagination']['has_more']
+
+    second = client.get(f'/api/users/?per_page=5&cursor={first["pagination"]["next_cursor"]}', headers=headers)
+    assert second.status_code == 200
+    page = second.get_json()['data']
+    assert page
+    assert not {user['id'] for user in page} & {user['id'] for user in first['data']}
+
+
+def test_users_pages_cover_the_stream(app, client, login):
+    headers = login(_coach_email(app))
+    for sort in ('created_at', 'last_name'):
+        ids = []
+        cursor = ''
+        while True:
+            body = client.get(f'/api/users/?per_page=4&sort={sort}&cursor={cursor}', headers=headers).get_json()
+            ids.extend(user['id'] for user in body['data'])
+            if not body['pagination']['has_more']:
+                break
+            cursor = body['pagination']['next_cursor']
+        assert len(ids) == len(set(ids))
+
+    streamed = client.get('/api/users/?stream=true', headers=headers).get_json()['data']
+    assert sorted(ids) == sorted(user['id'] for user in streamed)
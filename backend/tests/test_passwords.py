@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import db
+from app.models.user import User
+from app.services import passwords
+
+LEGACY_METHOD = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture
+def legacy_user(app):
+    """An athlete whose password hash predates the configured cost"""
+    with app.app_context():
+        user = User(email='legacy-hash@example.com', first_name='Old', last_name='Hash', is_athlete=True,
+                    password_hash=generate_password_hash('legacy-password', method=LEGACY_METHOD))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    yield user_id
+    with app.app_context():
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+
+@pytest.fixture
+def small_pool(app, monkeypatch):
+    """One hashing thread and one pending slot; yields the slot semaphore"""
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_CONCURRENCY', 1)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_QUEUE_LIMIT', 1)
+    _, slots = passwords._get_executor(app.config)
+    return slots
+
+
+def _login(client, password='legacy-password'):
+    return client.post('/api/auth/login', json={'email': 'legacy-hash@example.com', 'password': password})
+
+
+def test_login_upgrades_outdated_hashes(app, client, legacy_user):
+    with app.app_context():
+        assert passwords.needs_rehash(db.session.get(User, legacy_user).password_hash)
+
+    assert _login(client, 'wrong-password').status_code == 401
+    with app.app_context():
+        assert db.session.get(User, legacy_user).password_hash.startswith(LEGACY_METHOD + '$')
+
+    assert _login(client).status_code == 200
+    with app.app_context():
+        upgraded = db.session.get(User, legacy_user).password_hash
+        assert upgraded.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+        assert not passwords.needs_rehash(upgraded)
+        assert check_password_hash(upgraded, 'legacy-password')
+
+    # Already current: left alone
+    assert _login(client).status_code == 200
+    with app.app_context():
+        assert db.session.get(User, legacy_user).password_hash == upgraded
+
+
+def test_saturated_pool_answers_503(app, client, legacy_user, small_pool):
+    assert small_pool.acquire(blocking=False)
+    try:
+        with app.app_context():
+            with pytest.raises(passwords.HashingBusy, match='Too many'):
+                passwords.hash_password('anything')
+        response = _login(client)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+    finally:
+        small_pool.release()
+    assert _login(client).status_code == 200
+
+
+def test_slow_hash_times_out(app, small_pool, monkeypatch):
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_QUEUE_LIMIT', 2)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_TIMEOUT', 0.05)
+    executor, _ = passwords._get_executor(app.config)
+    release = threading.Event()
+    # Occupy the only hashing thread
+    executor.submit(release.wait, 5)
+    try:
+        with app.app_context():
+            with pytest.raises(passwords.HashingBusy, match='timed out'):
+                passwords.verify_password(generate_password_hash('x', method=LEGACY_METHOD), 'x')
+    finally:
+        release.set()
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2:sha256', 'pbkdf2'])
+def test_methods_without_parameters_are_not_rehashed(app, monkeypatch, method):
+    # werkzeug stores the resolved parameters, e.g. scrypt:32768:8:1$...
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_METHOD', method)
+    monkeypatch.setitem(app.config, 'PASSWORD_HASH_CONCURRENCY', 0)
+    with app.app_context():
+        password_hash = passwords.hash_password('fresh-password')
+        assert password_hash.split('$', 1)[0] != method
+        assert not passwords.needs_rehash(password_hash)
+        assert passwords.needs_rehash(generate_password_hash('fresh-password', method=LEGACY_METHOD))
@@ -0,0 +1,125 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.user import User
+from app.services import principals
+
+
+@pytest.fixture
+def athlete(app):
+    """An athlete's ID and email, with their principal evicted"""
+    with app.app_context():
+        user = db.session.scalar(db.select(User).where(User.is_athlete, ~User.archived).order_by(User.email).limit(1))
+        user_id, email = user.id, user.email
+    principals.invalidate(user_id)
+    return user_id, email
+
+
+def _lookups(app, client, headers, path='/api/auth/me'):
+    """Run one request and return how many users primary-key lookups it made"""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT') and 'FROM users' in statement and 'users.id = ?' in statement:
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_json()
+    return response, len(statements)
+
+
+def test_principal_is_cached_across_requests(app, client, login, athlete):
+    user_id, email = athlete
+    headers = login(email)
+    principals.invalidate(user_id)
+
+    hits = principals.cache_stats()['hits']
+    # The token lookup loads the principal, /me reads the row once more for the profile
+    assert _lookups(app, client, headers)[1] == 2
+    assert _lookups(app, client, headers)[1] == 1
+    assert principals.cache_stats()['hits'] > hits
+
+
+def test_orm_edit_invalidates_the_principal(app, client, login, athlete):
+    user_id, email = athlete
+    headers = login(email)
+    client.get('/api/auth/me', headers=headers)
+    assert principals._cache.get(user_id).is_coach is False
+
+    with app.app_context():
+        db.session.get(User, user_id).is_coach = True
+        db.session.commit()
+    try:
+        with app.app_context():
+            assert principals._cache.get(user_id) is None
+        assert _lookups(app, client, headers)[1] == 2
+        assert principals._cache.get(user_id).is_coach is True
+    finally:
+        with app.app_context():
+            db.session.get(User, user_id).is_coach = False
+            db.session.commit()
+
+
+def test_me_is_not_served_from_the_cache(app, client, login, athlete):
+    """last_tested is written by a Core UPDATE that skips the invalidation hooks"""
+    user_id, email = athlete
+    headers = login(email)
+    with app.app_context():
+        previous = db.session.get(User, user_id).last_tested
+    client.get('/api/auth/me', headers=headers)
+
+    with app.app_context():
+        db.session.execute(
+            db.update(User).where(User.id == user_id).values(last_tested=date(2030, 1, 1))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    try:
+        assert principals._cache.get(user_id) is not None
+        assert client.get('/api/auth/me', headers=headers).get_json()['user']['last_tested'] == '2030-01-01'
+    finally:
+        with app.app_context():
+            db.session.execute(
+                db.update(User).where(User.id == user_id).values(last_tested=previous)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+
+def test_archived_users_are_rejected(app, client, login, athlete):
+    user_id, email = athlete
+    headers = login(email)
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+
+    # A Core UPDATE, so the token cutoff written when archiving through the ORM is not in play
+    with app.app_context():
+        db.session.execute(
+            db.update(User).where(User.id == user_id).values(archived=True)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    try:
+        # Served from the cache until it is dropped
+        assert client.get('/api/auth/me', headers=headers).status_code == 200
+        principals.invalidate(user_id)
+        response = client.get('/api/auth/me', headers=headers)
+        assert response.status_code == 401
+        assert response.get_json() == {'error': 'User not found'}
+        assert principals._cache.get(user_id).archived is True
+    finally:
+        with app.app_context():
+            db.session.execute(
+                db.update(User).where(User.id == user_id).values(archived=False)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        principals.invalidate(user_id)
@@ -0,0 +1,40 @@
+import pytest
+
+from app import db
+from app.models.user import User
+from app.services.loading import load_options
+from app.utils.query_budget import QueryBudgetExceeded, query_budget
+
+
+def _coach(app):
+    with app.app_context():
+        return db.session.execute(db.select(User.id, User.email).where(User.is_coach).order_by(User.email)).first()
+
+
+def test_lazy_loading_exceeds_budget(app):
+    with app.app_context():
+        with pytest.raises(QueryBudgetExceeded, match='lazy'):
+            with query_budget(10, name='lazy'):
+                for user in db.session.scalars(db.select(User).where(User.is_athlete)):
+                    for membership in user.gym_relationships:
+                        membership.gym.name
+        db.session.rollback()
+
+
+def test_eager_profile_stays_within_budget(app):
+    coach_id, _ = _coach(app)
+    with app.app_context():
+        with query_budget(4) as budget:
+            coach = db.session.scalars(
+                db.select(User).options(*load_options('coach_roster')).where(User.id == coach_id)
+            ).first()
+            for link in coach.coached_athletes:
+                [membership.gym_id for membership in link.athlete.gym_relationships]
+        assert coach.coached_athletes
+        assert budget.count <= 4
+
+
+def test_budgeted_endpoint_passes_in_raise_mode(app, client, login):
+    coach_id, email = _coach(app)
+    assert app.config['QUERY_BUDGET_MODE'] == 'raise'
+    assert client.get(f'/api/users/{coach_id}/roster', headers=login(email)).status_code == 200
@@ -0,0 +1,214 @@
+import shutil
+import sqlite3
+
+import pytest
+from flask import g
+from sqlalchemy import event, text
+
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.user import User
+from app.services import replica, synthetic
+
+PASSWORD = 'synthetic-password'
+COACH = 'coach0@synthetic.aiptrack.test'
+# Written to the replica's copy only, so a response shows which database served it
+REPLICA_NAME = 'Replica'
+
+
+@pytest.fixture(scope='module')
+def replica_app(tmp_path_factory):
+    """An app whose primary and replica are two SQLite files with the same synthetic data"""
+    directory = tmp_path_factory.mktemp('replica')
+    primary, copy = directory / 'primary.db', directory / 'replica.db'
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{primary}')
+        patch.setattr(TestingConfig, 'DATABASE_REPLICA_URL', f'sqlite:///{copy}')
+        patch.setattr(TestingConfig, 'DB_REPLICA_HEALTH_INTERVAL', 60)
+        app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        # Another seed than conftest's, so user IDs (and the per-worker caches keyed by them) don't collide
+        synthetic.generate(gyms=1, coaches=1, athletes=4, exercises=1, metrics=40, days=30, seed=7, password=PASSWORD)
+        for engine in db.engines.values():
+            engine.dispose()
+    shutil.copyfile(primary, copy)
+    with sqlite3.connect(copy) as connection:
+        connection.execute('UPDATE users SET first_name = ? WHERE is_athlete', (REPLICA_NAME,))
+    return app
+
+
+@pytest.fixture
+def replica_client(replica_app):
+    return replica_app.test_client()
+
+
+@pytest.fixture
+def health(replica_app):
+    """The replica's health tracker, reset to healthy with fresh counters"""
+    with replica_app.app_context():
+        tracker = replica._health[db.engines[replica.BIND_KEY]]
+    tracker.healthy, tracker.reason, tracker.checked_at = True, None, None
+    tracker.replica_reads = tracker.primary_fallbacks = tracker.sticky_reads = 0
+    return tracker
+
+
+@pytest.fixture
+def statements(replica_app):
+    """(bind, SQL) for every statement executed while the test runs"""
+    executed = []
+    with replica_app.app_context():
+        engines = {'primary': db.engines[None], 'replica': db.engines[replica.BIND_KEY]}
+    listeners = []
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            executed.append((name, statement))
+        event.listen(engine, 'before_cursor_execute', record)
+        listeners.append((engine, record))
+    yield executed
+    for engine, record in listeners:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def _login(client):
+    response = client.post('/api/auth/login', json={'email': COACH, 'password': PASSWORD})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+
+
+def _athlete_names(users):
+    return {user['first_name'] for user in users if user['is_athlete']}
+
+
+def _binds(executed, table='users'):
+    return {name for name, statement in executed if statement.lstrip().startswith('SELECT') and table in statement}
+
+
+def test_read_replica_handlers_read_from_the_replica(replica_client, health, statements):
+    headers = _login(replica_client)
+    statements.clear()
+
+    response = replica_client.get('/api/users/?per_page=50', headers=headers)
+    assert response.status_code == 200
+    assert _athlete_names(response.get_json()['data']) == {REPLICA_NAME}
+    assert 'replica' in _binds(statements)
+    assert health.replica_reads > 0
+
+
+def test_undecorated_handlers_stay_on_the_primary(replica_client, health, statements):
+    headers = _login(replica_client)
+    users = replica_client.get('/api/users/?per_page=50', headers=headers).get_json()['data']
+    athlete_id = next(user['id'] for user in users if user['is_athlete'])
+    health.replica_reads = 0
+    statements.clear()
+
+    response = replica_client.get(f'/api/users/{athlete_id}', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['first_name'] != REPLICA_NAME
+    assert statements
+    assert {name for name, _ in statements} == {'primary'}
+    assert health.replica_reads == 0
+
+
+def test_stream_mode_reads_from_the_replica(replica_client, health, statements):
+    headers = _login(replica_client)
+    statements.clear()
+
+    response = replica_client.get('/api/users/?stream=true', headers=headers)
+    assert response.status_code == 200
+    assert _athlete_names(response.get_json()['data']) == {REPLICA_NAME}
+    assert _binds(statements) == {'replica'}
+
+
+def test_writes_and_locking_reads_use_the_primary(replica_app, health, statements):
+    with replica_app.test_request_context():
+        g.read_replica = True
+        user = db.session.scalar(db.select(User).where(User.is_athlete).limit(1))
+        assert user.first_name == REPLICA_NAME
+        assert statements[-1][0] == 'replica'
+
+        db.session.scalar(db.select(User).where(User.id == user.id).with_for_update())
+        assert statements[-1][0] == 'primary'
+        db.session.execute(text('SELECT 1'))
+        assert statements[-1][0] == 'primary'
+        assert not g.get('replica_sticky')
+
+        db.session.execute(
+            db.update(User).where(User.id == user.id).values(nick_name='primary only')
+            .execution_options(synchronize_session=False)
+        )
+        assert statements[-1][0] == 'primary'
+        # Read-your-writes: the rest of the request reads from the primary
+        assert db.session.scalar(db.select(User.nick_name).where(User.id == user.id)) == 'primary only'
+        assert statements[-1][0] == 'primary'
+        assert health.sticky_reads == 1
+        db.session.rollback()
+
+
+def test_flush_makes_the_request_sticky(replica_app, health, statements):
+    with replica_app.test_request_context():
+        g.read_replica = True
+        user = db.session.scalar(db.select(User).where(User.is_athlete).limit(1))
+        user.nick_name = 'flushed'
+        db.session.flush()
+        assert g.replica_sticky
+        assert db.session.scalar(db.select(User.first_name).where(User.id == user.id)) != REPLICA_NAME
+        assert statements[-1][0] == 'primary'
+        db.session.rollback()
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(replica_app, replica_client, health, statements, monkeypatch):
+    headers = _login(replica_client)
+    monkeypatch.setattr(health, '_probe', lambda: (False, 'replication lag 45s'))
+    statements.clear()
+
+    response = replica_client.get('/api/users/?per_page=50', headers=headers)
+    assert response.status_code == 200
+    assert REPLICA_NAME not in _athlete_names(response.get_json()['data'])
+    assert _binds(statements) == {'primary'}
+    assert health.primary_fallbacks > 0 and health.replica_reads == 0
+    with replica_app.app_context():
+        assert replica.stats(db)['reason'] == 'replication lag 45s'
+
+
+def test_replica_error_marks_it_down_until_the_next_probe(replica_app, replica_client, health):
+    headers = _login(replica_client)
+    with replica_app.app_context():
+        with pytest.raises(Exception):
+            with db.engines[replica.BIND_KEY].connect() as connection:
+                connection.execute(text('SELECT * FROM no_such_table'))
+    assert not health.healthy
+    assert health.reason == 'unreachable (OperationalError)'
+
+    response = replica_client.get('/api/users/?per_page=50', headers=headers)
+    assert REPLICA_NAME not in _athlete_names(response.get_json()['data'])
+
+    # The next probe finds it reachable again
+    health.checked_at = None
+    response = replica_client.get('/api/users/?per_page=50', headers=headers)
+    assert _athlete_names(response.get_json()['data']) == {REPLICA_NAME}
+
+
+class _Connection:
+    def __init__(self, status):
+        self.status = status
+
+    def execute(self, statement):
+        return self
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self.status
+
+
+@pytest.mark.parametrize('status, healthy, reason', [
+    (None, True, None),
+    ({'Seconds_Behind_Master': 3}, True, None),
+    ({'Seconds_Behind_Master': 45}, False, 'replication lag 45s'),
+    ({'Seconds_Behind_Master': None}, False, 'replication stopped'),
+])
+def test_replication_lag_check(health, status, healthy, reason):
+    assert health.max_lag == 30
+    assert health._check_lag(_Connection(status)) == (healthy, reason)
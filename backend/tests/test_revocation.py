@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+import pytest
+from flask_jwt_extended import decode_token
+from sqlalchemy import delete
+
+from app import db
+from app.models.token import RevokedToken, TokenCutoff
+from app.models.user import User
+from app.services import revocation
+
+# conftest's login fixture signs in with the synthetic password
+PASSWORD = 'synthetic-password'
+
+
+def test_login_right_after_logout_everywhere(app, client, login):
+    with app.app_context():
+        email = db.session.scalar(db.select(User.email).where(User.is_athlete).order_by(User.email.desc()))
+    old = login(email)
+    assert client.post('/api/auth/logout?everywhere=true', headers=old).status_code == 200
+
+    # Same second as the cutoff: only tokens issued before it are revoked
+    new = login(email)
+    assert client.get('/api/auth/me', headers=new).status_code == 200
+    assert client.get('/api/auth/me', headers=old).status_code == 401
+
+
+@pytest.fixture
+def member(app):
+    """A throwaway athlete, deleted with their revocation rows afterwards"""
+    with app.app_context():
+        user = User(email='revocation@example.com', first_name='Rev', last_name='Oked', is_athlete=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    yield user_id, 'revocation@example.com'
+    with app.app_context():
+        db.session.execute(delete(RevokedToken).where(RevokedToken.user_id == user_id))
+        db.session.execute(delete(TokenCutoff).where(TokenCutoff.user_id == user_id))
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+
+def _jti(headers):
+    return decode_token(headers['Authorization'].split()[1])['jti']
+
+
+def test_logout_revokes_only_that_token(app, client, login, member):
+    user_id, email = member
+    first, second = login(email), login(email)
+    assert client.post('/api/auth/logout', headers=first).status_code == 200
+
+    response = client.get('/api/auth/me', headers=first)
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Token has been revoked'}
+    assert client.get('/api/auth/me', headers=second).status_code == 200
+    with app.app_context():
+        row = db.session.get(RevokedToken, _jti(first))
+        assert row.user_id == user_id
+        assert row.expires_at > datetime.utcnow()
+
+
+def test_archiving_revokes_every_token(app, client, login, member):
+    user_id, email = member
+    headers = login(email)
+    with app.app_context():
+        db.session.get(User, user_id).archived = True
+        db.session.flush()
+        db.session.rollback()
+    # Rolled back: nothing revoked
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+
+    with app.app_context():
+        db.session.get(User, user_id).archived = True
+        db.session.commit()
+        assert db.session.get(TokenCutoff, user_id) is not None
+    response = client.get('/api/auth/me', headers=headers)
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Token has been revoked'}
+
+    with app.app_context():
+        db.session.get(User, user_id).archived = False
+        db.session.commit()
+    # Restoring the user does not bring old tokens back, but new ones work
+    assert client.get('/api/auth/me', headers=headers).status_code == 401
+    assert client.get('/api/auth/me', headers=login(email)).status_code == 200
+
+
+def test_other_workers_pick_up_rows_on_refresh(app, member):
+    user_id, _ = member
+    worker = revocation.RevocationList()
+    worker.refresh_interval = 60
+    now = datetime.utcnow()
+    expires = now + timedelta(hours=1)
+    with app.app_context():
+        worker.ensure_fresh()
+        refreshes = worker.refreshes
+        # Committed by another worker, once just now and once by a transaction that started before the
+        # last refresh; a row older than the overlap was already seen by the initial load
+        db.session.add_all([
+            RevokedToken(jti='other-worker-new', user_id=user_id, expires_at=expires),
+            RevokedToken(jti='other-worker-slow', user_id=user_id, expires_at=expires,
+                         created_at=now - timedelta(seconds=revocation.REFRESH_OVERLAP - 5)),
+            RevokedToken(jti='other-worker-old', user_id=user_id, expires_at=expires,
+                         created_at=now - timedelta(seconds=revocation.REFRESH_OVERLAP + 60)),
+            TokenCutoff(user_id=user_id, revoked_before=now, expires_at=expires),
+        ])
+        db.session.commit()
+
+        # Not due yet
+        worker.ensure_fresh()
+        assert worker.refreshes == refreshes
+        assert not worker.is_revoked('other-worker-new', user_id, time.time() + 60)
+
+        worker._checked_at -= worker.refresh_interval
+        worker.ensure_fresh()
+    assert worker.refreshes == refreshes + 1
+    assert worker.is_revoked('other-worker-new', None, 0)
+    assert worker.is_revoked('other-worker-slow', None, 0)
+    assert not worker.is_revoked('other-worker-old', None, 0)
+    assert worker.is_revoked('any', user_id, now.replace(tzinfo=timezone.utc).timestamp())
+    assert not worker.is_revoked('any', user_id, time.time() + 60)
+
+
+def test_expired_revocations_are_pruned(app, member):
+    user_id, _ = member
+    past = datetime.utcnow() - timedelta(minutes=1)
+    with app.app_context():
+        db.session.add_all([
+            RevokedToken(jti='expired-token', user_id=user_id, expires_at=past),
+            TokenCutoff(user_id=user_id, revoked_before=past - timedelta(hours=1), expires_at=past),
+        ])
+        db.session.commit()
+        revocation._list.add_token('expired-token', past.replace(tzinfo=timezone.utc).timestamp())
+
+        revocation.revoke_token({'jti': 'fresh-token', 'sub': user_id})
+        db.session.commit()
+        assert db.session.get(RevokedToken, 'expired-token') is None
+        assert db.session.get(RevokedToken, 'fresh-token') is not None
+        # Expired cutoffs are replaced, not kept alongside
+        assert db.session.get(TokenCutoff, user_id).expires_at == past
+
+        revocation.revoke_user_tokens(user_id)
+        db.session.commit()
+        assert db.session.get(TokenCutoff, user_id).expires_at > datetime.utcnow()
+
+        revocation._list._refresh()
+    assert not revocation._list.is_revoked('expired-token', None, 0)
+    assert revocation._list.is_revoked('fresh-token', None, 0)
@@ -0,0 +1,56 @@
+from datetime import date
+from decimal import Decimal
+
+from app import db
+from app.models.exercise import ExerciseMetric
+from app.models.metric import AthleteMetricRollup
+from app.models.user import User
+from app.services import rollups
+
+
+def _rollup(athlete_id, metric_id):
+    return db.session.scalar(
+        db.select(AthleteMetricRollup)
+        .where(AthleteMetricRollup.athlete_id == athlete_id, AthleteMetricRollup.exercise_metric_id == metric_id)
+    )
+
+
+def _result(athlete, metric, value, day):
+    return {
+        'athlete_id': athlete.id,
+        'exercise_metric_id': metric.id,
+        'exercise_id': metric.exercise_id,
+        'value': Decimal(value),
+        'date': day
+    }
+
+
+def test_first_insert_then_incremental_fold(app):
+    with app.app_context():
+        athlete = User(email='rollup-athlete@example.com', first_name='Roll', last_name='Up', is_athlete=True)
+        db.session.add(athlete)
+        db.session.flush()
+        metric = db.session.scalar(db.select(ExerciseMetric).where(ExerciseMetric.higher_is_better).limit(1))
+        try:
+            rollups.apply_inserted([_result(athlete, metric, '10', date(2024, 1, 10))])
+            rollup = _rollup(athlete.id, metric.id)
+            assert rollup.test_count == 1
+            assert (rollup.best_value, rollup.best_date) == (Decimal('10'), date(2024, 1, 10))
+            assert (rollup.latest_value, rollup.latest_date) == (Decimal('10'), date(2024, 1, 10))
+
+            # A second insert for a key that already exists is a no-op, not a unique_athlete_metric failure
+            rollups._insert_missing([_result(athlete, metric, '1', date(2024, 1, 1))])
+            assert _rollup(athlete.id, metric.id).test_count == 1
+
+            rollups.apply_inserted([
+                _result(athlete, metric, '12', date(2024, 1, 5)),
+                _result(athlete, metric, '8', date(2024, 2, 1))
+            ])
+            rollup = _rollup(athlete.id, metric.id)
+            assert rollup.test_count == 3
+            assert (rollup.best_value, rollup.best_date) == (Decimal('12'), date(2024, 1, 5))
+            assert (rollup.latest_value, rollup.latest_date) == (Decimal('8'), date(2024, 2, 1))
+            db.session.refresh(athlete)
+            assert athlete.last_tested == date(2024, 2, 1)
+        finally:
+            db.session.rollback()
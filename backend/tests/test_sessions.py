@@ -0,0 +1,81 @@
+from datetime import date
+from decimal import Decimal
+
+from app import db
+from app.models.exercise import ExerciseMetric
+from app.models.job import Job
+from app.models.metric import AthleteMetricRollup, PerformanceMetric
+from app.models.user import User, UserCoachRelationship
+from app.routes import metrics as metric_routes
+from app.services import rollups
+from app.services.notifications import RESULTS
+
+SESSION_DATE = date(2025, 1, 2)
+
+
+def _session(app):
+    """A coach's email and a session body for one of their athletes"""
+    with app.app_context():
+        link = db.session.scalar(db.select(UserCoachRelationship).order_by(UserCoachRelationship.id).limit(1))
+        metric = db.session.scalar(db.select(ExerciseMetric).where(ExerciseMetric.higher_is_better).limit(1))
+        email = db.session.get(User, link.coach_id).email
+        body = {
+            'gym_id': link.gym_id, 'athlete_id': link.athlete_id, 'date': SESSION_DATE.isoformat(),
+            'entries': [{'exercise_metric_id': metric.id, 'value': str(metric.max_value)}]
+        }
+    return email, body
+
+
+def _rollup(athlete_id, metric_id):
+    return db.session.scalar(
+        db.select(AthleteMetricRollup)
+        .where(AthleteMetricRollup.athlete_id == athlete_id, AthleteMetricRollup.exercise_metric_id == metric_id)
+    )
+
+
+def test_session_inserts_rows_rollup_and_notification(app, client, login):
+    email, body = _session(app)
+    athlete_id, metric_id = body['athlete_id'], body['entries'][0]['exercise_metric_id']
+    value = Decimal(body['entries'][0]['value'])
+    with app.app_context():
+        before = _rollup(athlete_id, metric_id)
+        count = before.test_count if before is not None else 0
+        # The metric's maximum: a new best unless an earlier result already reached it
+        best_date = before.best_date if before is not None and before.best_value == value else SESSION_DATE
+
+    response = client.post('/api/metrics/sessions', json=body, headers=login(email))
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json() == {'inserted': 1, 'errors': []}
+
+    with app.app_context():
+        row = db.session.scalars(
+            db.select(PerformanceMetric)
+            .where(PerformanceMetric.athlete_id == athlete_id, PerformanceMetric.date == SESSION_DATE)
+        ).one()
+        try:
+            assert (row.exercise_metric_id, row.value, row.gym_id) == (metric_id, value, body['gym_id'])
+
+            rollup = _rollup(athlete_id, metric_id)
+            assert rollup.test_count == count + 1
+            assert (rollup.best_value, rollup.best_date) == (value, best_date)
+            assert (rollup.latest_value, rollup.latest_date) == (value, SESSION_DATE)
+            assert db.session.get(User, athlete_id).last_tested == SESSION_DATE
+
+            jobs = db.session.scalars(db.select(Job).where(Job.kind == RESULTS)).all()
+            assert [job.payload for job in jobs] == [{'athlete_id': athlete_id, 'metric_ids': [row.id]}]
+        finally:
+            db.session.execute(db.delete(Job).where(Job.kind == RESULTS))
+            db.session.delete(row)
+            rollups.recompute({(athlete_id, metric_id)})
+            db.session.commit()
+
+
+def test_session_failure_hides_the_exception(app, client, login, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('connection to db-primary:3306 lost')
+
+    email, body = _session(app)
+    monkeypatch.setattr(metric_routes, 'ingest_session', fail)
+    response = client.post('/api/metrics/sessions', json=body, headers=login(email))
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'Session recording failed'}
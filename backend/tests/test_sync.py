@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models.cohort import Cohort, CohortMembership
+from app.models.exercise import ExerciseMetric
+from app.models.sync import SyncTombstone
+from app.models.metric import PerformanceMetric
+from app.models.user import User, UserCoachRelationship
+from app.utils.pagination import encode_cursor
+
+
+def _coach(app):
+    with app.app_context():
+        cohort = db.session.scalar(db.select(Cohort).order_by(Cohort.id).limit(1))
+        return cohort.coach_id, cohort.gym_id, cohort.id, db.session.get(User, cohort.coach_id).email
+
+
+def _round(client, headers, cursor=None, limit=2000):
+    """Every page of one sync round: (pages, cursor for the next round)"""
+    pages = []
+    while True:
+        query = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/sync/', query_string=query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        pages.append(page)
+        cursor = page['cursor']
+        if not page['has_more']:
+            return pages, cursor
+
+
+def _ids(pages, key, entity):
+    return [row['id'] if key == 'changes' else row for page in pages for row in page[key].get(entity, ())]
+
+
+def test_pages_split_a_round_without_gaps(app, client, login):
+    *_, email = _coach(app)
+    headers = login(email)
+    whole, _ = _round(client, headers)
+    paged, _ = _round(client, headers, limit=40)
+    assert len(whole) == 1 and len(paged) > 2
+    for entity in whole[0]['changes']:
+        ids = _ids(paged, 'changes', entity)
+        assert len(ids) == len(set(ids))
+        assert sorted(ids) == sorted(_ids(whole, 'changes', entity))
+    assert all(len(page['changes'].get('metrics', ())) <= 40 for page in paged)
+
+
+def test_expired_and_invalid_cursors(app, client, login):
+    *_, email = _coach(app)
+    headers = login(email)
+    expired = encode_cursor([datetime.utcnow() - timedelta(days=60), None, 0, None, None])
+    assert client.get('/api/sync/', query_string={'cursor': expired}, headers=headers).status_code == 410
+    assert client.get('/api/sync/', query_string={'cursor': 'not-a-cursor'}, headers=headers).status_code == 400
+
+
+def test_deleting_an_athlete_tombstones_cascaded_rows(app, client, login):
+    coach_id, gym_id, cohort_id, email = _coach(app)
+    headers = login(email)
+    _, cursor = _round(client, headers)
+
+    with app.app_context():
+        metric = db.session.scalar(db.select(ExerciseMetric).limit(1))
+        athlete = User(
+            email='sync-deleted@example.com', first_name='Gone', last_name='Soon',
+            date_of_birth=date(2005, 1, 1), is_athlete=True
+        )
+        db.session.add(athlete)
+        db.session.flush()
+        result = PerformanceMetric(
+            athlete_id=athlete.id, exercise_id=metric.exercise_id, exercise_metric_id=metric.id,
+            coach_id=coach_id, gym_id=gym_id, value=10, date=date(2024, 6, 1)
+        )
+        link = UserCoachRelationship(athlete_id=athlete.id, coach_id=coach_id, gym_id=gym_id)
+        membership = CohortMembership(cohort_id=cohort_id, athlete_id=athlete.id)
+        db.session.add_all([result, link, membership])
+        db.session.commit()
+        expected = {
+            'metrics': [result.id], 'coach_relationships': [link.id], 'cohort_memberships': [membership.id]
+        }
+
+        db.session.delete(athlete)
+        db.session.commit()
+        keys = db.session.execute(
+            db.select(SyncTombstone.gym_id, SyncTombstone.cohort_id)
+            .where(SyncTombstone.entity_id.in_([result.id, link.id, membership.id]))
+        ).all()
+        assert len(keys) == 3
+        assert all(gym == gym_id or cohort == cohort_id for gym, cohort in keys)
+        # SQLite does not enforce the ON DELETE CASCADE
+        for model in (PerformanceMetric, UserCoachRelationship, CohortMembership):
+            db.session.execute(db.delete(model).where(model.id.in_([result.id, link.id, membership.id])))
+        db.session.commit()
+
+    pages, _ = _round(client, headers, cursor)
+    for entity, ids in expected.items():
+        assert set(ids) <= set(_ids(pages, 'deleted', entity)), entity
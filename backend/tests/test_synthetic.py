@@ -0,0 +1,37 @@
+from app import db
+from app.models.user import User
+from app.services import synthetic
+
+
+def test_every_athlete_has_demographics(app):
+    with app.app_context():
+        missing = db.session.scalar(
+            db.select(db.func.count()).where(User.is_athlete.is_(True), User.date_of_birth.is_(None))
+        )
+        athletes = db.session.scalar(db.select(db.func.count()).where(User.is_athlete.is_(True)))
+    assert athletes
+    assert missing == 0
+
+
+def _generated_rows(monkeypatch):
+    """Rows one small generate() run would insert, per table, without writing them"""
+    captured = {}
+
+    def capture(writer, model):
+        rows = writer.rows.pop(model, [])
+        captured.setdefault(model.__tablename__, []).extend(
+            {key: value for key, value in row.items() if key != 'password_hash'} for row in rows
+        )
+
+    monkeypatch.setattr(synthetic._BatchWriter, '_write', capture)
+    monkeypatch.setattr(synthetic.rollups, 'rebuild', lambda athlete_ids: 0)
+    synthetic.generate(gyms=1, coaches=1, athletes=5, exercises=2, metrics=40, days=30, seed=7)
+    return captured
+
+
+def test_same_seed_same_rows(app, monkeypatch):
+    with app.app_context():
+        first = _generated_rows(monkeypatch)
+        second = _generated_rows(monkeypatch)
+    assert first['performance_metrics']
+    assert first == second
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, event, exc, text
+
+from app import db
+from app.models.user import User
+from app.services import instrumentation
+
+
+@pytest.fixture
+def metrics_enabled(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'METRICS_ENABLED', True)
+    monkeypatch.setitem(app.config, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'scrape-secret')
+
+
+@pytest.fixture
+def admin_email(app):
+    with app.app_context():
+        user = db.session.scalars(db.select(User).where(User.is_coach).order_by(User.email.desc())).first()
+        user.is_admin = True
+        db.session.commit()
+        email = user.email
+    yield email
+    with app.app_context():
+        db.session.scalars(db.select(User).where(User.email == email)).one().is_admin = False
+        db.session.commit()
+
+
+def test_system_metrics_require_token(app, client, login, metrics_enabled):
+    url = '/api/metrics/system?format=json'
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    with app.app_context():
+        athlete = db.session.scalar(db.select(User.email).where(User.is_athlete).order_by(User.email))
+    assert client.get(url, headers=login(athlete)).status_code == 401
+    assert client.get(url, headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+
+def test_system_metrics_allow_admins(client, login, metrics_enabled, admin_email):
+    assert client.get('/api/metrics/system?format=json', headers=login(admin_email)).status_code == 200
+
+
+def test_health_reports_only_status(client):
+    response = client.get('/api/health')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'healthy', 'database': 'connected'}
+
+
+def test_health_stats_require_token(client, metrics_enabled):
+    assert client.get('/api/metrics/health').status_code == 401
+    response = client.get('/api/metrics/health', headers={'Authorization': 'Bearer scrape-secret'})
+    assert response.status_code == 200
+    assert {'caches', 'database_pool', 'database_replica'} <= response.get_json().keys()
+
+
+def test_failed_statements_are_not_timed(app):
+    engine = create_engine('sqlite://')
+    event.listen(engine, 'before_cursor_execute', instrumentation._before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', instrumentation._after_cursor_execute)
+    metrics = instrumentation.RequestMetrics()
+    token = instrumentation._current.set(metrics)
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(exc.OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            connection.execute(text('SELECT 1'))
+            assert not connection.info
+    finally:
+        instrumentation._current.reset(token)
+    assert metrics.sql_statements == 1
@@ -0,0 +1,131 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.exercise import ExerciseMetric
+from app.models.metric import PerformanceMetric
+from app.models.user import User, UserCoachRelationship
+from app.services import trends
+
+START = date(2022, 1, 3)  # a Monday
+
+
+@pytest.fixture
+def series(app):
+    """A new athlete with 60 daily results from START, two on the first day; yields (athlete, metric)"""
+    with app.app_context():
+        link = db.session.scalar(db.select(UserCoachRelationship).order_by(UserCoachRelationship.id).limit(1))
+        metric = db.session.scalar(db.select(ExerciseMetric).limit(1))
+        athlete = User(email='trend-athlete@example.com', first_name='Tre', last_name='Nd', is_athlete=True)
+        db.session.add(athlete)
+        db.session.flush()
+        created = datetime(2022, 6, 1)
+        values = [(START, 5, created + timedelta(seconds=1)), (START, 7, created)] + [
+            (START + timedelta(days=i), 10 + i % 7 + (40 if i == 30 else 0), created) for i in range(1, 60)
+        ]
+        db.session.add_all([
+            PerformanceMetric(athlete_id=athlete.id, exercise_id=metric.exercise_id, exercise_metric_id=metric.id,
+                              coach_id=link.coach_id, gym_id=link.gym_id, value=value, date=day, created_at=at)
+            for day, value, at in values
+        ])
+        db.session.commit()
+        yield athlete.id, metric
+        db.session.execute(db.delete(PerformanceMetric).where(PerformanceMetric.athlete_id == athlete.id))
+        db.session.delete(db.session.get(User, athlete.id))
+        db.session.commit()
+
+
+def _criteria(athlete_id, metric, start, end):
+    return (
+        PerformanceMetric.athlete_id == athlete_id,
+        PerformanceMetric.exercise_metric_id == metric.id,
+        PerformanceMetric.date >= start,
+        PerformanceMetric.date <= end
+    )
+
+
+def test_choose_bucket_keeps_within_max_points():
+    assert trends.choose_bucket(START, START + timedelta(days=199), 200) == 'day'
+    assert trends.choose_bucket(START, START + timedelta(days=200), 200) == 'week'
+    assert trends.choose_bucket(START, START + timedelta(days=1399), 200) == 'week'
+    assert trends.choose_bucket(START, START + timedelta(days=1400), 200) == 'month'
+    # Nothing coarser exists
+    assert trends.choose_bucket(START, START + timedelta(days=100000), 10) == 'month'
+
+
+@pytest.mark.parametrize('bucket', trends.BUCKETS)
+def test_sql_and_numpy_buckets_agree(series, bucket):
+    athlete_id, metric = series
+    criteria = _criteria(athlete_id, metric, START, START + timedelta(days=59))
+    in_sql = trends._sql_buckets(criteria, bucket, 'sqlite')
+    in_numpy = trends._numpy_buckets(criteria, bucket)
+    assert len(in_sql) == len(in_numpy)
+    for a, b in zip(in_sql, in_numpy):
+        assert a['date'] == b['date'] and a['count'] == b['count']
+        assert a['min'] == b['min'] and a['max'] == b['max'] and a['last'] == b['last']
+        assert a['mean'] == pytest.approx(b['mean'])
+
+
+def test_week_buckets_start_on_monday(series):
+    athlete_id, metric = series
+    rows = trends._sql_buckets(_criteria(athlete_id, metric, START, START + timedelta(days=59)), 'week', 'sqlite')
+    assert [row['date'] for row in rows] == [START + timedelta(weeks=i) for i in range(9)]
+    first = rows[0]
+    # Two results on the first day: the later-created one is the bucket's last on that date
+    assert first['count'] == 8
+    assert (first['min'], first['max']) == (5, 16)
+    assert first['last'] == 16
+
+
+def test_day_bucket_keeps_the_later_result_of_a_day(series):
+    athlete_id, metric = series
+    rows = trends._numpy_buckets(_criteria(athlete_id, metric, START, START), 'day')
+    assert rows == [{'date': START, 'min': 5.0, 'max': 7.0, 'mean': 6.0, 'last': 5.0, 'count': 2}]
+
+
+def test_max_points_caps_and_keeps_the_spike(series):
+    athlete_id, metric = series
+    end = START + timedelta(days=59)
+    result = trends.trend_series(athlete_id, metric, START, end, 'day', max_points=12)
+    points = result['points']
+    assert result['bucket'] == 'day' and len(points) == 12
+    assert points[0]['date'] == START.isoformat() and points[-1]['date'] == end.isoformat()
+    assert (START + timedelta(days=30)).isoformat() in [point['date'] for point in points]
+
+    auto = trends.trend_series(athlete_id, metric, START, end, max_points=12)
+    assert auto['bucket'] == 'week' and len(auto['points']) == 9
+
+
+def test_lttb_indices():
+    assert trends.lttb_indices([0, 1, 2], [0, 1, 2], 5) == [0, 1, 2]
+    assert trends.lttb_indices(list(range(10)), [0] * 10, 2) == [0, 9]
+    keep = trends.lttb_indices(list(range(100)), [0] * 50 + [100] + [0] * 49, 10)
+    assert len(keep) == 10 and keep[0] == 0 and keep[-1] == 99 and 50 in keep
+
+
+def test_empty_range_and_invalid_dates(app, client, login, series):
+    athlete_id, metric = series
+    empty = trends.trend_series(athlete_id, metric, date(2020, 1, 1), date(2020, 12, 31))
+    assert empty['points'] == [] and empty['bucket'] == 'week'
+    assert trends._numpy_buckets(_criteria(athlete_id, metric, date(2020, 1, 1), date(2020, 12, 31)), 'month') == []
+
+    with app.app_context():
+        admin = db.session.scalar(db.select(User).where(User.is_coach).order_by(User.email).limit(1))
+        admin.is_admin = True
+        db.session.commit()
+        email = admin.email
+    try:
+        url = f'/api/metrics/athlete/{athlete_id}/trend/{metric.id}'
+        headers = login(email)
+        response = client.get(url, query_string={'start': '2022-03-01', 'end': '2022-01-01'}, headers=headers)
+        assert response.status_code == 400
+        response = client.get(url, query_string={'start': '2019-01-01', 'end': '2022-12-31', 'max_points': 50},
+                              headers=headers)
+        assert response.status_code == 200
+        assert response.get_json()['bucket'] == 'month'
+        assert [p['count'] for p in response.get_json()['points']] == [30, 28, 3]
+    finally:
+        with app.app_context():
+            db.session.scalars(db.select(User).where(User.email == email)).one().is_admin = False
+            db.session.commit()
@@ -0,0 +1,238 @@
+from app import create_app, db
+import click
+import os
+
+app = create_app()
+
+@app.cli.command()
+def init_db():
+    """Initialize the database."""
+    db.create_all()
+    print('Database initialized.')
+
+@app.cli.command()
+def seed_db():
+    """Seed the database with initial data."""
+    from app.models.user import User
+
+    # Create admin user
+    admin = User(
+        email='admin@aiptrack.com',
+        first_name='Admin',
+        last_name='User',
+        is_admin=True
+    )
+    admin.set_password('admin123')
+
+    db.session.add(admin)
+    db.session.commit()
+    print('Database seeded.')
+
+@app.cli.command()
+@click.option('--athlete', 'athlete_ids', multiple=True, help='Only rebuild these athlete IDs.')
+def rebuild_rollups(athlete_ids):
+    """Rebuild athlete metric rollups and last_tested from raw metrics."""
+    from app.services.rollups import rebuild
+
+    written = rebuild(set(athlete_ids) or None)
+    print(f'Rollups rebuilt: {written} rows.')
+
+@app.cli.command()
+@click.argument('csv_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--gym', 'gym_id', help='Gym the results belong to (new imports).')
+@click.option('--coach', 'coach_id', help='Coach recorded on every row (new imports).')
+@click.option('--resume', 'import_id', help='Continue an unfinished import of the same file.')
+@click.option('--batch-size', type=int, help='Rows per committed batch (default IMPORT_BATCH_SIZE).')
+def import_metrics(csv_file, gym_id, coach_id, import_id, batch_size):
+    """Import historical performance results from a CSV file."""
+    import sys
+    from contextlib import closing
+    from app.services import imports
+
+    with open(csv_file, encoding='utf-8-sig', newline='') as f:
+        try:
+            columns, reader = imports.open_rows(f)
+            if import_id:
+                job = imports.resume_import(import_id)
+            elif gym_id and coach_id:
+                job = imports.start_import(gym_id, coach_id, filename=os.path.basename(csv_file))
+            else:
+                raise click.UsageError('Pass --gym and --coach, or --resume')
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        print(f'Import {job.id}: starting after row {job.rows_read}')
+        with closing(imports.run_import(job, columns, reader, batch_size=batch_size)) as progress:
+            for event in progress:
+                if event['type'] == 'error':
+                    print(f'  row {event["row"]}: {event["error"]}', file=sys.stderr)
+                elif event['type'] == 'progress':
+                    print(f'  {event["rows_read"]} rows read, {event["inserted"]} inserted, {event["failed"]} rejected')
+                elif event['type'] == 'failed':
+                    raise click.ClickException(
+                        f'Import {job.id} failed after row {event["rows_read"]}: {event["error"]} '
+                        f'(continue with --resume {job.id})'
+                    )
+        print(f'Import {job.id} completed: {job.inserted} inserted, {job.failed} rejected.')
+
+@app.cli.command()
+@click.option('--days', type=int, help='Keep this many days (default SYNC_TOMBSTONE_RETENTION_DAYS).')
+def prune_sync_tombstones(days):
+    """Delete sync tombstones older than the retention window."""
+    from app.services.sync import prune_tombstones
+
+    print(f'Sync tombstones pruned: {prune_tombstones(days)} rows.')
+
+@app.cli.command()
+@click.argument('user_id')
+@click.option('--before', type=click.DateTime(), help='Revoke tokens issued up to this UTC time (default now).')
+def revoke_tokens(user_id, before):
+    """Revoke a user's access tokens."""
+    from app.services.revocation import revoke_user_tokens
+
+    revoke_user_tokens(user_id, before)
+    db.session.commit()
+    print(f'Tokens of user {user_id} issued up to {before or "now"} revoked.')
+
+@app.cli.command()
+@click.option('--full', is_flag=True, help='Recompute every athlete, not only those with new results.')
+@click.option('--processes', type=int, help='Processes for the computation (default ANALYTICS_PROCESSES).')
+@click.option('--chunk-size', type=int, help='Athletes per query (default ANALYTICS_CHUNK_SIZE).')
+def compute_analytics(full, processes, chunk_size):
+    """Compute progress rates, plateaus and outliers (run nightly)."""
+    from app.services import analytics
+
+    run = analytics.run(full=full, processes=processes, chunk_size=chunk_size)
+    seconds = (run.finished_at - run.started_at).total_seconds()
+    print(f'{"Full" if run.full else "Incremental"} analytics run: {run.athletes} athletes, '
+          f'{run.rows_read} results read, {run.rows_written} rows written in {seconds:.1f}s.')
+
+@app.cli.command()
+@click.option('--once', is_flag=True, help='Exit when no jobs are due instead of polling.')
+def run_jobs(once):
+    """Run background jobs (notification digests, image variants) until stopped."""
+    import signal
+    import threading
+    from app.services import images, jobs, notifications
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    print(f'Job worker {jobs.worker_name()} handling: {", ".join(jobs.HANDLERS)}')
+    try:
+        handled = jobs.run_worker(once=once, stop=stop)
+    finally:
+        notifications.close()
+        images.close()
+    print(f'Job worker stopped after {handled} jobs.')
+
+@app.cli.command()
+@click.option('--kind', help='Only jobs of this kind, e.g. notify.digest.')
+def retry_failed_jobs(kind):
+    """Queue failed background jobs again."""
+    from app.services import jobs
+
+    print(f'Jobs queued again: {jobs.retry_failed(kind)}.')
+
+@app.cli.command()
+@click.option('--athlete', 'athlete_id', help='Only this athlete.')
+@click.option('--gym', 'gym_id', help='Only results recorded in this gym.')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='Start date (YYYY-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='End date (YYYY-MM-DD).')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file (default stdout).')
+def export_metrics(athlete_id, gym_id, start, end, fmt, compress, output):
+    """Stream performance history as CSV or NDJSON."""
+    import sys
+    from app.services.exports import export_chunks, export_query
+
+    query = export_query(
+        athlete_id=athlete_id, gym_id=gym_id,
+        start=start.date() if start else None, end=end.date() if end else None
+    )
+    out = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for chunk in export_chunks(query, fmt, compress):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+
+@app.cli.command()
+@click.option('--gyms', default=50, show_default=True)
+@click.option('--coaches', default=500, show_default=True)
+@click.option('--athletes', default=20000, show_default=True)
+@click.option('--cohorts-per-coach', default=2, show_default=True)
+@click.option('--exercises', default=40, show_default=True)
+@click.option('--metrics', default=10_000_000, show_default=True, help='performance_metrics rows')
+@click.option('--days', default=730, show_default=True, help='Days of testing history.')
+@click.option('--seed', default=42, show_default=True)
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per insert batch.')
+@click.option('--anchor', type=click.DateTime(formats=['%Y-%m-%d']), default='2025-01-01', show_default=True,
+              help='Last day of testing history.')
+@click.option('--password', default='synthetic-password', show_default=True, help='Password for every synthetic user.')
+@click.option('--reset', is_flag=True, help='Drop and recreate every table first.')
+@click.confirmation_option('--yes', prompt='Insert synthetic data into the configured database?')
+def generate_data(reset, **scale):
+    """Fill the database at DATABASE_URL with seeded synthetic data."""
+    import time
+    from app.services import synthetic
+
+    if reset:
+        db.drop_all()
+    db.create_all()
+
+    reported = {}
+    def progress(table, rows):
+        # One line per table, then every 100k rows for the big ones
+        if table not in reported or rows - reported[table] >= 100_000:
+            reported[table] = rows
+            print(f'  {table}: {rows}')
+
+    start = time.perf_counter()
+    counts = synthetic.generate(progress=progress, **scale)
+    print(f'Synthetic data generated in {time.perf_counter() - start:.1f}s:')
+    for table, rows in counts.items():
+        print(f'  {table}: {rows}')
+
+@app.cli.command()
+@click.option('--dry-run', is_flag=True, help='Print the SQL without running it.')
+def convert_id_columns(dry_run):
+    """Convert VARCHAR(36) ID columns to BINARY(16) (MySQL/MariaDB).
+
+    Not transactional: each ALTER TABLE commits on its own. If it fails
+    partway, fix the cause and run it again to finish the conversion.
+    """
+    from app.services.id_migration import conversion_statements, convert
+
+    statements = conversion_statements()
+    if not statements:
+        print('ID columns already use the current storage; nothing to convert.')
+        return
+    if dry_run:
+        for statement in statements:
+            print(f'{statement};')
+        return
+    convert(statements)
+    print(f'ID columns converted ({len(statements)} statements).')
+
+@app.cli.command()
+def generate_docs():
+    """Generate API documentation."""
+    import yaml
+    import json
+
+    # Load OpenAPI spec
+    with open('openapi.yaml', 'r') as f:
+        spec = yaml.safe_load(f)
+
+    # Write JSON version
+    with open('openapi.json', 'w') as f:
+        json.dump(spec, f, indent=2)
+
+    print('API documentation generated: openapi.yaml, openapi.json')
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 3000)), debug=True)
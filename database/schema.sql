@@ -1,9 +1,14 @@
 -- Enable UUID extension for PostgreSQL (remove if using MySQL/MariaDB)
 -- CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- IDs are UUIDv7 (time-ordered) stored as BINARY(16); the application reads and
+-- writes them as 36-character strings. In SQL, write a literal ID with
+-- UNHEX(REPLACE('<uuid>', '-', '')) and read one with LOWER(HEX(id)).
+-- Databases created with VARCHAR(36) IDs are converted with `flask convert-id-columns`.
+
 -- Users Data table
 CREATE TABLE users (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     external_id VARCHAR(255),
     archived BOOLEAN DEFAULT FALSE NOT NULL,
     email VARCHAR(255) NOT NULL,
@@ -26,12 +31,15 @@ CREATE TABLE users (
     INDEX idx_users_external_id (external_id),
     INDEX idx_users_email (email),
     INDEX idx_users_roles (is_athlete, is_coach, is_admin),
-    INDEX idx_users_archived (archived)
+    INDEX idx_users_archived (archived),
+    INDEX idx_users_created_at_id (created_at, id),
+    INDEX idx_users_last_name_id (last_name, id),
+    INDEX idx_users_updated_at_id (updated_at, id)
 );
 
 -- Gym Data table
 CREATE TABLE gyms (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     address TEXT,
     phone VARCHAR(20),
@@ -42,18 +50,20 @@ CREATE TABLE gyms (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
 
     INDEX idx_gyms_name (name),
-    INDEX idx_gyms_archived (archived)
+    INDEX idx_gyms_archived (archived),
+    INDEX idx_gyms_updated_at_id (updated_at, id)
 );
 
 -- User-Gym Relationships
 CREATE TABLE user_gym_relationships (
-    id VARCHAR(36) PRIMARY KEY,
-    user_id VARCHAR(36) NOT NULL,
-    gym_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    user_id BINARY(16) NOT NULL,
+    gym_id BINARY(16) NOT NULL,
     role ENUM('athlete', 'coach') NOT NULL,
     is_active BOOLEAN DEFAULT TRUE NOT NULL,
     is_approved BOOLEAN DEFAULT FALSE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
 
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (gym_id) REFERENCES gyms(id) ON DELETE CASCADE,
@@ -62,17 +72,19 @@ CREATE TABLE user_gym_relationships (
     INDEX idx_user_gym_gym_id (gym_id),
     INDEX idx_user_gym_role (role),
     INDEX idx_user_gym_active (is_active),
-    INDEX idx_user_gym_approved (is_approved)
+    INDEX idx_user_gym_approved (is_approved),
+    INDEX idx_user_gym_updated_at_id (updated_at, id)
 );
 
 -- User-Coach Relationships
 CREATE TABLE user_coach_relationships (
-    id VARCHAR(36) PRIMARY KEY,
-    athlete_id VARCHAR(36) NOT NULL,
-    coach_id VARCHAR(36) NOT NULL,
-    gym_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    athlete_id BINARY(16) NOT NULL,
+    coach_id BINARY(16) NOT NULL,
+    gym_id BINARY(16) NOT NULL,
     is_active BOOLEAN DEFAULT TRUE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
 
     FOREIGN KEY (athlete_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (coach_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -81,18 +93,19 @@ CREATE TABLE user_coach_relationships (
     INDEX idx_user_coach_athlete_id (athlete_id),
     INDEX idx_user_coach_coach_id (coach_id),
     INDEX idx_user_coach_gym_id (gym_id),
-    INDEX idx_user_coach_active (is_active)
+    INDEX idx_user_coach_active (is_active),
+    INDEX idx_user_coach_updated_at_id (updated_at, id)
 );
 
 -- Cohort Definition
 CREATE TABLE cohorts (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     description TEXT,
     color VARCHAR(7), -- hex color code #RRGGBB
     image_url VARCHAR(500),
-    coach_id VARCHAR(36) NOT NULL,
-    gym_id VARCHAR(36) NOT NULL,
+    coach_id BINARY(16) NOT NULL,
+    gym_id BINARY(16) NOT NULL,
     is_active BOOLEAN DEFAULT TRUE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
@@ -102,30 +115,33 @@ CREATE TABLE cohorts (
     INDEX idx_cohorts_coach_id (coach_id),
     INDEX idx_cohorts_gym_id (gym_id),
     INDEX idx_cohorts_name (name),
-    INDEX idx_cohorts_active (is_active)
+    INDEX idx_cohorts_active (is_active),
+    INDEX idx_cohorts_updated_at_id (updated_at, id)
 );
 
 -- Cohort Membership
 CREATE TABLE cohort_memberships (
-    id VARCHAR(36) PRIMARY KEY,
-    cohort_id VARCHAR(36) NOT NULL,
-    athlete_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    cohort_id BINARY(16) NOT NULL,
+    athlete_id BINARY(16) NOT NULL,
     joined_at DATE NOT NULL,
     is_active BOOLEAN DEFAULT TRUE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
 
     FOREIGN KEY (cohort_id) REFERENCES cohorts(id) ON DELETE CASCADE,
     FOREIGN KEY (athlete_id) REFERENCES users(id) ON DELETE CASCADE,
     UNIQUE KEY unique_cohort_athlete (cohort_id, athlete_id),
     INDEX idx_cohort_membership_cohort_id (cohort_id),
     INDEX idx_cohort_membership_athlete_id (athlete_id),
-    INDEX idx_cohort_membership_active (is_active)
+    INDEX idx_cohort_membership_active (is_active),
+    INDEX idx_cohort_membership_updated_at_id (updated_at, id)
 );
 
 -- Responsible Party Data
 CREATE TABLE responsible_parties (
-    id VARCHAR(36) PRIMARY KEY,
-    athlete_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    athlete_id BINARY(16) NOT NULL,
     archived BOOLEAN DEFAULT FALSE NOT NULL,
     email VARCHAR(255) NOT NULL,
     first_name VARCHAR(100) NOT NULL,
@@ -142,9 +158,9 @@ CREATE TABLE responsible_parties (
 
 -- Exercise Definition
 CREATE TABLE exercises (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     is_enabled BOOLEAN DEFAULT TRUE NOT NULL,
-    creator_id VARCHAR(36),
+    creator_id BINARY(16),
     name VARCHAR(255) NOT NULL,
     creator_name VARCHAR(255),
     category ENUM('custom', 'system') NOT NULL,
@@ -158,14 +174,15 @@ CREATE TABLE exercises (
     INDEX idx_exercises_name (name),
     INDEX idx_exercises_category (category),
     INDEX idx_exercises_creator_id (creator_id),
-    INDEX idx_exercises_enabled (is_enabled)
+    INDEX idx_exercises_enabled (is_enabled),
+    INDEX idx_exercises_updated_at_id (updated_at, id)
 );
 
 -- Exercise Body Segments
 CREATE TABLE exercise_body_segments (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
-    exercise_id VARCHAR(36) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
     description TEXT,
 
     FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE,
@@ -175,9 +192,9 @@ CREATE TABLE exercise_body_segments (
 
 -- Exercise Equipment
 CREATE TABLE exercise_equipment (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
-    exercise_id VARCHAR(36) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
     description TEXT,
 
     FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE,
@@ -187,9 +204,9 @@ CREATE TABLE exercise_equipment (
 
 -- Exercise Search Terms
 CREATE TABLE exercise_search_terms (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
-    exercise_id VARCHAR(36) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
     description TEXT,
 
     FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE,
@@ -199,9 +216,9 @@ CREATE TABLE exercise_search_terms (
 
 -- Exercise Metrics
 CREATE TABLE exercise_metrics (
-    id VARCHAR(36) PRIMARY KEY,
+    id BINARY(16) PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
-    exercise_id VARCHAR(36) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
     is_enabled BOOLEAN DEFAULT TRUE NOT NULL,
     display_units ENUM('metric', 'imperial') DEFAULT 'metric' NOT NULL,
     unit_of_measure ENUM('Meter', 'Kilogram', 'Second', 'Newton', 'Watt', 'Number') NOT NULL,
@@ -209,6 +226,7 @@ CREATE TABLE exercise_metrics (
     min_value DECIMAL(15,6),
     max_value DECIMAL(15,6),
     default_value DECIMAL(15,6),
+    higher_is_better BOOLEAN DEFAULT TRUE NOT NULL, -- FALSE for times, where the lowest value is the personal best
 
     FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE,
     INDEX idx_exercise_metrics_exercise_id (exercise_id),
@@ -221,12 +239,12 @@ CREATE TABLE exercise_metrics (
 
 -- Performance Metrics
 CREATE TABLE performance_metrics (
-    id VARCHAR(36) PRIMARY KEY,
-    athlete_id VARCHAR(36) NOT NULL,
-    exercise_id VARCHAR(36) NOT NULL,
-    coach_id VARCHAR(36) NOT NULL,
-    gym_id VARCHAR(36) NOT NULL,
-    exercise_metric_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    athlete_id BINARY(16) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
+    coach_id BINARY(16) NOT NULL,
+    gym_id BINARY(16) NOT NULL,
+    exercise_metric_id BINARY(16) NOT NULL,
     value DECIMAL(15,6) NOT NULL,
     date DATE NOT NULL,
     notes TEXT,
@@ -246,13 +264,161 @@ CREATE TABLE performance_metrics (
     INDEX idx_performance_metrics_metric_id (exercise_metric_id),
     INDEX idx_performance_metrics_date (date),
     INDEX idx_performance_metrics_athlete_date (athlete_id, date),
-    INDEX idx_performance_metrics_athlete_exercise (athlete_id, exercise_id)
+    INDEX idx_performance_metrics_athlete_exercise (athlete_id, exercise_id),
+    INDEX idx_performance_metrics_updated_at_id (updated_at, id)
+);
+
+-- Athlete metric rollups (personal best, latest value and test count per athlete and metric)
+-- Maintained in the same transaction as performance_metrics writes; rebuild with `flask rebuild-rollups`
+CREATE TABLE athlete_metric_rollups (
+    id BINARY(16) PRIMARY KEY,
+    athlete_id BINARY(16) NOT NULL,
+    exercise_metric_id BINARY(16) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
+    test_count INT DEFAULT 0 NOT NULL,
+    best_value DECIMAL(15,6) NOT NULL,
+    best_date DATE NOT NULL,
+    latest_value DECIMAL(15,6) NOT NULL,
+    latest_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
+
+    FOREIGN KEY (athlete_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE,
+    FOREIGN KEY (exercise_metric_id) REFERENCES exercise_metrics(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_athlete_metric (athlete_id, exercise_metric_id),
+    INDEX idx_rollups_metric_best (exercise_metric_id, best_value),
+    INDEX idx_rollups_latest_date (latest_date)
+);
+
+-- Progress analytics per athlete and metric, written nightly by `flask compute-analytics`
+CREATE TABLE athlete_metric_analytics (
+    id BINARY(16) PRIMARY KEY,
+    athlete_id BINARY(16) NOT NULL,
+    exercise_metric_id BINARY(16) NOT NULL,
+    exercise_id BINARY(16) NOT NULL,
+    sample_count INT NOT NULL,
+    first_date DATE NOT NULL,
+    last_date DATE NOT NULL,
+    rolling_mean DECIMAL(15,6) NOT NULL,
+    slope_per_week DECIMAL(15,6),
+    progress_pct DOUBLE,
+    plateau BOOLEAN DEFAULT FALSE NOT NULL,
+    plateau_since DATE,
+    outlier_count INT DEFAULT 0 NOT NULL,
+    latest_is_outlier BOOLEAN DEFAULT FALSE NOT NULL,
+    computed_at DATETIME NOT NULL,
+
+    FOREIGN KEY (athlete_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (exercise_id) REFERENCES exercises(id) ON DELETE CASCADE,
+    FOREIGN KEY (exercise_metric_id) REFERENCES exercise_metrics(id) ON DELETE CASCADE,
+    UNIQUE KEY unique_athlete_metric_analytics (athlete_id, exercise_metric_id),
+    INDEX idx_analytics_metric_last_date (exercise_metric_id, last_date)
+);
+
+-- Runs of `flask compute-analytics`; the next incremental run reads results changed since the last watermark
+CREATE TABLE analytics_runs (
+    id BINARY(16) PRIMARY KEY,
+    full BOOLEAN DEFAULT FALSE NOT NULL,
+    watermark DATETIME NOT NULL,
+    athletes INT DEFAULT 0 NOT NULL,
+    rows_read INT DEFAULT 0 NOT NULL,
+    rows_written INT DEFAULT 0 NOT NULL,
+    started_at DATETIME NOT NULL,
+    finished_at DATETIME,
+
+    INDEX idx_analytics_runs_finished_at (finished_at)
+);
+
+-- CSV imports of historical results; rows_read is committed with each batch so imports can resume
+CREATE TABLE metric_imports (
+    id BINARY(16) PRIMARY KEY,
+    gym_id BINARY(16) NOT NULL,
+    coach_id BINARY(16) NOT NULL,
+    created_by BINARY(16),
+    filename VARCHAR(255),
+    status ENUM('running', 'completed', 'failed') DEFAULT 'running' NOT NULL,
+    rows_read INT DEFAULT 0 NOT NULL,
+    inserted INT DEFAULT 0 NOT NULL,
+    failed INT DEFAULT 0 NOT NULL,
+    message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
+
+    FOREIGN KEY (gym_id) REFERENCES gyms(id) ON DELETE CASCADE,
+    FOREIGN KEY (coach_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE SET NULL
+);
+
+-- Rejected rows of a metric import
+CREATE TABLE metric_import_errors (
+    id BINARY(16) PRIMARY KEY,
+    import_id BINARY(16) NOT NULL,
+    row_number INT NOT NULL,
+    error VARCHAR(255) NOT NULL,
+    line TEXT,
+
+    FOREIGN KEY (import_id) REFERENCES metric_imports(id) ON DELETE CASCADE,
+    INDEX idx_metric_import_errors_row (import_id, row_number)
+);
+
+-- Deleted rows reported by delta sync (GET /api/sync); prune with `flask prune-sync-tombstones`
+CREATE TABLE sync_tombstones (
+    id BINARY(16) PRIMARY KEY,
+    entity VARCHAR(50) NOT NULL,
+    entity_id BINARY(16) NOT NULL,
+    athlete_id BINARY(16),
+    gym_id BINARY(16),
+    cohort_id BINARY(16),
+    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+
+    INDEX idx_sync_tombstones_deleted_at_id (deleted_at, id)
+);
+
+-- Background jobs run by `flask run-jobs` (notification digests); finished jobs are deleted
+CREATE TABLE jobs (
+    id BINARY(16) PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    payload JSON NOT NULL,
+    status ENUM('queued', 'running', 'failed') DEFAULT 'queued' NOT NULL,
+    attempts INT DEFAULT 0 NOT NULL,
+    run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
+
+    INDEX idx_jobs_kind_status_run_at (kind, status, run_at)
+);
+
+-- Revoked access tokens (logout), kept until the token expires
+CREATE TABLE revoked_tokens (
+    jti VARCHAR(36) PRIMARY KEY,
+    user_id BINARY(16),
+    expires_at DATETIME NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_revoked_tokens_expires_at (expires_at),
+    INDEX idx_revoked_tokens_created_at (created_at)
+);
+
+-- Per-user revocation of every token issued up to revoked_before (archival, log out everywhere)
+CREATE TABLE token_cutoffs (
+    user_id BINARY(16) PRIMARY KEY,
+    revoked_before DATETIME(6) NOT NULL,
+    expires_at DATETIME NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP NOT NULL,
+
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_token_cutoffs_expires_at (expires_at),
+    INDEX idx_token_cutoffs_updated_at (updated_at)
 );
 
 -- Notifications table (for tracking notification preferences and history)
 CREATE TABLE notifications (
-    id VARCHAR(36) PRIMARY KEY,
-    user_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    user_id BINARY(16) NOT NULL,
     type ENUM('performance_update', 'cohort_invitation', 'system_alert') NOT NULL,
     title VARCHAR(255) NOT NULL,
     message TEXT NOT NULL,
@@ -269,8 +435,8 @@ CREATE TABLE notifications (
 
 -- User preferences for notifications
 CREATE TABLE user_notification_preferences (
-    id VARCHAR(36) PRIMARY KEY,
-    user_id VARCHAR(36) NOT NULL,
+    id BINARY(16) PRIMARY KEY,
+    user_id BINARY(16) NOT NULL,
     email_notifications BOOLEAN DEFAULT TRUE NOT NULL,
     performance_updates BOOLEAN DEFAULT TRUE NOT NULL,
     cohort_updates BOOLEAN DEFAULT TRUE NOT NULL,